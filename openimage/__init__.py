@@ -0,0 +1,7 @@
+# Celery is optional: load its app only when installed (GENERATION_JOB_BROKER = 'celery')
+try:
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
+
+__all__ = ('celery_app',)
@@ -3,6 +3,10 @@ ASGI config for openimage project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (``uvicorn openimage.asgi:application``) so the
+async generation endpoint (api/generate-async/) runs provider calls on the
+event loop instead of blocking one worker thread per request.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
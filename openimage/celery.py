@@ -0,0 +1,16 @@
+"""
+Celery application for OpenImage (optional)
+
+Only needed with GENERATION_JOB_BROKER = 'celery':
+    celery -A openimage worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'openimage.settings')
+
+app = Celery('openimage')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -6,7 +6,7 @@ from pathlib import Path
 import os
 # from django.core.management.utils import get_random_secret_key
 
-from decouple import config   # type: ignore
+from decouple import config, Csv   # type: ignore
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -181,6 +181,150 @@ STABILITY_AI_API_KEY = config('STABILITY_AI_API_KEY')
 RUNWARE_API_KEY = config('RUNWARE_API_KEY')
 REPLICATE_API_KEY = config('REPLICATE_API_KEY')
 
+# === Provider HTTP connection pool ===
+# Connect timeout (s); read timeouts are set per call by each client
+HTTP_CONNECT_TIMEOUT = config('HTTP_CONNECT_TIMEOUT', default=5.0, cast=float)
+# Keep-alive connections kept per host
+HTTP_POOL_MAXSIZE = config('HTTP_POOL_MAXSIZE', default=10, cast=int)
+# Per-host overrides, e.g. {'stablehorde.net': 40}
+HTTP_POOL_HOST_SIZES = {}
+# Largest image payload accepted from a provider (bytes)
+IMAGE_DOWNLOAD_MAX_BYTES = config('IMAGE_DOWNLOAD_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+# Payloads above this size are buffered in a temp file instead of memory
+IMAGE_DOWNLOAD_SPOOL_BYTES = config('IMAGE_DOWNLOAD_SPOOL_BYTES', default=4 * 1024 * 1024, cast=int)
+
+# Encoding of images returned decoded by an SDK (HuggingFace): PNG zlib level
+# (0-9, Pillow defaults to 6) and JPEG/WEBP quality
+IMAGE_ENCODE_PNG_COMPRESS_LEVEL = config('IMAGE_ENCODE_PNG_COMPRESS_LEVEL', default=1, cast=int)
+IMAGE_ENCODE_QUALITY = config('IMAGE_ENCODE_QUALITY', default=90, cast=int)
+
+# === Provider base URLs ===
+# Per-provider API base URL overrides, e.g. {'replicate': 'http://localhost:9000/v1'}
+PROVIDER_BASE_URLS = {}
+# Send every provider to the local emulator (`manage.py provider_emulator`),
+# e.g. http://127.0.0.1:8765; empty for the real APIs
+PROVIDER_EMULATOR_URL = config('PROVIDER_EMULATOR_URL', default='')
+
+# === Hedged generation (hedge_providers form field) ===
+# Seconds before the next provider in the list is started
+HEDGE_DELAY = config('HEDGE_DELAY', default=4.0, cast=float)
+
+# === Circuit breakers and failover ===
+# Defaults for every provider breaker (see you_image_generator/circuit_breaker.py)
+CIRCUIT_BREAKER = {
+    'failure_rate': config('CIRCUIT_BREAKER_FAILURE_RATE', default=0.5, cast=float),
+    'open_seconds': config('CIRCUIT_BREAKER_OPEN_SECONDS', default=60.0, cast=float),
+}
+# Per-provider overrides (queued providers are slow by nature)
+CIRCUIT_BREAKER_PROVIDERS = {
+    'aihorde': {'slow_call_seconds': 170.0},
+    'prodia': {'slow_call_seconds': 110.0},
+}
+# Providers tried in order when the requested one fails or its circuit is open
+# (empty to disable failover)
+PROVIDER_FALLBACK_CHAIN = [
+    p.strip() for p in config('PROVIDER_FALLBACK_CHAIN', default='pollinations,aihorde').split(',') if p.strip()
+]
+
+# === Provider quotas ===
+# Token bucket / daily quota per metered provider, shared by every worker
+# (see you_image_generator/rate_limiter.py for the built-in free-tier limits)
+RATE_LIMITS = {
+    'cloudflare': {'daily_quota': config('CLOUDFLARE_DAILY_QUOTA', default=20, cast=int)},
+    'segmind': {'daily_quota': config('SEGMIND_DAILY_QUOTA', default=100, cast=int)},
+}
+# 'database' (default) or 'redis'
+RATE_LIMIT_BACKEND = config('RATE_LIMIT_BACKEND', default='database')
+RATE_LIMIT_REDIS_URL = config('RATE_LIMIT_REDIS_URL', default='redis://localhost:6379/0')
+
+# === Single-flight ===
+# Identical requests in flight share one upstream generation (you_image_generator/single_flight.py)
+SINGLE_FLIGHT_ENABLED = config('SINGLE_FLIGHT_ENABLED', default=True, cast=bool)
+# Also coalesce across workers (InFlightGeneration rows)
+SINGLE_FLIGHT_DISTRIBUTED = config('SINGLE_FLIGHT_DISTRIBUTED', default=True, cast=bool)
+# 'shared': every requester gets the same saved image; 'per_request': one row each
+SINGLE_FLIGHT_ROWS = config('SINGLE_FLIGHT_ROWS', default='shared')
+SINGLE_FLIGHT_LEASE = config('SINGLE_FLIGHT_LEASE', default=300.0, cast=float)
+SINGLE_FLIGHT_LINGER = config('SINGLE_FLIGHT_LINGER', default=2.0, cast=float)
+
+# === Result cache ===
+# Seeded requests to deterministic providers reuse the saved image (you_image_generator/result_cache.py)
+RESULT_CACHE_ENABLED = config('RESULT_CACHE_ENABLED', default=True, cast=bool)
+RESULT_CACHE_TTL = config('RESULT_CACHE_TTL', default=7 * 24 * 3600, cast=int)
+RESULT_CACHE_MAX_ENTRIES = config('RESULT_CACHE_MAX_ENTRIES', default=1000, cast=int)
+
+# === Batch generation ===
+# Upper bound of num_images per generate request
+MAX_IMAGES_PER_REQUEST = config('MAX_IMAGES_PER_REQUEST', default=4, cast=int)
+
+# === Grid generation ===
+# Prompt x provider x style grids (you_image_generator/grid.py)
+GRID_MAX_CELLS = config('GRID_MAX_CELLS', default=48, cast=int)
+GRID_CONCURRENCY_PER_PROVIDER = config('GRID_CONCURRENCY_PER_PROVIDER', default=2, cast=int)
+
+# === Background jobs ===
+# generate/ with background=1 returns a job id (you_image_generator/jobs.py)
+# 'local': thread pool in the web process; 'database': `manage.py generation_worker`
+# processes; 'celery': Celery workers (`celery -A openimage worker`)
+GENERATION_JOB_BROKER = config('GENERATION_JOB_BROKER', default='local')
+# Dotted path of a callable(data) -> (body, status); empty for the built-in pipeline
+GENERATION_JOB_RUNNER = config('GENERATION_JOB_RUNNER', default='')
+GENERATION_WORKERS = config('GENERATION_WORKERS', default=4, cast=int)
+GENERATION_JOB_TIMEOUT = config('GENERATION_JOB_TIMEOUT', default=600, cast=int)
+GENERATION_JOB_MAX_ATTEMPTS = config('GENERATION_JOB_MAX_ATTEMPTS', default=2, cast=int)
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/1')
+# Progress stream of a job (api/jobs/<id>/events/): seconds between checks, max duration
+JOB_EVENTS_POLL_INTERVAL = config('JOB_EVENTS_POLL_INTERVAL', default=0.5, cast=float)
+JOB_EVENTS_TIMEOUT = config('JOB_EVENTS_TIMEOUT', default=600, cast=int)
+
+# === Metrics (api/metrics, Prometheus format) ===
+# Directory where each worker process writes its metrics so any worker can
+# report them all (empty: per process only). One directory per deployment and
+# host: files of exited processes are merged by pid.
+METRICS_DIR = config('METRICS_DIR', default=str(BASE_DIR / 'metrics'))
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=1.0, cast=float)
+
+# === Image blob storage ===
+# Image bytes are kept out of the database (you_image_generator/blob_storage.py):
+# 'local' (content-addressed files), 's3' (S3-compatible bucket, needs boto3)
+BLOB_STORAGE_BACKEND = config('BLOB_STORAGE_BACKEND', default='local')
+BLOB_STORAGE_ROOT = config('BLOB_STORAGE_ROOT', default=str(BASE_DIR / 'media' / 'blobs'))
+BLOB_STORAGE_S3_BUCKET = config('BLOB_STORAGE_S3_BUCKET', default='')
+BLOB_STORAGE_S3_PREFIX = config('BLOB_STORAGE_S3_PREFIX', default='images/')
+# Non-AWS endpoint, e.g. http://minio:9000
+BLOB_STORAGE_S3_ENDPOINT_URL = config('BLOB_STORAGE_S3_ENDPOINT_URL', default='')
+BLOB_STORAGE_S3_REGION = config('BLOB_STORAGE_S3_REGION', default='')
+BLOB_STORAGE_S3_ACCESS_KEY = config('BLOB_STORAGE_S3_ACCESS_KEY', default='')
+BLOB_STORAGE_S3_SECRET_KEY = config('BLOB_STORAGE_S3_SECRET_KEY', default='')
+
+# === Image files (image/<id>/) ===
+# Browser/CDN cache lifetime in seconds (image URLs never change content)
+IMAGE_CACHE_MAX_AGE = config('IMAGE_CACHE_MAX_AGE', default=31536000, cast=int)
+# Let the front server send blobs stored on disk: '' (Django streams them),
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache mod_xsendfile, lighttpd)
+IMAGE_SENDFILE = config('IMAGE_SENDFILE', default='')
+# nginx internal location aliased to BLOB_STORAGE_ROOT
+IMAGE_ACCEL_REDIRECT_PREFIX = config('IMAGE_ACCEL_REDIRECT_PREFIX', default='/protected-blobs/')
+
+# === Thumbnails (image/<id>/thumb/<size>/) ===
+# Longest side in pixels of each thumbnail (you_image_generator/thumbnails.py)
+THUMBNAIL_SIZES = config('THUMBNAIL_SIZES', default='128,256,512', cast=Csv(int))
+# 'webp' or 'avif' (needs a Pillow built with AVIF support)
+THUMBNAIL_FORMAT = config('THUMBNAIL_FORMAT', default='webp')
+THUMBNAIL_QUALITY = config('THUMBNAIL_QUALITY', default=80, cast=int)
+# 'background': thread pool of the web process after the image is saved;
+# 'sync': in the saving request; 'off': `manage.py generate_thumbnails` or
+# on the first request of each size
+THUMBNAIL_MODE = config('THUMBNAIL_MODE', default='background')
+THUMBNAIL_WORKERS = config('THUMBNAIL_WORKERS', default=2, cast=int)
+# Size linked from gallery and search results
+THUMBNAIL_GALLERY_SIZE = config('THUMBNAIL_GALLERY_SIZE', default=256, cast=int)
+
+# === Gallery (api/gallery/) ===
+# Images per infinite-scroll page, and the largest ?limit= accepted
+GALLERY_PAGE_SIZE = config('GALLERY_PAGE_SIZE', default=24, cast=int)
+GALLERY_MAX_PAGE_SIZE = config('GALLERY_MAX_PAGE_SIZE', default=100, cast=int)
+
 # Default provider
 DEFAULT_IMAGE_PROVIDER = config('DEFAULT_IMAGE_PROVIDER', 'pollinations')
 DEFAULT_IMAGE_GENERATION_MODEL = config('DEFAULT_IMAGE_GENERATION_MODEL', 'core')
@@ -1,25 +1,25 @@
 let modelsConfig = {};
 let currentGeneratedData = {};
-let allImages = [];
-const IMAGES_PER_PAGE = 20;
-let currentPage = 1;
+// Gallery: images shown so far and position of the next page (api/gallery/)
+let galleryImages = [];
+let nextCursor = null;
+let loadingGalleryPage = false;
 
 document.addEventListener('DOMContentLoaded', function() {
-    // Charger les images depuis le script JSON
+    // Première page de la galerie (métadonnées seules) depuis le script JSON
     const imagesDataElement = document.getElementById('images-data');
     if (imagesDataElement) {
         try {
-            allImages = JSON.parse(imagesDataElement.textContent);
+            addGalleryPage(JSON.parse(imagesDataElement.textContent));
         } catch (e) {
             console.error('Error parsing images data:', e);
-            allImages = [];
         }
     }
+    observeGalleryEnd();
 
     loadModelsConfig().then(() => {
         const providerInput = document.getElementById('providerInput');
         updateAdvancedOptions(providerInput.value);
-        if (allImages.length > 0) renderGallery();
     });
 });
 
@@ -228,6 +228,128 @@ function toggleAdvanced() {
     document.getElementById('advancedOptions').classList.toggle('active');
 }
 
+// Progress messages of a background job (api/jobs/<id>/events/)
+const PROGRESS_MESSAGES = {
+    queued: data => data.position ? `Queued, ${data.position} job(s) ahead...` : 'Queued, starting soon...',
+    position: data => `Waiting in the ${data.provider || 'provider'} queue` +
+        (data.position ? ` (position ${data.position})` : '') +
+        (data.wait_time ? `, about ${data.wait_time}s` : '') + '...',
+    processing: data => data.message ? `Generating: ${data.message}` :
+        (data.wait_time ? `Generating, about ${data.wait_time}s left...` : 'Generating your masterpiece...'),
+    downloading: () => 'Downloading the image...',
+    complete: () => 'Done!'
+};
+
+function setLoadingStatus(text) {
+    const status = document.getElementById('loadingStatus');
+    if (status) status.textContent = text;
+}
+
+// Follow a job's progress stream until it is finished
+function streamJobEvents(job) {
+    return new Promise(resolve => {
+        const events = new EventSource(job.events_url);
+        Object.keys(PROGRESS_MESSAGES).forEach(stage => {
+            events.addEventListener(stage, e => setLoadingStatus(PROGRESS_MESSAGES[stage](JSON.parse(e.data))));
+        });
+        const finish = () => { events.close(); resolve(); };
+        events.addEventListener('complete', finish);
+        events.addEventListener('failed', finish);
+        events.onerror = () => { if (events.readyState === EventSource.CLOSED) finish(); };
+    });
+}
+
+// Poll a job's status until it is finished (WSGI servers, where a stream
+// would hold a worker thread)
+function pollJobStatus(job) {
+    return new Promise(resolve => {
+        const check = async () => {
+            try {
+                const status = await (await fetch(job.status_url)).json();
+                const progress = status.progress || {};
+                if (PROGRESS_MESSAGES[progress.stage]) setLoadingStatus(PROGRESS_MESSAGES[progress.stage](progress));
+                if (!status.status || ['succeeded', 'failed'].includes(status.status)) return resolve();
+            } catch (error) {
+                return resolve();
+            }
+            setTimeout(check, 1000);
+        };
+        check();
+    });
+}
+
+// Queue the generation as a job and follow its progress;
+// resolves with the final response of the job
+function generateInBackground(formData) {
+    formData.append('background', '1');
+    return fetch(window.GENERATE_API_URL, {
+        method: 'POST',
+        body: formData,
+        headers: { 'X-CSRFToken': formData.get('csrfmiddlewaretoken') }
+    }).then(async response => {
+        const job = await response.json();
+        if (response.status !== 202) return { response, data: job };
+
+        await (window.JOB_EVENTS_STREAM && window.EventSource ? streamJobEvents(job) : pollJobStatus(job));
+
+        const result = await fetch(job.result_url);
+        if (result.status === 202) {
+            return { response: { ok: false }, data: { error: 'Still generating, the image will appear in the gallery' } };
+        }
+        return { response: result, data: await result.json() };
+    });
+}
+
+function showGenerationResult(data, formData) {
+    const resultContainer = document.getElementById('resultContainer');
+
+    document.getElementById('generatedImage').src = `data:${data.content_type};base64,${data.image_base64}`;
+    document.getElementById('resultPrompt').textContent = data.prompt;
+    document.getElementById('resultModel').textContent = data.model_used;
+    document.getElementById('resultProvider').textContent = data.provider;
+    
+    // Stocker les données pour le modal
+    currentGeneratedData = {
+        prompt: data.prompt,
+        model: data.model_used,
+        width: formData.get('width'),
+        height: formData.get('height'),
+        format: formData.get('output_format') || 'PNG',
+        imageData: `data:${data.content_type};base64,${data.image_base64}`
+    };
+
+    resultContainer.classList.add('active');
+    resultContainer.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+
+    // Batch requests (num_images) return every image under `images`
+    const savedImages = (data.images || [data]).filter(image => image.id);
+    if (savedImages.length) {
+        savedImages.reverse().forEach(image => {
+            addGalleryItem({
+                id: image.id,
+                prompt: image.prompt,
+                model_used: image.model_used,
+                width: image.width || formData.get('width'),
+                height: image.height || formData.get('height'),
+                output_format: image.output_format || formData.get('output_format') || 'PNG',
+                style_preset: formData.get('style_preset') || '',
+                image_url: image.image_url,
+                // Fresh images: the thumbnail may not be made yet, the base64 is at hand
+                thumbnail_url: `data:${image.content_type};base64,${image.image_base64}`,
+                is_favorite: false
+            }, true);
+        });
+        document.querySelector('.gallery').style.display = '';
+        
+        setTimeout(() => {
+            document.querySelector('.gallery')?.scrollIntoView({ 
+                behavior: 'smooth', 
+                block: 'start' 
+            });
+        }, 500);
+    }
+}
+
 // Form submission
 document.getElementById('generateForm').addEventListener('submit', async function(e) {
     e.preventDefault();
@@ -239,61 +361,16 @@ document.getElementById('generateForm').addEventListener('submit', async functio
 
     resultContainer.classList.remove('active');
     errorMessage.classList.remove('active');
+    setLoadingStatus('Generating your masterpiece...');
     loading.classList.add('active');
     generateBtn.disabled = true;
 
     try {
-        const response = await fetch(window.GENERATE_API_URL, {
-            method: 'POST',
-            body: formData,
-            headers: { 'X-CSRFToken': formData.get('csrfmiddlewaretoken') }
-        });
-
-        const data = await response.json();
+        // Background job with live progress
+        const { response, data } = await generateInBackground(formData);
 
         if (response.ok) {
-            document.getElementById('generatedImage').src = `data:${data.content_type};base64,${data.image_base64}`;
-            document.getElementById('resultPrompt').textContent = data.prompt;
-            document.getElementById('resultModel').textContent = data.model_used;
-            document.getElementById('resultProvider').textContent = data.provider;
-            
-            // Stocker les données pour le modal
-            currentGeneratedData = {
-                prompt: data.prompt,
-                model: data.model_used,
-                width: formData.get('width'),
-                height: formData.get('height'),
-                format: formData.get('output_format') || 'PNG',
-                imageData: `data:${data.content_type};base64,${data.image_base64}`
-            };
-
-            resultContainer.classList.add('active');
-            resultContainer.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
-
-            if (data.id) {
-                const newImage = {
-                    id: data.id,
-                    image_data: data.image_base64,
-                    prompt: data.prompt,
-                    model_used: data.model_used,
-                    width: formData.get('width'),
-                    height: formData.get('height'),
-                    output_format: formData.get('output_format') || 'PNG',
-                    style_preset: formData.get('style_preset') || '',
-                    is_favorite: false
-                };
-                
-                allImages.unshift(newImage);
-                currentPage = 1;
-                renderGallery();
-                
-                setTimeout(() => {
-                    document.querySelector('.gallery')?.scrollIntoView({ 
-                        behavior: 'smooth', 
-                        block: 'start' 
-                    });
-                }, 500);
-            }
+            showGenerationResult(data, formData);
         } else {
             errorMessage.textContent = data.error || 'An error occurred';
             errorMessage.classList.add('active');
@@ -313,93 +390,120 @@ function generateAnother() {
     window.scrollTo({ top: 0, behavior: 'smooth' });
 }
 
-// Gallery with pagination
-function renderGallery() {
-    const gallery = document.getElementById('galleryGrid');
-    const pagination = document.getElementById('pagination');
+// Gallery with infinite scroll
+function addGalleryPage(page) {
+    (page.images || []).forEach(image => addGalleryItem(image));
+    nextCursor = page.next_cursor || null;
+}
 
+// Load the next page when the end of the gallery comes into view
+function observeGalleryEnd() {
+    const sentinel = document.getElementById('gallerySentinel');
+    if (!sentinel) return;
+    if (!window.IntersectionObserver) {
+        window.addEventListener('scroll', () => {
+            if (sentinel.getBoundingClientRect().top < window.innerHeight + 600) loadNextGalleryPage();
+        });
+        return;
+    }
+    new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadNextGalleryPage();
+    }, { rootMargin: '600px' }).observe(sentinel);
+}
+
+async function loadNextGalleryPage() {
+    if (!nextCursor || loadingGalleryPage) return;
+    loadingGalleryPage = true;
+    try {
+        const response = await fetch(`${window.GALLERY_API_URL}?cursor=${encodeURIComponent(nextCursor)}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        addGalleryPage(await response.json());
+    } catch (error) {
+        console.error('Error loading gallery page:', error);
+    } finally {
+        loadingGalleryPage = false;
+    }
+    // Still room on screen: keep loading
+    const sentinel = document.getElementById('gallerySentinel');
+    if (nextCursor && sentinel && sentinel.getBoundingClientRect().top < window.innerHeight) {
+        loadNextGalleryPage();
+    }
+}
+
+function addGalleryItem(image, prepend = false) {
+    const gallery = document.getElementById('galleryGrid');
     if (!gallery) return;
-    const startIndex = (currentPage - 1) * IMAGES_PER_PAGE;
-    const endIndex = startIndex + IMAGES_PER_PAGE;
-    const pageImages = allImages.slice(startIndex, endIndex);
-    gallery.innerHTML = '';
-    
-    pageImages.forEach(image => {
-        const item = document.createElement('div');
-        item.className = 'gallery-item';
-        item.style.position = 'relative';
+    if (prepend) galleryImages.unshift(image); else galleryImages.push(image);
+
+    const item = document.createElement('div');
+    item.className = 'gallery-item';
+    item.style.position = 'relative';
+
+    item.innerHTML = `
+        <span class="favorite-star" 
+            data-image-id="${image.id}"
+            style="position: absolute; top: 10px; right: 10px; 
+                    font-size: 24px; cursor: pointer; z-index: 10;
+                    filter: drop-shadow(0 2px 4px rgba(0,0,0,0.8));"
+            title="${image.is_favorite ? 'Remove from favorites' : 'Add to favorites'}">
+            ${image.is_favorite ? '⭐' : '☆'}
+        </span>
         
-        item.innerHTML = `
-            <span class="favorite-star" 
-                data-image-id="${image.id}"
-                style="position: absolute; top: 10px; right: 10px; 
-                        font-size: 24px; cursor: pointer; z-index: 10;
-                        filter: drop-shadow(0 2px 4px rgba(0,0,0,0.8));"
-                title="${image.is_favorite ? 'Remove from favorites' : 'Add to favorites'}">
-                ${image.is_favorite ? '⭐' : '☆'}
-            </span>
-            
-            <img src="data:image/png;base64,${image.image_data}" 
-                alt="${image.prompt}"
-                style="cursor: pointer;">
+        <img loading="lazy" decoding="async" style="cursor: pointer;">
+        
+        <div class="gallery-item-info">
+            <div class="gallery-item-prompt"></div>
+            <div class="gallery-item-model"></div>
             
-            <div class="gallery-item-info">
-                <div class="gallery-item-prompt">
-                    ${image.prompt.substring(0, 60)}${image.prompt.length > 60 ? '...' : ''}
-                </div>
-                <div class="gallery-item-model">${image.model_used}</div>
-                
-                <div class="action-buttons" style="display: flex; gap: 5px; margin-top: 8px;">
-                    <button class="btn-download"
-                            data-image-id="${image.id}"
-                            style="flex: 1; padding: 6px 10px; background: #2196F3; color: white; 
-                                border: none; border-radius: 4px; cursor: pointer; 
-                                font-size: 12px; font-weight: 600;">
-                        ⬇️ Download
-                    </button>
-                </div>
+            <div class="action-buttons" style="display: flex; gap: 5px; margin-top: 8px;">
+                <button class="btn-download"
+                        data-image-id="${image.id}"
+                        style="flex: 1; padding: 6px 10px; background: #2196F3; color: white; 
+                            border: none; border-radius: 4px; cursor: pointer; 
+                            font-size: 12px; font-weight: 600;">
+                    ⬇️ Download
+                </button>
             </div>
-        `;
-        
-        const imgElement = item.querySelector('img');
-        imgElement.addEventListener('click', () => {
-            openModal(`data:image/png;base64,${image.image_data}`, {
-                prompt: image.prompt,
-                model: image.model_used,
-                width: image.width || 'Unknown',
-                height: image.height || 'Unknown',
-                format: image.output_format || 'PNG',
-                style_preset: image.style_preset || '',
-                imageData: `data:image/png;base64,${image.image_data}`
-            });
-        });
-        
-        const star = item.querySelector('.favorite-star');
-        star.addEventListener('click', (e) => {
-            e.stopPropagation();
-            toggleFavorite(image.id, star);
-        });
-        
-        const btnDownload = item.querySelector('.btn-download');
-        btnDownload.addEventListener('click', (e) => {
-            e.stopPropagation();
-            const link = document.createElement('a');
-            link.href = `data:image/png;base64,${image.image_data}`;
-            link.download = `openimage_${image.id}.png`;
-            document.body.appendChild(link);
-            link.click();
-            document.body.removeChild(link);
+        </div>
+    `;
+
+    const imgElement = item.querySelector('img');
+    imgElement.src = image.thumbnail_url;
+    imgElement.alt = image.prompt;
+    item.querySelector('.gallery-item-prompt').textContent =
+        image.prompt.substring(0, 60) + (image.prompt.length > 60 ? '...' : '');
+    item.querySelector('.gallery-item-model').textContent = image.model_used;
+
+    imgElement.addEventListener('click', () => {
+        openModal(image.image_url, {
+            prompt: image.prompt,
+            model: image.model_used,
+            width: image.width || 'Unknown',
+            height: image.height || 'Unknown',
+            format: image.output_format || 'PNG',
+            style_preset: image.style_preset || '',
+            imageData: image.image_url
         });
-                        
-        gallery.appendChild(item);
     });
-    
-    const totalPages = Math.ceil(allImages.length / IMAGES_PER_PAGE);
-    pagination.innerHTML = `
-        <button class="pagination-btn" onclick="changePage(-1)" ${currentPage === 1 ? 'disabled' : ''}>← Previous</button>
-        <span class="pagination-info">Page ${currentPage} of ${totalPages}</span>
-        <button class="pagination-btn" onclick="changePage(1)" ${currentPage === totalPages ? 'disabled' : ''}>Next →</button>
-    `;
+
+    const star = item.querySelector('.favorite-star');
+    star.addEventListener('click', (e) => {
+        e.stopPropagation();
+        toggleFavorite(image.id, star);
+    });
+
+    const btnDownload = item.querySelector('.btn-download');
+    btnDownload.addEventListener('click', (e) => {
+        e.stopPropagation();
+        const link = document.createElement('a');
+        link.href = image.image_url;
+        link.download = `openimage_${image.id}.${(image.output_format || 'png').toLowerCase()}`;
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+    });
+
+    if (prepend) gallery.prepend(item); else gallery.appendChild(item);
 }
 
 function getCookie(name) {
@@ -434,9 +538,9 @@ async function toggleFavorite(imageId, starElement) {
             starElement.textContent = data.is_favorite ? '⭐' : '☆';
             starElement.title = data.is_favorite ? 'Remove from favorites' : 'Add to favorites';
             
-            const imageIndex = allImages.findIndex(img => img.id === imageId);
-            if (imageIndex !== -1) {
-                allImages[imageIndex].is_favorite = data.is_favorite;
+            const image = galleryImages.find(img => img.id === imageId);
+            if (image) {
+                image.is_favorite = data.is_favorite;
             }
         }
     } catch (error) {
@@ -444,12 +548,6 @@ async function toggleFavorite(imageId, starElement) {
     }
 }
 
-function changePage(direction) {
-    currentPage += direction;
-    renderGallery();
-    document.querySelector('.gallery').scrollIntoView({ behavior: 'smooth' });
-}
-
 // Modal functions
 let currentModalData = {};
 
@@ -547,5 +645,4 @@ async function testFreeAPIs() {
 // Initialize
 loadModelsConfig().then(() => {
     updateAdvancedOptions(initialProvider);
-    renderGallery();
 });
\ No newline at end of file
@@ -3,25 +3,52 @@ AI Clients - VERSION FINALE QUI MARCHE
 Utilise les SDK et les clés API
 """
 import abc
+import asyncio
+import functools
 import requests
 import base64
 import json
 from typing import Dict, Any, Optional, List
 import logging
 import io
+import threading
+import random
 import time
+import urllib.parse
+
+from .http_pool import get_http_client, get_async_http_client
+from .job_poller import get_job_poller, JobPending, PENDING
+from .downloads import download_image, adownload_image, ImageDownloadError, CHUNK_SIZE, sniff_image_type
+from .inline_images import extract_base64_field, aextract_base64_field
+from .circuit_breaker import get_circuit_breaker, is_client_error, CircuitOpenError
+from .retry_policy import get_retry_policy, RetryPolicy
+from .rate_limiter import get_rate_limiter
+from .progress import report_progress, current_reporter
+from .metrics import track_provider_call
+from .sse import SSEEvent, iter_sse, aiter_sse
+from asgiref.sync import sync_to_async
 
 logger = logging.getLogger(__name__)
 
 # --- Data Structures ---
 
+class ProviderError(Exception):
+    """Error answer of a provider, with its HTTP status when known."""
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
 class ImageResult:
     """Represents the result of an image generation request."""
-    def __init__(self, image_data: bytes = None, image_url: str = None, prompt: str = None, model_used: str = None):
+    def __init__(self, image_data: bytes = None, image_url: str = None, prompt: str = None, model_used: str = None,
+                 seed: Optional[int] = None):
         self.image_data = image_data
         self.image_url = image_url
         self.prompt = prompt
         self.model_used = model_used
+        # Seed the provider was called with, when it reproduces this image
+        self.seed = seed
 
     def __str__(self):
         if self.image_url:
@@ -34,16 +61,284 @@ class ImageResult:
 
 # --- Abstract Base Class ---
 
+def _guard_generate(method):
+    """Run a generate_image implementation through the provider's rate limiter and circuit breaker, measuring it (see metrics.py)."""
+    @functools.wraps(method)
+    def wrapper(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        with track_provider_call(self.breaker_key, (options or {}).get('model')) as call:
+            # Breaker first: a call to a provider known to be down spends no quota
+            breaker = get_circuit_breaker(self.breaker_key)
+            breaker.before_call()
+            try:
+                get_rate_limiter().acquire(self.breaker_key, self._quota_cost(options))
+            except BaseException:
+                # Throttled: give back the slot (half-open probe) unused
+                breaker.release()
+                raise
+            started = time.monotonic()
+            try:
+                results = method(self, prompt, options)
+            except Exception as e:
+                if is_client_error(e):
+                    # Refused request (bad prompt, invalid key): the provider is up
+                    breaker.release()
+                else:
+                    breaker.record(False, time.monotonic() - started)
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record(bool(results), time.monotonic() - started)
+            call.results = results
+            return results
+    return wrapper
+
+
+def _guard_agenerate(method):
+    """Async counterpart of _guard_generate."""
+    @functools.wraps(method)
+    async def wrapper(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        with track_provider_call(self.breaker_key, (options or {}).get('model')) as call:
+            breaker = get_circuit_breaker(self.breaker_key)
+            breaker.before_call()
+            limiter = get_rate_limiter()
+            if limiter.is_limited(self.breaker_key):
+                try:
+                    # Shared state lives in the database (or Redis): keep it off the loop
+                    await sync_to_async(limiter.acquire)(self.breaker_key, self._quota_cost(options))
+                except BaseException:
+                    breaker.release()
+                    raise
+            started = time.monotonic()
+            try:
+                results = await method(self, prompt, options)
+            except Exception as e:
+                if is_client_error(e):
+                    # Refused request (bad prompt, invalid key): the provider is up
+                    breaker.release()
+                else:
+                    breaker.record(False, time.monotonic() - started)
+                raise
+            except BaseException:
+                # Cancelled (e.g. lost a hedged race): not the provider's fault
+                breaker.release()
+                raise
+            breaker.record(bool(results), time.monotonic() - started)
+            call.results = results
+            return results
+    return wrapper
+
+
+def provider_base_url(provider: str, default: str) -> str:
+    """
+    Base URL of a provider API
+
+    settings.PROVIDER_BASE_URLS maps a provider to its own base URL (a
+    proxy, a staging API); otherwise settings.PROVIDER_EMULATOR_URL sends
+    every provider to the local emulator (see emulator.py), keeping the
+    path of the real API under /<provider>.
+    """
+    from django.conf import settings
+
+    overrides = getattr(settings, 'PROVIDER_BASE_URLS', None) or {}
+    if provider in overrides:
+        return overrides[provider].rstrip('/')
+    emulator = getattr(settings, 'PROVIDER_EMULATOR_URL', '')
+    if emulator:
+        return f"{emulator.rstrip('/')}/{provider}{urllib.parse.urlsplit(default).path}"
+    return default
+
+
 class BaseImageGenerationModel(abc.ABC):
     """Abstract base class for AI image generation models."""
+    # Provider key, as in AVAILABLE_PROVIDERS (also names the circuit breaker)
+    provider = None
+    # Images one upstream call can return (native batch parameter)
+    max_batch_size = 1
+    # Sends options['seed'] upstream (same seed, same image)
+    supports_seed = False
+
     def __init__(self, api_key: str = None):
         self.api_key = api_key
         self.model_name = "Unknown Model"
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every provider call goes through its circuit breaker, so a dead
+        # provider fails fast instead of waiting for its full timeout
+        if 'generate_image' in cls.__dict__:
+            cls.generate_image = _guard_generate(cls.__dict__['generate_image'])
+        if 'agenerate_image' in cls.__dict__:
+            cls.agenerate_image = _guard_agenerate(cls.__dict__['agenerate_image'])
+
+    @property
+    def breaker_key(self) -> str:
+        return self.provider or type(self).__name__
+
+    def _quota_cost(self, options: Optional[Dict[str, Any]]) -> int:
+        """Images one call asks for (quotas of metered providers count images)"""
+        requested = int((options or {}).get('num_images') or 1)
+        return max(1, min(requested, self.max_batch_size))
+
+    @property
+    def http(self):
+        """Shared keep-alive connection pool (one per process)"""
+        return get_http_client()
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        return get_retry_policy(self.breaker_key)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the shared pool; `timeout` is the read timeout."""
+        return self.retry_policy.call(
+            lambda: self.http.request(method, url, **kwargs), method=method, label=self.model_name
+        )
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        return self._request('GET', url, **kwargs)
+
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        return self._request('POST', url, **kwargs)
+
+    @property
+    def ahttp(self):
+        """Async keep-alive pool bound to the running event loop"""
+        return get_async_http_client()
+
+    async def _arequest(self, method: str, url: str, **kwargs):
+        """Non-blocking _request on the async pool; returns an httpx.Response."""
+        return await self.retry_policy.acall(
+            lambda: self.ahttp.request(method, url, **kwargs), method=method, label=self.model_name
+        )
+
+    async def _aget(self, url: str, **kwargs):
+        return await self._arequest('GET', url, **kwargs)
+
+    async def _apost(self, url: str, **kwargs):
+        return await self._arequest('POST', url, **kwargs)
+
+    def _download(self, url: str, **kwargs) -> bytes:
+        """Stream an image body with size and signature checks (see downloads.py)."""
+        report_progress('downloading', provider=self.provider)
+        return self.retry_policy.call(
+            lambda: download_image(self.http, url, **kwargs),
+            method=kwargs.get('method', 'GET'), label=self.model_name
+        )
+
+    async def _adownload(self, url: str, **kwargs) -> bytes:
+        report_progress('downloading', provider=self.provider)
+        return await self.retry_policy.acall(
+            lambda: adownload_image(self.ahttp, url, **kwargs),
+            method=kwargs.get('method', 'GET'), label=self.model_name
+        )
+
+    def _post_inline_image(self, url: str, path, **kwargs) -> tuple:
+        """
+        POST, then stream-decode the base64 image at `path` of the JSON answer
+        (see inline_images.py) instead of parsing the whole document.
+
+        Returns:
+            (200, image bytes) or (error status, error body text)
+        """
+        response = self._post(url, stream=True, **kwargs)
+        if response.status_code != 200:
+            return response.status_code, response.text
+        return 200, extract_base64_field(response, path, url)
+
+    async def _apost_inline_image(self, url: str, path, **kwargs) -> tuple:
+        """Async _post_inline_image"""
+        async def send():
+            async with self.ahttp.stream('POST', url, **kwargs) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    # Raised so that the retry policy sees transient statuses
+                    raise ImageDownloadError(
+                        f"API Error: {response.status_code}", status_code=response.status_code,
+                        body=response.text, retry_after=response.headers.get('retry-after'),
+                    )
+                return await aextract_base64_field(response.aiter_bytes(CHUNK_SIZE), path, url)
+
+        try:
+            return 200, await self.retry_policy.acall(send, method='POST', label=self.model_name)
+        except ImageDownloadError as e:
+            if e.reason != 'status':
+                raise
+            return e.status_code, e.body
+
     @abc.abstractmethod
     def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
         pass
 
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        """
+        Async counterpart of generate_image.
+
+        Built-in clients implement it natively on the async pool. Custom
+        providers that only define generate_image run it in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate_image, prompt, options)
+
+    def generate_images(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                        num_images: int = 1) -> List[ImageResult]:
+        """
+        Generate several images of the same prompt.
+
+        Blocking wrapper of agenerate_images (runs on the job poller loop).
+        """
+        if num_images <= 1:
+            return self.generate_image(prompt, options)
+        return get_job_poller().run_coroutine(self.agenerate_images(prompt, options, num_images)).result()
+
+    async def agenerate_images(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                               num_images: int = 1) -> List[ImageResult]:
+        """
+        Generate several images of the same prompt.
+
+        Providers with a native batch parameter (max_batch_size > 1) get
+        `num_images` in their options and return up to that many images per
+        call; the others are called concurrently, with consecutive seeds
+        so the images differ (a random base seed when none is set, for
+        seeded providers). The first image of each call carries the seed of
+        its call. Partial failures are logged; the call only fails when no
+        image was produced.
+        """
+        options = dict(options or {})
+        seed = options.get('seed')
+        if seed is None or seed < 0:
+            seed = None
+            if self.supports_seed and num_images > self.max_batch_size:
+                # Same request, same image: each call needs its own seed
+                seed = random.randrange(2 ** 31 - num_images)
+        calls = []
+        call_seeds = []
+        remaining = num_images
+        while remaining > 0:
+            batch = min(remaining, self.max_batch_size)
+            call_options = dict(options, num_images=batch)
+            call_seed = None if seed is None else seed + len(calls)
+            if call_seed is not None:
+                call_options['seed'] = call_seed
+            calls.append(self.agenerate_image(prompt, call_options))
+            call_seeds.append(call_seed if self.supports_seed else None)
+            remaining -= batch
+
+        results = []
+        errors = []
+        outcomes = await asyncio.gather(*calls, return_exceptions=True)
+        for outcome, call_seed in zip(outcomes, call_seeds):
+            if isinstance(outcome, BaseException):
+                errors.append(outcome)
+            elif outcome:
+                if outcome[0].seed is None:
+                    outcome[0].seed = call_seed
+                results.extend(outcome)
+        if errors:
+            logger.warning(f"{self.model_name}: {len(errors)}/{len(calls)} batch call(s) failed: {errors[0]}")
+            if not results:
+                raise errors[0]
+        return results[:num_images]
+
 
 # === GRATUIT - Pollinations AVEC CLÉ API ===
 
@@ -52,9 +347,12 @@ class PollinationsClient(BaseImageGenerationModel):
     Pollinations.ai - FREE, no API key needed
     Old endpoint works: https://image.pollinations.ai/prompt/
     """
+    provider = 'pollinations'
+    supports_seed = True
+
     def __init__(self, api_key: str = None):
         super().__init__(api_key)
-        self.base_url = "https://image.pollinations.ai/prompt"
+        self.base_url = provider_base_url(self.provider, "https://image.pollinations.ai/prompt")
         self.model_name = "Pollinations.ai"
         
         # Old endpoint doesn't support model parameter
@@ -62,10 +360,7 @@ class PollinationsClient(BaseImageGenerationModel):
             "default": "default",
         }
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if options is None:
-            options = {}
-            
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         width = options.get('width', 512)
         height = options.get('height', 512)
         
@@ -78,6 +373,9 @@ class PollinationsClient(BaseImageGenerationModel):
             'height': height,
             'nologo': 'true',
         }
+        # Without a seed, identical URLs get the same cached image back
+        if options.get('seed') is not None and options['seed'] >= 0:
+            params['seed'] = options['seed']
         
         # Cloudflare blocks curl - use browser headers
         headers = {
@@ -87,23 +385,40 @@ class PollinationsClient(BaseImageGenerationModel):
             'Referer': 'https://pollinations.ai/',
         }
         
+        logger.info(f"Pollinations: size={width}x{height}, url={url}")
+        return {'url': url, 'params': params, 'headers': headers}
+
+    @staticmethod
+    def _download_error(error: ImageDownloadError) -> Exception:
+        if error.status_code == 200:
+            # Overloaded server answers 200 with a small error page
+            return Exception(f"Pollinations returned invalid image ({error}) - server may be overloaded, retry later")
+        return error
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
         try:
-            logger.info(f"Pollinations: size={width}x{height}, url={url}")
-            response = requests.get(url, params=params, headers=headers, timeout=60)
-            
-            if response.status_code == 200 and len(response.content) > 5000:
-                return [ImageResult(
-                    image_data=response.content,
-                    prompt=prompt,
-                    model_used="Pollinations"
-                )]
-            elif response.status_code == 200:
-                raise Exception(f"Pollinations returned invalid image ({len(response.content)} bytes) - server may be overloaded, retry later")
-            else:
-                error_text = response.text[:300]
-                logger.error(f"Pollinations error {response.status_code}: {error_text}")
-                raise Exception(f"API Error: {response.status_code} - {error_text}")
-                
+            try:
+                image_data = self._download(**self._build_request(prompt, options), timeout=60)
+            except ImageDownloadError as e:
+                raise self._download_error(e)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="Pollinations")]
+        except Exception as e:
+            logger.error(f"Pollinations error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
+        try:
+            try:
+                image_data = await self._adownload(**self._build_request(prompt, options), timeout=60)
+            except ImageDownloadError as e:
+                raise self._download_error(e)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="Pollinations")]
         except Exception as e:
             logger.error(f"Pollinations error: {e}")
             raise e
@@ -122,6 +437,8 @@ class HuggingFaceClient(BaseImageGenerationModel):
     Hugging Face - Uses SDK for stability
     Requires: pip install huggingface_hub
     """
+    provider = 'huggingface'
+
     def __init__(self, api_key: str = None):
         super().__init__(api_key)
         self.model_name = "Hugging Face (FREE)"
@@ -133,13 +450,71 @@ class HuggingFaceClient(BaseImageGenerationModel):
             self.use_sdk = True
         except ImportError:
             logger.warning("huggingface_hub not installed, will try HTTP API")
-            self.base_url = "https://api-inference.huggingface.co/models"
+            self.base_url = provider_base_url(self.provider, "https://api-inference.huggingface.co/models")
             self.use_sdk = False
         
         # FREE models - only confirmed working
         self.models = {
             "sdxl-lightning": "ByteDance/SDXL-Lightning",
         }
+        
+        # Async SDK client, created on first agenerate_image call
+        self._async_client = None
+
+    # Pillow format of each output_format
+    ENCODE_FORMATS = {'PNG': 'PNG', 'JPEG': 'JPEG', 'JPG': 'JPEG', 'WEBP': 'WEBP'}
+
+    @classmethod
+    def _encode_image(cls, image, output_format: str = 'PNG') -> bytes:
+        """
+        Encode a PIL image once, straight into the requested format.
+
+        PNG uses IMAGE_ENCODE_PNG_COMPRESS_LEVEL (Pillow defaults to 6,
+        several times slower at 1024² for a few percent of size), JPEG and
+        WEBP use IMAGE_ENCODE_QUALITY.
+        """
+        from django.conf import settings
+
+        image_format = cls.ENCODE_FORMATS.get((output_format or 'PNG').upper(), 'PNG')
+        if image_format == 'PNG':
+            params = {'compress_level': getattr(settings, 'IMAGE_ENCODE_PNG_COMPRESS_LEVEL', 1)}
+        else:
+            params = {'quality': getattr(settings, 'IMAGE_ENCODE_QUALITY', 90)}
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, **params)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _raw_image(raw: bytes) -> bytes:
+        """Check undecoded SDK bytes before passing them through."""
+        if not isinstance(raw, bytes) or sniff_image_type(raw[:12]) is None:
+            raise ValueError(f"HuggingFace returned no image: {bytes(raw[:200])!r}")
+        return raw
+
+    def _log_timings(self, model_id: str, image_data: bytes, request: float, encode: Optional[float]):
+        encode_label = 'passthrough' if encode is None else f"encode {encode * 1000:.0f}ms"
+        logger.info(f"HuggingFace SDK: model={model_id} request {request:.2f}s, {encode_label}, "
+                    f"{len(image_data)} bytes")
+
+    def _build_http_request(self, prompt: str, model_id: str) -> Dict[str, Any]:
+        url = f"{self.base_url}/{model_id}"
+        headers = {}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        
+        payload = {"inputs": prompt}
+        return {'url': url, 'headers': headers, 'json': payload}
+
+    @staticmethod
+    def _http_error(error: ImageDownloadError) -> Exception:
+        if error.status_code == 503:
+            return Exception("Model loading. Wait 30-60s and retry.")
+        logger.error(f"HuggingFace HTTP error {error.status_code}: {error.body[:300]}")
+        return ProviderError(f"API Error {error.status_code}. Install huggingface_hub: pip install huggingface_hub",
+                             status_code=error.status_code)
 
     def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
         if options is None:
@@ -152,15 +527,24 @@ class HuggingFaceClient(BaseImageGenerationModel):
             # Use SDK (preferred)
             try:
                 logger.info(f"HuggingFace SDK: model={model_id}")
-                from huggingface_hub import InferenceClient
-                from io import BytesIO
-                
-                image = self.client.text_to_image(prompt, model=model_id)
-                
-                # Convert PIL to bytes
-                buffer = BytesIO()
-                image.save(buffer, format='PNG')
-                image_data = buffer.getvalue()
+                started = time.monotonic()
+                # huggingface_hub < 0.31 returns the raw response bytes from
+                # post(): no PIL decode and re-encode at all
+                raw_post = getattr(self.client, 'post', None)
+                if raw_post is not None:
+                    image_data = self._raw_image(self.retry_policy.call(
+                        lambda: raw_post(json={'inputs': prompt}, model=model_id, task='text-to-image'),
+                        method='POST', label=self.model_name
+                    ))
+                    self._log_timings(model_id, image_data, time.monotonic() - started, None)
+                else:
+                    image = self.retry_policy.call(
+                        lambda: self.client.text_to_image(prompt, model=model_id),
+                        method='POST', label=self.model_name
+                    )
+                    requested = time.monotonic()
+                    image_data = self._encode_image(image, options.get('output_format', 'PNG'))
+                    self._log_timings(model_id, image_data, requested - started, time.monotonic() - requested)
                 
                 return [ImageResult(
                     image_data=image_data,
@@ -172,28 +556,66 @@ class HuggingFaceClient(BaseImageGenerationModel):
                 raise e
         else:
             # Fallback to HTTP API
-            url = f"{self.base_url}/{model_id}"
-            headers = {}
-            if self.api_key:
-                headers["Authorization"] = f"Bearer {self.api_key}"
-            
-            payload = {"inputs": prompt}
+            try:
+                try:
+                    image_data = self._download(method='POST', **self._build_http_request(prompt, model_id), timeout=120)
+                except ImageDownloadError as e:
+                    raise self._http_error(e)
+                return [ImageResult(image_data=image_data, prompt=prompt, model_used=f"HuggingFace {model_key}")]
+            except Exception as e:
+                logger.error(f"HuggingFace error: {e}")
+                raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
             
+        model_key = options.get('model', 'sdxl-lightning')
+        model_id = self.models.get(model_key, self.models['sdxl-lightning'])
+        
+        if self.use_sdk:
+            # Async SDK client (needs aiohttp)
             try:
-                response = requests.post(url, headers=headers, json=payload, timeout=120)
+                logger.info(f"HuggingFace async SDK: model={model_id}")
+                if self._async_client is None:
+                    from huggingface_hub import AsyncInferenceClient
+                    self._async_client = AsyncInferenceClient(token=self.api_key) if self.api_key else AsyncInferenceClient()
                 
-                if response.status_code == 200:
-                    return [ImageResult(
-                        image_data=response.content,
-                        prompt=prompt,
-                        model_used=f"HuggingFace {model_key}"
-                    )]
-                elif response.status_code == 503:
-                    raise Exception("Model loading. Wait 30-60s and retry.")
+                started = time.monotonic()
+                raw_post = getattr(self._async_client, 'post', None)
+                if raw_post is not None:
+                    image_data = self._raw_image(await self.retry_policy.acall(
+                        lambda: raw_post(json={'inputs': prompt}, model=model_id, task='text-to-image'),
+                        method='POST', label=self.model_name
+                    ))
+                    self._log_timings(model_id, image_data, time.monotonic() - started, None)
                 else:
-                    error_text = response.text[:300]
-                    logger.error(f"HuggingFace HTTP error {response.status_code}: {error_text}")
-                    raise Exception(f"API Error {response.status_code}. Install huggingface_hub: pip install huggingface_hub")
+                    image = await self.retry_policy.acall(
+                        lambda: self._async_client.text_to_image(prompt, model=model_id),
+                        method='POST', label=self.model_name
+                    )
+                    requested = time.monotonic()
+                    # Encoding is CPU bound, keep it off the event loop
+                    image_data = await asyncio.to_thread(
+                        self._encode_image, image, options.get('output_format', 'PNG')
+                    )
+                    self._log_timings(model_id, image_data, requested - started, time.monotonic() - requested)
+                
+                return [ImageResult(
+                    image_data=image_data,
+                    prompt=prompt,
+                    model_used=f"HuggingFace {model_key}"
+                )]
+            except Exception as e:
+                logger.error(f"HuggingFace async SDK error: {e}")
+                raise e
+        else:
+            try:
+                try:
+                    image_data = await self._adownload(method='POST', **self._build_http_request(prompt, model_id), timeout=120)
+                except ImageDownloadError as e:
+                    raise self._http_error(e)
+                return [ImageResult(image_data=image_data, prompt=prompt, model_used=f"HuggingFace {model_key}")]
             except Exception as e:
                 logger.error(f"HuggingFace error: {e}")
                 raise e
@@ -211,12 +633,57 @@ class SubnpClient(BaseImageGenerationModel):
     """
     Subnp - FREE (streaming SSE API)
     """
+    provider = 'subnp'
+
     def __init__(self):
         super().__init__()
-        self.base_url = "https://subnp.com/api/free/generate"
+        self.base_url = provider_base_url(self.provider, "https://subnp.com/api/free/generate")
         self.model_name = "Subnp"
         self.models = {"magic": "magic"}  # flux and turbo broken server-side
 
+    def _build_request(self, prompt: str, model: str) -> Dict[str, Any]:
+        payload = {"prompt": prompt, "model": model}
+        logger.info(f"Subnp: Requesting model={model}, prompt={prompt[:50]}...")
+        return {
+            'url': self.base_url,
+            'json': payload,
+            'headers': {"Content-Type": "application/json"},
+        }
+
+    def _handle_event(self, event: SSEEvent, event_count: int, model: str) -> Optional[str]:
+        """Handle one SSE event; returns the image URL once generation is complete."""
+        try:
+            data = json.loads(event.data)
+        except json.JSONDecodeError:
+            logger.warning(f"Subnp: JSON decode error on event {event_count}: {event.data[:100]}")
+            return None
+        
+        logger.info(f"Subnp: Event {event_count} status={data.get('status')}, model={model}")
+        
+        if data.get('status') == 'complete':
+            image_url = data.get('imageUrl')
+            if image_url:
+                logger.info(f"Subnp: Image URL received for {model}: {image_url}")
+            return image_url
+        elif data.get('status') == 'error':
+            error_msg = data.get('message', 'Unknown error')
+            error_detail = data.get('error', '')
+            logger.error(f"Subnp: Error status for {model}: {error_msg} - {error_detail}")
+            raise Exception(f"Subnp: {error_msg}")
+        # Intermediate status events: relay them as progress
+        report_progress('processing', provider=self.provider,
+                        message=data.get('message') or data.get('status'))
+        return None
+
+    @staticmethod
+    def _image_result(image_data: bytes, prompt: str, model: str) -> List[ImageResult]:
+        logger.info(f"Subnp: Downloaded {len(image_data)} bytes for {model}")
+        return [ImageResult(
+            image_data=image_data,
+            prompt=prompt,
+            model_used=f"Subnp {model}"
+        )]
+
     def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
         if options is None:
             options = {}
@@ -224,77 +691,67 @@ class SubnpClient(BaseImageGenerationModel):
         model = options.get('model', 'flux')
         
         try:
-            payload = {"prompt": prompt, "model": model}
-            
-            logger.info(f"Subnp: Requesting model={model}, prompt={prompt[:50]}...")
-            
-            response = requests.post(
-                self.base_url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                stream=True,
-                timeout=120
-            )
+            response = self._post(**self._build_request(prompt, model), stream=True, timeout=120)
             
             if response.status_code != 200:
                 error_text = response.text[:500]
                 logger.error(f"Subnp: HTTP {response.status_code}: {error_text}")
-                raise Exception(f"API Error {response.status_code}: {error_text}")
+                raise ProviderError(f"API Error {response.status_code}: {error_text}", status_code=response.status_code)
             
             # Parse SSE selon leur doc
             image_url = None
-            buffer = ""
-            line_count = 0
+            event_count = 0
+            
+            for event in iter_sse(response.iter_content(chunk_size=None)):
+                event_count += 1
+                image_url = self._handle_event(event, event_count, model)
+                if image_url:
+                    break
+            
+            if not image_url:
+                logger.error(f"Subnp: No image URL after {event_count} events for model={model}")
+                raise ValueError("No image URL from Subnp")
+            
+            # Download image
+            logger.info(f"Subnp: Downloading image from {image_url}")
+            image_data = self._download(image_url, timeout=30)
+            return self._image_result(image_data, prompt, model)
+                
+        except Exception as e:
+            logger.error(f"Subnp error for model={model}: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
+        model = options.get('model', 'flux')
+        request = self._build_request(prompt, model)
+        
+        try:
+            image_url = None
+            event_count = 0
             
-            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
-                if chunk:
-                    buffer += chunk
-                    lines = buffer.split('\n')
-                    buffer = lines[-1]  # Keep incomplete line
-                    
-                    for line in lines[:-1]:
-                        line = line.strip()
-                        line_count += 1
-                        
-                        if line.startswith('data: '):
-                            try:
-                                data_json = line[6:]
-                                data = json.loads(data_json)
-                                
-                                logger.info(f"Subnp: Line {line_count} status={data.get('status')}, model={model}")
-                                
-                                if data.get('status') == 'complete':
-                                    image_url = data.get('imageUrl')
-                                    if image_url:
-                                        logger.info(f"Subnp: Image URL received for {model}: {image_url}")
-                                        break
-                                elif data.get('status') == 'error':
-                                    error_msg = data.get('message', 'Unknown error')
-                                    error_detail = data.get('error', '')
-                                    logger.error(f"Subnp: Error status for {model}: {error_msg} - {error_detail}")
-                                    raise Exception(f"Subnp: {error_msg}")
-                            except json.JSONDecodeError as je:
-                                logger.warning(f"Subnp: JSON decode error on line {line_count}: {data_json[:100]}")
-                                continue
-                    
+            async with self.ahttp.stream('POST', request.pop('url'), timeout=120, **request) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    error_text = response.text[:500]
+                    logger.error(f"Subnp: HTTP {response.status_code}: {error_text}")
+                    raise ProviderError(f"API Error {response.status_code}: {error_text}", status_code=response.status_code)
+                
+                async for event in aiter_sse(response.aiter_bytes()):
+                    event_count += 1
+                    image_url = self._handle_event(event, event_count, model)
                     if image_url:
                         break
             
             if not image_url:
-                logger.error(f"Subnp: No image URL after {line_count} lines for model={model}")
+                logger.error(f"Subnp: No image URL after {event_count} events for model={model}")
                 raise ValueError("No image URL from Subnp")
             
-            # Download image
             logger.info(f"Subnp: Downloading image from {image_url}")
-            img_response = requests.get(image_url, timeout=30)
-            if img_response.status_code == 200:
-                logger.info(f"Subnp: Downloaded {len(img_response.content)} bytes for {model}")
-                return [ImageResult(
-                    image_data=img_response.content,
-                    prompt=prompt,
-                    model_used=f"Subnp {model}"
-                )]
-            raise Exception(f"Download failed: {img_response.status_code}")
+            image_data = await self._adownload(image_url, timeout=30)
+            return self._image_result(image_data, prompt, model)
                 
         except Exception as e:
             logger.error(f"Subnp error for model={model}: {e}")
@@ -308,18 +765,14 @@ class SubnpClient(BaseImageGenerationModel):
 
 class GeminiClient(BaseImageGenerationModel):
     """Google Gemini - Nécessite clé AI Studio"""
+    provider = 'gemini'
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
+        self.base_url = provider_base_url(self.provider, "https://generativelanguage.googleapis.com/v1beta/models")
         self.model_name = "Google Gemini"
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if not self.api_key:
-            raise ValueError("API key required for Gemini")
-            
-        if options is None:
-            options = {}
-
+    def _build_request(self, prompt: str) -> Dict[str, Any]:
         model = "gemini-2.5-flash-image-preview"
         url = f"{self.base_url}/{model}:generateContent"
         
@@ -331,26 +784,46 @@ class GeminiClient(BaseImageGenerationModel):
         payload = {
             "contents": [{"parts": [{"text": prompt}]}]
         }
+        return {'url': url, 'headers': headers, 'json': payload}
+
+    # candidates[].content.parts[].inlineData.data
+    IMAGE_FIELD = ('candidates', 'content', 'parts', 'inlineData', 'data')
+
+    def _parse_response(self, status_code: int, body, prompt: str) -> List[ImageResult]:
+        if status_code == 200:
+            return [ImageResult(
+                image_data=body,
+                prompt=prompt,
+                model_used="Gemini 2.5 Flash"
+            )]
+        else:
+            raise ProviderError(f"API Error: {body}", status_code=status_code)
 
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required for Gemini")
             
-            if response.status_code == 200:
-                data = response.json()
-                if 'candidates' in data and len(data['candidates']) > 0:
-                    parts = data['candidates'][0].get('content', {}).get('parts', [])
-                    for part in parts:
-                        if 'inlineData' in part:
-                            image_b64 = part['inlineData']['data']
-                            image_data = base64.b64decode(image_b64)
-                            return [ImageResult(
-                                image_data=image_data,
-                                prompt=prompt,
-                                model_used="Gemini 2.5 Flash"
-                            )]
-                raise ValueError("No image in response")
-            else:
-                raise Exception(f"API Error: {response.text}")
+        if options is None:
+            options = {}
+
+        try:
+            status_code, body = self._post_inline_image(
+                path=self.IMAGE_FIELD, **self._build_request(prompt), timeout=60
+            )
+            return self._parse_response(status_code, body, prompt)
+        except Exception as e:
+            logger.error(f"Gemini error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required for Gemini")
+
+        try:
+            status_code, body = await self._apost_inline_image(
+                path=self.IMAGE_FIELD, **self._build_request(prompt), timeout=60
+            )
+            return self._parse_response(status_code, body, prompt)
         except Exception as e:
             logger.error(f"Gemini error: {e}")
             raise e
@@ -360,27 +833,37 @@ class GeminiClient(BaseImageGenerationModel):
 
 class PlaceholderClient(BaseImageGenerationModel):
     """Placeholder - test only"""
+    provider = 'placeholder'
+
     def __init__(self):
         super().__init__()
         self.model_name = "Placeholder"
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if options is None:
-            options = {}
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         width = min(options.get('width', 512), 800)
         height = min(options.get('height', 512), 800)
         url = f"https://via.placeholder.com/{width}x{height}/4A90E2/FFFFFF.png"
         params = {'text': f"Generated: {prompt[:15]}"}
+        return {'url': url, 'params': params}
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
         
         try:
-            response = requests.get(url, params=params, timeout=30)
-            if response.status_code == 200:
-                return [ImageResult(
-                    image_data=response.content,
-                    prompt=prompt,
-                    model_used="Placeholder"
-                )]
+            image_data = self._download(**self._build_request(prompt, options), timeout=30)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="Placeholder")]
+        except Exception as e:
+            logger.error(f"Placeholder error: {e}")
             return []
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
+        try:
+            image_data = await self._adownload(**self._build_request(prompt, options), timeout=30)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="Placeholder")]
         except Exception as e:
             logger.error(f"Placeholder error: {e}")
             return []
@@ -390,17 +873,15 @@ class PlaceholderClient(BaseImageGenerationModel):
 
 class RunwareClient(BaseImageGenerationModel):
     """Runware - PAID"""
+    provider = 'runware'
+    max_batch_size = 4  # numberResults
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.base_url = "https://api.runware.ai/v1"
+        self.base_url = provider_base_url(self.provider, "https://api.runware.ai/v1")
         self.model_name = "Runware"
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if not self.api_key:
-            raise ValueError("API key required")
-        if options is None:
-            options = {}
-
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -409,35 +890,53 @@ class RunwareClient(BaseImageGenerationModel):
         payload = {
             "positivePrompt": prompt,
             "model": options.get('model', 'civitai:4384@128713'),
-            "numberResults": 1,
+            "numberResults": options.get('num_images', 1),
             "height": options.get('height', 512),
             "width": options.get('width', 512),
             "outputFormat": "PNG"
         }
+        return {'url': f"{self.base_url}/inference/generate", 'headers': headers, 'json': payload}
+
+    @staticmethod
+    def _image_urls(response) -> List[str]:
+        if response.status_code != 200:
+            raise ProviderError(f"API Error: {response.text}", status_code=response.status_code)
+        data = response.json()
+        return [item['imageURL'] for item in data.get('data', []) if item.get('imageURL')]
+
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required")
+        if options is None:
+            options = {}
 
         try:
-            response = requests.post(
-                f"{self.base_url}/inference/generate",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'data' in data and len(data['data']) > 0:
-                    image_url = data['data'][0].get('imageURL')
-                    if image_url:
-                        img_response = requests.get(image_url, timeout=30)
-                        if img_response.status_code == 200:
-                            return [ImageResult(
-                                image_data=img_response.content,
-                                prompt=prompt,
-                                model_used="Runware"
-                            )]
+            response = self._post(**self._build_request(prompt, options), timeout=60)
+            image_urls = self._image_urls(response)
+            if not image_urls:
                 raise ValueError("No image in response")
-            else:
-                raise Exception(f"API Error: {response.text}")
+            return [
+                ImageResult(image_data=self._download(url, timeout=30), prompt=prompt, model_used="Runware")
+                for url in image_urls
+            ]
+        except Exception as e:
+            logger.error(f"Runware error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required")
+        if options is None:
+            options = {}
+
+        try:
+            response = await self._apost(**self._build_request(prompt, options), timeout=60)
+            image_urls = self._image_urls(response)
+            if not image_urls:
+                raise ValueError("No image in response")
+            images = await asyncio.gather(*(self._adownload(url, timeout=30) for url in image_urls))
+            return [ImageResult(image_data=data, prompt=prompt, model_used="Runware") for data in images]
         except Exception as e:
             logger.error(f"Runware error: {e}")
             raise e
@@ -447,65 +946,112 @@ class RunwareClient(BaseImageGenerationModel):
 
 class ReplicateClient(BaseImageGenerationModel):
     """Replicate - PAID"""
+    provider = 'replicate'
+    max_batch_size = 4  # num_outputs (flux-schnell accepts up to 4)
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.base_url = "https://api.replicate.com/v1"
+        self.base_url = provider_base_url(self.provider, "https://api.replicate.com/v1")
         self.model_name = "Replicate"
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if not self.api_key:
-            raise ValueError("API key required")
-        if options is None:
-            options = {}
+    # Predictions usually finish within seconds; give up after a minute
+    POLL_SCHEDULE = {'interval': 1, 'max_interval': 5, 'timeout': 60}
 
-        headers = {
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Token {self.api_key}",
             "Content-Type": "application/json"
         }
-        
+
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         payload = {
             "version": options.get('model', 'black-forest-labs/flux-schnell'),
             "input": {
                 "prompt": prompt,
                 "width": options.get('width', 512),
                 "height": options.get('height', 512),
-                "num_outputs": 1
+                "num_outputs": options.get('num_images', 1)
             }
         }
+        return {'url': f"{self.base_url}/predictions", 'headers': self._headers(), 'json': payload}
+
+    @staticmethod
+    def _prediction_url(response) -> str:
+        if response.status_code == 201:
+            return response.json()['urls']['get']
+        raise ProviderError(f"API Error: {response.text}", status_code=response.status_code)
+
+    @staticmethod
+    def _output_urls(status_response) -> Optional[List[str]]:
+        """Image URLs once the prediction succeeded, None while it is still running."""
+        if status_response.status_code != 200:
+            return None
+        status_data = status_response.json()
+        if status_data['status'] == 'succeeded':
+            output = status_data.get('output')
+            if output:
+                return output if isinstance(output, list) else [output]
+        elif status_data['status'] == 'failed':
+            raise ValueError(f"Failed: {status_data.get('error')}")
+        return None
+
+    def _poll_prediction(self, prediction_url: str):
+        """Status check for the job poller: resolves with the image URLs."""
+        async def check():
+            status_response = await self._aget(prediction_url, headers=self._headers(), timeout=10)
+            return self._output_urls(status_response) or PENDING
+        return check
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required")
+        if options is None:
+            options = {}
 
         try:
-            response = requests.post(
-                f"{self.base_url}/predictions",
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
+            response = self._post(**self._build_request(prompt, options), timeout=10)
+            prediction_url = self._prediction_url(response)
             
-            if response.status_code == 201:
-                prediction = response.json()
-                prediction_url = prediction['urls']['get']
-                
-                for _ in range(30):
-                    time.sleep(2)
-                    status_response = requests.get(prediction_url, headers=headers)
-                    if status_response.status_code == 200:
-                        status_data = status_response.json()
-                        if status_data['status'] == 'succeeded':
-                            output = status_data.get('output')
-                            if output:
-                                image_url = output[0] if isinstance(output, list) else output
-                                img_response = requests.get(image_url, timeout=30)
-                                if img_response.status_code == 200:
-                                    return [ImageResult(
-                                        image_data=img_response.content,
-                                        prompt=prompt,
-                                        model_used="Replicate"
-                                    )]
-                        elif status_data['status'] == 'failed':
-                            raise ValueError(f"Failed: {status_data.get('error')}")
-                raise TimeoutError("Timed out")
-            else:
-                raise Exception(f"API Error: {response.text}")
+            image_urls = get_job_poller().submit(
+                self._poll_prediction(prediction_url), job_id=prediction_url, **self.POLL_SCHEDULE
+            ).result()
+            return [ImageResult(
+                image_data=self._download(image_url, timeout=30),
+                prompt=prompt,
+                model_used="Replicate"
+            ) for image_url in image_urls]
+        except Exception as e:
+            logger.error(f"Replicate error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required")
+        if options is None:
+            options = {}
+
+        try:
+            response = await self._apost(**self._build_request(prompt, options), timeout=10)
+            prediction_url = self._prediction_url(response)
+            
+            try:
+                image_urls = await get_job_poller().wait(
+                    self._poll_prediction(prediction_url), job_id=prediction_url, **self.POLL_SCHEDULE
+                )
+            except asyncio.CancelledError:
+                # Lost a hedged race: stop paying for the prediction
+                try:
+                    await self._apost(f"{prediction_url}/cancel", headers=self._headers(), timeout=5)
+                except Exception as e:
+                    logger.warning(f"Replicate: could not cancel remote job: {e}")
+                raise
+
+            images = await asyncio.gather(*(self._adownload(url, timeout=30) for url in image_urls))
+            return [ImageResult(
+                image_data=image_data,
+                prompt=prompt,
+                model_used="Replicate"
+            ) for image_data in images]
         except Exception as e:
             logger.error(f"Replicate error: {e}")
             raise e
@@ -515,17 +1061,14 @@ class ReplicateClient(BaseImageGenerationModel):
 
 class StabilityAiClient(BaseImageGenerationModel):
     """Stability AI - PAID"""
+    provider = 'stability'
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.base_url = "https://api.stability.ai/v2beta"
+        self.base_url = provider_base_url(self.provider, "https://api.stability.ai/v2beta")
         self.model_name = "Stability AI"
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if not self.api_key:
-            raise ValueError("API key required")
-        if options is None:
-            options = {}
-
+    def _build_request(self, prompt: str) -> Dict[str, Any]:
         endpoint_url = f"{self.base_url}/stable-image/generate/core"
         payload = {
             "prompt": prompt,
@@ -536,17 +1079,28 @@ class StabilityAiClient(BaseImageGenerationModel):
             "Authorization": f"Bearer {self.api_key}",
             "Accept": "image/*"
         }
+        return {'url': endpoint_url, 'headers': headers, 'data': payload}
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required")
+        if options is None:
+            options = {}
 
         try:
-            response = requests.post(endpoint_url, headers=headers, data=payload, timeout=60)
-            if response.status_code == 200:
-                return [ImageResult(
-                    image_data=response.content,
-                    prompt=prompt,
-                    model_used="Stability AI"
-                )]
-            else:
-                raise Exception(f"API Error: {response.text}")
+            image_data = self._download(method='POST', **self._build_request(prompt), timeout=60)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="Stability AI")]
+        except Exception as e:
+            logger.error(f"Stability error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if not self.api_key:
+            raise ValueError("API key required")
+
+        try:
+            image_data = await self._adownload(method='POST', **self._build_request(prompt), timeout=60)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="Stability AI")]
         except Exception as e:
             logger.error(f"Stability error: {e}")
             raise e
@@ -556,35 +1110,50 @@ class StabilityAiClient(BaseImageGenerationModel):
 
 class DeepAIClient(BaseImageGenerationModel):
     """DeepAI - PAID"""
+    provider = 'deepai'
+
     def __init__(self, api_key: str = None):
         super().__init__(api_key)
-        self.base_url = "https://api.deepai.org/api/text2img"
+        self.base_url = provider_base_url(self.provider, "https://api.deepai.org/api/text2img")
         self.model_name = "DeepAI"
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if options is None:
-            options = {}
+    def _build_request(self, prompt: str) -> Dict[str, Any]:
         headers = {}
         if self.api_key:
             headers["api-key"] = self.api_key
         data = {'text': prompt}
+        return {'url': self.base_url, 'data': data, 'headers': headers}
+
+    @staticmethod
+    def _image_url(response) -> Optional[str]:
+        if response.status_code == 200:
+            return response.json().get('output_url')
+        raise ProviderError(f"API Error: {response.text}", status_code=response.status_code)
+
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
         
         try:
-            response = requests.post(self.base_url, data=data, headers=headers, timeout=60)
-            if response.status_code == 200:
-                result = response.json()
-                image_url = result.get('output_url')
-                if image_url:
-                    img_response = requests.get(image_url, timeout=30)
-                    if img_response.status_code == 200:
-                        return [ImageResult(
-                            image_data=img_response.content,
-                            prompt=prompt,
-                            model_used="DeepAI"
-                        )]
+            response = self._post(**self._build_request(prompt), timeout=60)
+            image_url = self._image_url(response)
+            if not image_url:
                 raise ValueError("No image URL")
-            else:
-                raise Exception(f"API Error: {response.text}")
+            image_data = self._download(image_url, timeout=30)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="DeepAI")]
+        except Exception as e:
+            logger.error(f"DeepAI error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        try:
+            response = await self._apost(**self._build_request(prompt), timeout=60)
+            image_url = self._image_url(response)
+            if not image_url:
+                raise ValueError("No image URL")
+            image_data = await self._adownload(image_url, timeout=30)
+            return [ImageResult(image_data=image_data, prompt=prompt, model_used="DeepAI")]
         except Exception as e:
             logger.error(f"DeepAI error: {e}")
             raise e
@@ -592,31 +1161,80 @@ class DeepAIClient(BaseImageGenerationModel):
 
 # === FACTORY ===
 
+# Built once: provider -> factory(api_key, account_id), None when credentials are missing
+_CLIENT_FACTORIES = {
+    'placeholder': lambda api_key, account_id: PlaceholderClient(),
+    'cloudflare': lambda api_key, account_id: CloudflareAIClient(api_key, account_id) if api_key and account_id else None,
+    'aihorde': lambda api_key, account_id: AIHordeClient(api_key),
+    'segmind': lambda api_key, account_id: SegmindClient(api_key) if api_key else None,
+    'prodia': lambda api_key, account_id: ProdiaClient(),
+    'pollinations': lambda api_key, account_id: PollinationsClient(api_key),
+    'huggingface': lambda api_key, account_id: HuggingFaceClient(api_key),
+    'subnp': lambda api_key, account_id: SubnpClient(),
+    'gemini': lambda api_key, account_id: GeminiClient(api_key) if api_key else None,
+    'runware': lambda api_key, account_id: RunwareClient(api_key) if api_key else None,
+    'replicate': lambda api_key, account_id: ReplicateClient(api_key) if api_key else None,
+    'stability': lambda api_key, account_id: StabilityAiClient(api_key) if api_key else None,
+    'deepai': lambda api_key, account_id: DeepAIClient(api_key) if api_key else None,
+}
+
+# Process-wide client registry keyed by (provider, api_key, account_id)
+_client_registry = {}
+_client_registry_lock = threading.Lock()
+
+
 def get_api_client(provider: str, api_key: str = None, account_id: str = None):
-    """Factory function"""
-    clients = {
-        'placeholder': lambda: PlaceholderClient(),
-        'cloudflare': lambda: CloudflareAIClient(api_key, account_id) if api_key and account_id else None,
-        'aihorde': lambda: AIHordeClient(api_key),
-        'segmind': lambda: SegmindClient(api_key) if api_key else None,
-        'prodia': lambda: ProdiaClient(),
-        'pollinations': lambda: PollinationsClient(api_key),
-        'huggingface': lambda: HuggingFaceClient(api_key),
-        'subnp': lambda: SubnpClient(),
-        'gemini': lambda: GeminiClient(api_key) if api_key else None,
-        'runware': lambda: RunwareClient(api_key) if api_key else None,
-        'replicate': lambda: ReplicateClient(api_key) if api_key else None,
-        'stability': lambda: StabilityAiClient(api_key) if api_key else None,
-        'deepai': lambda: DeepAIClient(api_key) if api_key else None,
-    }
-    
-    client_factory = clients.get(provider)
-    if client_factory:
-        client = client_factory()
-        if client:
-            return client
-        raise ValueError(f"API key required for {provider}")
-    raise ValueError(f"Unknown provider: {provider}")
+    """
+    Factory function
+
+    Clients hold no per-request state, so one instance per
+    (provider, api_key, account_id) is built and then reused by every caller
+    (SDK clients such as HuggingFace's InferenceClient stay warm).
+    Call invalidate_api_client() when a key is rotated.
+    """
+    client_factory = _CLIENT_FACTORIES.get(provider)
+    if not client_factory:
+        raise ValueError(f"Unknown provider: {provider}")
+
+    key = (provider, api_key or None, account_id or None)
+    client = _client_registry.get(key)
+    if client is not None:
+        return client
+
+    with _client_registry_lock:
+        client = _client_registry.get(key)
+        if client is None:
+            client = client_factory(api_key, account_id)
+            if not client:
+                raise ValueError(f"API key required for {provider}")
+            _client_registry[key] = client
+            logger.debug(f"Created {provider} client ({len(_client_registry)} cached)")
+    return client
+
+
+def invalidate_api_client(provider: str = None, api_key: str = None) -> int:
+    """
+    Drop cached clients so the next get_api_client() builds fresh ones
+
+    Args:
+        provider: Only drop clients of this provider (all providers if None)
+        api_key: Only drop clients built with this key (all keys if None)
+
+    Returns:
+        Number of clients removed
+    """
+    with _client_registry_lock:
+        stale = [
+            key for key in _client_registry
+            if (provider is None or key[0] == provider)
+            and (api_key is None or key[1] == api_key)
+        ]
+        for key in stale:
+            del _client_registry[key]
+
+    if stale:
+        logger.info(f"Invalidated {len(stale)} cached client(s) for {provider or 'all providers'}")
+    return len(stale)
 
 
 def check_all_providers(api_keys: dict = None):
@@ -640,11 +1258,28 @@ def check_all_providers(api_keys: dict = None):
                 continue
             
             client = get_api_client(provider_name, api_key)
-            results[provider_name] = {
-                'status': 'available',
-                'message': 'Client initialized',
-                'healthy': True
-            }
+            breaker = get_circuit_breaker(client.breaker_key)
+            budget = get_rate_limiter().remaining_budget(provider_name)
+            if breaker.is_open:
+                retry_in = breaker.snapshot()['retry_in']
+                results[provider_name] = {
+                    'status': 'circuit_open',
+                    'message': str(CircuitOpenError(provider_name, retry_in)),
+                    'healthy': False
+                }
+            elif budget is not None and not budget['has_headroom']:
+                results[provider_name] = {
+                    'status': 'quota_exhausted',
+                    'message': 'Rate limit or daily quota reached',
+                    'healthy': False
+                }
+            else:
+                results[provider_name] = {
+                    'status': 'available',
+                    'message': 'Client initialized',
+                    'healthy': True
+                }
+            results[provider_name]['budget'] = budget
             
         except Exception as e:
             results[provider_name] = {
@@ -652,6 +1287,8 @@ def check_all_providers(api_keys: dict = None):
                 'message': str(e),
                 'healthy': False
             }
+        
+        results[provider_name]['circuit'] = get_circuit_breaker(provider_name).snapshot()
     
     return results
 
@@ -663,9 +1300,13 @@ class SegmindClient(BaseImageGenerationModel):
     Segmind.com - FREE tier: 100 images/day
     Official API, stable, multiple models
     """
+    provider = 'segmind'
+    supports_seed = True
+    max_batch_size = 4  # samples
+
     def __init__(self, api_key: str = None):
         super().__init__(api_key)
-        self.base_url = "https://api.segmind.com/v1"
+        self.base_url = provider_base_url(self.provider, "https://api.segmind.com/v1")
         self.model_name = "Segmind"
         
         # Free tier models
@@ -675,10 +1316,7 @@ class SegmindClient(BaseImageGenerationModel):
             "kandinsky": "kandinsky-2.2-txt2img",
         }
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if options is None:
-            options = {}
-            
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         width = options.get('width', 1024)
         height = options.get('height', 1024)
         model_key = options.get('model', 'sdxl')
@@ -694,31 +1332,77 @@ class SegmindClient(BaseImageGenerationModel):
         payload = {
             "prompt": prompt,
             "negative_prompt": options.get('negative_prompt', ''),
-            "samples": 1,
+            "samples": options.get('num_images', 1),
             "scheduler": "UniPC",
             "num_inference_steps": 25,
             "guidance_scale": options.get('cfg_scale', 7.5),
             "seed": options.get('seed', -1),
             "img_width": width,
             "img_height": height,
-            "base64": False
+            # One sample comes back as raw image bytes, several as base64 JSON
+            "base64": options.get('num_images', 1) > 1
         }
         
+        logger.info(f"Segmind: model={model_key}, size={width}x{height}")
+        return {'url': url, 'json': payload, 'headers': headers}
+
+    @staticmethod
+    def _api_error(error: ImageDownloadError) -> Exception:
+        logger.error(f"Segmind error {error.status_code}: {error.body[:300]}")
+        return ProviderError(f"Segmind API Error: {error.status_code}", status_code=error.status_code)
+
+    @staticmethod
+    def _image_result(image_data: bytes, prompt: str, model_key: str) -> List[ImageResult]:
+        return [ImageResult(
+            image_data=image_data,
+            prompt=prompt,
+            model_used=f"Segmind {model_key}"
+        )]
+
+    @staticmethod
+    def _batch_results(response, prompt: str, model_key: str) -> List[ImageResult]:
+        """Images of a multi-sample request ({"image": [base64, ...]})."""
+        if response.status_code != 200:
+            logger.error(f"Segmind error {response.status_code}: {response.text[:300]}")
+            raise ProviderError(f"Segmind API Error: {response.status_code}", status_code=response.status_code)
+        images = response.json().get('image') or []
+        if isinstance(images, str):
+            images = [images]
+        return [
+            ImageResult(image_data=base64.b64decode(image), prompt=prompt, model_used=f"Segmind {model_key}")
+            for image in images
+        ]
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
         try:
-            logger.info(f"Segmind: model={model_key}, size={width}x{height}")
-            response = requests.post(url, json=payload, headers=headers, timeout=120)
-            
-            if response.status_code == 200:
-                return [ImageResult(
-                    image_data=response.content,
-                    prompt=prompt,
-                    model_used=f"Segmind {model_key}"
-                )]
-            else:
-                error_text = response.text[:300]
-                logger.error(f"Segmind error {response.status_code}: {error_text}")
-                raise Exception(f"Segmind API Error: {response.status_code}")
-                
+            if options.get('num_images', 1) > 1:
+                response = self._post(**self._build_request(prompt, options), timeout=180)
+                return self._batch_results(response, prompt, options.get('model', 'sdxl'))
+            try:
+                image_data = self._download(method='POST', **self._build_request(prompt, options), timeout=120)
+            except ImageDownloadError as e:
+                raise self._api_error(e)
+            return self._image_result(image_data, prompt, options.get('model', 'sdxl'))
+        except Exception as e:
+            logger.error(f"Segmind error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
+        try:
+            if options.get('num_images', 1) > 1:
+                response = await self._apost(**self._build_request(prompt, options), timeout=180)
+                return self._batch_results(response, prompt, options.get('model', 'sdxl'))
+            try:
+                image_data = await self._adownload(method='POST', **self._build_request(prompt, options), timeout=120)
+            except ImageDownloadError as e:
+                raise self._api_error(e)
+            return self._image_result(image_data, prompt, options.get('model', 'sdxl'))
         except Exception as e:
             logger.error(f"Segmind error: {e}")
             raise e
@@ -735,9 +1419,12 @@ class ProdiaClient(BaseImageGenerationModel):
     Prodia.com - Completely FREE (no key needed)
     Slower but unlimited and stable
     """
+    provider = 'prodia'
+    supports_seed = True
+
     def __init__(self, api_key: str = None):
         super().__init__(api_key)
-        self.base_url = "https://api.prodia.com/v1"
+        self.base_url = provider_base_url(self.provider, "https://api.prodia.com/v1")
         self.model_name = "Prodia"
         
         # Free models
@@ -747,10 +1434,10 @@ class ProdiaClient(BaseImageGenerationModel):
             "realistic-vision": "realisticVisionV51_v51VAE",
         }
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if options is None:
-            options = {}
-            
+    # Jobs take 10-60s: poll often at first, then back off (2 minutes max)
+    POLL_SCHEDULE = {'interval': 3, 'max_interval': 10, 'timeout': 120}
+
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         model_key = options.get('model', 'sdxl')
         model_id = self.models.get(model_key, self.models['sdxl'])
         
@@ -767,50 +1454,92 @@ class ProdiaClient(BaseImageGenerationModel):
             "sampler": "DPM++ 2M Karras",
         }
         
+        logger.info(f"Prodia: Submitting job, model={model_key}")
+        return {'url': url, 'json': payload}
+
+    @staticmethod
+    def _job_id(response) -> str:
+        if response.status_code != 200:
+            raise ProviderError(f"Failed to submit job: {response.status_code}", status_code=response.status_code)
+        
+        job_id = response.json().get('job')
+        if not job_id:
+            raise Exception("No job ID returned")
+        return job_id
+
+    @staticmethod
+    def _image_url(status_response, job_id: str) -> Optional[str]:
+        """Image URL once the job succeeded, None while it is still running."""
+        status_data = status_response.json()
+        
+        status = status_data.get('status')
+        logger.info(f"Prodia: Job {job_id} status={status}")
+        
+        if status == 'succeeded':
+            image_url = status_data.get('imageUrl')
+            if not image_url:
+                raise Exception("No image URL in response")
+            return image_url
+        elif status == 'failed':
+            raise Exception("Generation failed")
+        return None
+
+    def _poll_job(self, job_id: str):
+        """Status check for the job poller: resolves with the image URL."""
+        status_url = f"{self.base_url}/job/{job_id}"
+
+        async def check():
+            status_response = await self._aget(status_url, timeout=10)
+            return self._image_url(status_response, job_id) or PENDING
+        return check
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+            
+        model_key = options.get('model', 'sdxl')
+        
         try:
-            logger.info(f"Prodia: Submitting job, model={model_key}")
-            response = requests.post(url, json=payload, timeout=30)
+            response = self._post(**self._build_request(prompt, options), timeout=30)
+            job_id = self._job_id(response)
             
-            if response.status_code != 200:
-                raise Exception(f"Failed to submit job: {response.status_code}")
+            # Step 2: Wait for completion (polled by the shared job poller)
+            image_url = get_job_poller().submit(
+                self._poll_job(job_id), job_id=job_id, **self.POLL_SCHEDULE
+            ).result()
             
-            data = response.json()
-            job_id = data.get('job')
+            # Download image
+            image_data = self._download(image_url, timeout=30)
+            return [ImageResult(
+                image_data=image_data,
+                prompt=prompt,
+                model_used=f"Prodia {model_key}"
+            )]
             
-            if not job_id:
-                raise Exception("No job ID returned")
+        except Exception as e:
+            logger.error(f"Prodia error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
             
-            # Step 2: Poll for completion
-            status_url = f"{self.base_url}/job/{job_id}"
-            max_wait = 120  # 2 minutes max
-            waited = 0
+        model_key = options.get('model', 'sdxl')
+        
+        try:
+            response = await self._apost(**self._build_request(prompt, options), timeout=30)
+            job_id = self._job_id(response)
             
-            while waited < max_wait:
-                time.sleep(5)
-                waited += 5
-                
-                status_response = requests.get(status_url, timeout=10)
-                status_data = status_response.json()
-                
-                status = status_data.get('status')
-                logger.info(f"Prodia: Job {job_id} status={status}, waited={waited}s")
-                
-                if status == 'succeeded':
-                    image_url = status_data.get('imageUrl')
-                    if not image_url:
-                        raise Exception("No image URL in response")
-                    
-                    # Download image
-                    img_response = requests.get(image_url, timeout=30)
-                    return [ImageResult(
-                        image_data=img_response.content,
-                        prompt=prompt,
-                        model_used=f"Prodia {model_key}"
-                    )]
-                elif status == 'failed':
-                    raise Exception("Generation failed")
+            image_url = await get_job_poller().wait(
+                self._poll_job(job_id), job_id=job_id, **self.POLL_SCHEDULE
+            )
             
-            raise Exception("Timeout waiting for generation")
+            image_data = await self._adownload(image_url, timeout=30)
+            return [ImageResult(
+                image_data=image_data,
+                prompt=prompt,
+                model_used=f"Prodia {model_key}"
+            )]
             
         except Exception as e:
             logger.error(f"Prodia error: {e}")
@@ -830,10 +1559,12 @@ class CloudflareAIClient(BaseImageGenerationModel):
     Cloudflare Workers AI - FREE 20-30 images/day
     Official Cloudflare API, stable and fast
     """
+    provider = 'cloudflare'
+
     def __init__(self, api_key: str = None, account_id: str = None):
         super().__init__(api_key)
         self.account_id = account_id
-        self.base_url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run"
+        self.base_url = provider_base_url(self.provider, f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run")
         self.model_name = "Cloudflare AI"
         
         # Available models on Workers AI
@@ -843,10 +1574,7 @@ class CloudflareAIClient(BaseImageGenerationModel):
             "stable-diffusion": "@cf/runwayml/stable-diffusion-v1-5-inpainting",
         }
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if options is None:
-            options = {}
-            
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         model_key = options.get('model', 'sdxl')
         model_id = self.models.get(model_key, self.models['sdxl'])
         
@@ -861,28 +1589,46 @@ class CloudflareAIClient(BaseImageGenerationModel):
             "prompt": prompt,
         }
         
+        logger.info(f"Cloudflare AI: model={model_key}")
+        return {'url': url, 'json': payload, 'headers': headers}
+
+    # Cloudflare returns base64 in result.image
+    IMAGE_FIELD = ('result', 'image')
+
+    def _parse_response(self, status_code: int, body, prompt: str, model_key: str) -> List[ImageResult]:
+        if status_code == 200:
+            return [ImageResult(
+                image_data=body,
+                prompt=prompt,
+                model_used=f"Cloudflare {model_key}"
+            )]
+        else:
+            error_text = body[:300]
+            logger.error(f"Cloudflare error {status_code}: {error_text}")
+            raise ProviderError(f"Cloudflare API Error: {status_code}", status_code=status_code)
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
         try:
-            logger.info(f"Cloudflare AI: model={model_key}")
-            response = requests.post(url, json=payload, headers=headers, timeout=60)
-            
-            if response.status_code == 200:
-                # Cloudflare returns base64 in response
-                data = response.json()
-                if 'result' in data and 'image' in data['result']:
-                    import base64
-                    image_data = base64.b64decode(data['result']['image'])
-                    return [ImageResult(
-                        image_data=image_data,
-                        prompt=prompt,
-                        model_used=f"Cloudflare {model_key}"
-                    )]
-                else:
-                    raise Exception("No image in response")
-            else:
-                error_text = response.text[:300]
-                logger.error(f"Cloudflare error {response.status_code}: {error_text}")
-                raise Exception(f"Cloudflare API Error: {response.status_code}")
-                
+            status_code, body = self._post_inline_image(
+                path=self.IMAGE_FIELD, **self._build_request(prompt, options), timeout=60
+            )
+            return self._parse_response(status_code, body, prompt, options.get('model', 'sdxl'))
+        except Exception as e:
+            logger.error(f"Cloudflare error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+        
+        try:
+            status_code, body = await self._apost_inline_image(
+                path=self.IMAGE_FIELD, **self._build_request(prompt, options), timeout=60
+            )
+            return self._parse_response(status_code, body, prompt, options.get('model', 'sdxl'))
         except Exception as e:
             logger.error(f"Cloudflare error: {e}")
             raise e
@@ -899,9 +1645,12 @@ class AIHordeClient(BaseImageGenerationModel):
     AI Horde (Stable Horde) - Completely FREE
     Community-powered, asynchronous generation
     """
+    provider = 'aihorde'
+    supports_seed = True
+
     def __init__(self, api_key: str = None):
         super().__init__(api_key or "0000000000")  # Public key
-        self.base_url = "https://stablehorde.net/api/v2"
+        self.base_url = provider_base_url(self.provider, "https://stablehorde.net/api/v2")
         self.model_name = "AI Horde"
         
         # Popular community models
@@ -911,10 +1660,10 @@ class AIHordeClient(BaseImageGenerationModel):
             "dreamshaper": "DreamShaper",
         }
 
-    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
-        if options is None:
-            options = {}
-            
+    # Community queue: follows the Horde's wait_time estimate (3 minutes max)
+    POLL_SCHEDULE = {'interval': 5, 'max_interval': 20, 'timeout': 180}
+
+    def _build_request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
         model_key = options.get('model', 'sdxl')
         model_name = self.models.get(model_key, self.models['sdxl'])
         
@@ -939,56 +1688,114 @@ class AIHordeClient(BaseImageGenerationModel):
             "trusted_workers": False,
             "models": [model_name],
         }
+        if options.get('seed') is not None:
+            payload["params"]["seed"] = str(options['seed'])
         
-        try:
-            logger.info(f"AI Horde: Submitting job, model={model_key}")
-            response = requests.post(submit_url, json=payload, headers=headers, timeout=30)
+        logger.info(f"AI Horde: Submitting job, model={model_key}")
+        return {'url': submit_url, 'json': payload, 'headers': headers}
+
+    @staticmethod
+    def _job_id(response) -> str:
+        if response.status_code != 202:
+            raise ProviderError(f"Failed to submit: {response.status_code}", status_code=response.status_code)
+        
+        job_id = response.json().get('id')
+        if not job_id:
+            raise Exception("No job ID returned")
+        return job_id
+
+    @staticmethod
+    def _image_url(status_response) -> str:
+        status_data = status_response.json()
+        
+        generations = status_data.get('generations', [])
+        if generations and 'img' in generations[0]:
+            return generations[0]['img']
+        raise Exception("No image URL in response")
+
+    def _poll_job(self, job_id: str):
+        """Status check for the job poller: resolves with the image URL."""
+        check_url = f"{self.base_url}/generate/check/{job_id}"
+        status_url = f"{self.base_url}/generate/status/{job_id}"
+        # Runs on the poller loop: keep the caller's progress reporter
+        reporter = current_reporter()
+
+        async def check():
+            check_response = await self._aget(check_url, timeout=10)
+            check_data = check_response.json()
             
-            if response.status_code != 202:
-                raise Exception(f"Failed to submit: {response.status_code}")
+            if check_data.get('done'):
+                # Get final result
+                status_response = await self._aget(status_url, timeout=10)
+                return self._image_url(status_response)
             
-            data = response.json()
-            job_id = data.get('id')
+            logger.info(f"AI Horde: Job {job_id} waiting, queue position {check_data.get('queue_position')}")
+            if check_data.get('processing'):
+                report_progress('processing', reporter, provider=self.provider,
+                                wait_time=check_data.get('wait_time'))
+            else:
+                report_progress('position', reporter, provider=self.provider,
+                                position=check_data.get('queue_position'),
+                                wait_time=check_data.get('wait_time'))
+            # The Horde estimates the remaining time itself
+            return JobPending(retry_after=check_data.get('wait_time'))
+        return check
+
+    def generate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
             
-            if not job_id:
-                raise Exception("No job ID returned")
+        model_key = options.get('model', 'sdxl')
+        
+        try:
+            response = self._post(**self._build_request(prompt, options), timeout=30)
+            job_id = self._job_id(response)
             
-            # Step 2: Poll for completion
-            check_url = f"{self.base_url}/generate/check/{job_id}"
-            status_url = f"{self.base_url}/generate/status/{job_id}"
+            # Step 2: Wait for completion (polled by the shared job poller)
+            image_url = get_job_poller().submit(
+                self._poll_job(job_id), job_id=job_id, **self.POLL_SCHEDULE
+            ).result()
             
-            max_wait = 180  # 3 minutes max
-            waited = 0
+            # Download image
+            image_data = self._download(image_url, timeout=30)
+            return [ImageResult(
+                image_data=image_data,
+                prompt=prompt,
+                model_used=f"AI Horde {model_key}"
+            )]
             
-            while waited < max_wait:
-                time.sleep(5)
-                waited += 5
-                
-                check_response = requests.get(check_url, timeout=10)
-                check_data = check_response.json()
-                
-                if check_data.get('done'):
-                    # Get final result
-                    status_response = requests.get(status_url, timeout=10)
-                    status_data = status_response.json()
-                    
-                    generations = status_data.get('generations', [])
-                    if generations and 'img' in generations[0]:
-                        image_url = generations[0]['img']
-                        
-                        # Download image
-                        img_response = requests.get(image_url, timeout=30)
-                        return [ImageResult(
-                            image_data=img_response.content,
-                            prompt=prompt,
-                            model_used=f"AI Horde {model_key}"
-                        )]
-                    else:
-                        raise Exception("No image URL in response")
-                
-                logger.info(f"AI Horde: Job {job_id} waiting, {waited}s elapsed")
+        except Exception as e:
+            logger.error(f"AI Horde error: {e}")
+            raise e
+
+    async def agenerate_image(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> List[ImageResult]:
+        if options is None:
+            options = {}
+            
+        model_key = options.get('model', 'sdxl')
+        
+        try:
+            response = await self._apost(**self._build_request(prompt, options), timeout=30)
+            job_id = self._job_id(response)
+            
+            try:
+                image_url = await get_job_poller().wait(
+                    self._poll_job(job_id), job_id=job_id, **self.POLL_SCHEDULE
+                )
+            except asyncio.CancelledError:
+                # Lost a hedged race: free our slot in the community queue
+                try:
+                    await self._arequest('DELETE', f"{self.base_url}/generate/status/{job_id}", timeout=5)
+                except Exception as e:
+                    logger.warning(f"AI Horde: could not cancel remote job: {e}")
+                raise
             
-            raise Exception("Timeout waiting for generation")
+            image_data = await self._adownload(image_url, timeout=30)
+            return [ImageResult(
+                image_data=image_data,
+                prompt=prompt,
+                model_used=f"AI Horde {model_key}"
+            )]
             
         except Exception as e:
             logger.error(f"AI Horde error: {e}")
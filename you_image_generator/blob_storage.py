@@ -0,0 +1,315 @@
+# you_image_generator/blob_storage.py
+"""
+Image blob storage, outside the database
+
+GeneratedImage rows only keep the key of their image (image_key); the bytes
+live in a BlobStore chosen with settings.BLOB_STORAGE_BACKEND:
+- 'local' (default): content-addressed files under BLOB_STORAGE_ROOT,
+  <root>/ab/cd/abcd... (sha256 of the bytes), so identical images are
+  stored once
+- 's3': an S3-compatible bucket (AWS, MinIO, Ceph...), through boto3
+  (optional dependency)
+- or the dotted path of a BlobStore subclass
+
+Keys are the sha256 of the content unless the caller picks one (derived
+files such as thumbnails). `manage.py migrate_image_blobs` moves the images
+of older rows out of the image_data column.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+    logger.info("boto3 not installed, the 's3' blob storage backend is unavailable")
+
+
+class BlobNotFound(KeyError):
+    """No blob under this key"""
+
+
+def content_key(data: bytes) -> str:
+    """Content address of a blob (sha256, hex)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """
+    Interface of the storage backends
+
+    Keys are made of [0-9a-z._-] segments separated by '/'.
+    """
+
+    def put(self, data: bytes, key: Optional[str] = None) -> str:
+        """
+        Store a blob
+
+        Args:
+            data: Blob bytes
+            key: Key to store under (content_key(data) if None)
+
+        Returns:
+            The key
+        """
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        """
+        Readable binary stream of a blob (to close after use)
+
+        Raises:
+            BlobNotFound: Unknown key
+        """
+        raise NotImplementedError
+
+    def open_range(self, key: str, start: int, end: int) -> BinaryIO:
+        """
+        Readable binary stream starting at byte `start` of a blob
+
+        Args:
+            key: Blob key
+            start, end: First and last byte positions (inclusive); the
+                stream may go on past `end`, callers stop reading there
+
+        Raises:
+            BlobNotFound: Unknown key
+        """
+        stream = self.open(key)
+        try:
+            stream.seek(start)
+        except (AttributeError, OSError):
+            # Not seekable: skip the leading bytes
+            remaining = start
+            while remaining:
+                chunk = stream.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+        return stream
+
+    def get(self, key: str) -> bytes:
+        """Whole blob (raises BlobNotFound)"""
+        with self.open(key) as stream:
+            return stream.read()
+
+    def size(self, key: str) -> int:
+        """Blob length in bytes (raises BlobNotFound)"""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.size(key)
+        except BlobNotFound:
+            return False
+        return True
+
+    def delete(self, key: str):
+        """Remove a blob (no error if missing)"""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the blob on this machine, None if not stored as a file"""
+        return None
+
+
+def _check_key(key: str) -> str:
+    parts = key.split('/')
+    if not key or any(part in ('', '.', '..') for part in parts) or '\\' in key:
+        raise ValueError(f"Invalid blob key: {key!r}")
+    return key
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs as files under a root directory
+
+    Content keys are spread over two directory levels (ab/cd/abcd...).
+    Files are written to a temporary name then renamed, so readers never
+    see a partial blob.
+
+    Args:
+        root: Base directory (created on first write)
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        _check_key(key)
+        first = key.split('/', 1)[0]
+        if len(first) >= 4:
+            return os.path.join(self.root, first[:2], first[2:4], *key.split('/'))
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, data: bytes, key: Optional[str] = None) -> str:
+        addressed = key is None
+        key = content_key(data) if key is None else key
+        path = self._path(key)
+        if addressed and os.path.exists(path):
+            return key  # same content already stored
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return key
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return open(self._path(key), 'rb')
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def size(self, key: str) -> int:
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+class S3BlobStore(BlobStore):
+    """
+    Blobs as objects of an S3-compatible bucket
+
+    Args:
+        bucket: Bucket name
+        prefix: Key prefix inside the bucket (e.g. 'images/')
+        client: boto3 S3 client (or any object with the same put_object,
+            get_object, head_object and delete_object methods); built from
+            the other arguments if None
+        endpoint_url: Non-AWS endpoint (MinIO: http://localhost:9000)
+        region, access_key, secret_key: Credentials (boto3's usual lookup
+            if empty)
+    """
+
+    # Error codes of a missing object
+    NOT_FOUND = ('NoSuchKey', '404', 'NotFound')
+
+    def __init__(self, bucket: str, prefix: str = '', client=None, endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key: Optional[str] = None,
+                 secret_key: Optional[str] = None):
+        if client is None:
+            if not BOTO3_AVAILABLE:
+                raise ImportError("boto3 is required for BLOB_STORAGE_BACKEND = 's3'")
+            client = boto3.client(
+                's3',
+                endpoint_url=endpoint_url or None,
+                region_name=region or None,
+                aws_access_key_id=access_key or None,
+                aws_secret_access_key=secret_key or None,
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{_check_key(key)}"
+
+    def _not_found(self, error: Exception) -> bool:
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        return code in self.NOT_FOUND
+
+    def put(self, data: bytes, key: Optional[str] = None) -> str:
+        key = content_key(data) if key is None else key
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+        return key
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+        except Exception as e:
+            if self._not_found(e):
+                raise BlobNotFound(key)
+            raise
+
+    def open_range(self, key: str, start: int, end: int) -> BinaryIO:
+        try:
+            return self.client.get_object(
+                Bucket=self.bucket, Key=self._object_key(key), Range=f'bytes={start}-{end}',
+            )['Body']
+        except Exception as e:
+            if self._not_found(e):
+                raise BlobNotFound(key)
+            raise
+
+    def size(self, key: str) -> int:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))['ContentLength']
+        except Exception as e:
+            if self._not_found(e):
+                raise BlobNotFound(key)
+            raise
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+# Global store instance
+_blob_store = None
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Get or create the global blob store
+
+    Chosen with settings.BLOB_STORAGE_BACKEND ('local', 's3' or the dotted
+    path of a BlobStore subclass taking no arguments).
+
+    Returns:
+        BlobStore instance
+    """
+    global _blob_store
+
+    if _blob_store is None:
+        from django.conf import settings
+        from django.utils.module_loading import import_string
+
+        backend = getattr(settings, 'BLOB_STORAGE_BACKEND', 'local')
+        if backend == 'local':
+            _blob_store = LocalBlobStore(getattr(settings, 'BLOB_STORAGE_ROOT', 'blobs'))
+        elif backend == 's3':
+            _blob_store = S3BlobStore(
+                bucket=settings.BLOB_STORAGE_S3_BUCKET,
+                prefix=getattr(settings, 'BLOB_STORAGE_S3_PREFIX', ''),
+                endpoint_url=getattr(settings, 'BLOB_STORAGE_S3_ENDPOINT_URL', None),
+                region=getattr(settings, 'BLOB_STORAGE_S3_REGION', None),
+                access_key=getattr(settings, 'BLOB_STORAGE_S3_ACCESS_KEY', None),
+                secret_key=getattr(settings, 'BLOB_STORAGE_S3_SECRET_KEY', None),
+            )
+        else:
+            _blob_store = import_string(backend)()
+        logger.info(f"Blob storage: {type(_blob_store).__name__}")
+
+    return _blob_store
+
+
+def reset_blob_store():
+    """Drop the global instance (after a settings change, in tests)"""
+    global _blob_store
+    _blob_store = None
@@ -0,0 +1,232 @@
+# you_image_generator/circuit_breaker.py
+"""
+Per-provider circuit breakers
+
+Every call to a provider's generate_image / agenerate_image goes through the
+breaker of that provider (see BaseImageGenerationModel.__init_subclass__).
+The breaker keeps the outcome and duration of the last calls:
+- CLOSED: calls go through; when the failure rate or the slow-call rate of
+  the window crosses its threshold, the breaker opens,
+- OPEN: calls fail at once with CircuitOpenError (no network, no timeout)
+  until `open_seconds` have passed,
+- HALF_OPEN: a single probe call is let through; success closes the
+  breaker, failure opens it again.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Defaults, overridable with settings.CIRCUIT_BREAKER and per provider with
+# settings.CIRCUIT_BREAKER_PROVIDERS
+DEFAULT_BREAKER_CONFIG = {
+    'window': 20,               # Number of recent calls considered
+    'min_calls': 5,             # Calls needed before the rates are trusted
+    'failure_rate': 0.5,        # Open when at least this share of calls failed
+    'slow_call_seconds': 90.0,  # A successful call slower than this is "slow"
+    'slow_call_rate': 0.8,      # Open when at least this share of calls was slow
+    'open_seconds': 60.0,       # Time spent open before a probe is allowed
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} is temporarily disabled after repeated failures "
+                         f"(circuit open, retry in {retry_in:.0f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status carried by a provider error (ProviderError, HTTPError, ImageDownloadError...)"""
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return response.status_code
+    return getattr(error, 'status_code', None)
+
+
+def is_client_error(error: BaseException) -> bool:
+    """
+    Whether the provider refused the request itself (4xx other than 429)
+
+    A content filter, a bad request or an invalid key says nothing about the
+    provider's health: such errors do not count against its breaker and do
+    not trigger a failover. Transport errors, timeouts, 429, 5xx and open
+    circuits do.
+    """
+    status = error_status(error)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class CircuitBreaker:
+    """
+    Failure-rate and latency circuit breaker for one provider
+
+    Thread-safe: the same breaker is shared by every thread and event loop
+    of the process.
+    """
+
+    def __init__(self, provider: str, window: int = 20, min_calls: int = 5,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 90.0,
+                 slow_call_rate: float = 0.8, open_seconds: float = 60.0):
+        self.provider = provider
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self.opened_at = None
+        self._calls = deque(maxlen=window)  # (failed, slow) per call
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Reserve a call slot
+
+        Raises:
+            CircuitOpenError: If the breaker is open (or already probing)
+        """
+        with self._lock:
+            if self.state == OPEN:
+                retry_in = self.opened_at + self.open_seconds - time.time()
+                if retry_in > 0:
+                    raise CircuitOpenError(self.provider, retry_in)
+                self.state = HALF_OPEN
+                logger.info(f"Circuit {self.provider}: half-open, probing")
+
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.provider, 0)
+                self._probe_in_flight = True
+
+    def record(self, success: bool, duration: float):
+        """Record the outcome of a call started with before_call()"""
+        slow = success and duration > self.slow_call_seconds
+
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success and not slow:
+                    self._close()
+                else:
+                    self._open('probe failed' if not success else f'probe took {duration:.0f}s')
+                return
+
+            self._calls.append((not success, slow))
+            if len(self._calls) < self.min_calls:
+                return
+
+            failure_rate, slow_rate = self._rates()
+            if failure_rate >= self.failure_rate_threshold:
+                self._open(f'failure rate {failure_rate:.0%}')
+            elif slow_rate >= self.slow_call_rate_threshold:
+                self._open(f'slow call rate {slow_rate:.0%}')
+
+    def release(self):
+        """Give back a slot without an outcome (call cancelled)"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _rates(self):
+        count = len(self._calls) or 1
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        return failures / count, slow / count
+
+    def _open(self, reason: str):
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._calls.clear()
+        logger.warning(f"Circuit {self.provider}: OPEN ({reason}), failing fast for {self.open_seconds:.0f}s")
+
+    def _close(self):
+        self.state = CLOSED
+        self.opened_at = None
+        self._calls.clear()
+        logger.info(f"Circuit {self.provider}: closed")
+
+    def reset(self):
+        """Force the breaker closed"""
+        with self._lock:
+            self._probe_in_flight = False
+            self._close()
+
+    def snapshot(self) -> dict:
+        """State for the health endpoint"""
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(self.opened_at + self.open_seconds - time.time(), 0), 1)
+            return {
+                'state': self.state,
+                'calls': len(self._calls),
+                'failure_rate': round(failure_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'retry_in': retry_in,
+            }
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN and time.time() < self.opened_at + self.open_seconds
+
+
+def _breaker_config(provider: str) -> dict:
+    from django.conf import settings
+
+    config = dict(DEFAULT_BREAKER_CONFIG)
+    config.update(getattr(settings, 'CIRCUIT_BREAKER', {}) or {})
+    config.update((getattr(settings, 'CIRCUIT_BREAKER_PROVIDERS', {}) or {}).get(provider, {}))
+    return config
+
+
+# Global breaker instances, one per provider
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """
+    Get or create the breaker of a provider
+
+    Args:
+        provider: Provider key (e.g. 'pollinations')
+
+    Returns:
+        CircuitBreaker instance
+    """
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(provider, **_breaker_config(provider))
+                _breakers[provider] = breaker
+    return breaker
+
+
+def get_breaker_states(providers: Optional[list] = None) -> Dict[str, dict]:
+    """Snapshot of every breaker (or of the given providers)"""
+    if providers is None:
+        providers = list(_breakers)
+    return {provider: get_circuit_breaker(provider).snapshot() for provider in providers}
+
+
+def reset_circuit_breakers():
+    """Drop every breaker (used in tests)"""
+    with _breakers_lock:
+        _breakers.clear()
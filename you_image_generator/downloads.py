@@ -0,0 +1,238 @@
+# you_image_generator/downloads.py
+"""
+Streaming download stage for provider image payloads
+
+Image bodies are read in chunks into a spooled buffer instead of being
+loaded whole with `response.content`:
+- the first bytes are checked against known image signatures, so HTML or
+  JSON error pages are rejected after one chunk,
+- a configurable maximum size aborts oversized responses (Content-Length is
+  checked before reading anything),
+- bodies larger than the spool threshold roll over to a temporary file,
+  which bounds the memory held per in-flight request.
+"""
+
+import logging
+import tempfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Defaults, overridable with IMAGE_DOWNLOAD_MAX_BYTES / IMAGE_DOWNLOAD_SPOOL_BYTES
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_SPOOL_BYTES = 4 * 1024 * 1024
+
+# Bytes needed to recognise every supported format
+SNIFF_BYTES = 12
+
+# Bytes of an error body kept for the error message
+ERROR_BODY_BYTES = 1024
+
+# Content types that are never image payloads
+ERROR_CONTENT_TYPES = ('text/', 'application/json', 'application/problem+json')
+
+
+class ImageDownloadError(Exception):
+    """
+    Provider answered with an error, a non-image body or an oversized image
+
+    Attributes:
+        status_code: HTTP status of the response
+        body: Start of the response body
+        reason: 'status' (error status), 'content' (not an image) or 'size'
+        retry_after: Retry-After header of the response, if any
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: str = '',
+                 reason: str = 'status', retry_after: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Identify an image from its first bytes
+
+    Args:
+        head: At least SNIFF_BYTES leading bytes of the payload
+
+    Returns:
+        Format name ('png', 'jpeg', 'webp', 'gif', 'avif', 'bmp') or None
+    """
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[4:8] == b'ftyp':
+        return 'avif'
+    if head.startswith(b'BM'):
+        return 'bmp'
+    return None
+
+
+def _download_limits(max_bytes: Optional[int]):
+    from django.conf import settings
+
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'IMAGE_DOWNLOAD_MAX_BYTES', DEFAULT_MAX_BYTES)
+    spool_bytes = getattr(settings, 'IMAGE_DOWNLOAD_SPOOL_BYTES', DEFAULT_SPOOL_BYTES)
+    return max_bytes, spool_bytes
+
+
+class ImageBuffer:
+    """
+    Accumulates streamed chunks and validates them as they arrive
+
+    Args:
+        url: Source URL (for error messages)
+        max_bytes: Abort once more bytes than this have been received
+        spool_bytes: Size kept in memory before spilling to a temp file
+    """
+
+    def __init__(self, url: str, max_bytes: int, spool_bytes: int):
+        self.url = url
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.image_type = None
+        self._head = b''
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+
+    def check_headers(self, status_code: int, headers) -> bool:
+        """
+        Validate status and headers before reading the body
+
+        Returns:
+            True if the body should be read as an image, False if it is an
+            error body (read a snippet of it, then call fail())
+        """
+        if status_code != 200:
+            return False
+
+        content_type = (headers.get('content-type') or '').lower()
+        if content_type.startswith(ERROR_CONTENT_TYPES):
+            return False
+
+        content_length = headers.get('content-length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            self.close()
+            raise ImageDownloadError(
+                f"Image too large: {content_length} bytes (max {self.max_bytes})",
+                status_code=status_code,
+                reason='size',
+            )
+        return True
+
+    def feed(self, chunk: bytes):
+        """Append a chunk, checking the signature and the size limit"""
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.close()
+            raise ImageDownloadError(f"Image exceeds {self.max_bytes} bytes, download aborted",
+                                     status_code=200, reason='size')
+
+        if self.image_type is None:
+            self._head += chunk[:SNIFF_BYTES]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        self._file.write(chunk)
+
+    def _sniff(self):
+        self.image_type = sniff_image_type(self._head)
+        if self.image_type is None:
+            self.close()
+            raise ImageDownloadError(
+                f"Response is not an image (starts with {self._head[:SNIFF_BYTES]!r})",
+                status_code=200,
+                body=self._head.decode('utf-8', errors='replace'),
+                reason='content',
+            )
+
+    def getvalue(self) -> bytes:
+        """Return the validated image bytes and release the buffer"""
+        if self.image_type is None:
+            self._sniff()
+        self._file.seek(0)
+        data = self._file.read()
+        self.close()
+        logger.debug(f"Downloaded {self.size} bytes ({self.image_type}) from {self.url[:100]}")
+        return data
+
+    def fail(self, status_code: int, body: bytes, headers=None):
+        """Raise the error for a non-image response"""
+        self.close()
+        text = body.decode('utf-8', errors='replace')
+        if status_code == 200:
+            raise ImageDownloadError(f"Response is not an image: {text[:300]}", status_code=status_code,
+                                     body=text, reason='content')
+        retry_after = headers.get('retry-after') if headers is not None else None
+        raise ImageDownloadError(f"API Error: {status_code} - {text[:300]}", status_code=status_code,
+                                 body=text, retry_after=retry_after)
+
+    def close(self):
+        self._file.close()
+
+
+def download_image(http, url: str, method: str = 'GET', max_bytes: Optional[int] = None,
+                   timeout=30, **kwargs) -> bytes:
+    """
+    Stream an image body through the shared pool
+
+    Args:
+        http: PooledHTTPClient
+        url: Image URL (or generation endpoint answering with image bytes)
+        method: HTTP method
+        max_bytes: Size limit (IMAGE_DOWNLOAD_MAX_BYTES by default)
+        timeout: Read timeout in seconds
+        **kwargs: Passed to the request (params, json, headers...)
+
+    Returns:
+        Image bytes
+
+    Raises:
+        ImageDownloadError: Error status, non-image body or size limit hit
+    """
+    buffer = ImageBuffer(url, *_download_limits(max_bytes))
+    response = http.request(method, url, timeout=timeout, stream=True, **kwargs)
+    try:
+        if not buffer.check_headers(response.status_code, response.headers):
+            body = b''
+            for chunk in response.iter_content(chunk_size=ERROR_BODY_BYTES):
+                body += chunk
+                if len(body) >= ERROR_BODY_BYTES:
+                    break
+            buffer.fail(response.status_code, body, response.headers)
+
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            buffer.feed(chunk)
+        return buffer.getvalue()
+    finally:
+        response.close()
+
+
+async def adownload_image(ahttp, url: str, method: str = 'GET', max_bytes: Optional[int] = None,
+                          timeout=30, **kwargs) -> bytes:
+    """Async download_image on an AsyncPooledHTTPClient"""
+    buffer = ImageBuffer(url, *_download_limits(max_bytes))
+    async with ahttp.stream(method, url, timeout=timeout, **kwargs) as response:
+        if not buffer.check_headers(response.status_code, response.headers):
+            body = b''
+            async for chunk in response.aiter_bytes(ERROR_BODY_BYTES):
+                body += chunk
+                if len(body) >= ERROR_BODY_BYTES:
+                    break
+            buffer.fail(response.status_code, body, response.headers)
+
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            buffer.feed(chunk)
+    return buffer.getvalue()
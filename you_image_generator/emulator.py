@@ -0,0 +1,558 @@
+# you_image_generator/emulator.py
+"""
+Local stand-in for the image providers, for offline load testing
+
+ProviderEmulator is a small HTTP server speaking the protocol each client of
+ai_clients.py expects:
+- pollinations: GET returning the image
+- subnp: POST answered with an SSE stream of status events, then the image URL
+- gemini, cloudflare: POST answered with the image base64-encoded in JSON
+- replicate, prodia, aihorde: submit, poll the job status, download the image
+- stability: form / multipart POST returning the image
+
+Each provider has a ProviderProfile: latency distribution, error rate and
+status, payload size. Images are valid PNGs of random (incompressible)
+pixels of about the requested size.
+
+Clients are pointed at it with settings.PROVIDER_EMULATOR_URL: every
+provider base URL becomes `<emulator>/<provider><original path>` (see
+ai_clients.provider_base_url), so the whole pipeline (views, pools, retries,
+breakers, job poller) runs unchanged without network.
+
+    python manage.py provider_emulator --port 8765 --latency uniform:1,3
+    PROVIDER_EMULATOR_URL=http://127.0.0.1:8765 python manage.py runserver
+"""
+
+import base64
+import functools
+import json
+import logging
+import math
+import random
+import re
+import struct
+import threading
+import time
+import urllib.parse
+import uuid
+import zlib
+from collections import Counter
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_PAYLOAD_BYTES = 512 * 1024
+# Bytes written at a time for large bodies
+WRITE_CHUNK = 64 * 1024
+# Finished or abandoned jobs are forgotten after this many seconds
+JOB_TTL = 600
+
+# Typical latency of each real provider (seconds)
+DEFAULT_LATENCIES = {
+    'pollinations': 'uniform:2,6',
+    'subnp': 'uniform:3,8',
+    'gemini': 'uniform:4,10',
+    'cloudflare': 'uniform:1,4',
+    'replicate': 'uniform:2,5',
+    'prodia': 'uniform:5,15',
+    'aihorde': 'uniform:10,40',
+    'stability': 'uniform:3,8',
+}
+PROVIDERS = tuple(DEFAULT_LATENCIES)
+
+
+def parse_latency(spec) -> Callable[[], float]:
+    """
+    Build a latency sampler
+
+    Args:
+        spec: Seconds ('1.5') or 'distribution:params': 'constant:1.5',
+            'uniform:min,max', 'normal:mean,stddev', 'lognormal:mu,sigma'
+            (of the natural log of the seconds), 'exponential:mean'
+
+    Returns:
+        Callable returning a delay (never negative)
+
+    Raises:
+        ValueError: Unknown distribution or wrong parameters
+    """
+    if isinstance(spec, (int, float)):
+        spec = str(spec)
+    name, _, params = spec.partition(':')
+    if not params:
+        name, params = 'constant', name
+    try:
+        args = [float(value) for value in params.split(',')]
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters: {spec!r}")
+
+    samplers = {
+        'constant': (1, lambda value: value),
+        'uniform': (2, random.uniform),
+        'normal': (2, random.gauss),
+        'lognormal': (2, random.lognormvariate),
+        'exponential': (1, lambda mean: random.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if name not in samplers:
+        raise ValueError(f"Unknown latency distribution: {name!r}")
+    arity, sampler = samplers[name]
+    if len(args) != arity:
+        raise ValueError(f"{name} latency takes {arity} parameter(s): {spec!r}")
+    return lambda: max(0.0, sampler(*args))
+
+
+class ProviderProfile:
+    """
+    Behaviour of one emulated provider
+
+    Args:
+        latency: Generation time (see parse_latency)
+        error_rate: Share of submissions answered with error_status
+        error_status: HTTP status of injected failures (429 adds Retry-After)
+        payload_bytes: Approximate size of the returned images
+        download_latency: Time before an image download starts
+    """
+
+    def __init__(self, latency='constant:0', error_rate: float = 0.0, error_status: int = 503,
+                 payload_bytes: int = DEFAULT_PAYLOAD_BYTES, download_latency='constant:0'):
+        if not 0 <= error_rate <= 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.payload_bytes = payload_bytes
+        self.download_latency = download_latency
+        self.sample_latency = parse_latency(latency)
+        self.sample_download_latency = parse_latency(download_latency)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+    def __repr__(self):
+        return (f"ProviderProfile(latency={self.latency!r}, error_rate={self.error_rate}, "
+                f"error_status={self.error_status}, payload_bytes={self.payload_bytes})")
+
+
+def default_profiles(**overrides) -> Dict[str, ProviderProfile]:
+    """Profiles with each provider's typical latency, `overrides` applied to all"""
+    return {
+        provider: ProviderProfile(**{'latency': latency, **overrides})
+        for provider, latency in DEFAULT_LATENCIES.items()
+    }
+
+
+@functools.lru_cache(maxsize=8)
+def make_png(payload_bytes: int, width: int = 512) -> bytes:
+    """
+    Valid RGB PNG of random pixels, about `payload_bytes` long
+
+    Pixels are stored uncompressed, like a photo they don't shrink.
+    """
+    row = width * 3
+    height = max(1, math.ceil(payload_bytes / (row + 1)))
+    rng = random.Random(payload_bytes)
+    raw = b''.join(b'\x00' + rng.randbytes(row) for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw, 0)) + chunk(b'IEND', b''))
+
+
+class EmulatedJob:
+    """A submitted asynchronous generation (replicate, prodia, aihorde)"""
+
+    def __init__(self, provider: str, latency: float, outputs: int = 1):
+        self.id = uuid.uuid4().hex
+        self.provider = provider
+        self.created = time.monotonic()
+        self.latency = latency
+        self.outputs = outputs
+        self.cancelled = False
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.created + self.latency - time.monotonic())
+
+    @property
+    def done(self) -> bool:
+        return self.remaining == 0
+
+    @property
+    def processing(self) -> bool:
+        """Second half of the wait: a worker has the job"""
+        return self.remaining <= self.latency / 2
+
+
+# (method, path, handler name); paths are the real ones behind /<provider>
+ROUTES = [
+    ('GET', r'/pollinations/prompt/(?P<prompt>.+)', 'pollinations'),
+    ('POST', r'/subnp/api/free/generate', 'subnp'),
+    ('POST', r'/gemini/v1beta/models/(?P<model>[^/:]+):generateContent', 'gemini'),
+    ('POST', r'/cloudflare/client/v4/accounts/(?P<account>[^/]+)/ai/run/(?P<model>.+)', 'cloudflare'),
+    ('POST', r'/replicate/v1/predictions', 'replicate_create'),
+    ('GET', r'/replicate/v1/predictions/(?P<job>\w+)', 'replicate_get'),
+    ('POST', r'/replicate/v1/predictions/(?P<job>\w+)/cancel', 'replicate_cancel'),
+    ('POST', r'/prodia/v1/sd/generate', 'prodia_create'),
+    ('GET', r'/prodia/v1/job/(?P<job>\w+)', 'prodia_get'),
+    ('POST', r'/aihorde/api/v2/generate/async', 'horde_create'),
+    ('GET', r'/aihorde/api/v2/generate/check/(?P<job>\w+)', 'horde_check'),
+    ('GET', r'/aihorde/api/v2/generate/status/(?P<job>\w+)', 'horde_status'),
+    ('DELETE', r'/aihorde/api/v2/generate/status/(?P<job>\w+)', 'horde_cancel'),
+    ('POST', r'/stability/v2beta/stable-image/generate/(?P<model>[\w-]+)', 'stability'),
+    ('GET', r'/files/(?P<source>\w+)/(?P<size>\d+)/(?P<token>\w+)\.png', 'file'),
+]
+_ROUTES = [(method, re.compile(pattern), name) for method, pattern, name in ROUTES]
+
+# Header carrying the credentials of each keyed provider
+_AUTH_HEADERS = {
+    'gemini': 'x-goog-api-key',
+    'cloudflare': 'Authorization',
+    'replicate': 'Authorization',
+    'stability': 'Authorization',
+}
+
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    """Routes one request to the emulated provider (self.emulator)"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+    emulator: 'ProviderEmulator' = None
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        logger.debug(f"Emulator: {self.address_string()} {format % args}")
+
+    # --- plumbing ---
+
+    def _dispatch(self, method: str):
+        # Always drain the body so the connection can be reused
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        url = urllib.parse.urlsplit(self.path)
+        self.query = urllib.parse.parse_qs(url.query)
+
+        for route_method, pattern, name in _ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match and route_method == method:
+                provider = url.path.split('/')[1]
+                if provider in _AUTH_HEADERS and not self.headers.get(_AUTH_HEADERS[provider]):
+                    return self._json(provider, 401, {'error': 'Missing credentials'})
+                try:
+                    return getattr(self, f'_{name}')(provider, **match.groupdict())
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # client gave up (timeout, lost hedged race)
+        self._json('unknown', 404, {'error': f'No emulated endpoint for {method} {url.path}'})
+
+    def _start(self, provider: str, status: int, content_type: str, length: Optional[int] = None,
+               headers: Optional[dict] = None):
+        self.emulator.count(provider, status)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if length is None:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Content-Length', str(length))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _send(self, provider: str, status: int, content_type: str, body: bytes, headers: Optional[dict] = None):
+        self._start(provider, status, content_type, len(body), headers)
+        with memoryview(body) as view:
+            for start in range(0, len(view), WRITE_CHUNK):
+                self.wfile.write(view[start:start + WRITE_CHUNK])
+
+    def _json(self, provider: str, status: int, data: dict, headers: Optional[dict] = None):
+        self._send(provider, status, 'application/json', json.dumps(data).encode(), headers)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def _json_body(self) -> dict:
+        try:
+            return json.loads(self.body or b'{}')
+        except ValueError:
+            return {}
+
+    def _form_body(self) -> dict:
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser().parsebytes(
+                f'Content-Type: {content_type}\r\n\r\n'.encode() + self.body
+            )
+            return {
+                part.get_param('name', header='content-disposition'): part.get_payload(decode=True).decode(errors='replace')
+                for part in message.get_payload() if not isinstance(part, str)
+            }
+        return {key: values[0] for key, values in urllib.parse.parse_qs(self.body.decode(errors='replace')).items()}
+
+    def _fail(self, provider: str) -> bool:
+        """Answer with the injected failure if this submission draws one"""
+        profile = self.emulator.profiles[provider]
+        if not profile.should_fail():
+            return False
+        headers = {'Retry-After': '1'} if profile.error_status == 429 else None
+        self._json(provider, profile.error_status, {'error': 'Emulated provider failure'}, headers)
+        return True
+
+    def _generate(self, provider: str):
+        """Wait as long as the provider takes to produce an image"""
+        time.sleep(self.emulator.profiles[provider].sample_latency())
+
+    def _image(self, provider: str) -> bytes:
+        return make_png(self.emulator.profiles[provider].payload_bytes)
+
+    # --- synchronous providers ---
+
+    def _pollinations(self, provider, prompt):
+        if self._fail(provider):
+            return
+        self._generate(provider)
+        self._send(provider, 200, 'image/png', self._image(provider))
+
+    def _subnp(self, provider):
+        if self._fail(provider):
+            return
+        delay = self.emulator.profiles[provider].sample_latency()
+        self._start(provider, 200, 'text/event-stream', headers={'Cache-Control': 'no-cache'})
+        for message in ('Queued', 'Generating image', 'Finalizing'):
+            time.sleep(delay / 3)
+            event = {'status': 'processing', 'message': message}
+            self._write_chunk(f'data: {json.dumps(event)}\n\n'.encode())
+        event = {'status': 'complete', 'imageUrl': self.emulator.file_url(provider)}
+        self._write_chunk(f'data: {json.dumps(event)}\n\n'.encode())
+        self._write_chunk(b'')
+
+    def _inline_image(self, provider: str) -> str:
+        return base64.b64encode(self._image(provider)).decode('ascii')
+
+    def _gemini(self, provider, model):
+        if self._fail(provider):
+            return
+        self._generate(provider)
+        self._json(provider, 200, {
+            'candidates': [{
+                'content': {'parts': [
+                    {'text': 'Here is your image.'},
+                    {'inlineData': {'mimeType': 'image/png', 'data': self._inline_image(provider)}},
+                ], 'role': 'model'},
+                'finishReason': 'STOP',
+            }],
+            'modelVersion': model,
+        })
+
+    def _cloudflare(self, provider, account, model):
+        if self._fail(provider):
+            return
+        self._generate(provider)
+        self._json(provider, 200, {
+            'result': {'image': self._inline_image(provider)},
+            'success': True, 'errors': [], 'messages': [],
+        })
+
+    def _stability(self, provider, model):
+        form = self._form_body()
+        if not form.get('prompt'):
+            return self._json(provider, 400, {'name': 'bad_request', 'errors': ['prompt: is required']})
+        if self._fail(provider):
+            return
+        self._generate(provider)
+        image = self._image(provider)
+        seed = str(random.randrange(2 ** 32))
+        if 'application/json' in self.headers.get('Accept', ''):
+            return self._json(provider, 200, {
+                'image': base64.b64encode(image).decode('ascii'), 'finish_reason': 'SUCCESS', 'seed': seed,
+            })
+        self._send(provider, 200, 'image/png', image, {'finish-reason': 'SUCCESS', 'seed': seed})
+
+    def _file(self, provider, source, size, token):
+        if source not in self.emulator.profiles:
+            return self._json(provider, 404, {'error': 'Unknown provider'})
+        time.sleep(self.emulator.profiles[source].sample_download_latency())
+        self._send(source, 200, 'image/png', make_png(int(size)))
+
+    # --- asynchronous providers ---
+
+    def _job(self, provider: str, job_id: str) -> Optional[EmulatedJob]:
+        job = self.emulator.get_job(job_id)
+        if job is None or job.provider != provider:
+            self._json(provider, 404, {'detail': 'Not found.', 'message': 'Job not found'})
+            return None
+        return job
+
+    def _replicate_create(self, provider):
+        if self._fail(provider):
+            return
+        outputs = int(self._json_body().get('input', {}).get('num_outputs') or 1)
+        job = self.emulator.create_job(provider, outputs)
+        self._json(provider, 201, self._replicate_state(job))
+
+    def _replicate_state(self, job: EmulatedJob) -> dict:
+        url = f"{self.emulator.url}/replicate/v1/predictions/{job.id}"
+        if job.cancelled:
+            status = 'canceled'
+        elif job.done:
+            status = 'succeeded'
+        else:
+            status = 'processing' if job.processing else 'starting'
+        return {
+            'id': job.id,
+            'status': status,
+            'output': [self.emulator.file_url(job.provider) for _ in range(job.outputs)] if status == 'succeeded' else None,
+            'error': None,
+            'urls': {'get': url, 'cancel': f'{url}/cancel'},
+        }
+
+    def _replicate_get(self, provider, job):
+        job = self._job(provider, job)
+        if job:
+            self._json(provider, 200, self._replicate_state(job))
+
+    def _replicate_cancel(self, provider, job):
+        job = self._job(provider, job)
+        if job:
+            job.cancelled = True
+            self._json(provider, 200, self._replicate_state(job))
+
+    def _prodia_create(self, provider):
+        if self._fail(provider):
+            return
+        job = self.emulator.create_job(provider)
+        self._json(provider, 200, {'job': job.id, 'status': 'queued'})
+
+    def _prodia_get(self, provider, job):
+        job = self._job(provider, job)
+        if not job:
+            return
+        if job.done:
+            self._json(provider, 200, {'job': job.id, 'status': 'succeeded',
+                                       'imageUrl': self.emulator.file_url(provider)})
+        else:
+            self._json(provider, 200, {'job': job.id, 'status': 'generating' if job.processing else 'queued'})
+
+    def _horde_create(self, provider):
+        if self._fail(provider):
+            return
+        job = self.emulator.create_job(provider)
+        self._json(provider, 202, {'id': job.id, 'kudos': 10.0})
+
+    def _horde_state(self, job: EmulatedJob) -> dict:
+        done = job.done and not job.cancelled
+        processing = not done and job.processing
+        return {
+            'finished': int(done), 'processing': int(processing), 'restarted': 0,
+            'waiting': int(not done and not processing), 'done': done, 'faulted': False,
+            'wait_time': math.ceil(job.remaining),
+            # One queue slot per 5 seconds of remaining wait
+            'queue_position': 0 if processing or done else math.ceil(job.remaining / 5),
+            'kudos': 10.0, 'is_possible': True,
+        }
+
+    def _horde_check(self, provider, job):
+        job = self._job(provider, job)
+        if job:
+            self._json(provider, 200, self._horde_state(job))
+
+    def _horde_status(self, provider, job):
+        job = self._job(provider, job)
+        if not job:
+            return
+        state = self._horde_state(job)
+        state['generations'] = [{
+            'img': self.emulator.file_url(provider), 'seed': str(random.randrange(2 ** 32)),
+            'id': job.id, 'censored': False, 'model': 'stable_diffusion_xl',
+            'worker_id': 'emulator', 'worker_name': 'emulator',
+        }] if state['done'] else []
+        self._json(provider, 200, state)
+
+    def _horde_cancel(self, provider, job):
+        job = self._job(provider, job)
+        if job:
+            job.cancelled = True
+            self._json(provider, 200, {**self._horde_state(job), 'generations': []})
+
+
+class ProviderEmulator:
+    """
+    Emulated providers served on one port
+
+    Args:
+        host: Interface to listen on
+        port: Port (0 for a free one, see `url`)
+        profiles: ProviderProfile per provider (default_profiles() if None;
+            providers left out use a zero-latency profile)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 profiles: Optional[Dict[str, ProviderProfile]] = None):
+        self.profiles = {provider: ProviderProfile() for provider in PROVIDERS}
+        self.profiles.update(default_profiles() if profiles is None else profiles)
+        self.requests = Counter()
+        self._jobs: Dict[str, EmulatedJob] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        handler = type('EmulatorHandler', (EmulatorHandler,), {'emulator': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        # Load tests open many connections at once
+        self.server.request_queue_size = 128
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as PROVIDER_EMULATOR_URL"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def file_url(self, provider: str) -> str:
+        """Download URL of a fresh image of the provider's payload size"""
+        return f"{self.url}/files/{provider}/{self.profiles[provider].payload_bytes}/{uuid.uuid4().hex}.png"
+
+    def count(self, provider: str, status: int):
+        with self._lock:
+            self.requests[(provider, status)] += 1
+
+    def create_job(self, provider: str, outputs: int = 1) -> EmulatedJob:
+        job = EmulatedJob(provider, self.profiles[provider].sample_latency(), outputs)
+        with self._lock:
+            now = time.monotonic()
+            for stale in [key for key, old in self._jobs.items() if now - old.created > JOB_TTL]:
+                del self._jobs[stale]
+            self._jobs[job.id] = job
+        return job
+
+    def get_job(self, job_id: str) -> Optional[EmulatedJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def serve_forever(self):
+        logger.info(f"Provider emulator listening on {self.url}")
+        self.server.serve_forever()
+
+    def start(self) -> 'ProviderEmulator':
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name='provider-emulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
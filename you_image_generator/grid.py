@@ -0,0 +1,229 @@
+# you_image_generator/grid.py
+"""
+Prompt x provider x style grid generation
+
+A grid expands lists of prompts, providers (optionally `provider:model`) and
+style preset keys into cells, each prompt being styled through
+apply_style_to_prompt. Cells run concurrently on the job poller loop with a
+bounded number of in-flight calls per provider, so a grid never floods one
+provider, and results are yielded as soon as each cell finishes.
+
+estimate_grid() gives the number of calls, the expected wall time and the
+expected cost before anything is sent.
+"""
+
+import asyncio
+import logging
+import math
+import queue
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from .job_poller import get_job_poller
+from .styles import apply_style_to_prompt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 2
+
+# Typical seconds per image and USD per image, overridable with
+# settings.GRID_PROVIDER_ESTIMATES
+PROVIDER_ESTIMATES = {
+    'pollinations': {'seconds': 8, 'cost': 0.0},
+    'huggingface': {'seconds': 10, 'cost': 0.0},
+    'subnp': {'seconds': 15, 'cost': 0.0},
+    'cloudflare': {'seconds': 5, 'cost': 0.0},
+    'aihorde': {'seconds': 60, 'cost': 0.0},
+    'segmind': {'seconds': 10, 'cost': 0.0},
+    'prodia': {'seconds': 15, 'cost': 0.0},
+    'gemini': {'seconds': 10, 'cost': 0.039},
+    'stability': {'seconds': 12, 'cost': 0.08},
+    'replicate': {'seconds': 5, 'cost': 0.003},
+    'runware': {'seconds': 4, 'cost': 0.002},
+    'deepai': {'seconds': 10, 'cost': 0.005},
+    'placeholder': {'seconds': 1, 'cost': 0.0},
+}
+_UNKNOWN_ESTIMATE = {'seconds': 20, 'cost': 0.0}
+
+
+class GridCell:
+    """
+    One prompt / provider / style combination
+
+    Attributes:
+        index: Position in the grid (prompt-major order)
+        prompt: Prompt as typed
+        provider: Provider key
+        model: Model key ('' for the provider default)
+        style: Style preset key ('' for none)
+        styled_prompt: Prompt sent to the provider
+        negative_prompt: Negative prompt added by the style
+        generation: Prepared generation (client, options...), set by the caller
+        error: Reason the cell cannot run, set by the caller
+    """
+
+    def __init__(self, index: int, prompt: str, provider: str, model: str = '', style: str = ''):
+        self.index = index
+        self.prompt = prompt
+        self.provider = provider
+        self.model = model
+        self.style = style
+
+        styled = apply_style_to_prompt(prompt, style) if style else {'prompt': prompt}
+        self.styled_prompt = styled['prompt']
+        self.negative_prompt = styled.get('negative_prompt', '')
+
+        self.generation: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'prompt': self.prompt,
+            'provider': self.provider,
+            'model': self.model,
+            'style': self.style,
+        }
+
+
+def expand_grid(prompts: List[str], targets: List[str], styles: Optional[List[str]] = None) -> List[GridCell]:
+    """
+    Build the cells of a grid
+
+    Args:
+        prompts: Prompts
+        targets: Providers, optionally with a model ('segmind:kandinsky')
+        styles: Style preset keys ('' or none for the raw prompt)
+
+    Returns:
+        List of GridCell, prompt-major
+    """
+    styles = styles or ['']
+    cells = []
+    for prompt in prompts:
+        for target in targets:
+            provider, _, model = target.partition(':')
+            for style in styles:
+                cells.append(GridCell(len(cells), prompt, provider.strip(), model.strip(), style))
+    return cells
+
+
+def _estimates() -> Dict[str, dict]:
+    from django.conf import settings
+
+    estimates = {k: dict(v) for k, v in PROVIDER_ESTIMATES.items()}
+    for provider, overrides in (getattr(settings, 'GRID_PROVIDER_ESTIMATES', {}) or {}).items():
+        estimates.setdefault(provider, dict(_UNKNOWN_ESTIMATE)).update(overrides)
+    return estimates
+
+
+def estimate_grid(cells: List[GridCell], concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Expected calls, wall time and cost of a grid
+
+    Providers run in parallel, each with `concurrency` calls in flight, so
+    the wall time is the one of the slowest provider.
+
+    Returns:
+        Dict with cells, per-provider details, estimated_seconds and
+        estimated_cost (USD)
+    """
+    estimates = _estimates()
+    counts: Dict[str, int] = {}
+    for cell in cells:
+        if cell.error is None:
+            counts[cell.provider] = counts.get(cell.provider, 0) + 1
+
+    providers = {}
+    for provider, count in counts.items():
+        estimate = estimates.get(provider, _UNKNOWN_ESTIMATE)
+        providers[provider] = {
+            'cells': count,
+            'estimated_seconds': math.ceil(count / concurrency) * estimate['seconds'],
+            'estimated_cost': round(count * estimate['cost'], 4),
+        }
+
+    return {
+        'cells': len(cells),
+        'runnable_cells': sum(counts.values()),
+        'concurrency_per_provider': concurrency,
+        'providers': providers,
+        'estimated_seconds': max((p['estimated_seconds'] for p in providers.values()), default=0),
+        'estimated_cost': round(sum(p['estimated_cost'] for p in providers.values()), 4),
+    }
+
+
+class GridResult:
+    """Outcome of one cell: images (list of ImageResult) or an error"""
+
+    def __init__(self, cell: GridCell, images: Optional[list] = None,
+                 error: Optional[str] = None, duration: float = 0.0):
+        self.cell = cell
+        self.images = images or []
+        self.error = error
+        self.duration = duration
+
+
+async def run_grid(cells: List[GridCell], concurrency: int = DEFAULT_CONCURRENCY) -> AsyncIterator[GridResult]:
+    """
+    Run the cells, at most `concurrency` per provider at a time
+
+    Yields:
+        GridResult in completion order; cells that cannot run come first
+    """
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def run(cell: GridCell) -> GridResult:
+        if cell.error is not None:
+            return GridResult(cell, error=cell.error)
+        semaphore = semaphores.setdefault(cell.provider, asyncio.Semaphore(concurrency))
+        async with semaphore:
+            started = time.monotonic()
+            generation = cell.generation
+            try:
+                images = await generation['client'].agenerate_image(generation['prompt'], generation['options'])
+            except Exception as e:
+                logger.warning(f"Grid cell {cell.index} ({cell.provider}) failed: {e}")
+                return GridResult(cell, error=str(e), duration=time.monotonic() - started)
+            if not images:
+                return GridResult(cell, error='No images were generated', duration=time.monotonic() - started)
+            return GridResult(cell, images=images, duration=time.monotonic() - started)
+
+    tasks = [asyncio.ensure_future(run(cell)) for cell in cells]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away: stop the remaining cells
+        for task in tasks:
+            task.cancel()
+
+
+_DONE = object()
+
+
+def iter_grid(cells: List[GridCell], concurrency: int = DEFAULT_CONCURRENCY) -> Iterator[GridResult]:
+    """
+    Blocking iterator over run_grid for sync callers (streaming views)
+
+    The cells run on the job poller loop; closing the iterator cancels the
+    cells still running.
+    """
+    results: queue.Queue = queue.Queue()
+
+    async def pump():
+        try:
+            async for result in run_grid(cells, concurrency):
+                results.put(result)
+        finally:
+            results.put(_DONE)
+
+    future = get_job_poller().run_coroutine(pump())
+    try:
+        while True:
+            result = results.get()
+            if result is _DONE:
+                break
+            yield result
+    finally:
+        future.cancel()
@@ -0,0 +1,139 @@
+# you_image_generator/hedging.py
+"""
+Hedged generation across several providers
+
+The same prompt is sent to an ordered list of providers: the first one starts
+immediately, each next one only if the previous attempts have not succeeded
+after a delay (or as soon as one of them fails). The first valid result wins
+and every other in-flight attempt is cancelled, which also cancels its remote
+job where the provider supports it (see ReplicateClient / AIHordeClient).
+Slow or broken providers stop dictating tail latency, while the fast path
+still only pays for one provider.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .job_poller import get_job_poller
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE_DELAY = 4.0
+
+# Seconds given to cancelled attempts to clean up (remote job cancellation)
+CANCEL_GRACE = 5.0
+
+
+class HedgedGenerationError(Exception):
+    """Every hedged provider failed"""
+
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        details = '; '.join(f"{provider}: {error}" for provider, error in errors.items())
+        super().__init__(f"All providers failed ({details})")
+
+
+class HedgeCandidate:
+    """
+    One provider taking part in a hedged generation
+
+    Attributes:
+        provider: Provider key (as in AVAILABLE_PROVIDERS)
+        client: Client instance from get_api_client
+        options: Generation options for that provider
+    """
+
+    def __init__(self, provider: str, client, options: Optional[Dict[str, Any]] = None):
+        self.provider = provider
+        self.client = client
+        self.options = options or {}
+
+
+async def hedged_generate(
+    prompt: str,
+    candidates: List[HedgeCandidate],
+    delay: Optional[float] = None,
+) -> Tuple[str, list]:
+    """
+    Generate with the first provider that answers
+
+    Args:
+        prompt: Text prompt
+        candidates: Providers in order of preference
+        delay: Seconds before the next provider is started
+            (settings.HEDGE_DELAY by default)
+
+    Returns:
+        (winning provider key, list of ImageResult)
+
+    Raises:
+        HedgedGenerationError: If every provider failed
+    """
+    if not candidates:
+        raise ValueError("No provider to generate with")
+    if delay is None:
+        from django.conf import settings
+        delay = getattr(settings, 'HEDGE_DELAY', DEFAULT_HEDGE_DELAY)
+
+    loop = asyncio.get_running_loop()
+    queue = list(candidates)
+    running = {}
+    errors = {}
+    started = time.time()
+
+    def launch():
+        candidate = queue.pop(0)
+        logger.info(f"Hedge: starting {candidate.provider} after {time.time() - started:.1f}s")
+        task = loop.create_task(candidate.client.agenerate_image(prompt, candidate.options))
+        running[task] = candidate.provider
+
+    launch()
+    next_start = loop.time() + delay
+
+    try:
+        while running:
+            timeout = max(next_start - loop.time(), 0) if queue else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            failed = False
+
+            for task in done:
+                provider = running.pop(task)
+                try:
+                    results = task.result()
+                except Exception as e:
+                    logger.warning(f"Hedge: {provider} failed: {e}")
+                    errors[provider] = e
+                    failed = True
+                    continue
+                if results:
+                    logger.info(f"Hedge: {provider} won after {time.time() - started:.1f}s "
+                                f"({len(errors)} failed, {len(running)} cancelled)")
+                    return provider, results
+                errors[provider] = ValueError("No images were generated")
+                failed = True
+
+            # Start the next provider when the delay expired or an attempt failed
+            if queue and (failed or loop.time() >= next_start):
+                launch()
+                next_start = loop.time() + delay
+
+        raise HedgedGenerationError(errors)
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.wait(running, timeout=CANCEL_GRACE)
+            for task in running:
+                if task.done() and not task.cancelled():
+                    task.exception()  # Mark as retrieved
+
+
+def generate_hedged(
+    prompt: str,
+    candidates: List[HedgeCandidate],
+    delay: Optional[float] = None,
+) -> Tuple[str, list]:
+    """Blocking hedged_generate for sync callers (runs on the job poller loop)"""
+    return get_job_poller().run_coroutine(hedged_generate(prompt, candidates, delay)).result()
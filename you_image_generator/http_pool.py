@@ -0,0 +1,314 @@
+# you_image_generator/http_pool.py
+"""
+Shared HTTP connection pools for the provider clients
+
+Every client in ai_clients.py sends its requests through one process-wide
+keep-alive session, so generation calls, polling loops and result downloads
+reuse open TCP/TLS connections instead of paying a new handshake each time.
+The async engine (agenerate_image) uses the httpx equivalent, one per event
+loop, closed when its loop shuts down (under WSGI, async_to_sync runs every
+async view on a loop of its own).
+"""
+
+import asyncio
+import http.cookiejar
+import logging
+import threading
+import weakref
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import note_first_byte, anote_first_byte
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    logger.warning("httpx not installed, async generation unavailable. Install with: pip install httpx")
+
+# Seconds allowed to open a connection (the read timeout is chosen per call)
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+
+# Number of distinct hosts kept in the default adapter, and connections per host
+DEFAULT_POOL_CONNECTIONS = 20
+DEFAULT_POOL_MAXSIZE = 10
+
+# Hosts hit several times per generation (submit, poll, download) get more
+# keep-alive connections than the default
+DEFAULT_HOST_POOL_SIZES = {
+    'image.pollinations.ai': 20,
+    'stablehorde.net': 20,
+    'api.prodia.com': 20,
+    'api.replicate.com': 20,
+    'replicate.delivery': 20,
+}
+
+TimeoutType = Union[None, float, Tuple[float, float]]
+
+
+class PooledHTTPClient:
+    """
+    Thread-safe wrapper around a keep-alive requests.Session
+
+    Connections are pooled per host by urllib3, which is safe to share between
+    threads. Cookies are never stored, so no state leaks from one provider
+    call to another (each call used to start from an empty session).
+
+    Attributes:
+        connect_timeout: Seconds allowed to establish a connection
+        session: Underlying requests.Session
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        host_pool_sizes: Optional[Dict[str, int]] = None,
+    ):
+        self.connect_timeout = connect_timeout
+        self.session = requests.Session()
+        self.session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        self.session.headers['Connection'] = 'keep-alive'
+        # Runs once the headers are in, before the body is read
+        self.session.hooks['response'].append(note_first_byte)
+
+        default_adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+        )
+        self.session.mount('https://', default_adapter)
+        self.session.mount('http://', default_adapter)
+
+        for host, maxsize in (host_pool_sizes or {}).items():
+            self.mount_host(host, maxsize)
+
+    def mount_host(self, host: str, maxsize: int):
+        """
+        Give a host its own connection pool
+
+        Args:
+            host: Hostname (e.g. 'stablehorde.net')
+            maxsize: Number of keep-alive connections kept for that host
+        """
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=maxsize)
+        for scheme in ('https', 'http'):
+            self.session.mount(f'{scheme}://{host}/', adapter)
+
+    def timeout(self, read_timeout: TimeoutType = None) -> Tuple[float, float]:
+        """
+        Build a (connect, read) timeout tuple
+
+        Args:
+            read_timeout: Read timeout in seconds, or an explicit
+                (connect, read) tuple which is returned unchanged
+
+        Returns:
+            Tuple suitable for the requests `timeout` argument
+        """
+        if isinstance(read_timeout, tuple):
+            return read_timeout
+        if read_timeout is None:
+            read_timeout = DEFAULT_READ_TIMEOUT
+        return (self.connect_timeout, read_timeout)
+
+    def request(self, method: str, url: str, timeout: TimeoutType = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the shared pool
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            timeout: Read timeout in seconds (connect timeout is added)
+            **kwargs: Passed to requests.Session.request
+
+        Returns:
+            requests.Response
+        """
+        return self.session.request(method, url, timeout=self.timeout(timeout), **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        """Close every pooled connection"""
+        self.session.close()
+
+
+class AsyncPooledHTTPClient:
+    """
+    Non-blocking counterpart of PooledHTTPClient built on httpx.AsyncClient
+
+    An httpx.AsyncClient is tied to the event loop it was created on, so one
+    instance is kept per running loop (see get_async_http_client).
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        host_pool_sizes: Optional[Dict[str, int]] = None,
+    ):
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx is not installed. Install with: pip install httpx")
+
+        self.connect_timeout = connect_timeout
+
+        # No cap on open connections: only the number kept alive is bounded,
+        # like the non-blocking requests adapters
+        mounts = {
+            f'all://{host}': httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=maxsize)
+            )
+            for host, maxsize in (host_pool_sizes or {}).items()
+        }
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=None,
+                    max_keepalive_connections=pool_connections * pool_maxsize,
+                )
+            ),
+            mounts=mounts,
+            follow_redirects=True,
+            event_hooks={'response': [anote_first_byte]},
+        )
+        self.client.cookies.jar.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+    def timeout(self, read_timeout: TimeoutType = None) -> 'httpx.Timeout':
+        """Build an httpx.Timeout with the shared connect timeout"""
+        if isinstance(read_timeout, tuple):
+            connect, read = read_timeout
+            return httpx.Timeout(read, connect=connect)
+        if read_timeout is None:
+            read_timeout = DEFAULT_READ_TIMEOUT
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout)
+
+    async def request(self, method: str, url: str, timeout: TimeoutType = None, **kwargs) -> 'httpx.Response':
+        """Send a request without blocking the event loop"""
+        return await self.client.request(method, url, timeout=self.timeout(timeout), **kwargs)
+
+    async def get(self, url: str, **kwargs) -> 'httpx.Response':
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> 'httpx.Response':
+        return await self.request('POST', url, **kwargs)
+
+    def stream(self, method: str, url: str, timeout: TimeoutType = None, **kwargs):
+        """Open a streaming response (use with `async with`)"""
+        return self.client.stream(method, url, timeout=self.timeout(timeout), **kwargs)
+
+    async def aclose(self):
+        """Close every pooled connection"""
+        await self.client.aclose()
+
+
+def _pool_settings() -> dict:
+    """Read pool tuning from Django settings"""
+    from django.conf import settings
+
+    host_pool_sizes = dict(DEFAULT_HOST_POOL_SIZES)
+    host_pool_sizes.update(getattr(settings, 'HTTP_POOL_HOST_SIZES', {}) or {})
+
+    return {
+        'connect_timeout': getattr(settings, 'HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+        'pool_maxsize': getattr(settings, 'HTTP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE),
+        'host_pool_sizes': host_pool_sizes,
+    }
+
+
+# Global client instances
+_http_client = None
+_async_http_clients = weakref.WeakKeyDictionary()
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> PooledHTTPClient:
+    """
+    Get or create the process-wide pooled HTTP client
+
+    Pool sizes and the connect timeout can be tuned in settings with
+    HTTP_CONNECT_TIMEOUT, HTTP_POOL_MAXSIZE and HTTP_POOL_HOST_SIZES.
+
+    Returns:
+        PooledHTTPClient instance
+    """
+    global _http_client
+
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                pool_settings = _pool_settings()
+                _http_client = PooledHTTPClient(**pool_settings)
+                logger.info(f"HTTP pool created ({len(pool_settings['host_pool_sizes'])} host-specific pools)")
+
+    return _http_client
+
+
+def get_async_http_client() -> AsyncPooledHTTPClient:
+    """
+    Get or create the async pooled client for the running event loop
+
+    Must be called from inside a coroutine.
+
+    Returns:
+        AsyncPooledHTTPClient instance
+    """
+    loop = asyncio.get_running_loop()
+
+    with _http_client_lock:
+        client = _async_http_clients.get(loop)
+        if client is None:
+            client = AsyncPooledHTTPClient(**_pool_settings())
+            _async_http_clients[loop] = client
+            _close_with_loop(loop, client)
+
+    return client
+
+
+async def _aclose_on_shutdown(loop: asyncio.AbstractEventLoop, client: AsyncPooledHTTPClient):
+    try:
+        yield
+    finally:
+        with _http_client_lock:
+            if _async_http_clients.get(loop) is client:
+                del _async_http_clients[loop]
+        await client.aclose()
+
+
+def _close_with_loop(loop: asyncio.AbstractEventLoop, client: AsyncPooledHTTPClient):
+    """
+    Close a per-loop client when its loop shuts down
+
+    asyncio.run and async_to_sync call loop.shutdown_asyncgens() before
+    closing their loop: an async generator left suspended on the loop has its
+    `finally` run there, while the loop can still await aclose().
+    """
+    guard = _aclose_on_shutdown(loop, client)
+    # Kept alive by the client: the loop only holds its async generators weakly
+    client._shutdown_guard = guard
+    try:
+        # First step (registers the generator with the running loop), up to the yield
+        guard.asend(None).send(None)
+    except StopIteration:
+        pass
+
+
+def reset_http_client():
+    """Close and drop the global client (used after fork and in tests)"""
+    global _http_client
+
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
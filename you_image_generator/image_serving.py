@@ -0,0 +1,226 @@
+# you_image_generator/image_serving.py
+"""
+HTTP delivery of stored images (image/<id>/)
+
+Blob keys are content addresses, so an image URL always returns the same
+bytes: responses carry a strong ETag (the key), Last-Modified and an
+immutable Cache-Control, conditional requests get a 304 and single byte
+ranges a 206. Blobs stored on disk can be handed to the front server
+instead of being read by Django (settings.IMAGE_SENDFILE):
+- 'x-accel-redirect': nginx, with an internal location aliased to
+  BLOB_STORAGE_ROOT, e.g.
+      location /protected-blobs/ { internal; alias /app/media/blobs/; }
+- 'x-sendfile': Apache mod_xsendfile, lighttpd
+"""
+
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .blob_storage import BlobStore, content_key, get_blob_store
+from .downloads import SNIFF_BYTES, sniff_image_type
+
+logger = logging.getLogger(__name__)
+
+# Read size of streamed blobs
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range header outside of the blob (answered with a 416)"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Byte positions requested by a Range header
+
+    Only single ranges are served; multipart ranges and malformed headers
+    get the whole blob, as RFC 9110 allows.
+
+    Args:
+        header: Range header value (None if absent)
+        size: Blob length
+
+    Returns:
+        (start, end), both inclusive, or None for the whole blob
+
+    Raises:
+        RangeNotSatisfiable: Range starting past the end of the blob
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+        if int(last) == 0:
+            raise RangeNotSatisfiable(header)
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def content_type_of(head: bytes, default: str = 'application/octet-stream') -> str:
+    """MIME type of an image from its first bytes"""
+    image_type = sniff_image_type(head)
+    return f'image/{image_type}' if image_type else default
+
+
+def _iter_stream(stream, length: int) -> Iterator[bytes]:
+    """Read `length` bytes of a stream by chunks, then close it"""
+    try:
+        while length > 0:
+            chunk = stream.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        stream.close()
+
+
+def _sendfile_headers(store: BlobStore, key: str) -> Optional[dict]:
+    """Offload header for a blob stored on disk, None to stream it"""
+    mode = getattr(settings, 'IMAGE_SENDFILE', '')
+    path = store.local_path(key) if mode else None
+    if not path:
+        return None
+    if mode == 'x-accel-redirect' and getattr(store, 'root', None):
+        prefix = getattr(settings, 'IMAGE_ACCEL_REDIRECT_PREFIX', '/protected-blobs/')
+        relative = os.path.relpath(path, store.root).replace(os.sep, '/')
+        return {'X-Accel-Redirect': prefix.rstrip('/') + '/' + relative}
+    if mode == 'x-sendfile':
+        return {'X-Sendfile': path}
+    logger.warning(f"Cannot offload blobs with IMAGE_SENDFILE = {mode!r}, streaming them")
+    return None
+
+
+def serve_blob(request, key: Optional[str], size: int, last_modified: datetime,
+               data: Optional[bytes] = None, filename: Optional[str] = None,
+               default_type: str = 'application/octet-stream') -> HttpResponse:
+    """
+    Response of an image, with caching, conditional and range support
+
+    Args:
+        request: GET or HEAD request
+        key: Blob key in the blob store (None to serve `data`)
+        size: Blob length in bytes
+        last_modified: Time the image was written
+        data: Image bytes of rows still kept in the database
+        filename: Name suggested to the browser when saving the image
+        default_type: Content type if the bytes are not a known image format
+
+    Returns:
+        200, 206, 304, 412 or 416 response
+
+    Raises:
+        BlobNotFound: The key is not in the store
+    """
+    store = get_blob_store()
+    etag = f'"{key or content_key(data)}"'
+    max_age = getattr(settings, 'IMAGE_CACHE_MAX_AGE', 31536000)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified.timestamp()),
+        'Cache-Control': f'public, max-age={max_age}, immutable',
+        'Accept-Ranges': 'bytes',
+    }
+
+    base = HttpResponse(headers=headers)
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()), response=base,
+    )
+    if conditional is not base:
+        return conditional
+
+    if data is not None:
+        head = data[:SNIFF_BYTES]
+    else:
+        stream = store.open_range(key, 0, SNIFF_BYTES - 1)
+        try:
+            head = stream.read(SNIFF_BYTES)
+        finally:
+            stream.close()
+    content_type = content_type_of(head, default_type)
+    if filename:
+        headers['Content-Disposition'] = f'inline; filename="{filename}"'
+
+    if key is not None:
+        offload = _sendfile_headers(store, key)
+        if offload:
+            # The front server answers ranges itself
+            return HttpResponse(content_type=content_type, headers={**headers, **offload})
+
+    # Ranges only apply while the client's copy is still this blob
+    if_range = request.headers.get('If-Range')
+    byte_range = None
+    if if_range is None or if_range in (etag, headers['Last-Modified']):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    status = 206 if byte_range else 200
+    headers['Content-Length'] = str(length)
+    if byte_range:
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    if request.method == 'HEAD':
+        return HttpResponse(status=status, content_type=content_type, headers=headers)
+    if data is not None:
+        return HttpResponse(data[start:end + 1], status=status, content_type=content_type, headers=headers)
+    if not byte_range:
+        # FileResponse lets the WSGI server send local files with sendfile()
+        response = FileResponse(store.open(key), filename=filename or '', content_type=content_type,
+                                headers=headers)
+        response.block_size = CHUNK_SIZE
+        response.headers['Content-Length'] = str(length)
+        return response
+    return StreamingHttpResponse(
+        _iter_stream(store.open_range(key, start, end), length),
+        status=status, content_type=content_type, headers=headers,
+    )
+
+
+def serve_image(request, image) -> HttpResponse:
+    """
+    Response of a GeneratedImage (see serve_blob)
+
+    Args:
+        request: GET or HEAD request
+        image: GeneratedImage, its legacy_image_data column may be deferred
+    """
+    extension = (image.output_format or 'png').lower()
+    options = {
+        'last_modified': image.created_at,
+        'filename': f'image-{image.pk}.{extension}',
+        'default_type': f'image/{"jpeg" if extension == "jpg" else extension}',
+    }
+    if image.image_key:
+        size = image.image_size
+        if size is None:
+            size = get_blob_store().size(image.image_key)
+        return serve_blob(request, image.image_key, size, **options)
+    data = image.image_data
+    if data is None:
+        raise Http404(f"Image {image.pk} has no data")
+    return serve_blob(request, None, len(data), data=data, **options)
@@ -0,0 +1,243 @@
+# you_image_generator/inline_images.py
+"""
+Streaming extraction of base64 images embedded in JSON responses
+
+Gemini (`candidates[].content.parts[].inlineData.data`) and Cloudflare
+Workers AI (`result.image`) answer with the image as a base64 string inside
+a JSON document. `response.json()` + `b64decode` holds the raw text, the
+parsed document (with its copy of the string) and the decoded bytes at the
+same time.
+
+Base64FieldExtractor reads the body chunk by chunk with a minimal JSON
+scanner that only tracks object keys: strings outside the target field are
+skipped without being stored, and the target string is base64-decoded as it
+arrives into an ImageBuffer (size limit, signature check, spill to disk, see
+downloads.py). Peak memory is about the decoded image plus one chunk.
+"""
+
+import binascii
+import logging
+import re
+from typing import AsyncIterable, Optional, Sequence
+
+from .downloads import CHUNK_SIZE, ImageBuffer, _download_limits
+
+logger = logging.getLogger(__name__)
+
+# Next structural character or string start outside strings
+_STRUCTURE = re.compile(rb'[{}\[\]:,"]')
+# End of string or escape inside strings
+_STRING_SPECIAL = re.compile(rb'["\\]')
+
+# JSON escapes that can appear in a base64 string
+_BASE64_ESCAPES = {ord('/'): b'/', ord('\\'): b'\\', ord('"'): b'"'}
+_KEY_ESCAPES = {ord('n'): b'\n', ord('t'): b'\t', ord('r'): b'\r', ord('b'): b'\b', ord('f'): b'\f'}
+
+# Scanner states
+_SCAN, _KEY, _SKIP, _TARGET = range(4)
+
+
+class Base64FieldExtractor:
+    """
+    Decode one base64 string field of a streamed JSON document
+
+    Args:
+        path: Object keys leading to the field, array levels omitted
+            (('result', 'image') matches {"result": {"image": "..."}})
+        url: Source URL (for error messages)
+        max_bytes: Size limit of the decoded image (IMAGE_DOWNLOAD_MAX_BYTES
+            by default)
+
+    Attributes:
+        done: True once the field has been fully decoded
+    """
+
+    def __init__(self, path: Sequence[str], url: str = '', max_bytes: Optional[int] = None):
+        self.path = tuple(path)
+        self.done = False
+        self._buffer = ImageBuffer(url, *_download_limits(max_bytes))
+        self._state = _SCAN
+        # ['obj', key] or ['arr'] per open container
+        self._stack = []
+        self._expect_key = False
+        self._key = bytearray()
+        self._escape = False
+        self._unicode = None  # hex digits of a pending \uXXXX escape
+        self._pending = bytearray()  # base64 characters not yet a multiple of 4
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Scan the next chunk of the body
+
+        Returns:
+            True once the field is complete (the rest can be skipped)
+        """
+        pos, end = 0, len(chunk)
+        while pos < end and not self.done:
+            if self._escape or self._unicode is not None:
+                pos = self._feed_escape(chunk, pos)
+            elif self._state == _SCAN:
+                pos = self._scan(chunk, pos)
+            else:
+                pos = self._string(chunk, pos)
+        return self.done
+
+    def getvalue(self) -> bytes:
+        """
+        Decoded image bytes
+
+        Raises:
+            ValueError: The field was not found (or the body was cut)
+        """
+        if not self.done:
+            self._buffer.close()
+            raise ValueError("No image in response")
+        return self._buffer.getvalue()
+
+    def close(self):
+        self._buffer.close()
+
+    # --- scanner ---
+
+    def _scan(self, chunk: bytes, pos: int) -> int:
+        match = _STRUCTURE.search(chunk, pos)
+        if match is None:
+            return len(chunk)
+        char = chunk[match.start()]
+        if char == ord('"'):
+            if self._expect_key:
+                self._key.clear()
+                self._state = _KEY
+            elif self._value_path() == self.path:
+                self._state = _TARGET
+            else:
+                self._state = _SKIP
+        elif char == ord('{'):
+            self._stack.append(['obj', None])
+            self._expect_key = True
+        elif char == ord('['):
+            self._stack.append(['arr'])
+            self._expect_key = False
+        elif char in (ord('}'), ord(']')):
+            if self._stack:
+                self._stack.pop()
+            self._expect_key = False
+        elif char == ord(':'):
+            self._expect_key = False
+        elif char == ord(','):
+            self._expect_key = bool(self._stack) and self._stack[-1][0] == 'obj'
+        return match.end()
+
+    def _value_path(self) -> tuple:
+        return tuple(entry[1] for entry in self._stack if entry[0] == 'obj')
+
+    def _string(self, chunk: bytes, pos: int) -> int:
+        match = _STRING_SPECIAL.search(chunk, pos)
+        stop = match.start() if match else len(chunk)
+        self._consume(chunk, pos, stop)
+        if match is None:
+            return len(chunk)
+        if chunk[stop] == ord('\\'):
+            self._escape = True
+        else:
+            self._end_string()
+        return stop + 1
+
+    def _consume(self, chunk: bytes, start: int, stop: int):
+        if start == stop:
+            return
+        if self._state == _KEY:
+            self._key += chunk[start:stop]
+        elif self._state == _TARGET:
+            self._decode(memoryview(chunk)[start:stop])
+
+    def _feed_escape(self, chunk: bytes, pos: int) -> int:
+        if self._unicode is None:
+            char = chunk[pos]
+            self._escape = False
+            if char == ord('u'):
+                self._unicode = bytearray()
+                return pos + 1
+            if self._state == _KEY:
+                self._key += _KEY_ESCAPES.get(char, bytes([char]))
+            elif self._state == _TARGET and char in _BASE64_ESCAPES:
+                self._decode(_BASE64_ESCAPES[char])
+            # \n, \r... inside base64 are line wrapping: dropped
+            return pos + 1
+
+        needed = 4 - len(self._unicode)
+        self._unicode += chunk[pos:pos + needed]
+        pos += min(needed, len(chunk) - pos)
+        if len(self._unicode) == 4:
+            char = chr(int(self._unicode, 16)).encode('utf-8')
+            self._unicode = None
+            if self._state == _KEY:
+                self._key += char
+            elif self._state == _TARGET and char.isascii() and char.strip():
+                self._decode(char)
+        return pos
+
+    def _end_string(self):
+        if self._state == _KEY:
+            if self._stack and self._stack[-1][0] == 'obj':
+                self._stack[-1][1] = self._key.decode('utf-8', errors='replace')
+        elif self._state == _TARGET:
+            self._decode(b'', final=True)
+            self.done = True
+        self._state = _SCAN
+
+    # --- base64 ---
+
+    def _decode(self, data, final: bool = False):
+        if self._pending:
+            self._pending += data
+            data = self._pending
+        usable = len(data) if final else len(data) - len(data) % 4
+        if usable:
+            try:
+                self._buffer.feed(binascii.a2b_base64(data[:usable]))
+            except binascii.Error as e:
+                self._buffer.close()
+                raise ValueError(f"Invalid base64 image: {e}")
+        self._pending = bytearray(data[usable:])
+
+
+def extract_base64_field(response, path: Sequence[str], url: str = '',
+                         max_bytes: Optional[int] = None) -> bytes:
+    """
+    Decode a base64 field from a streamed requests response
+
+    Args:
+        response: Response obtained with stream=True (closed on return)
+        path: Object keys leading to the field (see Base64FieldExtractor)
+
+    Returns:
+        Image bytes
+
+    Raises:
+        ValueError: Field missing or not valid base64
+        ImageDownloadError: Decoded bytes too large or not an image
+    """
+    extractor = Base64FieldExtractor(path, url, max_bytes)
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if extractor.feed(chunk):
+                break
+        return extractor.getvalue()
+    finally:
+        extractor.close()
+        response.close()
+
+
+async def aextract_base64_field(chunks: AsyncIterable[bytes], path: Sequence[str], url: str = '',
+                                max_bytes: Optional[int] = None) -> bytes:
+    """Async extract_base64_field over a byte stream (httpx's aiter_bytes())"""
+    extractor = Base64FieldExtractor(path, url, max_bytes)
+    try:
+        async for chunk in chunks:
+            if extractor.feed(chunk):
+                break
+        return extractor.getvalue()
+    finally:
+        extractor.close()
+
@@ -0,0 +1,184 @@
+# you_image_generator/job_poller.py
+"""
+Shared poller for asynchronous provider jobs (Replicate, Prodia, AI Horde)
+
+Those providers answer a generation request with a job id that has to be
+polled until the image is ready. Jobs are registered here and polled by a
+single background event loop, each backing off on its own and resolving a
+future. With the async engine (agenerate_image) the caller awaits that
+future, so ten outstanding Horde jobs cost ten lightweight tasks, not ten
+blocked threads; the sync generate_image still blocks its request thread
+on the future's result until the job is done.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default polling schedule (seconds)
+DEFAULT_INTERVAL = 2.0
+DEFAULT_MAX_INTERVAL = 15.0
+DEFAULT_BACKOFF = 1.5
+DEFAULT_TIMEOUT = 180.0
+
+
+class JobPending:
+    """
+    Returned by a status check while the remote job is still running
+
+    Attributes:
+        retry_after: Provider estimate in seconds before the job is done
+            (e.g. AI Horde wait_time), used instead of the backoff schedule
+    """
+
+    def __init__(self, retry_after: Optional[float] = None):
+        self.retry_after = retry_after
+
+
+PENDING = JobPending()
+
+StatusCheck = Callable[[], Awaitable[Any]]
+
+
+class JobPoller:
+    """
+    Polls many remote jobs from one event loop running in a daemon thread
+
+    A job is an async `check` callable: it returns a JobPending while the job
+    runs, the final value once it is done, and raises when the job failed.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._active = 0
+
+    @property
+    def active_jobs(self) -> int:
+        """Number of jobs currently being polled"""
+        return self._active
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the polling thread on first use (and again after a fork)"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='job-poller',
+                    daemon=True,
+                )
+                self._thread.start()
+                self._pid = os.getpid()
+                self._active = 0
+                logger.info("Job poller started")
+            return self._loop
+
+    def submit(
+        self,
+        check: StatusCheck,
+        job_id: str = '',
+        interval: float = DEFAULT_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        backoff: float = DEFAULT_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+        callback: Optional[Callable[[concurrent.futures.Future], None]] = None,
+    ) -> concurrent.futures.Future:
+        """
+        Register a remote job
+
+        Args:
+            check: Async status check (see class docstring)
+            job_id: Provider job id, used in logs and errors
+            interval: Delay before the first check
+            max_interval: Upper bound for the delay between checks
+            backoff: Factor applied to the delay after each pending check
+            timeout: Seconds before the job is abandoned (TimeoutError)
+            callback: Called with the future once the job completes
+
+        Returns:
+            concurrent.futures.Future resolved with the check's final value
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._poll(check, job_id, interval, max_interval, backoff, timeout),
+            loop,
+        )
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def run_coroutine(self, coro) -> concurrent.futures.Future:
+        """
+        Run any coroutine on the poller loop
+
+        Lets sync code (WSGI views) drive the async engine on one long-lived
+        loop, reusing its HTTP pools instead of creating a loop per call.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def wait(self, check: StatusCheck, **kwargs) -> Any:
+        """Submit a job and await its result from another event loop"""
+        return await asyncio.wrap_future(self.submit(check, **kwargs))
+
+    async def _poll(self, check, job_id, interval, max_interval, backoff, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = interval
+        checks = 0
+
+        self._active += 1
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"Timeout waiting for job {job_id} after {checks} checks")
+                await asyncio.sleep(min(delay, remaining))
+
+                checks += 1
+                result = await check()
+                if not isinstance(result, JobPending):
+                    logger.debug(f"Job {job_id} done after {checks} checks")
+                    return result
+
+                if result.retry_after:
+                    delay = min(max(result.retry_after, interval), max_interval)
+                else:
+                    delay = min(delay * backoff, max_interval)
+        finally:
+            self._active -= 1
+
+    def shutdown(self):
+        """Stop the polling thread (outstanding jobs are cancelled)"""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+
+# Global poller instance
+_job_poller = None
+
+
+def get_job_poller() -> JobPoller:
+    """
+    Get or create the global job poller
+
+    Returns:
+        JobPoller instance
+    """
+    global _job_poller
+
+    if _job_poller is None:
+        _job_poller = JobPoller()
+
+    return _job_poller
@@ -0,0 +1,464 @@
+# you_image_generator/jobs.py
+"""
+Background generation jobs
+
+`generate/` with `background=1` stores the request as a GenerationJob row
+and answers at once with the job id; a worker runs the generation and
+writes the result back to the row, which `api/jobs/<id>/` reports.
+
+Both halves are swappable:
+- the broker (settings.GENERATION_JOB_BROKER) carries job ids to workers:
+  'local' (default) runs them on a thread pool inside the web process, no
+  external service needed; 'database' leaves them in the table for
+  `manage.py generation_worker` processes; 'celery' sends them to a Celery
+  worker (optional dependency)
+- the runner (settings.GENERATION_JOB_RUNNER, dotted path) turns the form
+  data into a (body, status) response; the default is the same pipeline as
+  the synchronous endpoint, single-flight included: identical jobs (other
+  tabs, retries) share one provider call
+
+Throughput scales by adding worker threads (GENERATION_WORKERS) or worker
+processes; a job is claimed with a conditional UPDATE so two workers never
+run the same one. A running job whose worker is gone (its process on this
+host has exited, or GENERATION_JOB_TIMEOUT has passed) is queued again or
+failed, by `manage.py generation_worker` and whenever a client asks about
+it, so a restarted web process does not leave jobs running forever.
+
+While a job runs, the progress events of its provider (see progress.py) are
+stored on the row; job_event() turns the row into the normalized event that
+api/jobs/<id>/events/ streams.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Optional
+
+from .metrics import get_metrics_registry
+from .progress import progress_reporter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import celery  # noqa: F401
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+    logger.info("celery not installed, the 'celery' job broker is unavailable")
+
+DEFAULT_WORKERS = 4
+# Seconds after which a running job whose worker vanished is queued again
+DEFAULT_JOB_TIMEOUT = 600
+DEFAULT_MAX_ATTEMPTS = 2
+
+
+def _worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"[:100]
+
+
+def default_runner(data) -> tuple:
+    """
+    Run a generation like `generate/` does, coalesced with identical
+    requests in flight
+
+    Args:
+        data: QueryDict of the form fields
+
+    Returns:
+        (response body, HTTP status)
+    """
+    from .views import _single_flight_response
+    return _single_flight_response(data)
+
+
+def _get_runner() -> Callable:
+    from django.conf import settings
+    from django.utils.module_loading import import_string
+
+    path = getattr(settings, 'GENERATION_JOB_RUNNER', None)
+    return import_string(path) if path else default_runner
+
+
+def _stored_result(body: dict) -> dict:
+    """Response body kept on the job: images are reloaded from their rows"""
+    if 'id' not in body:
+        return body
+    stored = {k: v for k, v in body.items() if k != 'image_base64'}
+    if 'images' in stored:
+        stored['images'] = [
+            {k: v for k, v in image.items() if k != 'image_base64'} for image in stored['images']
+        ]
+    return stored
+
+
+def enqueue_generation(data):
+    """
+    Store a generation request as a job and hand it to the broker
+
+    Args:
+        data: QueryDict of the form fields
+
+    Returns:
+        The GenerationJob (status 'queued')
+    """
+    from django.db import transaction
+    from .models import GenerationJob
+
+    fields = {key: values for key, values in data.lists() if key != 'csrfmiddlewaretoken'}
+    fields.pop('background', None)
+    job = GenerationJob.objects.create(request_data=fields)
+    # Publish once the row is visible to other connections
+    transaction.on_commit(lambda: get_job_broker().publish(job.id))
+    logger.info(f"Queued generation job {job.id}")
+    return job
+
+
+def claim_job(job_id=None):
+    """
+    Mark a queued job as running for this worker
+
+    Args:
+        job_id: Job to claim, or None for the oldest queued job
+
+    Returns:
+        The claimed GenerationJob, or None if there is nothing to run (or
+        another worker got it first)
+    """
+    from django.db.models import F
+    from django.utils import timezone
+    from .models import GenerationJob
+
+    queued = GenerationJob.objects.filter(status=GenerationJob.STATUS_QUEUED)
+    if job_id is not None:
+        queued = queued.filter(pk=job_id)
+
+    for candidate in queued.order_by('created_at').values_list('pk', flat=True)[:10]:
+        claimed = GenerationJob.objects.filter(pk=candidate, status=GenerationJob.STATUS_QUEUED).update(
+            status=GenerationJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+            worker=_worker_name(),
+            progress={},
+        )
+        if claimed:
+            return GenerationJob.objects.get(pk=candidate)
+    return None
+
+
+def run_job(job_id=None) -> Optional[str]:
+    """
+    Claim and run one job, storing its result on the row
+
+    Args:
+        job_id: Job to run, or None for the oldest queued job
+
+    Returns:
+        Final status, or None if no job was claimed
+    """
+    from django.db import close_old_connections
+    from django.http import QueryDict
+    from django.utils import timezone
+    from .models import GenerationJob
+
+    close_old_connections()
+    try:
+        job = claim_job(job_id)
+        if job is None:
+            return None
+
+        data = QueryDict(mutable=True)
+        for key, values in job.request_data.items():
+            data.setlist(key, values)
+        get_metrics_registry().observe(
+            'openimage_job_queue_wait_seconds',
+            {'provider': data.get('provider') or 'default'},
+            (job.started_at - job.created_at).total_seconds(),
+        )
+
+        try:
+            with progress_reporter(JobProgress(job.id)):
+                body, status = _get_runner()(data)
+        except Exception as e:
+            logger.error(f"Generation job {job.id} failed: {e}")
+            body, status = {'error': 'An internal server error occurred. Please try again.'}, 500
+
+        job.result = _stored_result(body)
+        job.http_status = status
+        job.status = GenerationJob.STATUS_SUCCEEDED if status == 200 else GenerationJob.STATUS_FAILED
+        job.error = '' if status == 200 else str(body.get('error', ''))
+        job.finished_at = timezone.now()
+        job.save(update_fields=['result', 'http_status', 'status', 'error', 'finished_at'])
+        logger.info(f"Generation job {job.id} {job.status} in {(job.finished_at - job.started_at).total_seconds():.1f}s")
+        return job.status
+    finally:
+        close_old_connections()
+
+
+def _process_gone(pid: int) -> bool:
+    if os.name != 'posix':
+        return False  # os.kill() would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False  # exists, owned by another user
+    return False
+
+
+def _worker_lost(worker: str) -> bool:
+    """Whether the process that claimed a job has exited (only known on its own host)"""
+    host, _, rest = (worker or '').partition(':')
+    pid = rest.partition(':')[0]
+    if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    return _process_gone(int(pid))
+
+
+def _job_limits() -> tuple:
+    from django.conf import settings
+    return (getattr(settings, 'GENERATION_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT),
+            getattr(settings, 'GENERATION_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+
+
+def requeue_stale_jobs(timeout: float = DEFAULT_JOB_TIMEOUT, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+    """
+    Recover jobs whose worker died while running them
+
+    A job is stale once it has run for `timeout` seconds, or as soon as its
+    worker process on this host has exited. Jobs still under max_attempts
+    go back to the queue, the others fail.
+
+    Returns:
+        Number of jobs queued again
+    """
+    from django.db.models import Q
+    from django.utils import timezone
+    from .models import GenerationJob
+
+    now = timezone.now()
+    running = GenerationJob.objects.filter(status=GenerationJob.STATUS_RUNNING)
+    lost = [
+        pk for pk, worker in running.filter(worker__startswith=f"{socket.gethostname()}:").values_list('pk', 'worker')
+        if _worker_lost(worker)
+    ]
+    stale = running.filter(Q(started_at__lt=now - timedelta(seconds=timeout)) | Q(pk__in=lost))
+    stale.filter(attempts__gte=max_attempts).update(
+        status=GenerationJob.STATUS_FAILED, error='Worker lost', http_status=500, finished_at=now
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status=GenerationJob.STATUS_QUEUED)
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale generation job(s)")
+    return requeued
+
+
+def recover_stale_job(job):
+    """
+    Queue again (or fail) a running job whose worker is gone
+
+    Called when a client asks about the job: with the local broker, jobs of
+    a restarted web process would otherwise stay 'running' until the client
+    gives up.
+
+    Args:
+        job: GenerationJob
+
+    Returns:
+        The job, reloaded if it was recovered
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from .models import GenerationJob
+
+    if job.status != GenerationJob.STATUS_RUNNING:
+        return job
+    timeout, max_attempts = _job_limits()
+    now = timezone.now()
+    timed_out = job.started_at is not None and job.started_at < now - timedelta(seconds=timeout)
+    if not timed_out and not _worker_lost(job.worker):
+        return job
+
+    # Conditional on the attempt we saw: another request may recover it first
+    current = GenerationJob.objects.filter(pk=job.pk, status=GenerationJob.STATUS_RUNNING, attempts=job.attempts)
+    if job.attempts < max_attempts:
+        if current.update(status=GenerationJob.STATUS_QUEUED):
+            logger.warning(f"Requeued generation job {job.pk}: worker {job.worker} lost")
+            transaction.on_commit(lambda: get_job_broker().publish(job.pk))
+    else:
+        current.update(status=GenerationJob.STATUS_FAILED, error='Worker lost', http_status=500, finished_at=now)
+    return GenerationJob.objects.get(pk=job.pk)
+
+
+class JobProgress:
+    """
+    Progress reporter storing the latest event on a GenerationJob row
+
+    Repeated identical events are not written again. Events reported from
+    an event loop (status checks on the job poller) are written from a
+    thread, the ORM being synchronous.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last = None
+
+    def __call__(self, stage: str, details: dict):
+        event = {'stage': stage, **details}
+        if event == self._last:
+            return
+        self._last = event
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(event)
+        else:
+            loop.run_in_executor(None, self._write_from_thread, event)
+
+    def _write(self, event: dict):
+        from .models import GenerationJob
+        GenerationJob.objects.filter(pk=self.job_id).update(progress=event)
+
+    def _write_from_thread(self, event: dict):
+        from django.db import connection
+        try:
+            self._write(event)
+        finally:
+            connection.close()
+
+
+def job_event(job) -> tuple:
+    """
+    Normalized progress event of a job
+
+    Returns:
+        (stage, details), stage being one of progress.STAGES
+    """
+    from .models import GenerationJob
+
+    if job.status == GenerationJob.STATUS_QUEUED:
+        return 'queued', {'position': queue_position(job)}
+    if job.status == GenerationJob.STATUS_SUCCEEDED:
+        return 'complete', {}
+    if job.status == GenerationJob.STATUS_FAILED:
+        return 'failed', {'error': job.error or 'Generation failed'}
+
+    progress = dict(job.progress or {})
+    stage = progress.pop('stage', None) or 'processing'
+    return stage, progress
+
+
+def queue_position(job) -> int:
+    """Number of queued jobs ahead of `job` (0 once it is running)"""
+    from .models import GenerationJob
+
+    if job.status != GenerationJob.STATUS_QUEUED:
+        return 0
+    return GenerationJob.objects.filter(
+        status=GenerationJob.STATUS_QUEUED, created_at__lt=job.created_at
+    ).count()
+
+
+class LocalBroker:
+    """
+    In-process worker pool: jobs run on threads of the web process
+
+    Args:
+        workers: Jobs run at the same time
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            # A forked worker does not inherit the parent's threads
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='generation-job')
+                self._pid = os.getpid()
+            return self._executor
+
+    def publish(self, job_id):
+        self._get_executor().submit(run_job, job_id)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+class DatabaseBroker:
+    """
+    The GenerationJob table is the queue: `manage.py generation_worker`
+    processes poll it, so publishing is a no-op
+    """
+
+    def publish(self, job_id):
+        pass
+
+
+class CeleryBroker:
+    """Send job ids to Celery workers (tasks.run_generation_job)"""
+
+    def __init__(self):
+        if not CELERY_AVAILABLE:
+            raise ImportError("celery is required for GENERATION_JOB_BROKER = 'celery'")
+
+    def publish(self, job_id):
+        from .tasks import run_generation_job
+        run_generation_job.delay(str(job_id))
+
+
+BROKERS = {
+    'local': LocalBroker,
+    'database': DatabaseBroker,
+    'celery': CeleryBroker,
+}
+
+
+# Global broker instance
+_job_broker = None
+
+
+def get_job_broker():
+    """
+    Get or create the global job broker
+
+    Chosen with settings.GENERATION_JOB_BROKER ('local', 'database',
+    'celery' or the dotted path of a class with a publish(job_id) method).
+
+    Returns:
+        Broker instance
+    """
+    global _job_broker
+
+    if _job_broker is None:
+        from django.conf import settings
+        from django.utils.module_loading import import_string
+
+        name = getattr(settings, 'GENERATION_JOB_BROKER', 'local')
+        if name == 'local':
+            _job_broker = LocalBroker(getattr(settings, 'GENERATION_WORKERS', DEFAULT_WORKERS))
+        elif name in BROKERS:
+            _job_broker = BROKERS[name]()
+        else:
+            _job_broker = import_string(name)()
+        logger.info(f"Generation job broker: {type(_job_broker).__name__}")
+
+    return _job_broker
+
+
+def reset_job_broker():
+    """Drop the global instance (after a settings change, in tests)"""
+    global _job_broker
+    if isinstance(_job_broker, LocalBroker):
+        _job_broker.shutdown(wait=False)
+    _job_broker = None
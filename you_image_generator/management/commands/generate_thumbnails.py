@@ -0,0 +1,97 @@
+# you_image_generator/management/commands/generate_thumbnails.py
+"""
+Make the missing thumbnails of the existing images
+
+    python manage.py generate_thumbnails --workers 8
+
+Rows are read a batch at a time (ids only) and spread over a thread pool;
+Pillow releases the GIL while resizing and encoding, so threads use several
+cores. Rows that already have every size are skipped, so the command can be
+stopped and run again; --force renders everything again (after a change
+of THUMBNAIL_QUALITY, for instance).
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Q
+
+from you_image_generator.models import GeneratedImage
+from you_image_generator.thumbnails import generate_thumbnails, thumbnail_sizes
+
+
+class Command(BaseCommand):
+    help = 'Generate the thumbnails of the stored images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                            help='Images processed at the same time')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Rows read per query')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after this many images')
+        parser.add_argument('--sizes', default=None,
+                            help='Comma-separated sizes (default: THUMBNAIL_SIZES)')
+        parser.add_argument('--force', action='store_true',
+                            help='Render thumbnails already stored again')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the images left to process')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = ([int(size) for size in options['sizes'].split(',')] if options['sizes']
+                     else thumbnail_sizes())
+        except ValueError:
+            raise CommandError(f"Invalid --sizes: {options['sizes']!r}")
+
+        pending = GeneratedImage.objects.filter(Q(image_key__isnull=False) | Q(legacy_image_data__isnull=False))
+        if not options['force']:
+            pending = pending.exclude(thumbnails__has_keys=[str(size) for size in sizes])
+        if options['dry_run']:
+            self.stdout.write(f"{pending.count()} image(s) without all their thumbnails")
+            return
+
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        limit = options['limit']
+        done = failed = 0
+        last_pk = 0
+        started = time.monotonic()
+
+        def process(pk) -> bool:
+            try:
+                image = GeneratedImage.objects.with_image().get(pk=pk)
+                generate_thumbnails(image, sizes, force=options['force'])
+                return True
+            except Exception as e:
+                self.stderr.write(f"  image {pk}: {e}")
+                return False
+            finally:
+                if workers > 1:
+                    close_old_connections()
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnails') if workers > 1 else None
+        try:
+            while limit is None or done + failed < limit:
+                size = batch_size if limit is None else min(batch_size, limit - done - failed)
+                ids = list(pending.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:size])
+                if not ids:
+                    break
+                results = executor.map(process, ids) if executor else map(process, ids)
+                for ok in results:
+                    done += ok
+                    failed += not ok
+                last_pk = ids[-1]
+                rate = done / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"  {done} image(s) done, {failed} failed (up to id {last_pk}, {rate:.1f}/s)")
+        finally:
+            if executor:
+                executor.shutdown()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Thumbnails of {done} image(s) generated in {elapsed:.1f}s with {workers} worker(s); {failed} failed"
+        ))
@@ -0,0 +1,60 @@
+# you_image_generator/management/commands/generation_worker.py
+"""
+Run queued GenerationJob rows (GENERATION_JOB_BROKER = 'database')
+
+    python manage.py generation_worker --concurrency 4
+
+Start as many processes as needed: jobs are claimed atomically.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from you_image_generator.jobs import (
+    DEFAULT_JOB_TIMEOUT, DEFAULT_MAX_ATTEMPTS, requeue_stale_jobs, run_job,
+)
+
+
+class Command(BaseCommand):
+    help = 'Run background generation jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'GENERATION_WORKERS', 4),
+                            help='Jobs run at the same time by this process')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        stop = threading.Event()
+        self.stdout.write(f"Generation worker started ({concurrency} thread(s))")
+
+        def work():
+            while not stop.is_set():
+                if run_job() is None:
+                    if options['once']:
+                        return
+                    stop.wait(options['poll_interval'])
+
+        threads = [threading.Thread(target=work, name=f'generation-worker-{i}', daemon=True)
+                   for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                requeue_stale_jobs(
+                    getattr(settings, 'GENERATION_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT),
+                    getattr(settings, 'GENERATION_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+                )
+                time.sleep(max(options['poll_interval'], 1.0))
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping, waiting for running jobs...')
+            stop.set()
+            for thread in threads:
+                thread.join()
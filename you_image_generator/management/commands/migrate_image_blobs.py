@@ -0,0 +1,73 @@
+# you_image_generator/management/commands/migrate_image_blobs.py
+"""
+Move the images of older GeneratedImage rows into the blob store
+
+    python manage.py migrate_image_blobs --batch-size 100
+
+Rows are read a batch at a time (only the key and the bytes), written to
+the store, checked, then updated to reference their blob with the
+image_data column cleared. Each batch commits on its own: the command can
+be stopped at any time and run again to resume where it left off.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from you_image_generator.blob_storage import get_blob_store
+from you_image_generator.models import GeneratedImage
+
+
+class Command(BaseCommand):
+    help = 'Move image bytes from the database to the blob store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Rows read and updated per transaction')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after this many rows')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows left to move')
+
+    def handle(self, *args, **options):
+        pending = GeneratedImage.objects.filter(legacy_image_data__isnull=False)
+        if options['dry_run']:
+            self.stdout.write(f"{pending.count()} image(s) left in the database")
+            return
+
+        store = get_blob_store()
+        batch_size = max(1, options['batch_size'])
+        limit = options['limit']
+        moved = moved_bytes = 0
+        last_pk = 0
+        started = time.monotonic()
+
+        while limit is None or moved < limit:
+            size = batch_size if limit is None else min(batch_size, limit - moved)
+            with transaction.atomic():
+                batch = list(
+                    pending.with_image().filter(pk__gt=last_pk).order_by('pk')
+                    .select_for_update(skip_locked=True)
+                    .only('pk', 'legacy_image_data')[:size]
+                )
+                if not batch:
+                    break
+                for image in batch:
+                    data = bytes(image.legacy_image_data)
+                    image.image_key = store.put(data)
+                    if store.size(image.image_key) != len(data):
+                        raise RuntimeError(f"Blob of image {image.pk} was not stored completely")
+                    image.image_size = len(data)
+                    image.legacy_image_data = None
+                    moved_bytes += len(data)
+                GeneratedImage.objects.bulk_update(batch, ['image_key', 'image_size', 'legacy_image_data'])
+            moved += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"  {moved} image(s), {moved_bytes / 1e6:.1f} MB moved (up to id {last_pk})")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} image(s) ({moved_bytes / 1e6:.1f} MB) in {elapsed:.1f}s; "
+            f"{pending.count()} left"
+        ))
@@ -0,0 +1,86 @@
+# you_image_generator/management/commands/provider_emulator.py
+"""
+Serve emulated providers for offline load testing (see emulator.py)
+
+    python manage.py provider_emulator --latency uniform:1,3 --error-rate 0.05
+    python manage.py provider_emulator --config profiles.json
+
+profiles.json gives per-provider ProviderProfile arguments, applied over the
+command line ones:
+
+    {"aihorde": {"latency": "exponential:20"}, "gemini": {"error_status": 429}}
+
+Then run the site with PROVIDER_EMULATOR_URL=http://127.0.0.1:8765 (keyed
+providers only need a dummy key; raise CLOUDFLARE_DAILY_QUOTA and the like
+so quotas don't throttle the test).
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from you_image_generator.emulator import (
+    DEFAULT_LATENCIES, DEFAULT_PAYLOAD_BYTES, DEFAULT_PORT, ProviderEmulator, ProviderProfile,
+)
+
+
+class Command(BaseCommand):
+    help = 'Run a local server emulating the image providers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+        parser.add_argument('--latency',
+                            help="Generation time of every provider, e.g. 2, uniform:1,3, normal:4,1, "
+                                 "lognormal:1,0.5, exponential:5 (default: each provider's typical one)")
+        parser.add_argument('--download-latency', default='constant:0',
+                            help='Time before an image download starts')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Share of submissions answered with --error-status')
+        parser.add_argument('--error-status', type=int, default=503)
+        parser.add_argument('--payload-bytes', type=int, default=DEFAULT_PAYLOAD_BYTES,
+                            help='Approximate size of the returned images')
+        parser.add_argument('--config', help='JSON file of per-provider profile arguments')
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['config']:
+            try:
+                with open(options['config']) as f:
+                    overrides = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['config']}: {e}")
+            unknown = set(overrides) - set(DEFAULT_LATENCIES)
+            if unknown:
+                raise CommandError(f"Unknown provider(s) in {options['config']}: {', '.join(sorted(unknown))}")
+
+        try:
+            profiles = {
+                provider: ProviderProfile(**{
+                    'latency': options['latency'] or latency,
+                    'download_latency': options['download_latency'],
+                    'error_rate': options['error_rate'],
+                    'error_status': options['error_status'],
+                    'payload_bytes': options['payload_bytes'],
+                    **overrides.get(provider, {}),
+                })
+                for provider, latency in DEFAULT_LATENCIES.items()
+            }
+            emulator = ProviderEmulator(options['host'], options['port'], profiles)
+        except (TypeError, ValueError, OSError) as e:
+            raise CommandError(str(e))
+
+        for provider, profile in profiles.items():
+            self.stdout.write(f"  {provider:<13} {profile}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Provider emulator on {emulator.url} - start the site with PROVIDER_EMULATOR_URL={emulator.url}"
+        ))
+
+        try:
+            emulator.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping')
+        finally:
+            emulator.server.server_close()
+            for (provider, status), count in sorted(emulator.requests.items()):
+                self.stdout.write(f"  {provider:<13} HTTP {status}: {count}")
@@ -0,0 +1,442 @@
+# you_image_generator/metrics.py
+"""
+Per-provider latency and throughput metrics, exported in Prometheus format
+
+Every generate_image / agenerate_image call is tracked (see the guards in
+ai_clients.py) and recorded, labelled by provider and model:
+- openimage_provider_requests_total: calls by outcome class
+- openimage_provider_duration_seconds: total latency histogram
+- openimage_provider_ttfb_seconds: time to the first response headers
+- openimage_provider_received_bytes_total: image bytes received
+- openimage_provider_retries_total: HTTP retries made by the retry policy
+and, for background jobs, openimage_job_queue_wait_seconds.
+
+The registry lives in each process. So that a scrape of any gunicorn worker
+sees the whole server, every process periodically writes its values to
+its own file in METRICS_DIR, and /api/metrics sums the files of all
+processes (counters and histogram buckets add up). Counters must never go
+down, so the values of exited workers are kept: when a process starts, it
+folds the files of dead processes into a single archive file (like
+prometheus_client's multiprocess mode). METRICS_DIR must therefore belong
+to one deployment on one host.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no compaction, dead processes' files are kept
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers fast providers as well as queued ones (AI Horde)
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Values of exited processes, and the lock guarding its rewrite
+ARCHIVE_FILE = 'metrics-archive.json'
+LOCK_FILE = 'metrics.lock'
+_PROCESS_FILE_RE = re.compile(r'^metrics-(\d+)-\d+\.json$')
+
+# name -> (type, help)
+METRICS = {
+    'openimage_provider_requests_total': ('counter', 'Provider generate calls by outcome'),
+    'openimage_provider_duration_seconds': ('histogram', 'Total latency of a provider generate call'),
+    'openimage_provider_ttfb_seconds': ('histogram', 'Time from call start to the first response headers'),
+    'openimage_provider_received_bytes_total': ('counter', 'Image bytes received from providers'),
+    'openimage_provider_retries_total': ('counter', 'HTTP retries made during provider calls'),
+    'openimage_job_queue_wait_seconds': ('histogram', 'Time a background job waited for a worker'),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _sum_snapshots(snapshots: List[dict]) -> Tuple[dict, dict, dict]:
+    """Add up the values of several processes: (counters, histograms, buckets)"""
+    counters: Dict[Tuple[str, LabelKey], float] = {}
+    histograms: Dict[Tuple[str, LabelKey], list] = {}
+    buckets: Dict[str, list] = {}
+
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get('counters', []):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, bounds, series in snapshot.get('histograms', []):
+            if buckets.setdefault(name, bounds) != bounds:
+                continue  # buckets changed between versions: not addable
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.get(key)
+            histograms[key] = series if total is None else [a + b for a, b in zip(total, series)]
+    return counters, histograms, buckets
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by another user
+    return True
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of one process, shared through a directory
+
+    Args:
+        directory: Where each process writes its values (None: this
+            process only)
+        flush_interval: Minimum seconds between two writes
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._histograms: Dict[Tuple[str, LabelKey], list] = {}
+        self._buckets: Dict[str, tuple] = {}
+        self._flushed_at = 0.0
+        self._dirty = False
+        self._pid = os.getpid()
+        self._path = None
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1):
+        """Add `value` to a counter"""
+        self._own_path()
+        with self._lock:
+            key = (name, _label_key(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+        self._maybe_flush()
+
+    def observe(self, name: str, labels: Dict[str, str], value: float, buckets: tuple = DEFAULT_BUCKETS):
+        """Record one value in a histogram"""
+        self._own_path()
+        with self._lock:
+            buckets = self._buckets.setdefault(name, tuple(buckets))
+            key = (name, _label_key(labels))
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(buckets)] += 1
+            series[-1] += value
+            self._dirty = True
+        self._maybe_flush()
+
+    def snapshot(self) -> dict:
+        """Values of this process, JSON serializable"""
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, list(labels), list(self._buckets[name]), list(series)]
+                    for (name, labels), series in self._histograms.items()
+                ],
+            }
+
+    # --- sharing across processes ---
+
+    def _own_path(self) -> Optional[str]:
+        if self._pid != os.getpid():
+            # Forked child: the parent's values are already in the parent's file
+            self._pid = os.getpid()
+            self._path = None
+            with self._lock:
+                self._counters.clear()
+                self._histograms.clear()
+        if not self.directory:
+            return None
+        if self._path is None:
+            # First write of this process: a good time to tidy up after dead ones
+            self.compact()
+            self._path = os.path.join(self.directory, f'metrics-{self._pid}-{int(time.time() * 1000)}.json')
+        return self._path
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the directory lock (no-op without fcntl)"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def compact(self):
+        """Fold the files of exited processes into the archive file"""
+        if not self.directory or fcntl is None or not os.path.isdir(self.directory):
+            return
+        try:
+            with self._locked(exclusive=True):
+                dead = []
+                for filename in os.listdir(self.directory):
+                    match = _PROCESS_FILE_RE.match(filename)
+                    if match and not _pid_alive(int(match.group(1))):
+                        dead.append(os.path.join(self.directory, filename))
+                if not dead:
+                    return
+
+                archive = os.path.join(self.directory, ARCHIVE_FILE)
+                snapshots = []
+                for path in [archive] + dead:
+                    try:
+                        with open(path) as f:
+                            snapshots.append(json.load(f))
+                    except FileNotFoundError:
+                        pass
+                    except ValueError as e:
+                        logger.warning(f"Dropping unreadable metrics file {path}: {e}")
+                counters, histograms, buckets = _sum_snapshots(snapshots)
+                merged = {
+                    'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                    'histograms': [
+                        [name, list(labels), buckets[name], series]
+                        for (name, labels), series in histograms.items()
+                    ],
+                }
+                tmp = f'{archive}.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump(merged, f)
+                os.replace(tmp, archive)
+                for path in dead:
+                    os.remove(path)
+            logger.info(f"Merged the metrics of {len(dead)} exited process(es) into {ARCHIVE_FILE}")
+        except OSError as e:
+            logger.warning(f"Could not compact metrics in {self.directory}: {e}")
+
+    def _maybe_flush(self):
+        if self.directory and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write this process's values to its file"""
+        path = self._own_path()
+        if path is None or not self._dirty:
+            return
+        self._flushed_at = time.monotonic()
+        self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f'{path}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {path}: {e}")
+
+    def collect(self) -> List[dict]:
+        """Snapshots of every process (this one included, up to date)"""
+        own = self._own_path()
+        snapshots = [self.snapshot()]
+        if not self.directory or not os.path.isdir(self.directory):
+            return snapshots
+        # Shared lock: never read a dead process's file and the archive it was merged into
+        with self._locked(exclusive=False):
+            for filename in os.listdir(self.directory):
+                path = os.path.join(self.directory, filename)
+                if not filename.endswith('.json') or path == own:
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping metrics file {filename}: {e}")
+        return snapshots
+
+    def render(self) -> str:
+        """All processes' values in the Prometheus text exposition format"""
+        counters, histograms, buckets = _sum_snapshots(self.collect())
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = sorted((k, v) for k, v in (counters if kind == 'counter' else histograms).items() if k[0] == name)
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (_, labels), value in series:
+                if kind == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                for bound, count in zip(buckets[name], value):
+                    lines.append(f'{name}_bucket{_format_labels(labels, le=_format_value(bound))} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {value[-2]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value[-2]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: LabelKey, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# --- provider call tracking ---
+
+class ProviderCall:
+    """Measurements of one generate call, filled while it runs"""
+
+    def __init__(self, provider: str, model: Optional[str]):
+        self.provider = provider
+        self.model = model or 'default'
+        self.started = time.monotonic()
+        self.first_byte: Optional[float] = None
+        self.retries = 0
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        return {'provider': self.provider, 'model': self.model}
+
+
+_current_call: contextvars.ContextVar = contextvars.ContextVar('provider_call', default=None)
+
+
+def outcome_class(error: Optional[BaseException], results=None) -> str:
+    """Outcome label of a provider call"""
+    import asyncio
+    from .circuit_breaker import CircuitOpenError
+    from .rate_limiter import RateLimitExceeded
+
+    if error is None:
+        return 'success' if results else 'empty'
+    if isinstance(error, RateLimitExceeded):
+        return 'rate_limited'
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, asyncio.CancelledError):
+        return 'cancelled'
+    if isinstance(error, TimeoutError) or 'timeout' in type(error).__name__.lower():
+        return 'timeout'
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return 'client_error'
+    if isinstance(status, int) and status >= 500:
+        return 'server_error'
+    return 'error'
+
+
+@contextmanager
+def track_provider_call(provider: str, model: Optional[str] = None):
+    """
+    Measure the enclosed generate call
+
+    Yields:
+        ProviderCall; set its `results` attribute to the returned images
+    """
+    call = ProviderCall(provider, model)
+    call.results = None
+    token = _current_call.set(call)
+    error = None
+    try:
+        yield call
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_call.reset(token)
+        try:
+            _record_call(call, error)
+        except Exception as e:
+            logger.warning(f"Could not record metrics of {provider}: {e}")
+
+
+def _record_call(call: ProviderCall, error: Optional[BaseException]):
+    registry = get_metrics_registry()
+    labels = call.labels
+    registry.inc('openimage_provider_requests_total', {**labels, 'outcome': outcome_class(error, call.results)})
+    if error is not None and outcome_class(error) in ('rate_limited', 'circuit_open'):
+        return  # never reached the provider
+    registry.observe('openimage_provider_duration_seconds', labels, time.monotonic() - call.started)
+    if call.first_byte is not None:
+        registry.observe('openimage_provider_ttfb_seconds', labels, call.first_byte - call.started)
+    if call.retries:
+        registry.inc('openimage_provider_retries_total', labels, call.retries)
+    received = sum(len(result.image_data or b'') for result in call.results or [])
+    if received:
+        registry.inc('openimage_provider_received_bytes_total', labels, received)
+
+
+def note_first_byte(*args, **kwargs):
+    """HTTP response hook: headers of a response of the current call arrived"""
+    call = _current_call.get()
+    if call is not None and call.first_byte is None:
+        call.first_byte = time.monotonic()
+
+
+async def anote_first_byte(*args, **kwargs):
+    """Async note_first_byte (httpx event hook)"""
+    note_first_byte()
+
+
+def note_retry():
+    """The retry policy is about to retry a request of the current call"""
+    call = _current_call.get()
+    if call is not None:
+        call.retries += 1
+
+
+# Global registry instance
+_metrics_registry = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Get or create the process metrics registry
+
+    Shared through settings.METRICS_DIR (<BASE_DIR>/metrics by default;
+    empty to keep metrics per process).
+
+    Returns:
+        MetricsRegistry instance
+    """
+    global _metrics_registry
+
+    if _metrics_registry is None:
+        from django.conf import settings
+
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if directory is None:
+            directory = os.path.join(settings.BASE_DIR, 'metrics')
+        _metrics_registry = MetricsRegistry(
+            directory=directory or None,
+            flush_interval=getattr(settings, 'METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+        )
+
+    return _metrics_registry
+
+
+def reset_metrics_registry():
+    """Drop the global instance (after a settings change, in tests)"""
+    global _metrics_registry
+    _metrics_registry = None
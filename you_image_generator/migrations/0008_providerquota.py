@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("you_image_generator", "0007_generatedimage_tags"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProviderQuota",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("provider", models.CharField(max_length=50, unique=True)),
+                ("tokens", models.FloatField(default=0)),
+                ("refilled_at", models.FloatField(default=0)),
+                ("day", models.DateField(blank=True, null=True)),
+                ("used_today", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Provider Quota",
+                "verbose_name_plural": "Provider Quotas",
+            },
+        ),
+    ]
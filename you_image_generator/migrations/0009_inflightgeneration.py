@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("you_image_generator", "0008_providerquota"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InFlightGeneration",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.CharField(max_length=64, unique=True)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "In-flight Generation",
+                "verbose_name_plural": "In-flight Generations",
+            },
+        ),
+    ]
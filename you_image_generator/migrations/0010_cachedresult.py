@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("you_image_generator", "0009_inflightgeneration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CachedResult",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.CharField(max_length=64, unique=True)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField()),
+                ("last_used_at", models.DateTimeField(db_index=True)),
+                ("image", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="cache_entries", to="you_image_generator.generatedimage")),
+            ],
+            options={
+                "verbose_name": "Cached Result",
+                "verbose_name_plural": "Cached Results",
+            },
+        ),
+    ]
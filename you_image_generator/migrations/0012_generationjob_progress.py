@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("you_image_generator", "0011_generationjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationjob",
+            name="progress",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
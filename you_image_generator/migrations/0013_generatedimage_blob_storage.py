@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("you_image_generator", "0012_generationjob_progress"),
+    ]
+
+    operations = [
+        # Same column, new field name: image_data is now a property reading
+        # the blob store
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name="generatedimage",
+                    old_name="image_data",
+                    new_name="legacy_image_data",
+                ),
+                migrations.AlterField(
+                    model_name="generatedimage",
+                    name="legacy_image_data",
+                    field=models.BinaryField(blank=True, db_column="image_data", null=True),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="generatedimage",
+            name="image_key",
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="generatedimage",
+            name="image_size",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("you_image_generator", "0013_generatedimage_blob_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generatedimage",
+            name="thumbnails",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
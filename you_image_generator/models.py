@@ -1,8 +1,51 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .blob_storage import get_blob_store
+from .thumbnails import schedule_thumbnails
+
+
+class GeneratedImageQuerySet(models.QuerySet):
+    def with_image(self):
+        """
+        Also select the image column, for code that reads every image_data
+
+        Rows moved to the blob store read their bytes from the store either
+        way; older rows would otherwise cost one query each.
+        """
+        return self.defer(None)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(): write the images to the blob store first
+        objs = list(objs)
+        for obj in objs:
+            obj.store_image()
+        created = super().bulk_create(objs, *args, **kwargs)
+        schedule_thumbnails([obj.pk for obj in objs if obj._thumbnails_pending and obj.pk])
+        return created
+
+
+class GeneratedImageManager(models.Manager.from_queryset(GeneratedImageQuerySet)):
+    """Metadata only: the image column is left out unless .with_image() is used"""
+
+    # Columns that can hold image bytes
+    IMAGE_FIELDS = ('legacy_image_data',)
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*self.IMAGE_FIELDS)
+
 
 class GeneratedImage(models.Model):
     """
     Model to store information about generated images with full metadata.
+
+    The image bytes live in the blob store (see blob_storage.py), the row
+    keeps their key; `image_data` reads and writes them transparently.
+    Queries leave the image column out by default (see
+    GeneratedImageManager): use `.with_image()` when listing images whose
+    bytes are all needed.
     """
     # Texte et modèle
     prompt = models.TextField()
@@ -13,7 +56,13 @@ class GeneratedImage(models.Model):
     
     # Image data
     image_url = models.URLField(blank=True, null=True)
-    image_data = models.BinaryField(blank=True, null=True)
+    image_key = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    image_size = models.PositiveIntegerField(blank=True, null=True)
+    # Bytes of rows saved before the blob store (`manage.py migrate_image_blobs`
+    # moves them out)
+    legacy_image_data = models.BinaryField(blank=True, null=True, db_column='image_data')
+    # Blob keys of the thumbnails by size, see thumbnails.py
+    thumbnails = models.JSONField(default=dict, blank=True)
     
     # Métadonnées de génération
     width = models.IntegerField(default=1024)
@@ -32,6 +81,14 @@ class GeneratedImage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = GeneratedImageManager()
+
+    # Bytes set on the instance, written to the store on save
+    _new_image = None
+    _image_changed = False
+    _image_cache = None
+    _thumbnails_pending = False
+
     class Meta:
         verbose_name = "Generated Image"
         verbose_name_plural = "Generated Images"
@@ -49,4 +106,181 @@ class GeneratedImage(models.Model):
     @property
     def resolution(self):
         """Retourne la résolution formatée"""
-        return f"{self.width}x{self.height}"
\ No newline at end of file
+        return f"{self.width}x{self.height}"
+
+    @property
+    def image_data(self):
+        """Image bytes (read from the blob store on first access)"""
+        if self._image_changed:
+            return self._new_image
+        if self._image_cache is None:
+            if self.image_key:
+                self._image_cache = get_blob_store().get(self.image_key)
+            elif self.legacy_image_data is not None:
+                self._image_cache = bytes(self.legacy_image_data)
+        return self._image_cache
+
+    @image_data.setter
+    def image_data(self, data):
+        self._new_image = data
+        self._image_changed = True
+
+    def store_image(self):
+        """Write the bytes set through image_data to the blob store"""
+        if not self._image_changed:
+            return
+        data = self._new_image
+        if data is None:
+            self.image_key = self.image_size = None
+        else:
+            data = bytes(data)
+            key = get_blob_store().put(data)
+            if key != self.image_key:
+                self.thumbnails = {}
+                self._thumbnails_pending = True
+            self.image_key = key
+            self.image_size = len(data)
+        self.legacy_image_data = None
+        self._image_cache = data
+        self._new_image = None
+        self._image_changed = False
+
+    def save(self, *args, **kwargs):
+        self.store_image()
+        super().save(*args, **kwargs)
+        if self._thumbnails_pending:
+            self._thumbnails_pending = False
+            schedule_thumbnails([self.pk])
+
+    def thumbnail_url(self, size: int) -> str:
+        """URL of a thumbnail (made on first request if missing)"""
+        from django.urls import reverse
+        return reverse('you_image_generator:image_thumbnail', args=[self.pk, size])
+
+
+@receiver(post_delete, sender=GeneratedImage)
+def _delete_image_blob(sender, instance, **kwargs):
+    """Remove the blob of a deleted image and its thumbnails once no other row uses it"""
+    key = instance.image_key
+    if not key:
+        return
+    thumbnail_keys = list((instance.thumbnails or {}).values())
+
+    def delete_if_orphan():
+        if not GeneratedImage.objects.filter(image_key=key).exists():
+            store = get_blob_store()
+            store.delete(key)
+            for thumbnail_key in thumbnail_keys:
+                store.delete(thumbnail_key)
+
+    transaction.on_commit(delete_if_orphan)
+
+
+class ProviderQuota(models.Model):
+    """
+    Shared rate-limit state of a metered provider (see rate_limiter.py).
+    One row per provider, updated under a row lock by every worker.
+    """
+    provider = models.CharField(max_length=50, unique=True)
+
+    # Token bucket
+    tokens = models.FloatField(default=0)
+    refilled_at = models.FloatField(default=0)  # Unix timestamp
+
+    # Daily quota (UTC day)
+    day = models.DateField(blank=True, null=True)
+    used_today = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Provider Quota"
+        verbose_name_plural = "Provider Quotas"
+
+    def __str__(self):
+        return f"{self.provider}: {self.used_today} call(s) on {self.day}"
+
+
+class InFlightGeneration(models.Model):
+    """
+    Cross-worker lock of a generation being run (see single_flight.py).
+    The worker that creates the row runs the generation; identical requests
+    in other workers wait for `result`.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    result = models.JSONField(blank=True, null=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "In-flight Generation"
+        verbose_name_plural = "In-flight Generations"
+
+    def __str__(self):
+        state = 'done' if self.result is not None else 'running'
+        return f"{self.key[:12]} ({state})"
+
+
+class CachedResult(models.Model):
+    """
+    Content-addressed cache entry of a seeded generation (see result_cache.py).
+    Deleting the image deletes its entries; evicting an entry keeps the image.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    image = models.ForeignKey(GeneratedImage, on_delete=models.CASCADE, related_name='cache_entries')
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    last_used_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Cached Result"
+        verbose_name_plural = "Cached Results"
+
+    def __str__(self):
+        return f"{self.key[:12]} -> image {self.image_id} ({self.hits} hit(s))"
+
+
+class GenerationJob(models.Model):
+    """
+    Generation request run in the background (see jobs.py).
+    The row is the job: the broker only carries its id to a worker.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # Form fields of the generate request, as lists (QueryDict.lists())
+    request_data = models.JSONField(default=dict)
+    # Response body of the generation, without the base64 image
+    result = models.JSONField(blank=True, null=True)
+    http_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    # Latest progress event reported while running (see progress.py)
+    progress = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Generation Job"
+        verbose_name_plural = "Generation Jobs"
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
@@ -0,0 +1,70 @@
+# you_image_generator/progress.py
+"""
+Progress events of a running generation
+
+Clients report what they learn while waiting (AI Horde queue position,
+Subnp SSE status, image download) with report_progress(); the events go to
+the reporter installed for the current generation, if any. Background jobs
+install one that stores the latest event on the GenerationJob row, from
+which api/jobs/<id>/events/ streams them to the browser.
+
+Normalized stages:
+    queued       waiting for a worker          (position)
+    position     waiting in a provider queue   (position, wait_time)
+    processing   the provider is generating    (message, wait_time)
+    downloading  fetching the image
+    complete     done                          (result)
+    failed       done, with an error           (error)
+"""
+
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('queued', 'position', 'processing', 'downloading', 'complete', 'failed')
+
+# reporter(stage, details) of the generation running in this context
+_reporter: contextvars.ContextVar = contextvars.ContextVar('generation_progress', default=None)
+
+
+def current_reporter() -> Optional[Callable[[str, dict], None]]:
+    """
+    Reporter of the current generation
+
+    Status checks that run on the job poller loop (another thread) capture
+    it before being submitted.
+    """
+    return _reporter.get()
+
+
+def report_progress(stage: str, reporter: Optional[Callable] = None, **details):
+    """
+    Report a progress event; a no-op outside a tracked generation
+
+    Args:
+        stage: One of STAGES
+        reporter: Explicit reporter (captured with current_reporter()),
+            defaults to the one of the current context
+        **details: Stage details (position, wait_time, message...)
+    """
+    reporter = reporter or _reporter.get()
+    if reporter is None:
+        return
+    try:
+        reporter(stage, {k: v for k, v in details.items() if v is not None})
+    except Exception as e:
+        # Progress is best effort, never fail the generation for it
+        logger.warning(f"Progress report failed ({stage}): {e}")
+
+
+@contextmanager
+def progress_reporter(reporter: Callable[[str, dict], None]):
+    """Send the progress events of the enclosed generation to `reporter`"""
+    token = _reporter.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _reporter.reset(token)
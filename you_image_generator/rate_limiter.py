@@ -0,0 +1,341 @@
+# you_image_generator/rate_limiter.py
+"""
+Quota-aware rate limiter for metered providers
+
+Some providers have hard quotas (Cloudflare Workers AI: 20-30 images/day,
+Segmind: 100/day) or per-image prices. Each limited provider gets:
+- a token bucket (`per_minute` requests/minute, bursts up to `burst`),
+- a daily quota (`daily_quota` images per UTC day: a call asking for
+  several images at once is charged each of them).
+
+The state is shared by every worker process through the database
+(ProviderQuota rows, default) or Redis (RATE_LIMIT_BACKEND = 'redis'), and
+is consulted before a request is dispatched, so an exhausted provider is
+skipped at once instead of failing upstream. remaining_budget() reports the
+headroom left so routing (failover chain, health endpoint) can prefer
+providers that still have some.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Documented free-tier limits (see AVAILABLE_PROVIDERS); extend or override
+# with settings.RATE_LIMITS, e.g. {'stability': {'daily_quota': 50}}
+DEFAULT_RATE_LIMITS = {
+    'cloudflare': {'per_minute': 6, 'burst': 3, 'daily_quota': 20},
+    'segmind': {'per_minute': 10, 'burst': 5, 'daily_quota': 100},
+}
+
+
+class RateLimitExceeded(Exception):
+    """A provider has no budget left right now"""
+
+    def __init__(self, provider: str, reason: str, retry_in: float):
+        self.provider = provider
+        self.reason = reason
+        self.retry_in = retry_in
+        if reason == 'daily_quota':
+            message = f"{provider} daily quota exhausted (resets in {retry_in / 3600:.1f}h)"
+        else:
+            message = f"{provider} rate limit reached, retry in {retry_in:.0f}s"
+        super().__init__(message)
+
+
+class ProviderLimit:
+    """
+    Limits of one provider
+
+    Attributes:
+        per_minute: Sustained requests per minute (None: no token bucket)
+        burst: Bucket capacity (defaults to per_minute)
+        daily_quota: Images per UTC day (None: unlimited)
+    """
+
+    def __init__(self, per_minute: Optional[float] = None, burst: Optional[float] = None,
+                 daily_quota: Optional[int] = None):
+        self.per_minute = per_minute
+        self.burst = burst if burst is not None else (per_minute or 0)
+        self.daily_quota = daily_quota
+
+    @property
+    def rate_per_second(self) -> float:
+        return (self.per_minute or 0) / 60.0
+
+
+def _utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+def _seconds_until_utc_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return (midnight - now).total_seconds()
+
+
+def _refill(tokens: float, refilled_at: float, limit: ProviderLimit, now: float) -> float:
+    return min(limit.burst, tokens + (now - refilled_at) * limit.rate_per_second)
+
+
+class DatabaseRateLimitBackend:
+    """Shared state in ProviderQuota rows, updated under a row lock"""
+
+    def acquire(self, provider: str, limit: ProviderLimit, cost: int = 1):
+        from django.db import IntegrityError, transaction
+        from .models import ProviderQuota
+
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    quota, _ = ProviderQuota.objects.select_for_update().get_or_create(
+                        provider=provider,
+                        defaults={'tokens': limit.burst, 'refilled_at': time.time(), 'day': _utc_today()},
+                    )
+                    self._consume(quota, limit, cost)
+                    return
+            except IntegrityError as e:
+                # Row created concurrently by another worker: lock it and retry
+                if attempt:
+                    # Never let the call through without consuming a token
+                    logger.error(f"Rate limiter: cannot update the quota of {provider}: {e}")
+                    raise
+
+    @staticmethod
+    def _consume(quota, limit: ProviderLimit, cost: int = 1):
+        now = time.time()
+        today = _utc_today()
+        if quota.day != today:
+            quota.day = today
+            quota.used_today = 0
+
+        if limit.daily_quota is not None and quota.used_today + cost > limit.daily_quota:
+            raise RateLimitExceeded(quota.provider, 'daily_quota', _seconds_until_utc_midnight())
+
+        if limit.per_minute:
+            quota.tokens = _refill(quota.tokens, quota.refilled_at, limit, now)
+            quota.refilled_at = now
+            if quota.tokens < 1:
+                # Nothing to store: the raise rolls back acquire()'s transaction,
+                # and the next call refills from the stored timestamp anyway
+                raise RateLimitExceeded(quota.provider, 'rate', (1 - quota.tokens) / limit.rate_per_second)
+            quota.tokens -= 1
+
+        quota.used_today += cost
+        quota.save(update_fields=['tokens', 'refilled_at', 'day', 'used_today'])
+
+    def remaining(self, provider: str, limit: ProviderLimit) -> dict:
+        from .models import ProviderQuota
+
+        quota = ProviderQuota.objects.filter(provider=provider).first()
+        used_today = quota.used_today if quota and quota.day == _utc_today() else 0
+        tokens = _refill(quota.tokens, quota.refilled_at, limit, time.time()) if quota else limit.burst
+        return {'used_today': used_today, 'tokens': tokens}
+
+    def reset(self, provider: str):
+        from .models import ProviderQuota
+        ProviderQuota.objects.filter(provider=provider).delete()
+
+
+# Atomic token bucket + daily counter, run inside Redis
+_REDIS_ACQUIRE = """
+local bucket = KEYS[1]
+local daily = KEYS[2]
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local quota = tonumber(ARGV[4])
+local day_ttl = tonumber(ARGV[5])
+local cost = tonumber(ARGV[6])
+
+local used = tonumber(redis.call('GET', daily) or '0')
+if quota >= 0 and used + cost > quota then
+    return {1, 0}
+end
+
+if rate > 0 then
+    local state = redis.call('HMGET', bucket, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    if tokens < 1 then
+        redis.call('HSET', bucket, 'tokens', tokens, 'ts', now)
+        return {2, tostring((1 - tokens) / rate)}
+    end
+    redis.call('HSET', bucket, 'tokens', tokens - 1, 'ts', now)
+    redis.call('EXPIRE', bucket, 86400)
+end
+
+redis.call('INCRBY', daily, cost)
+redis.call('EXPIRE', daily, day_ttl)
+return {0, 0}
+"""
+
+
+class RedisRateLimitBackend:
+    """Shared state in Redis (RATE_LIMIT_REDIS_URL), one Lua call per acquire"""
+
+    def __init__(self, url: str):
+        if not REDIS_AVAILABLE:
+            raise ImportError("redis is not installed. Install with: pip install redis")
+        self.client = redis.Redis.from_url(url)
+        self._acquire = self.client.register_script(_REDIS_ACQUIRE)
+
+    @staticmethod
+    def _keys(provider: str):
+        return f"ratelimit:{provider}:bucket", f"ratelimit:{provider}:{_utc_today().isoformat()}"
+
+    def acquire(self, provider: str, limit: ProviderLimit, cost: int = 1):
+        bucket, daily = self._keys(provider)
+        quota = limit.daily_quota if limit.daily_quota is not None else -1
+        status, value = self._acquire(
+            keys=[bucket, daily],
+            args=[limit.rate_per_second, limit.burst, time.time(), quota,
+                  int(_seconds_until_utc_midnight()) + 3600, cost],
+        )
+        if status == 1:
+            raise RateLimitExceeded(provider, 'daily_quota', _seconds_until_utc_midnight())
+        if status == 2:
+            raise RateLimitExceeded(provider, 'rate', float(value))
+
+    def remaining(self, provider: str, limit: ProviderLimit) -> dict:
+        bucket, daily = self._keys(provider)
+        used_today = int(self.client.get(daily) or 0)
+        tokens, ts = self.client.hmget(bucket, 'tokens', 'ts')
+        if tokens is None:
+            tokens = limit.burst
+        else:
+            tokens = _refill(float(tokens), float(ts), limit, time.time())
+        return {'used_today': used_today, 'tokens': tokens}
+
+    def reset(self, provider: str):
+        self.client.delete(*self._keys(provider))
+
+
+class RateLimiter:
+    """
+    Consulted before each provider call (see BaseImageGenerationModel)
+
+    Providers without a configured limit are never throttled and cost no
+    backend round trip.
+    """
+
+    def __init__(self, limits: Dict[str, ProviderLimit], backend):
+        self.limits = limits
+        self.backend = backend
+
+    def is_limited(self, provider: str) -> bool:
+        return provider in self.limits
+
+    def acquire(self, provider: str, cost: int = 1):
+        """
+        Take one request from the provider's budget
+
+        Args:
+            provider: Provider key
+            cost: Images the request asks for, charged to the daily quota
+                (the token bucket counts requests)
+
+        Raises:
+            RateLimitExceeded: If the bucket is empty or the daily quota is used up
+        """
+        limit = self.limits.get(provider)
+        if limit is None:
+            return
+        self.backend.acquire(provider, limit, cost)
+
+    def remaining_budget(self, provider: str) -> Optional[dict]:
+        """
+        Headroom left for a provider
+
+        Returns:
+            None for unlimited providers, else a dict with daily_quota,
+            daily_remaining, requests_available (whole tokens) and has_headroom
+        """
+        limit = self.limits.get(provider)
+        if limit is None:
+            return None
+        state = self.backend.remaining(provider, limit)
+        daily_remaining = None
+        if limit.daily_quota is not None:
+            daily_remaining = max(limit.daily_quota - state['used_today'], 0)
+        requests_available = int(state['tokens']) if limit.per_minute else None
+        return {
+            'daily_quota': limit.daily_quota,
+            'daily_remaining': daily_remaining,
+            'per_minute': limit.per_minute,
+            'requests_available': requests_available,
+            'has_headroom': daily_remaining != 0 and requests_available != 0,
+        }
+
+    def has_headroom(self, provider: str) -> bool:
+        budget = self.remaining_budget(provider)
+        return budget is None or budget['has_headroom']
+
+    def budgets(self) -> Dict[str, dict]:
+        """Remaining budget of every limited provider"""
+        return {provider: self.remaining_budget(provider) for provider in self.limits}
+
+    def reset(self, provider: str):
+        self.backend.reset(provider)
+
+
+# Global limiter instance
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get or create the global rate limiter
+
+    Limits: DEFAULT_RATE_LIMITS updated with settings.RATE_LIMITS.
+    Backend: settings.RATE_LIMIT_BACKEND ('database' or 'redis', the latter
+    using settings.RATE_LIMIT_REDIS_URL).
+
+    Returns:
+        RateLimiter instance
+    """
+    global _rate_limiter
+
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                from django.conf import settings
+
+                config = {k: dict(v) for k, v in DEFAULT_RATE_LIMITS.items()}
+                for provider, overrides in (getattr(settings, 'RATE_LIMITS', {}) or {}).items():
+                    config.setdefault(provider, {}).update(overrides)
+                limits = {
+                    provider: ProviderLimit(**options)
+                    for provider, options in config.items()
+                    if options
+                }
+
+                backend = DatabaseRateLimitBackend()
+                if getattr(settings, 'RATE_LIMIT_BACKEND', 'database') == 'redis':
+                    try:
+                        backend = RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+                    except ImportError as e:
+                        logger.warning(f"{e} - using the database rate limit backend")
+
+                _rate_limiter = RateLimiter(limits, backend)
+                logger.info(f"Rate limiter ready for {', '.join(limits) or 'no provider'} "
+                            f"({type(backend).__name__})")
+
+    return _rate_limiter
+
+
+def reset_rate_limiter():
+    """Drop the global limiter (after a settings change, in tests)"""
+    global _rate_limiter
+    _rate_limiter = None
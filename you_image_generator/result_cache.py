@@ -0,0 +1,152 @@
+# you_image_generator/result_cache.py
+"""
+Content-addressed cache of seeded generations
+
+Providers that honour `seed` (Segmind, Prodia, AI Horde) return the same
+image for the same provider, model, prompt, negative prompt, size, seed,
+cfg_scale and style. Such a request is answered from the GeneratedImage
+that was saved the first time instead of being sent upstream again.
+
+Entries (CachedResult rows) expire after RESULT_CACHE_TTL seconds and the
+least recently used ones are evicted beyond RESULT_CACHE_MAX_ENTRIES.
+Evicting an entry never deletes the image itself.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Providers whose output is fully determined by the request and its seed
+DETERMINISTIC_PROVIDERS = ('segmind', 'prodia', 'aihorde')
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def cache_key(provider: str, model: str, prompt: str, negative_prompt: str,
+              width: int, height: int, seed: int, cfg_scale: Optional[float],
+              style: str) -> str:
+    """
+    Canonical key of a seeded generation
+
+    Returns:
+        SHA-256 hex digest of the normalized parameters
+    """
+    canonical = json.dumps({
+        'provider': provider,
+        'model': model or '',
+        'prompt': prompt.strip(),
+        'negative_prompt': (negative_prompt or '').strip(),
+        'width': int(width),
+        'height': int(height),
+        'seed': int(seed),
+        'cfg_scale': float(cfg_scale) if cfg_scale is not None else None,
+        'style': style or '',
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    TTL + LRU cache of GeneratedImage rows, shared by every worker
+
+    Args:
+        ttl: Seconds an entry stays valid
+        max_entries: Entries kept before the least recently used are evicted
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, key: str):
+        """
+        Look up a cached image
+
+        Returns:
+            The GeneratedImage, or None on a miss
+        """
+        from django.db.models import F
+        from django.utils import timezone
+        from .models import CachedResult
+
+        now = timezone.now()
+        entry = CachedResult.objects.select_related('image').filter(key=key).first()
+        if entry is None:
+            return None
+        if entry.created_at <= now - timedelta(seconds=self.ttl):
+            entry.delete()
+            return None
+
+        CachedResult.objects.filter(pk=entry.pk).update(last_used_at=now, hits=F('hits') + 1)
+        logger.info(f"Result cache hit {key[:12]} (image {entry.image_id})")
+        return entry.image
+
+    def put(self, key: str, image_id: int):
+        """Remember the image generated for `key`, then evict stale entries"""
+        from django.utils import timezone
+        from .models import CachedResult
+
+        now = timezone.now()
+        CachedResult.objects.update_or_create(
+            key=key,
+            defaults={'image_id': image_id, 'created_at': now, 'last_used_at': now, 'hits': 0},
+        )
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop expired entries and the least recently used beyond max_entries
+
+        Returns:
+            Number of entries removed
+        """
+        from django.utils import timezone
+        from .models import CachedResult
+
+        removed, _ = CachedResult.objects.filter(
+            created_at__lte=timezone.now() - timedelta(seconds=self.ttl)
+        ).delete()
+
+        overflow = list(
+            CachedResult.objects.order_by('-last_used_at').values_list('pk', flat=True)[self.max_entries:]
+        )
+        if overflow:
+            removed += CachedResult.objects.filter(pk__in=overflow).delete()[0]
+        return removed
+
+
+# Global cache instance
+_result_cache = None
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Get or create the global result cache
+
+    Configured with settings.RESULT_CACHE_TTL and RESULT_CACHE_MAX_ENTRIES.
+
+    Returns:
+        ResultCache instance
+    """
+    global _result_cache
+
+    if _result_cache is None:
+        from django.conf import settings
+
+        _result_cache = ResultCache(
+            ttl=getattr(settings, 'RESULT_CACHE_TTL', DEFAULT_TTL),
+            max_entries=getattr(settings, 'RESULT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+        )
+
+    return _result_cache
+
+
+def reset_result_cache():
+    """Drop the global instance (after a settings change, in tests)"""
+    global _result_cache
+    _result_cache = None
@@ -0,0 +1,260 @@
+# you_image_generator/retry_policy.py
+"""
+Declarative retry policies for provider calls
+
+A RetryPolicy says which failures are transient for a provider (status codes,
+exception classes, non-image bodies), how long to wait between attempts
+(jittered exponential backoff, or the server's Retry-After) and how long a
+call may take in total. BaseImageGenerationModel applies the provider's
+policy to every HTTP request, download and SDK call, so a HuggingFace model
+that is loading or a 429 is retried server-side instead of being sent back
+to the browser.
+
+Non-idempotent requests (POST submitting a job) are only retried when the
+provider cannot have processed them: connection failures and the statuses
+in `post_statuses` (429 / 503 by default).
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+from .metrics import note_retry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    _CONNECT_ERRORS = (requests.ConnectionError, httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    _TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+except ImportError:
+    _CONNECT_ERRORS = (requests.ConnectionError,)
+    _TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+# Methods that are safe to resend after an ambiguous failure (e.g. a read timeout)
+_IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'DELETE', 'PUT')
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header
+
+    Args:
+        value: Delay in seconds ('120') or an HTTP date
+
+    Returns:
+        Seconds to wait (>= 0), or None if absent or unparseable
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _status_and_retry_after(error: BaseException) -> Tuple[Optional[int], Optional[str]]:
+    """Status code and Retry-After carried by an exception (HTTPError, ImageDownloadError...)"""
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return response.status_code, response.headers.get('retry-after')
+    return getattr(error, 'status_code', None), getattr(error, 'retry_after', None)
+
+
+class RetryPolicy:
+    """
+    Retry rules for one provider
+
+    Args:
+        statuses: Transient HTTP statuses for idempotent requests
+        post_statuses: Transient statuses for other requests (not processed)
+        exceptions: Transient exception classes (connection errors, timeouts)
+        retry_invalid_content: Retry when a 200 response is not an image
+        max_attempts: Attempts per call, including the first one
+        base_delay: First backoff delay in seconds, doubled on each retry
+        max_delay: Upper bound of a backoff delay
+        deadline: Seconds after which no new attempt is started
+    """
+
+    def __init__(
+        self,
+        statuses=(429, 500, 502, 503, 504),
+        post_statuses=(429, 503),
+        exceptions=_TRANSPORT_ERRORS,
+        retry_invalid_content: bool = False,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        deadline: float = 90.0,
+    ):
+        self.statuses = tuple(statuses)
+        self.post_statuses = tuple(post_statuses)
+        self.exceptions = tuple(exceptions)
+        self.retry_invalid_content = retry_invalid_content
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def _transient_statuses(self, method: str):
+        return self.statuses if method.upper() in _IDEMPOTENT_METHODS else self.post_statuses
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered exponential delay before retry number `attempt` (1-based)"""
+        delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+        return random.uniform(delay / 2, delay)
+
+    def _next_delay(self, attempt: int, started: float, retry_after: Optional[str]) -> Optional[float]:
+        """Delay before the next attempt, or None when the call must give up"""
+        if attempt >= self.max_attempts:
+            return None
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = self.backoff(attempt)
+        if time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+    def retry_delay_for_response(self, response, method: str, attempt: int, started: float) -> Optional[float]:
+        """Delay before retrying after `response`, or None to return it"""
+        if response.status_code not in self._transient_statuses(method):
+            return None
+        return self._next_delay(attempt, started, response.headers.get('retry-after'))
+
+    def retry_delay_for_error(self, error: Exception, method: str, attempt: int, started: float) -> Optional[float]:
+        """Delay before retrying after `error`, or None to re-raise it"""
+        if getattr(error, 'reason', None) == 'content':
+            if not self.retry_invalid_content:
+                return None
+            return self._next_delay(attempt, started, None)
+
+        status, retry_after = _status_and_retry_after(error)
+        if status is not None:
+            if status not in self._transient_statuses(method):
+                return None
+            return self._next_delay(attempt, started, retry_after)
+
+        if not isinstance(error, self.exceptions):
+            return None
+        if method.upper() not in _IDEMPOTENT_METHODS and not isinstance(error, _CONNECT_ERRORS):
+            return None
+        return self._next_delay(attempt, started, None)
+
+    def call(self, send: Callable[[], Any], method: str = 'GET', label: str = '') -> Any:
+        """
+        Run `send` until it succeeds or the failure is not transient
+
+        `send` may return a response (retried on transient statuses; the last
+        response is returned as is) or raise.
+        """
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                result = send()
+            except Exception as e:
+                delay = self.retry_delay_for_error(e, method, attempt, started)
+                if delay is None:
+                    raise
+                logger.warning(f"{label}: {e} - retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+            else:
+                delay = None
+                if hasattr(result, 'status_code'):
+                    delay = self.retry_delay_for_response(result, method, attempt, started)
+                if delay is None:
+                    return result
+                logger.warning(f"{label}: HTTP {result.status_code} - retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                result.close()
+            note_retry()
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, send: Callable[[], Any], method: str = 'GET', label: str = '') -> Any:
+        """Async counterpart of call(); `send` returns an awaitable"""
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                result = await send()
+            except Exception as e:
+                delay = self.retry_delay_for_error(e, method, attempt, started)
+                if delay is None:
+                    raise
+                logger.warning(f"{label}: {e} - retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+            else:
+                delay = None
+                if hasattr(result, 'status_code'):
+                    delay = self.retry_delay_for_response(result, method, attempt, started)
+                if delay is None:
+                    return result
+                logger.warning(f"{label}: HTTP {result.status_code} - retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                await result.aclose()
+            note_retry()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+# Provider-specific rules (keyword arguments of RetryPolicy)
+PROVIDER_RETRY_POLICIES: Dict[str, dict] = {
+    # 503 while the model loads (30-60s)
+    'huggingface': {'max_attempts': 4, 'base_delay': 10.0, 'max_delay': 30.0, 'deadline': 120.0},
+    # Overloaded server answers 200 with a small error body
+    'pollinations': {'retry_invalid_content': True, 'base_delay': 2.0},
+    # Free tiers rate-limit hard; Retry-After tells how long
+    'cloudflare': {'statuses': (429, 502, 503, 504), 'max_attempts': 2},
+    'segmind': {'statuses': (429, 502, 503, 504), 'max_attempts': 2},
+    # Paid providers: never resubmit what may have been billed
+    'stability': {'post_statuses': (429,)},
+    'replicate': {'post_statuses': (429,)},
+    'runware': {'post_statuses': (429,)},
+    'deepai': {'post_statuses': (429,)},
+    # No remote job to hammer
+    'placeholder': {'max_attempts': 1},
+}
+
+_retry_policies: Dict[str, RetryPolicy] = {}
+
+
+def get_retry_policy(provider: str) -> RetryPolicy:
+    """
+    Get the retry policy of a provider
+
+    Built from PROVIDER_RETRY_POLICIES, overridable with
+    settings.RETRY_POLICIES = {'provider': {...RetryPolicy kwargs}}.
+
+    Args:
+        provider: Provider key
+
+    Returns:
+        RetryPolicy instance
+    """
+    policy = _retry_policies.get(provider)
+    if policy is None:
+        from django.conf import settings
+
+        options = dict(PROVIDER_RETRY_POLICIES.get(provider, {}))
+        options.update((getattr(settings, 'RETRY_POLICIES', {}) or {}).get(provider, {}))
+        policy = RetryPolicy(**options)
+        _retry_policies[provider] = policy
+    return policy
+
+
+def reset_retry_policies():
+    """Forget built policies (after a settings change, in tests)"""
+    _retry_policies.clear()
@@ -0,0 +1,331 @@
+# you_image_generator/single_flight.py
+"""
+Single-flight coalescing of identical generation requests
+
+Double-clicks and retrying clients fire the same prompt, provider, model,
+size and seed several times at once, and each one is a paid upstream call.
+SingleFlight lets the first request (the leader) run the generation while
+identical requests wait for its result:
+- in the same process, followers wait on the leader's future,
+- across workers, the leader holds an InFlightGeneration row (unique key);
+  followers in other workers poll it until the result is published. The
+  leader renews its lease while it runs (every third of the lease), so a
+  long failover chain keeps it; a leader that dies is replaced once its
+  lease expires.
+
+The published result stays readable for SINGLE_FLIGHT_LINGER seconds so
+followers polling from other workers can pick it up; a request arriving
+after publication is not a follower and generates again.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Form fields that do not change the generated image
+_IGNORED_FIELDS = ('csrfmiddlewaretoken',)
+
+DEFAULT_LEASE = 300.0
+DEFAULT_LINGER = 2.0
+DEFAULT_POLL_INTERVAL = 0.2
+
+_GONE = 'gone'
+_DONE = 'done'
+_RUNNING = 'running'
+
+
+def request_key(data) -> str:
+    """
+    Canonical key of a generation request
+
+    Args:
+        data: Form data (QueryDict or dict)
+
+    Returns:
+        SHA-256 hex digest of the sorted form fields
+    """
+    if hasattr(data, 'lists'):
+        items = {k: v for k, v in data.lists() if k not in _IGNORED_FIELDS}
+    else:
+        items = {k: v for k, v in data.items() if k not in _IGNORED_FIELDS}
+    canonical = json.dumps(items, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time and shares its result
+
+    Args:
+        distributed: Also coalesce across workers through the database
+        lease: Seconds a leader may run before another worker takes over
+        linger: Seconds a published result stays readable by other workers
+        poll_interval: Delay between checks of a remote leader
+    """
+
+    def __init__(self, distributed: bool = True, lease: float = DEFAULT_LEASE,
+                 linger: float = DEFAULT_LINGER, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.distributed = distributed
+        self.lease = lease
+        self.linger = linger
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of keys led by this process"""
+        return len(self._calls)
+
+    def _join(self, key: str) -> Tuple[concurrent.futures.Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = concurrent.futures.Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key: str, future, result=None, error: BaseException = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any],
+           share: Optional[Callable[[Any], Any]] = None) -> Tuple[Any, bool]:
+        """
+        Run `fn` unless an identical call is already running
+
+        Args:
+            key: Request key (see request_key)
+            fn: The call; its result must be JSON-serializable when distributed
+            share: Converts the result before it is published to other
+                workers (e.g. to drop large payloads they can reload)
+
+        Returns:
+            (result, coalesced) where coalesced is True when the result
+            comes from another request
+        """
+        future, leader = self._join(key)
+        if not leader:
+            logger.info(f"Single-flight {key[:12]}: waiting for in-flight request")
+            return future.result(), True
+
+        try:
+            result, coalesced = self._lead(key, fn, share)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, coalesced
+
+    async def ado(self, key: str, fn: Callable[[], Any],
+                  share: Optional[Callable[[Any], Any]] = None) -> Tuple[Any, bool]:
+        """Async counterpart of do(); `fn` returns an awaitable"""
+        future, leader = self._join(key)
+        if not leader:
+            logger.info(f"Single-flight {key[:12]}: waiting for in-flight request")
+            return await asyncio.wrap_future(future), True
+
+        try:
+            result, coalesced = await self._alead(key, fn, share)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, coalesced
+
+    # --- Cross-worker lock (InFlightGeneration rows) ---
+
+    def _lead(self, key, fn, share):
+        if not self.distributed:
+            return fn(), False
+
+        while True:
+            if self._claim(key):
+                break
+            remote = self._wait_remote(key)
+            if remote is not None:
+                return remote, True
+            # Remote leader gone or lease expired: try to take over
+
+        stop = threading.Event()
+        threading.Thread(target=self._keep_alive, args=(key, stop), daemon=True,
+                         name='single-flight-lease').start()
+        try:
+            result = fn()
+        except BaseException:
+            self._release(key)
+            raise
+        finally:
+            stop.set()
+        self._publish(key, share(result) if share else result)
+        return result, False
+
+    async def _alead(self, key, fn, share):
+        from asgiref.sync import sync_to_async
+
+        if not self.distributed:
+            return await fn(), False
+
+        while True:
+            if await sync_to_async(self._claim)(key):
+                break
+            remote = await self._await_remote(key)
+            if remote is not None:
+                return remote, True
+
+        heartbeat = asyncio.ensure_future(self._akeep_alive(key))
+        try:
+            result = await fn()
+        except BaseException:
+            await sync_to_async(self._release)(key)
+            raise
+        finally:
+            heartbeat.cancel()
+        await sync_to_async(self._publish)(key, share(result) if share else result)
+        return result, False
+
+    def _keep_alive(self, key: str, stop: threading.Event):
+        """Renew the lease of a running leader until `stop` is set"""
+        from django.db import connection
+
+        try:
+            while not stop.wait(self.lease / 3):
+                try:
+                    self._renew(key)
+                except Exception as e:
+                    logger.warning(f"Single-flight {key[:12]}: could not renew the lease: {e}")
+        finally:
+            connection.close()
+
+    async def _akeep_alive(self, key: str):
+        """Async _keep_alive, cancelled when the leader is done"""
+        from asgiref.sync import sync_to_async
+
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await sync_to_async(self._renew)(key)
+            except Exception as e:
+                logger.warning(f"Single-flight {key[:12]}: could not renew the lease: {e}")
+
+    def _claim(self, key: str):
+        """Try to become the cross-worker leader"""
+        from django.db import IntegrityError, transaction
+        from django.utils import timezone
+        from .models import InFlightGeneration
+
+        now = timezone.now()
+        InFlightGeneration.objects.filter(key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                InFlightGeneration.objects.create(key=key, expires_at=now + timedelta(seconds=self.lease))
+            return True
+        except IntegrityError:
+            # A finished row only serves the requests that waited for it: a
+            # new identical request generates again
+            if InFlightGeneration.objects.filter(key=key, result__isnull=False).update(
+                result=None, expires_at=now + timedelta(seconds=self.lease)
+            ):
+                return True
+            return False
+
+    def _renew(self, key: str):
+        """Push the lease of the running leader forward"""
+        from django.utils import timezone
+        from .models import InFlightGeneration
+
+        InFlightGeneration.objects.filter(key=key, result__isnull=True).update(
+            expires_at=timezone.now() + timedelta(seconds=self.lease)
+        )
+
+    def _check(self, key: str):
+        from django.utils import timezone
+        from .models import InFlightGeneration
+
+        row = InFlightGeneration.objects.filter(key=key).values('result', 'expires_at').first()
+        if row is None or row['expires_at'] <= timezone.now():
+            return _GONE, None
+        if row['result'] is not None:
+            return _DONE, row['result']
+        return _RUNNING, None
+
+    def _wait_remote(self, key: str):
+        logger.info(f"Single-flight {key[:12]}: waiting for another worker")
+        while True:
+            state, result = self._check(key)
+            if state != _RUNNING:
+                return result
+            time.sleep(self.poll_interval)
+
+    async def _await_remote(self, key: str):
+        from asgiref.sync import sync_to_async
+
+        logger.info(f"Single-flight {key[:12]}: waiting for another worker")
+        while True:
+            state, result = await sync_to_async(self._check)(key)
+            if state != _RUNNING:
+                return result
+            await asyncio.sleep(self.poll_interval)
+
+    def _publish(self, key: str, result):
+        from django.utils import timezone
+        from .models import InFlightGeneration
+
+        now = timezone.now()
+        InFlightGeneration.objects.filter(key=key).update(
+            result=result, expires_at=now + timedelta(seconds=self.linger)
+        )
+        # Housekeeping: results nobody picked up
+        InFlightGeneration.objects.filter(expires_at__lte=now).delete()
+
+    def _release(self, key: str):
+        """Leader failed: let waiting workers run the request themselves"""
+        from .models import InFlightGeneration
+        InFlightGeneration.objects.filter(key=key, result__isnull=True).delete()
+
+
+# Global single-flight instance
+_single_flight = None
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Get or create the global single-flight group
+
+    Configured with settings.SINGLE_FLIGHT_DISTRIBUTED, SINGLE_FLIGHT_LEASE
+    and SINGLE_FLIGHT_LINGER.
+
+    Returns:
+        SingleFlight instance
+    """
+    global _single_flight
+
+    if _single_flight is None:
+        from django.conf import settings
+
+        _single_flight = SingleFlight(
+            distributed=getattr(settings, 'SINGLE_FLIGHT_DISTRIBUTED', True),
+            lease=getattr(settings, 'SINGLE_FLIGHT_LEASE', DEFAULT_LEASE),
+            linger=getattr(settings, 'SINGLE_FLIGHT_LINGER', DEFAULT_LINGER),
+        )
+
+    return _single_flight
+
+
+def reset_single_flight():
+    """Drop the global instance (after a settings change, in tests)"""
+    global _single_flight
+    _single_flight = None
@@ -0,0 +1,167 @@
+# you_image_generator/sse.py
+"""
+Incremental Server-Sent Events parser
+
+Follows the WHATWG event-stream format: CRLF, LF or CR line endings, a
+leading BOM, comment lines, multi-line `data:` fields (joined with '\n'),
+`event`, `id` (kept across events) and `retry` fields.
+
+Chunks are fed as raw bytes: the parser keeps one bytearray, scans each
+byte once and only copies complete lines out of it, so a stream is parsed
+in linear time whatever its length and chunking. Lines are decoded as
+UTF-8 once complete, so a character split across chunks is never broken.
+
+    parser = SSEParser()
+    for chunk in response.iter_content(chunk_size=None):
+        for event in parser.feed(chunk):
+            ...
+"""
+
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+_LINE_END = re.compile(rb'\r\n|\r|\n')
+_BOM = b'\xef\xbb\xbf'
+
+
+class SSEEvent:
+    """One dispatched event"""
+
+    __slots__ = ('event', 'data', 'id', 'retry')
+
+    def __init__(self, event: str = 'message', data: str = '', id: Optional[str] = None,
+                 retry: Optional[int] = None):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def __eq__(self, other):
+        if not isinstance(other, SSEEvent):
+            return NotImplemented
+        return (self.event, self.data, self.id, self.retry) == (other.event, other.data, other.id, other.retry)
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, data={self.data[:50]!r}, id={self.id!r})"
+
+
+class SSEParser:
+    """
+    Turns a byte stream into SSEEvent objects as soon as they complete
+
+    Attributes:
+        last_event_id: Last `id` seen (to send as Last-Event-ID on reconnect)
+        retry: Last reconnection delay (ms) sent by the server
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._start = True
+        self._data: List[str] = []
+        self._event = ''
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """
+        Add bytes to the stream
+
+        Returns:
+            Events completed by this chunk (possibly none)
+        """
+        buffer = self._buffer
+        # The kept bytes hold no line end (but a possible trailing CR):
+        # resume the scan where it stopped instead of rescanning the line
+        scan = max(len(buffer) - 1, 0)
+        buffer += chunk
+        if self._start:
+            if len(buffer) < len(_BOM) and _BOM.startswith(bytes(buffer)):
+                return []
+            if buffer.startswith(_BOM):
+                del buffer[:len(_BOM)]
+                scan = 0
+            self._start = False
+
+        events = []
+        pos = 0
+        with memoryview(buffer) as view:
+            while True:
+                match = _LINE_END.search(buffer, max(pos, scan))
+                if match is None:
+                    break
+                # A CR ending the chunk may be the first half of a CRLF
+                if match.group() == b'\r' and match.end() == len(buffer):
+                    break
+                event = self._process_line(str(view[pos:match.start()], 'utf-8', 'replace'))
+                if event is not None:
+                    events.append(event)
+                pos = match.end()
+
+        # Only the incomplete last line is kept
+        del buffer[:pos]
+        return events
+
+    def close(self) -> List[SSEEvent]:
+        """
+        End of stream
+
+        A pending CR still ends its line; an event not followed by a blank
+        line is discarded, as the spec requires.
+        """
+        events = []
+        if self._buffer.endswith(b'\r'):
+            event = self._process_line(self._buffer[:-1].decode('utf-8', errors='replace'))
+            if event is not None:
+                events.append(event)
+        self._buffer.clear()
+        self._data = []
+        self._event = ''
+        return events
+
+    def _process_line(self, line: str) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line[0] == ':':
+            return None  # comment / keep-alive
+
+        field, colon, value = line.partition(':')
+        if colon and value[:1] == ' ':
+            value = value[1:]
+
+        if field == 'data':
+            self._data.append(value)
+        elif field == 'event':
+            self._event = value
+        elif field == 'id':
+            if '\0' not in value:
+                self.last_event_id = value
+        elif field == 'retry':
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        data, event = self._data, self._event
+        self._data = []
+        self._event = ''
+        if not data:
+            return None
+        return SSEEvent(event or 'message', '\n'.join(data), self.last_event_id, self.retry)
+
+
+def iter_sse(chunks: Iterable[bytes]) -> Iterator[SSEEvent]:
+    """Events of a byte stream (e.g. requests' iter_content(chunk_size=None))"""
+    parser = SSEParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_sse(chunks: AsyncIterable[bytes]) -> AsyncIterator[SSEEvent]:
+    """Async counterpart of iter_sse (e.g. httpx's aiter_bytes())"""
+    parser = SSEParser()
+    async for chunk in chunks:
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
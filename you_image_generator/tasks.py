@@ -0,0 +1,17 @@
+# you_image_generator/tasks.py
+"""
+Celery tasks (used when GENERATION_JOB_BROKER = 'celery')
+
+Start a worker with:
+    celery -A openimage worker -l info
+"""
+
+from celery import shared_task
+
+from .jobs import run_job
+
+
+@shared_task(name='you_image_generator.run_generation_job', ignore_result=True)
+def run_generation_job(job_id: str):
+    """Run one GenerationJob; its result is stored on the row, not in Celery"""
+    run_job(job_id)
@@ -1 +1,14 @@
-# Tests package for you_image_generator
\ No newline at end of file
+# Tests package for you_image_generator
+import atexit
+import shutil
+import tempfile
+
+from django.test.utils import override_settings
+
+# Images saved by the tests go to a throwaway blob store, their metrics to a
+# throwaway directory
+_blob_root = tempfile.mkdtemp(prefix='openimage-test-blobs-')
+_metrics_dir = tempfile.mkdtemp(prefix='openimage-test-metrics-')
+override_settings(BLOB_STORAGE_BACKEND='local', BLOB_STORAGE_ROOT=_blob_root, METRICS_DIR=_metrics_dir).enable()
+atexit.register(shutil.rmtree, _blob_root, True)
+atexit.register(shutil.rmtree, _metrics_dir, True)
@@ -1,12 +1,19 @@
+import asyncio
+import httpx
 from django.test import TestCase
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from you_image_generator.ai_clients import (
     get_api_client,
+    invalidate_api_client,
     PollinationsClient,
     GeminiClient,
+    HuggingFaceClient,
+    RunwareClient,
+    BaseImageGenerationModel,
     AVAILABLE_PROVIDERS,
     ImageResult
 )
+from you_image_generator.http_pool import get_async_http_client
 
 
 class AIClientsTest(TestCase):
@@ -45,6 +52,21 @@ class AIClientsTest(TestCase):
         with self.assertRaises(ValueError):
             get_api_client('gemini')
     
+    def test_get_api_client_reuses_instances(self):
+        """Test que le registre réutilise les clients par (provider, clé)"""
+        client = get_api_client('gemini', 'fake_api_key')
+        self.assertIs(get_api_client('gemini', 'fake_api_key'), client)
+        self.assertIsNot(get_api_client('gemini', 'other_api_key'), client)
+    
+    def test_invalidate_api_client(self):
+        """Test invalidation du registre après rotation de clé"""
+        client = get_api_client('gemini', 'fake_api_key')
+        get_api_client('pollinations')
+        
+        self.assertEqual(invalidate_api_client('gemini', 'fake_api_key'), 1)
+        self.assertIsNot(get_api_client('gemini', 'fake_api_key'), client)
+        self.assertGreaterEqual(invalidate_api_client(), 2)
+    
     def test_image_result_creation(self):
         """Test création ImageResult"""
         result = ImageResult(
@@ -55,20 +77,187 @@ class AIClientsTest(TestCase):
         self.assertEqual(result.prompt, "test prompt")
         self.assertEqual(result.image_data, b'fake_data')
     
-    @patch('requests.get')
-    def test_pollinations_client_generate(self, mock_get):
+    @patch('requests.Session.request')
+    def test_pollinations_client_generate(self, mock_request):
         """Test génération Pollinations"""
+        fake_image = b'\x89PNG\r\n\x1a\n' + b'0' * 6000
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.content = b'fake_image_data'
-        mock_get.return_value = mock_response
+        mock_response.headers = {'content-type': 'image/png'}
+        mock_response.iter_content.return_value = [fake_image]
+        mock_request.return_value = mock_response
         
         client = PollinationsClient()
         results = client.generate_image("test prompt", {'width': 512, 'height': 512})
         
         self.assertEqual(len(results), 1)
         self.assertIsInstance(results[0], ImageResult)
-        self.assertEqual(results[0].image_data, b'fake_image_data')
+        self.assertEqual(results[0].image_data, fake_image)
+    
+    def test_clients_share_http_pool(self):
+        """Test que tous les clients partagent le même pool HTTP"""
+        pollinations = PollinationsClient()
+        gemini = GeminiClient('fake_api_key')
+        self.assertIs(pollinations.http, gemini.http)
+    
+    @patch('requests.Session.request')
+    def test_request_uses_connect_and_read_timeouts(self, mock_request):
+        """Test timeouts connexion/lecture séparés"""
+        mock_request.return_value = Mock(status_code=200, headers={})
+        mock_request.return_value.iter_content.return_value = [b'\x89PNG\r\n\x1a\n' + b'0' * 6000]
+        
+        client = PollinationsClient()
+        client.generate_image("test prompt")
+        
+        timeout = mock_request.call_args.kwargs['timeout']
+        self.assertEqual(timeout, (client.http.connect_timeout, 60))
+    
+    def test_async_pool_closed_with_loop(self):
+        """Test fermeture du client async quand sa boucle se termine"""
+        async def current_client():
+            return get_async_http_client()
+        
+        first = asyncio.run(current_client())
+        second = asyncio.run(current_client())
+        
+        self.assertIsNot(first, second)
+        self.assertTrue(first.client.is_closed)
+        self.assertTrue(second.client.is_closed)
+    
+    @patch('httpx.AsyncHTTPTransport.handle_async_request', new_callable=AsyncMock)
+    def test_pollinations_client_agenerate(self, mock_transport):
+        """Test génération asynchrone Pollinations"""
+        fake_image = b'\x89PNG\r\n\x1a\n' + b'0' * 6000
+        mock_transport.return_value = httpx.Response(200, content=fake_image, headers={'content-type': 'image/png'})
+        
+        client = PollinationsClient()
+        results = asyncio.run(client.agenerate_image("test prompt", {'width': 512, 'height': 512}))
+        
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].image_data, fake_image)
+        self.assertEqual(mock_transport.call_args.args[0].method, 'GET')
+
+
+class FakeBatchClient(BaseImageGenerationModel):
+    """Client factice enregistrant ses appels"""
+    provider = 'fake_batch'
+
+    def __init__(self, max_batch_size=1, fail_first=False):
+        super().__init__()
+        self.max_batch_size = max_batch_size
+        self.fail_first = fail_first
+        self.calls = []
+
+    def generate_image(self, prompt, options=None):
+        self.calls.append(dict(options or {}))
+        if self.fail_first and len(self.calls) == 1:
+            raise Exception("down")
+        return [ImageResult(image_data=b'png', prompt=prompt, model_used='fake')
+                for _ in range(options.get('num_images', 1))]
+
+
+class BatchGenerationTest(TestCase):
+    """Tests pour la génération de plusieurs images"""
+    
+    def test_native_batch_single_call(self):
+        """Test paramètre de lot natif: un seul appel amont"""
+        client = FakeBatchClient(max_batch_size=4)
+        results = client.generate_images("a cat", {}, num_images=4)
+        
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(client.calls[0]['num_images'], 4)
+    
+    def test_concurrent_calls_with_distinct_seeds(self):
+        """Test appels concurrents avec seeds consécutifs"""
+        client = FakeBatchClient()
+        results = client.generate_images("a cat", {'seed': 10}, num_images=3)
+        
+        self.assertEqual(len(results), 3)
+        self.assertEqual(sorted(call['seed'] for call in client.calls), [10, 11, 12])
+    
+    def test_seed_recorded_per_call(self):
+        """Test seed de chaque appel porté par son image"""
+        client = FakeBatchClient()
+        client.supports_seed = True
+        results = client.generate_images("a cat", {'seed': 10}, num_images=3)
+        
+        self.assertEqual(sorted(result.seed for result in results), [10, 11, 12])
+    
+    def test_seed_generated_when_missing(self):
+        """Test seed de base tiré au hasard pour les fournisseurs à seed"""
+        client = FakeBatchClient()
+        client.supports_seed = True
+        results = client.generate_images("a cat", {}, num_images=3)
+        
+        seeds = sorted(call['seed'] for call in client.calls)
+        self.assertEqual(seeds, [seeds[0], seeds[0] + 1, seeds[0] + 2])
+        self.assertEqual(sorted(result.seed for result in results), seeds)
+    
+    def test_no_seed_for_unseeded_provider(self):
+        """Test pas de seed inventé pour un fournisseur qui l'ignore"""
+        client = FakeBatchClient()
+        results = client.generate_images("a cat", {}, num_images=2)
+        
+        self.assertTrue(all('seed' not in call for call in client.calls))
+        self.assertTrue(all(result.seed is None for result in results))
+    
+    @patch('httpx.AsyncHTTPTransport.handle_async_request', new_callable=AsyncMock)
+    def test_pollinations_distinct_seeds(self, mock_transport):
+        """Test Pollinations: un seed distinct par image dans l'URL"""
+        fake_image = b'\x89PNG\r\n\x1a\n' + b'0' * 6000
+        mock_transport.side_effect = lambda request: httpx.Response(
+            200, content=fake_image, headers={'content-type': 'image/png'}
+        )
+        
+        results = PollinationsClient().generate_images("a cat", {}, num_images=3)
+        
+        seeds = sorted(int(call.args[0].url.params['seed']) for call in mock_transport.call_args_list)
+        self.assertEqual(len(set(seeds)), 3)
+        self.assertEqual(sorted(result.seed for result in results), seeds)
+    
+    def test_partial_failure(self):
+        """Test échec partiel: les images obtenues sont renvoyées"""
+        client = FakeBatchClient(fail_first=True)
+        results = client.generate_images("a cat", {}, num_images=3)
+        self.assertEqual(len(results), 2)
+    
+    def test_runware_number_results(self):
+        """Test numberResults Runware"""
+        request = RunwareClient('key')._build_request("a cat", {'num_images': 3})
+        self.assertEqual(request['json']['numberResults'], 3)
+
+
+class HuggingFaceEncodingTest(TestCase):
+    """Tests du chemin SDK HuggingFace sans ré-encodage inutile"""
+
+    def _client(self, sdk):
+        client = HuggingFaceClient()
+        client.use_sdk = True
+        client.client = sdk
+        return client
+
+    def test_raw_bytes_passthrough(self):
+        """Test octets bruts du SDK transmis tels quels"""
+        raw = b'\xff\xd8\xff\xe0' + b'0' * 100
+        sdk = Mock(spec=['post', 'text_to_image'])
+        sdk.post.return_value = raw
+
+        results = self._client(sdk).generate_image('a fox')
+        self.assertIs(results[0].image_data, raw)
+        sdk.text_to_image.assert_not_called()
+
+    def test_single_encode_in_requested_format(self):
+        """Test encodage unique dans le format demandé"""
+        from PIL import Image
+        sdk = Mock(spec=['text_to_image'])
+        sdk.text_to_image.return_value = Image.new('RGBA', (64, 64), 'red')
+
+        results = self._client(sdk).generate_image('a fox', {'output_format': 'JPEG'})
+        self.assertTrue(results[0].image_data.startswith(b'\xff\xd8\xff'))
+
+        results = self._client(sdk).generate_image('a fox')
+        self.assertTrue(results[0].image_data.startswith(b'\x89PNG'))
 
 
 class AIClientIntegrationTest(TestCase):
@@ -0,0 +1,164 @@
+import io
+import os
+import shutil
+import tempfile
+from django.core.management import call_command
+from django.test import TestCase, SimpleTestCase
+from you_image_generator.blob_storage import (
+    BlobNotFound, LocalBlobStore, S3BlobStore, content_key, get_blob_store,
+)
+from you_image_generator.models import GeneratedImage
+
+
+class FakeS3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class FakeS3Client:
+    """Stand-in S3 en mémoire (mêmes méthodes que le client boto3)"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def get_object(self, Bucket, Key, Range=None):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('NoSuchKey')
+        data = self.objects[(Bucket, Key)]
+        if Range:
+            start, end = Range[len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+        return {'Body': io.BytesIO(data)}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('404')
+        return {'ContentLength': len(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+class LocalBlobStoreTest(SimpleTestCase):
+    """Tests pour le stockage local adressé par contenu"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = LocalBlobStore(self.root)
+
+    def test_round_trip(self):
+        """Test écriture, lecture, taille et suppression"""
+        key = self.store.put(b'image bytes')
+        self.assertEqual(key, content_key(b'image bytes'))
+        self.assertEqual(self.store.get(key), b'image bytes')
+        self.assertEqual(self.store.size(key), 11)
+        self.assertTrue(self.store.local_path(key).startswith(os.path.join(self.root, key[:2], key[2:4])))
+        self.store.delete(key)
+        self.assertFalse(self.store.exists(key))
+        with self.assertRaises(BlobNotFound):
+            self.store.get(key)
+
+    def test_same_content_stored_once(self):
+        """Test contenu identique stocké une seule fois"""
+        self.assertEqual(self.store.put(b'same'), self.store.put(b'same'))
+        files = [f for _, _, names in os.walk(self.root) for f in names]
+        self.assertEqual(len(files), 1)
+
+    def test_open_range(self):
+        """Test lecture à partir d'un octet donné"""
+        key = self.store.put(b'0123456789')
+        with self.store.open_range(key, 4, 6) as stream:
+            self.assertEqual(stream.read(3), b'456')
+
+    def test_explicit_key(self):
+        """Test clé choisie par l'appelant (fichiers dérivés)"""
+        key = self.store.put(b'thumb', key='abcd/thumb-256.webp')
+        self.assertEqual(self.store.get(key), b'thumb')
+
+    def test_invalid_keys(self):
+        """Test clés hors de la racine refusées"""
+        for key in ('../etc/passwd', 'a//b', '', 'a/./b'):
+            with self.assertRaises(ValueError, msg=key):
+                self.store.put(b'x', key=key)
+
+
+class S3BlobStoreTest(SimpleTestCase):
+    """Tests pour le stockage S3 (client factice)"""
+
+    def test_round_trip(self):
+        """Test objets préfixés dans le bucket"""
+        client = FakeS3Client()
+        store = S3BlobStore('bucket', prefix='images/', client=client)
+        key = store.put(b'png')
+        self.assertIn(('bucket', f'images/{key}'), client.objects)
+        self.assertEqual(store.get(key), b'png')
+        self.assertEqual(store.size(key), 3)
+        self.assertIsNone(store.local_path(key))
+        self.assertEqual(store.open_range(key, 1, 1).read(), b'n')
+        store.delete(key)
+        self.assertFalse(store.exists(key))
+        with self.assertRaises(BlobNotFound):
+            store.open(key)
+
+
+class GeneratedImageBlobTest(TestCase):
+    """Tests pour les images de GeneratedImage dans le stockage"""
+
+    def test_saved_to_store(self):
+        """Test octets écrits dans le stockage, clé sur la ligne"""
+        image = GeneratedImage.objects.create(prompt='a cat', image_data=b'png bytes')
+        self.assertEqual(image.image_key, content_key(b'png bytes'))
+        self.assertEqual(image.image_size, 9)
+
+        reloaded = GeneratedImage.objects.get(pk=image.pk)
+        self.assertIsNone(reloaded.legacy_image_data)
+        self.assertEqual(reloaded.image_data, b'png bytes')
+
+    def test_bulk_create(self):
+        """Test bulk_create passe aussi par le stockage"""
+        GeneratedImage.objects.bulk_create([
+            GeneratedImage(prompt='a', image_data=b'one'),
+            GeneratedImage(prompt='b', image_data=b'two'),
+        ])
+        self.assertEqual(
+            sorted(bytes(image.image_data) for image in GeneratedImage.objects.all()), [b'one', b'two']
+        )
+
+    def test_blob_deleted_with_last_row(self):
+        """Test blob supprimé quand plus aucune ligne ne l'utilise"""
+        first = GeneratedImage.objects.create(prompt='a', image_data=b'shared')
+        second = GeneratedImage.objects.create(prompt='b', image_data=b'shared')
+        store = get_blob_store()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(store.exists(second.image_key))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(store.exists(second.image_key))
+
+    def test_legacy_rows_readable(self):
+        """Test lignes anciennes lues depuis la colonne"""
+        image = GeneratedImage.objects.create(prompt='old')
+        GeneratedImage.objects.filter(pk=image.pk).update(legacy_image_data=b'old bytes')
+        self.assertEqual(GeneratedImage.objects.get(pk=image.pk).image_data, b'old bytes')
+
+    def test_migrate_command(self):
+        """Test migration par lots, reprise possible"""
+        for i in range(5):
+            image = GeneratedImage.objects.create(prompt=f'old {i}')
+            GeneratedImage.objects.filter(pk=image.pk).update(legacy_image_data=f'bytes {i}'.encode())
+
+        call_command('migrate_image_blobs', batch_size=2, limit=3, stdout=io.StringIO())
+        self.assertEqual(GeneratedImage.objects.filter(legacy_image_data__isnull=False).count(), 2)
+        call_command('migrate_image_blobs', batch_size=2, stdout=io.StringIO())
+        self.assertFalse(GeneratedImage.objects.filter(legacy_image_data__isnull=False).exists())
+
+        for image in GeneratedImage.objects.all():
+            self.assertEqual(image.image_data, f'bytes {image.prompt[-1]}'.encode())
+            self.assertEqual(image.image_size, len(image.image_data))
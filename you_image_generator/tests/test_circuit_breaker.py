@@ -0,0 +1,103 @@
+import time
+from django.test import SimpleTestCase
+from unittest.mock import Mock, patch
+from you_image_generator.ai_clients import PollinationsClient, ProviderError
+from you_image_generator.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_circuit_breaker,
+    is_client_error,
+    reset_circuit_breakers,
+    CLOSED,
+    OPEN,
+    HALF_OPEN,
+)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    """Tests pour les disjoncteurs par provider"""
+    
+    def setUp(self):
+        reset_circuit_breakers()
+    
+    def tearDown(self):
+        reset_circuit_breakers()
+    
+    def _breaker(self, **kwargs):
+        config = {'window': 10, 'min_calls': 4, 'failure_rate': 0.5, 'open_seconds': 60}
+        config.update(kwargs)
+        return CircuitBreaker('test', **config)
+    
+    def _call(self, breaker, success, duration=0.1):
+        breaker.before_call()
+        breaker.record(success, duration)
+    
+    def test_opens_on_failure_rate(self):
+        """Test ouverture quand le taux d'erreur dépasse le seuil"""
+        breaker = self._breaker()
+        self._call(breaker, True)
+        self._call(breaker, False)
+        self._call(breaker, True)
+        self.assertEqual(breaker.state, CLOSED)
+        
+        self._call(breaker, False)
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+    
+    def test_opens_on_slow_calls(self):
+        """Test ouverture quand les appels sont trop lents"""
+        breaker = self._breaker(slow_call_seconds=1, slow_call_rate=0.75)
+        for _ in range(4):
+            self._call(breaker, True, duration=5)
+        self.assertEqual(breaker.state, OPEN)
+    
+    def test_half_open_probe(self):
+        """Test demi-ouverture: un seul appel test, qui referme le circuit"""
+        breaker = self._breaker(open_seconds=0.05)
+        for _ in range(4):
+            self._call(breaker, False)
+        time.sleep(0.06)
+        
+        breaker.before_call()
+        self.assertEqual(breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        
+        breaker.record(True, 0.1)
+        self.assertEqual(breaker.state, CLOSED)
+    
+    @patch('requests.Session.request', side_effect=ConnectionError("down"))
+    def test_client_fails_fast_when_open(self, mock_request):
+        """Test qu'un client au circuit ouvert n'appelle plus le réseau"""
+        client = PollinationsClient()
+        for _ in range(5):
+            with self.assertRaises(ConnectionError):
+                client.generate_image("test prompt")
+        calls = mock_request.call_count
+        
+        with self.assertRaises(CircuitOpenError):
+            client.generate_image("test prompt")
+        self.assertEqual(mock_request.call_count, calls)
+        self.assertEqual(get_circuit_breaker('pollinations').snapshot()['state'], OPEN)
+    
+    @patch('requests.Session.request')
+    def test_client_errors_not_counted(self, mock_request):
+        """Test qu'une requête refusée (4xx) n'ouvre pas le circuit"""
+        mock_request.return_value = Mock(status_code=400, headers={}, text='bad request')
+        mock_request.return_value.iter_content.return_value = [b'bad request']
+        client = PollinationsClient()
+        for _ in range(6):
+            with self.assertRaises(Exception):
+                client.generate_image("test prompt")
+        
+        self.assertEqual(get_circuit_breaker('pollinations').snapshot()['state'], CLOSED)
+    
+    def test_is_client_error(self):
+        """Test classement des erreurs: 4xx hors 429 seulement"""
+        self.assertTrue(is_client_error(ProviderError("filtered", status_code=400)))
+        self.assertTrue(is_client_error(ProviderError("bad key", status_code=401)))
+        self.assertFalse(is_client_error(ProviderError("slow down", status_code=429)))
+        self.assertFalse(is_client_error(ProviderError("down", status_code=503)))
+        self.assertFalse(is_client_error(ConnectionError("down")))
+        self.assertFalse(is_client_error(CircuitOpenError('test', 10)))
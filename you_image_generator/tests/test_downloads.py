@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase
+from unittest.mock import Mock
+from you_image_generator.downloads import download_image, sniff_image_type, ImageDownloadError
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+
+class DownloadImageTest(SimpleTestCase):
+    """Tests pour le téléchargement en streaming des images"""
+    
+    def _http(self, chunks, status_code=200, headers=None):
+        response = Mock(status_code=status_code, headers=headers or {})
+        response.iter_content.side_effect = lambda chunk_size: iter(chunks)
+        http = Mock()
+        http.request.return_value = response
+        return http, response
+    
+    def test_sniff_image_type(self):
+        """Test détection du format par les magic bytes"""
+        self.assertEqual(sniff_image_type(PNG), 'png')
+        self.assertEqual(sniff_image_type(b'\xff\xd8\xff\xe0' + b'0' * 8), 'jpeg')
+        self.assertEqual(sniff_image_type(b'RIFF\x00\x00\x00\x00WEBP'), 'webp')
+        self.assertIsNone(sniff_image_type(b'<!DOCTYPE html>'))
+    
+    def test_download_streams_chunks(self):
+        """Test lecture par morceaux et fermeture de la réponse"""
+        http, response = self._http([PNG[:10], PNG[10:]])
+        
+        self.assertEqual(download_image(http, 'http://x/img.png'), PNG)
+        self.assertTrue(http.request.call_args.kwargs['stream'])
+        response.close.assert_called_once()
+    
+    def test_html_body_aborts_after_first_chunk(self):
+        """Test rejet d'une page HTML sans lire la suite"""
+        consumed = []
+        
+        def chunks():
+            for chunk in (b'<html><body>overloaded</body>', b'x' * 1000):
+                consumed.append(chunk)
+                yield chunk
+        
+        http, _ = self._http(chunks())
+        with self.assertRaises(ImageDownloadError) as ctx:
+            download_image(http, 'http://x/img.png')
+        self.assertEqual(ctx.exception.status_code, 200)
+        self.assertEqual(len(consumed), 1)
+    
+    def test_error_content_type_and_status(self):
+        """Test erreurs HTTP et content-type non image"""
+        http, _ = self._http([b'{"error": "bad"}'], status_code=400)
+        with self.assertRaises(ImageDownloadError) as ctx:
+            download_image(http, 'http://x/')
+        self.assertIn('400', str(ctx.exception))
+        
+        http, _ = self._http([PNG], headers={'content-type': 'text/html'})
+        with self.assertRaises(ImageDownloadError):
+            download_image(http, 'http://x/')
+    
+    def test_max_size(self):
+        """Test taille maximale (Content-Length puis flux)"""
+        http, response = self._http([PNG], headers={'content-length': '999999'})
+        with self.assertRaises(ImageDownloadError):
+            download_image(http, 'http://x/', max_bytes=1000)
+        response.iter_content.assert_not_called()
+        
+        http, _ = self._http([PNG, PNG, PNG])
+        with self.assertRaises(ImageDownloadError):
+            download_image(http, 'http://x/', max_bytes=200)
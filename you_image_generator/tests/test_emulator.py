@@ -0,0 +1,133 @@
+import asyncio
+import requests
+from django.test import TestCase, SimpleTestCase, override_settings
+from unittest.mock import patch
+from you_image_generator.ai_clients import (
+    PollinationsClient, SubnpClient, GeminiClient, CloudflareAIClient, ReplicateClient,
+    ProdiaClient, AIHordeClient, StabilityAiClient, provider_base_url,
+)
+from you_image_generator.circuit_breaker import reset_circuit_breakers
+from you_image_generator.downloads import sniff_image_type
+from you_image_generator.emulator import ProviderEmulator, ProviderProfile, make_png, parse_latency
+
+FAST_POLL = {'interval': 0.05, 'max_interval': 0.1, 'timeout': 10}
+
+
+class EmulatorHelpersTest(SimpleTestCase):
+    """Tests pour les profils de l'émulateur"""
+
+    def test_parse_latency(self):
+        """Test distributions de latence"""
+        self.assertEqual(parse_latency('1.5')(), 1.5)
+        self.assertEqual(parse_latency('constant:2')(), 2.0)
+        for _ in range(20):
+            self.assertTrue(1 <= parse_latency('uniform:1,3')() <= 3)
+            self.assertGreaterEqual(parse_latency('normal:0,5')(), 0)
+        with self.assertRaises(ValueError):
+            parse_latency('gamma:1,2')
+        with self.assertRaises(ValueError):
+            parse_latency('uniform:1')
+
+    def test_make_png(self):
+        """Test PNG valide de la taille demandée"""
+        image = make_png(100_000)
+        self.assertEqual(sniff_image_type(image), 'png')
+        self.assertAlmostEqual(len(image), 100_000, delta=2000)
+
+    def test_invalid_error_rate(self):
+        """Test taux d'erreur hors bornes refusé"""
+        with self.assertRaises(ValueError):
+            ProviderProfile(error_rate=2)
+
+    @override_settings(PROVIDER_EMULATOR_URL='http://127.0.0.1:8765/', PROVIDER_BASE_URLS={'gemini': 'http://proxy/v1/'})
+    def test_base_url_overrides(self):
+        """Test redirection des URLs de base"""
+        self.assertEqual(
+            provider_base_url('aihorde', 'https://stablehorde.net/api/v2'),
+            'http://127.0.0.1:8765/aihorde/api/v2',
+        )
+        self.assertEqual(provider_base_url('gemini', 'https://example.com/x'), 'http://proxy/v1')
+
+    def test_base_url_default(self):
+        """Test URL réelle sans surcharge"""
+        self.assertEqual(provider_base_url('aihorde', 'https://stablehorde.net/api/v2'), 'https://stablehorde.net/api/v2')
+
+
+class EmulatedProvidersTest(TestCase):
+    """Tests de bout en bout des clients contre l'émulateur"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        profiles = {provider: ProviderProfile(payload_bytes=20_000) for provider in ('pollinations', 'subnp',
+                    'gemini', 'cloudflare', 'replicate', 'prodia', 'aihorde', 'stability')}
+        cls.emulator = ProviderEmulator(port=0, profiles=profiles).start()
+        cls.settings_override = override_settings(PROVIDER_EMULATOR_URL=cls.emulator.url)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.emulator.shutdown()
+        super().tearDownClass()
+
+    def setUp(self):
+        reset_circuit_breakers()
+        self.addCleanup(reset_circuit_breakers)
+
+    def assertImage(self, results, count=1):
+        self.assertEqual(len(results), count)
+        for result in results:
+            self.assertEqual(sniff_image_type(result.image_data), 'png')
+            self.assertGreater(len(result.image_data), 19_000)
+
+    def test_sync_providers(self):
+        """Test protocoles GET, SSE, base64 JSON et multipart"""
+        self.assertImage(PollinationsClient().generate_image('a cat'))
+        self.assertImage(SubnpClient().generate_image('a cat', {'model': 'magic'}))
+        self.assertImage(GeminiClient('key').generate_image('a cat'))
+        self.assertImage(CloudflareAIClient('key', 'account').generate_image('a cat'))
+        self.assertImage(StabilityAiClient('key').generate_image('a cat'))
+
+    def test_async_providers(self):
+        """Test chemins asynchrones des mêmes protocoles"""
+        async def run():
+            return await asyncio.gather(
+                SubnpClient().agenerate_image('a cat'),
+                GeminiClient('key').agenerate_image('a cat'),
+                CloudflareAIClient('key', 'account').agenerate_image('a cat'),
+            )
+        for results in asyncio.run(run()):
+            self.assertImage(results)
+
+    @patch.object(ReplicateClient, 'POLL_SCHEDULE', FAST_POLL)
+    @patch.object(ProdiaClient, 'POLL_SCHEDULE', FAST_POLL)
+    @patch.object(AIHordeClient, 'POLL_SCHEDULE', FAST_POLL)
+    def test_job_providers(self):
+        """Test soumission, polling et téléchargement"""
+        self.emulator.profiles['aihorde'] = ProviderProfile(latency='constant:0.2', payload_bytes=20_000)
+        self.addCleanup(self.emulator.profiles.__setitem__, 'aihorde', ProviderProfile(payload_bytes=20_000))
+        self.assertImage(ReplicateClient('key').generate_image('a cat', {'num_images': 2}), count=2)
+        self.assertImage(ProdiaClient().generate_image('a cat'))
+        self.assertImage(AIHordeClient().generate_image('a cat'))
+
+    @patch.object(AIHordeClient, 'POLL_SCHEDULE', FAST_POLL)
+    def test_async_job_provider(self):
+        """Test soumission, polling et téléchargement asynchrones (AI Horde)"""
+        self.assertImage(asyncio.run(AIHordeClient().agenerate_image('a cat')))
+
+    def test_missing_credentials(self):
+        """Test clé absente refusée comme par le vrai provider"""
+        response = requests.post(f'{self.emulator.url}/replicate/v1/predictions', json={})
+        self.assertEqual(response.status_code, 401)
+
+    def test_injected_errors(self):
+        """Test erreurs injectées selon le profil"""
+        self.emulator.profiles['gemini'] = ProviderProfile(error_rate=1, error_status=429)
+        self.addCleanup(self.emulator.profiles.__setitem__, 'gemini', ProviderProfile(payload_bytes=20_000))
+        response = requests.post(
+            f'{self.emulator.url}/gemini/v1beta/models/m:generateContent',
+            headers={'x-goog-api-key': 'key'}, json={},
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '1')
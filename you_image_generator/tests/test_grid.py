@@ -0,0 +1,112 @@
+import asyncio
+import json
+from django.test import TestCase, SimpleTestCase, Client, override_settings
+from django.urls import reverse
+from unittest.mock import patch, Mock, AsyncMock
+from you_image_generator.ai_clients import ImageResult
+from you_image_generator.grid import expand_grid, estimate_grid, iter_grid
+from you_image_generator.models import GeneratedImage
+
+
+class SlowClient:
+    """Client factice mesurant le nombre d'appels simultanés"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def agenerate_image(self, prompt, options=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        return [ImageResult(image_data=b'png', prompt=prompt, model_used='fake')]
+
+
+class GridTest(SimpleTestCase):
+    """Tests pour la génération en grille"""
+
+    def test_expand_grid(self):
+        """Test expansion prompts x providers x styles"""
+        cells = expand_grid(['a fox', 'a cat'], ['pollinations', 'segmind:kandinsky'], ['', 'anime'])
+
+        self.assertEqual(len(cells), 8)
+        self.assertEqual(cells[0].styled_prompt, 'a fox')
+        self.assertTrue(cells[1].styled_prompt.startswith('a fox, '))
+        self.assertEqual((cells[2].provider, cells[2].model), ('segmind', 'kandinsky'))
+
+    def test_estimate_grid(self):
+        """Test estimation du temps et du coût"""
+        cells = expand_grid(['a', 'b', 'c'], ['stability', 'pollinations'])
+        cells[0].error = 'API key required'
+        estimate = estimate_grid(cells, concurrency=2)
+
+        self.assertEqual(estimate['runnable_cells'], 5)
+        self.assertEqual(estimate['providers']['stability']['cells'], 2)
+        self.assertAlmostEqual(estimate['estimated_cost'], 0.16)
+        self.assertEqual(estimate['estimated_seconds'], 16)  # 2 rounds of pollinations
+
+    def test_bounded_concurrency_per_provider(self):
+        """Test concurrence bornée par provider"""
+        client = SlowClient()
+        cells = expand_grid([f'prompt {i}' for i in range(6)], ['pollinations'])
+        for cell in cells:
+            cell.generation = {'client': client, 'prompt': cell.styled_prompt, 'options': {}}
+
+        results = list(iter_grid(cells, concurrency=2))
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(client.max_running, 2)
+        self.assertTrue(all(result.images for result in results))
+
+
+class GridViewTest(TestCase):
+    """Tests des endpoints de grille"""
+
+    def setUp(self):
+        self.client = Client()
+
+    @override_settings(STABILITY_AI_API_KEY='')
+    def test_estimate_endpoint(self):
+        """Test estimation avant génération"""
+        response = self.client.post(
+            reverse('you_image_generator:grid_estimate'),
+            json.dumps({'prompts': ['a fox'], 'providers': ['pollinations', 'stability'], 'styles': ['anime']}),
+            content_type='application/json'
+        )
+        data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['estimate']['cells'], 2)
+        self.assertEqual(data['estimate']['skipped'][0]['provider'], 'stability')
+
+    def test_unknown_style(self):
+        """Test style inconnu refusé"""
+        response = self.client.post(
+            reverse('you_image_generator:grid_estimate'),
+            json.dumps({'prompts': ['a fox'], 'providers': ['pollinations'], 'styles': ['nope']}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @patch('you_image_generator.views.get_api_client')
+    def test_grid_streams_cells(self, mock_get_client):
+        """Test résultats envoyés au fil de l'eau (NDJSON)"""
+        mock_client = Mock()
+        mock_client.agenerate_image = AsyncMock(
+            return_value=[Mock(prompt='a fox', model_used='test_model', image_data=b'fake_image', seed=None)]
+        )
+        mock_get_client.return_value = mock_client
+
+        response = self.client.post(
+            reverse('you_image_generator:grid_generate'),
+            json.dumps({'prompts': ['a fox'], 'providers': ['pollinations'], 'styles': ['', 'anime']}),
+            content_type='application/json'
+        )
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([line['type'] for line in lines], ['estimate', 'cell', 'cell', 'done'])
+        self.assertEqual(lines[-1]['succeeded'], 2)
+        self.assertEqual(GeneratedImage.objects.count(), 2)
+        self.assertEqual(set(GeneratedImage.objects.values_list('style_preset', flat=True)), {None, 'anime'})
@@ -0,0 +1,76 @@
+import asyncio
+from django.test import SimpleTestCase
+from you_image_generator.ai_clients import ImageResult
+from you_image_generator.hedging import (
+    hedged_generate,
+    generate_hedged,
+    HedgeCandidate,
+    HedgedGenerationError,
+)
+
+
+class FakeClient:
+    """Client simulé avec une latence et un résultat configurables"""
+    
+    def __init__(self, latency, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.started = False
+        self.cancelled = False
+    
+    async def agenerate_image(self, prompt, options=None):
+        self.started = True
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise Exception("provider down")
+        return [ImageResult(image_data=b'img', prompt=prompt, model_used='fake')]
+
+
+class HedgedGenerateTest(SimpleTestCase):
+    """Tests pour la génération en course entre providers"""
+    
+    def test_fast_primary_does_not_start_backup(self):
+        """Test que le second provider ne part pas si le premier répond avant le délai"""
+        primary, backup = FakeClient(0.01), FakeClient(0.01)
+        candidates = [HedgeCandidate('a', primary), HedgeCandidate('b', backup)]
+        
+        provider, results = asyncio.run(hedged_generate('cat', candidates, delay=0.5))
+        
+        self.assertEqual(provider, 'a')
+        self.assertEqual(len(results), 1)
+        self.assertFalse(backup.started)
+    
+    def test_slow_primary_is_cancelled(self):
+        """Test que le premier résultat gagne et que les autres sont annulés"""
+        slow, fast = FakeClient(5), FakeClient(0.01)
+        candidates = [HedgeCandidate('slow', slow), HedgeCandidate('fast', fast)]
+        
+        provider, _ = asyncio.run(hedged_generate('cat', candidates, delay=0.05))
+        
+        self.assertEqual(provider, 'fast')
+        self.assertTrue(slow.cancelled)
+    
+    def test_failure_starts_next_provider_immediately(self):
+        """Test démarrage immédiat du suivant en cas d'échec"""
+        candidates = [
+            HedgeCandidate('down', FakeClient(0, fail=True)),
+            HedgeCandidate('up', FakeClient(0.01)),
+        ]
+        
+        provider, _ = generate_hedged('cat', candidates, delay=60)
+        self.assertEqual(provider, 'up')
+    
+    def test_all_providers_fail(self):
+        """Test erreur quand tous les providers échouent"""
+        candidates = [
+            HedgeCandidate('a', FakeClient(0, fail=True)),
+            HedgeCandidate('b', FakeClient(0, fail=True)),
+        ]
+        
+        with self.assertRaises(HedgedGenerationError) as ctx:
+            asyncio.run(hedged_generate('cat', candidates, delay=0.01))
+        self.assertEqual(set(ctx.exception.errors), {'a', 'b'})
@@ -0,0 +1,115 @@
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from you_image_generator.blob_storage import get_blob_store
+from you_image_generator.image_serving import RangeNotSatisfiable, parse_range
+from you_image_generator.models import GeneratedImage
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+
+
+class ParseRangeTest(SimpleTestCase):
+    """Tests pour l'en-tête Range"""
+
+    def test_ranges(self):
+        """Test plages simples, ouvertes et suffixes"""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_whole_blob(self):
+        """Test en-têtes absents, invalides ou multiples ignorés"""
+        for header in (None, '', 'items=0-1', 'bytes=0-1,5-6', 'bytes=5-2', 'bytes=-'):
+            self.assertIsNone(parse_range(header, 100), msg=header)
+
+    def test_not_satisfiable(self):
+        """Test plage hors du blob"""
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=100-', 100)
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=-0', 100)
+
+
+class ImageFileViewTest(TestCase):
+    """Tests pour image/<id>/"""
+
+    def setUp(self):
+        self.image = GeneratedImage.objects.create(prompt='a cat', image_data=PNG, output_format='PNG')
+        self.url = reverse('you_image_generator:image_file', args=[self.image.id])
+
+    def test_full_image(self):
+        """Test image complète avec en-têtes de cache"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), PNG)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Content-Length'], str(len(PNG)))
+        self.assertEqual(response['ETag'], f'"{self.image.image_key}"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_not_modified(self):
+        """Test 304 sur If-None-Match"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.content, b'')
+
+    def test_range(self):
+        """Test 206 sur Range"""
+        response = self.client.get(self.url, headers={'Range': 'bytes=8-15'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), PNG[8:16])
+        self.assertEqual(response['Content-Range'], f'bytes 8-15/{len(PNG)}')
+        self.assertEqual(response['Content-Length'], '8')
+
+        response = self.client.get(self.url, headers={'Range': f'bytes={len(PNG)}-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(PNG)}')
+
+    def test_if_range_mismatch(self):
+        """Test image complète si If-Range ne correspond plus"""
+        response = self.client.get(self.url, headers={'Range': 'bytes=0-9', 'If-Range': '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_head(self):
+        """Test HEAD sans lecture du blob"""
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(PNG)))
+        self.assertEqual(response.content, b'')
+
+    def test_legacy_row(self):
+        """Test ligne dont l'image est encore dans la base"""
+        GeneratedImage.objects.filter(pk=self.image.pk).update(
+            image_key=None, image_size=None, legacy_image_data=PNG,
+        )
+        response = self.client.get(self.url, headers={'Range': 'bytes=0-7'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, PNG[:8])
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    @override_settings(IMAGE_SENDFILE='x-accel-redirect', IMAGE_ACCEL_REDIRECT_PREFIX='/protected-blobs/')
+    def test_accel_redirect(self):
+        """Test envoi délégué à nginx"""
+        response = self.client.get(self.url)
+        key = self.image.image_key
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-blobs/{key[:2]}/{key[2:4]}/{key}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], f'"{key}"')
+
+    @override_settings(IMAGE_SENDFILE='x-sendfile')
+    def test_sendfile(self):
+        """Test envoi délégué à Apache / lighttpd"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], get_blob_store().local_path(self.image.image_key))
+
+    def test_missing(self):
+        """Test 404 pour une image ou un blob absents"""
+        self.assertEqual(self.client.get(reverse('you_image_generator:image_file', args=[999])).status_code, 404)
+        get_blob_store().delete(self.image.image_key)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
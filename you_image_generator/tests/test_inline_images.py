@@ -0,0 +1,65 @@
+import base64
+import json
+from django.test import SimpleTestCase
+from unittest.mock import patch, Mock
+from you_image_generator.ai_clients import CloudflareAIClient, GeminiClient
+from you_image_generator.inline_images import Base64FieldExtractor
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+
+
+def gemini_body(image: bytes) -> bytes:
+    return json.dumps({
+        'candidates': [{
+            'content': {'parts': [
+                {'text': 'Here is "data": your image'},
+                {'inlineData': {'mimeType': 'image/png', 'data': base64.b64encode(image).decode()}},
+            ]},
+            'finishReason': 'STOP',
+        }],
+        'usageMetadata': {'data': 'not this one'},
+    }).encode()
+
+
+def extract(body: bytes, path, size: int) -> bytes:
+    extractor = Base64FieldExtractor(path)
+    for i in range(0, len(body), size):
+        if extractor.feed(body[i:i + size]):
+            break
+    return extractor.getvalue()
+
+
+class Base64FieldExtractorTest(SimpleTestCase):
+    """Tests pour l'extraction base64 en flux"""
+
+    def test_any_chunking(self):
+        """Test champ imbriqué décodé quel que soit le découpage"""
+        body = gemini_body(PNG)
+        for size in (1, 3, 5, 64, len(body)):
+            self.assertEqual(extract(body, GeminiClient.IMAGE_FIELD, size), PNG, size)
+
+    def test_escaped_slashes(self):
+        """Test échappements JSON dans la chaîne base64"""
+        encoded = base64.b64encode(PNG).decode().replace('/', '\\/')
+        body = ('{"success": true, "result": {"image": "%s"}}' % encoded).encode()
+        self.assertEqual(extract(body, CloudflareAIClient.IMAGE_FIELD, 7), PNG)
+
+    def test_missing_field(self):
+        """Test champ absent"""
+        with self.assertRaises(ValueError):
+            extract(b'{"result": {"other": "abc"}}', ('result', 'image'), 4)
+
+    @patch('requests.Session.request')
+    def test_gemini_client(self, mock_request):
+        """Test client Gemini sans parser le document complet"""
+        body = gemini_body(PNG)
+        mock_request.return_value = Mock(status_code=200)
+        mock_request.return_value.iter_content.side_effect = lambda chunk_size: (
+            body[i:i + chunk_size] for i in range(0, len(body), chunk_size)
+        )
+
+        results = GeminiClient('fake_api_key').generate_image('a fox')
+
+        self.assertEqual(results[0].image_data, PNG)
+        self.assertTrue(mock_request.call_args.kwargs['stream'])
+        mock_request.return_value.json.assert_not_called()
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from django.test import SimpleTestCase
+from you_image_generator.job_poller import JobPoller, JobPending, PENDING
+
+
+class JobPollerTest(SimpleTestCase):
+    """Tests pour le poller de jobs partagé"""
+    
+    def setUp(self):
+        self.poller = JobPoller()
+    
+    def tearDown(self):
+        self.poller.shutdown()
+    
+    def _job(self, pending_checks, result='done'):
+        state = {'checks': 0, 'threads': set()}
+        
+        async def check():
+            state['checks'] += 1
+            state['threads'].add(threading.get_ident())
+            if state['checks'] <= pending_checks:
+                return PENDING
+            return result
+        return check, state
+    
+    def test_job_resolves_future(self):
+        """Test que le future reçoit le résultat une fois le job terminé"""
+        check, state = self._job(pending_checks=2, result='http://img')
+        future = self.poller.submit(check, job_id='a', interval=0.01, max_interval=0.02)
+        
+        self.assertEqual(future.result(timeout=5), 'http://img')
+        self.assertEqual(state['checks'], 3)
+    
+    def test_many_jobs_share_one_thread(self):
+        """Test que plusieurs jobs sont multiplexés sur une seule boucle"""
+        jobs = [self._job(pending_checks=3) for _ in range(10)]
+        futures = [
+            self.poller.submit(check, interval=0.01, max_interval=0.02)
+            for check, _ in jobs
+        ]
+        
+        for future in futures:
+            self.assertEqual(future.result(timeout=5), 'done')
+        threads = set().union(*(state['threads'] for _, state in jobs))
+        self.assertEqual(len(threads), 1)
+    
+    def test_job_failure_and_timeout(self):
+        """Test propagation des erreurs et du timeout"""
+        async def failing():
+            raise ValueError("Generation failed")
+        
+        async def never_done():
+            return JobPending(retry_after=0.01)
+        
+        with self.assertRaises(ValueError):
+            self.poller.submit(failing, interval=0.01).result(timeout=5)
+        with self.assertRaises(TimeoutError):
+            self.poller.submit(never_done, interval=0.01, timeout=0.1).result(timeout=5)
+    
+    def test_wait_from_another_loop(self):
+        """Test attente asynchrone depuis une autre boucle"""
+        check, _ = self._job(pending_checks=1, result=42)
+        
+        result = asyncio.run(self.poller.wait(check, interval=0.01))
+        self.assertEqual(result, 42)
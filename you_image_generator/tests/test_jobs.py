@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import socket
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.test import TestCase, Client, AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+from unittest.mock import patch, Mock, AsyncMock
+from you_image_generator.ai_clients import AIHordeClient, SubnpClient
+from you_image_generator.jobs import (
+    DatabaseBroker, JobProgress, LocalBroker, claim_job, get_job_broker, job_event, requeue_stale_jobs,
+    recover_stale_job, reset_job_broker, run_job,
+)
+from you_image_generator.models import GeneratedImage, GenerationJob
+from you_image_generator.progress import progress_reporter
+from you_image_generator.single_flight import SingleFlight
+from you_image_generator.sse import SSEEvent
+
+
+def fake_runner(data):
+    return {'prompt': data.get('prompt'), 'seed': data.getlist('seed')}, 200
+
+
+class JobBrokerTest(TestCase):
+    """Tests pour la file de générations en arrière-plan"""
+
+    def tearDown(self):
+        reset_job_broker()
+
+    def test_broker_from_settings(self):
+        """Test choix du broker par configuration"""
+        reset_job_broker()
+        with self.settings(GENERATION_JOB_BROKER='local', GENERATION_WORKERS=3):
+            broker = get_job_broker()
+        self.assertIsInstance(broker, LocalBroker)
+        self.assertEqual(broker.workers, 3)
+
+        reset_job_broker()
+        with self.settings(GENERATION_JOB_BROKER='database'):
+            self.assertIsInstance(get_job_broker(), DatabaseBroker)
+
+    def test_claim_once(self):
+        """Test un job n'est réclamé que par un seul worker"""
+        job = GenerationJob.objects.create(request_data={'prompt': ['a cat']})
+
+        claimed = claim_job(job.id)
+        self.assertEqual(claimed.status, GenerationJob.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(claim_job(job.id))
+        self.assertIsNone(claim_job())
+
+    def test_custom_runner(self):
+        """Test runner configurable"""
+        job = GenerationJob.objects.create(request_data={'prompt': ['a cat'], 'seed': ['1', '2']})
+
+        with self.settings(GENERATION_JOB_RUNNER='you_image_generator.tests.test_jobs.fake_runner'):
+            self.assertEqual(run_job(), GenerationJob.STATUS_SUCCEEDED)
+
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'prompt': 'a cat', 'seed': ['1', '2']})
+        self.assertEqual(job.http_status, 200)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_requeue_stale_jobs(self):
+        """Test reprise des jobs dont le worker a disparu"""
+        long_ago = timezone.now() - timedelta(seconds=700)
+        retry = GenerationJob.objects.create(status=GenerationJob.STATUS_RUNNING, started_at=long_ago, attempts=1)
+        given_up = GenerationJob.objects.create(status=GenerationJob.STATUS_RUNNING, started_at=long_ago, attempts=2)
+
+        self.assertEqual(requeue_stale_jobs(timeout=600, max_attempts=2), 1)
+        retry.refresh_from_db()
+        given_up.refresh_from_db()
+        self.assertEqual(retry.status, GenerationJob.STATUS_QUEUED)
+        self.assertEqual(given_up.status, GenerationJob.STATUS_FAILED)
+
+    def test_recover_job_of_exited_process(self):
+        """Test reprise immédiate d'un job dont le processus web a redémarré"""
+        job = GenerationJob.objects.create(
+            status=GenerationJob.STATUS_RUNNING, started_at=timezone.now(), attempts=1,
+            worker=f'{socket.gethostname()}:999999999:generation-job_0',
+        )
+        with self.settings(GENERATION_JOB_BROKER='database'), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(recover_stale_job(job).status, GenerationJob.STATUS_QUEUED)
+
+        alive = GenerationJob.objects.create(
+            status=GenerationJob.STATUS_RUNNING, started_at=timezone.now(), attempts=1,
+            worker=f'{socket.gethostname()}:{os.getpid()}:generation-job_0',
+        )
+        self.assertEqual(recover_stale_job(alive).status, GenerationJob.STATUS_RUNNING)
+
+    def test_timed_out_job_reported_failed(self):
+        """Test job expiré sans nouvelle tentative signalé en échec"""
+        job = GenerationJob.objects.create(
+            status=GenerationJob.STATUS_RUNNING, attempts=2, worker='other-host:1:t',
+            started_at=timezone.now() - timedelta(seconds=700),
+        )
+        status = json.loads(Client().get(reverse('you_image_generator:job_status', args=[job.id])).content)
+        self.assertEqual(status['status'], GenerationJob.STATUS_FAILED)
+        self.assertEqual(status['error'], 'Worker lost')
+
+
+@patch('you_image_generator.views._get_provider_credentials', return_value=('test_key', None))
+@patch('you_image_generator.views.get_api_client')
+class JobViewTest(TestCase):
+    """Tests des endpoints de jobs"""
+
+    def setUp(self):
+        reset_job_broker()
+        self.client = Client()
+
+    def tearDown(self):
+        reset_job_broker()
+
+    def _enqueue(self, **form):
+        with self.settings(GENERATION_JOB_BROKER='database'), self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('you_image_generator:generate_api'),
+                {'prompt': 'a red fox', 'provider': 'pollinations', 'background': '1', **form},
+            )
+
+    def test_enqueue_then_result(self, mock_get_client, mock_credentials):
+        """Test réponse immédiate avec l'id du job, puis résultat"""
+        mock_get_client.return_value.generate_image.return_value = [
+            Mock(prompt='a red fox', model_used='test_model', image_data=b'fake_image', seed=None)
+        ]
+
+        response = self._enqueue()
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(data['status'], 'queued')
+        self.assertEqual(data['position'], 0)
+        mock_get_client.assert_not_called()
+
+        pending = self.client.get(data['result_url'])
+        self.assertEqual(pending.status_code, 202)
+
+        self.assertEqual(run_job(), GenerationJob.STATUS_SUCCEEDED)
+
+        status = json.loads(self.client.get(data['status_url']).content)
+        self.assertEqual(status['status'], 'succeeded')
+        self.assertNotIn('image_base64', status['result'])
+
+        result = self.client.get(data['result_url'])
+        body = json.loads(result.content)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(body['id'], GeneratedImage.objects.get().id)
+        self.assertEqual(body['image_base64'], 'ZmFrZV9pbWFnZQ==')
+
+    def test_identical_jobs_share_generation(self, mock_get_client, mock_credentials):
+        """Test deux jobs identiques: un seul appel au provider"""
+        mock_get_client.return_value.generate_image.return_value = [
+            Mock(prompt='a red fox', model_used='test_model', image_data=b'fake_image', seed=None)
+        ]
+        first = json.loads(self._enqueue().content)
+        second = json.loads(self._enqueue().content)
+
+        self.assertEqual(run_job(first['job_id']), GenerationJob.STATUS_SUCCEEDED)
+        first_result = GenerationJob.objects.get(pk=first['job_id']).result
+        # The second job starts while the first one is still running in another worker
+        with patch.object(SingleFlight, '_claim', return_value=False), \
+                patch.object(SingleFlight, '_check', return_value=('done', [first_result, 200])):
+            self.assertEqual(run_job(second['job_id']), GenerationJob.STATUS_SUCCEEDED)
+
+        second_result = GenerationJob.objects.get(pk=second['job_id']).result
+        self.assertEqual(mock_get_client.return_value.generate_image.call_count, 1)
+        self.assertEqual(second_result['id'], first_result['id'])
+        self.assertTrue(second_result['coalesced'])
+
+    def test_failed_job(self, mock_get_client, mock_credentials):
+        """Test erreur du provider rapportée par le job"""
+        mock_get_client.return_value.generate_image.side_effect = Exception('down')
+
+        data = json.loads(self._enqueue().content)
+        self.assertEqual(run_job(), GenerationJob.STATUS_FAILED)
+
+        result = self.client.get(data['result_url'])
+        self.assertGreaterEqual(result.status_code, 400)
+        self.assertIn('error', json.loads(result.content))
+
+    def test_invalid_prompt_not_queued(self, mock_get_client, mock_credentials):
+        """Test prompt invalide refusé sans créer de job"""
+        response = self._enqueue(prompt='a')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_unknown_job(self, mock_get_client, mock_credentials):
+        """Test job inconnu"""
+        response = self.client.get(reverse('you_image_generator:job_status', args=['00000000-0000-0000-0000-000000000000']))
+        self.assertEqual(response.status_code, 404)
+
+
+class JobProgressTest(TestCase):
+    """Tests des événements de progression"""
+
+    def test_job_events(self):
+        """Test événements normalisés d'un job"""
+        first = GenerationJob.objects.create()
+        second = GenerationJob.objects.create()
+        self.assertEqual(job_event(second), ('queued', {'position': 1}))
+
+        claim_job(first.id)
+        first.refresh_from_db()
+        self.assertEqual(job_event(first), ('processing', {}))
+
+        JobProgress(first.id)('position', {'provider': 'aihorde', 'position': 3})
+        first.refresh_from_db()
+        self.assertEqual(job_event(first), ('position', {'provider': 'aihorde', 'position': 3}))
+
+    def test_status_reports_progress(self):
+        """Test progression incluse dans le statut pour le polling"""
+        job = GenerationJob.objects.create()
+        claim_job(job.id)
+        JobProgress(job.id)('position', {'provider': 'aihorde', 'position': 3})
+
+        status = json.loads(Client().get(reverse('you_image_generator:job_status', args=[job.id])).content)
+        self.assertEqual(status['progress'], {'stage': 'position', 'provider': 'aihorde', 'position': 3})
+
+    def test_horde_queue_relayed(self):
+        """Test position dans la file AI Horde relayée"""
+        events = []
+        client = AIHordeClient()
+        check_response = Mock()
+        check_response.json.return_value = {'done': False, 'queue_position': 4, 'wait_time': 30, 'processing': 0}
+
+        with progress_reporter(lambda stage, details: events.append((stage, details))):
+            check = client._poll_job('job-1')
+        with patch.object(client, '_aget', AsyncMock(return_value=check_response)):
+            asyncio.run(check())
+
+        self.assertEqual(events, [('position', {'provider': 'aihorde', 'position': 4, 'wait_time': 30})])
+
+    def test_subnp_status_relayed(self):
+        """Test statuts SSE Subnp relayés"""
+        events = []
+        with progress_reporter(lambda stage, details: events.append((stage, details))):
+            SubnpClient()._handle_event(SSEEvent(data='{"status": "processing", "message": "Generating"}'), 1, 'magic')
+        self.assertEqual(events, [('processing', {'provider': 'subnp', 'message': 'Generating'})])
+
+    async def test_event_stream(self):
+        """Test flux SSE asynchrone jusqu'à la fin du job"""
+        job = await GenerationJob.objects.acreate()
+
+        def finish_job():
+            claim_job(job.id)
+            GenerationJob.objects.filter(pk=job.id).update(status=GenerationJob.STATUS_SUCCEEDED, result={'id': 1})
+
+        async def worker_progress(seconds):
+            # Stands for the worker between two checks of the stream
+            await sync_to_async(finish_job)()
+
+        with patch('you_image_generator.views.asyncio.sleep', side_effect=worker_progress):
+            response = await AsyncClient().get(reverse('you_image_generator:job_events', args=[job.id]))
+            content = ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = [line[7:] for line in content.splitlines() if line.startswith('event: ')]
+        self.assertEqual(events, ['queued', 'complete'])
+        self.assertIn('"result": {"id": 1}', content)
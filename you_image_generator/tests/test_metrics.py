@@ -0,0 +1,171 @@
+import json
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from unittest.mock import patch, Mock
+from you_image_generator.ai_clients import BaseImageGenerationModel, ImageResult
+from you_image_generator.metrics import (
+    MetricsRegistry, track_provider_call, note_first_byte, note_retry, outcome_class,
+    get_metrics_registry, reset_metrics_registry,
+)
+from you_image_generator.rate_limiter import RateLimitExceeded
+from you_image_generator.circuit_breaker import reset_circuit_breakers
+from you_image_generator.retry_policy import RetryPolicy
+
+
+class StubClient(BaseImageGenerationModel):
+    provider = 'stub'
+
+    def generate_image(self, prompt, options=None):
+        return [ImageResult(image_data=b'\x89PNG' + b'0' * 20, prompt=prompt, model_used='stub')]
+
+
+class MetricsRegistryTest(SimpleTestCase):
+    """Tests pour le registre de métriques"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_render_prometheus_format(self):
+        """Test compteurs et histogrammes au format texte Prometheus"""
+        registry = MetricsRegistry()
+        labels = {'provider': 'pollinations', 'model': 'flux'}
+        registry.inc('openimage_provider_requests_total', {**labels, 'outcome': 'success'})
+        registry.inc('openimage_provider_requests_total', {**labels, 'outcome': 'success'})
+        registry.observe('openimage_provider_duration_seconds', labels, 0.3)
+        registry.observe('openimage_provider_duration_seconds', labels, 7)
+
+        text = registry.render()
+        self.assertIn('# TYPE openimage_provider_requests_total counter', text)
+        self.assertIn(
+            'openimage_provider_requests_total{model="flux",outcome="success",provider="pollinations"} 2', text
+        )
+        self.assertIn('openimage_provider_duration_seconds_bucket{model="flux",provider="pollinations",le="0.5"} 1', text)
+        self.assertIn('openimage_provider_duration_seconds_bucket{model="flux",provider="pollinations",le="10"} 2', text)
+        self.assertIn('openimage_provider_duration_seconds_bucket{model="flux",provider="pollinations",le="+Inf"} 2', text)
+        self.assertIn('openimage_provider_duration_seconds_sum{model="flux",provider="pollinations"} 7.3', text)
+        self.assertIn('openimage_provider_duration_seconds_count{model="flux",provider="pollinations"} 2', text)
+
+    def test_label_escaping(self):
+        """Test échappement des valeurs de labels"""
+        registry = MetricsRegistry()
+        registry.inc('openimage_provider_retries_total', {'provider': 'x', 'model': 'a"b\\c'})
+        self.assertIn('model="a\\"b\\\\c"', registry.render())
+
+    def test_aggregates_processes(self):
+        """Test somme des valeurs écrites par chaque processus"""
+        labels = {'provider': 'gemini', 'model': 'default'}
+        first = MetricsRegistry(self.directory, flush_interval=0)
+        second = MetricsRegistry(self.directory, flush_interval=0)
+        second._path = f'{self.directory}/metrics-other.json'
+        for registry in (first, second):
+            registry.inc('openimage_provider_received_bytes_total', labels, 100)
+            registry.observe('openimage_provider_ttfb_seconds', labels, 0.2)
+
+        text = first.render()
+        self.assertIn('openimage_provider_received_bytes_total{model="default",provider="gemini"} 200', text)
+        self.assertIn('openimage_provider_ttfb_seconds_count{model="default",provider="gemini"} 2', text)
+
+    def test_dead_processes_merged(self):
+        """Test fusion des fichiers des processus terminés dans l'archive"""
+        labels = [['model', 'default'], ['provider', 'gemini']]
+        snapshot = {'counters': [['openimage_provider_received_bytes_total', labels, 100]], 'histograms': []}
+        for name in ('metrics-999999991-1.json', 'metrics-999999992-1.json', f'metrics-{os.getpid()}-1.json'):
+            with open(os.path.join(self.directory, name), 'w') as f:
+                json.dump(snapshot, f)
+
+        registry = MetricsRegistry(self.directory, flush_interval=0)
+        registry.inc('openimage_provider_retries_total', {'provider': 'x', 'model': 'y'})
+
+        files = sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+        self.assertIn('metrics-archive.json', files)
+        self.assertNotIn('metrics-999999991-1.json', files)
+        self.assertIn(f'metrics-{os.getpid()}-1.json', files)
+        self.assertIn('openimage_provider_received_bytes_total{model="default",provider="gemini"} 300',
+                      registry.render())
+
+    def test_flush_throttled(self):
+        """Test écriture au plus une fois par intervalle"""
+        registry = MetricsRegistry(self.directory, flush_interval=60)
+        with patch('you_image_generator.metrics.json.dump') as dump:
+            for _ in range(5):
+                registry.inc('openimage_provider_retries_total', {'provider': 'x', 'model': 'y'})
+        self.assertEqual(dump.call_count, 1)
+
+
+@override_settings(METRICS_DIR='')
+class ProviderCallTrackingTest(SimpleTestCase):
+    """Tests pour la mesure des appels aux providers"""
+
+    def setUp(self):
+        reset_metrics_registry()
+        reset_circuit_breakers()
+        self.addCleanup(reset_metrics_registry)
+        self.addCleanup(reset_circuit_breakers)
+
+    def test_track_call(self):
+        """Test durée, TTFB, retries et octets reçus d'un appel"""
+        with track_provider_call('pollinations', 'flux') as call:
+            note_first_byte()
+            note_retry()
+            call.results = [Mock(image_data=b'x' * 50)]
+
+        text = get_metrics_registry().render()
+        labels = 'model="flux",provider="pollinations"'
+        self.assertIn(f'openimage_provider_requests_total{{model="flux",outcome="success",provider="pollinations"}} 1', text)
+        self.assertIn(f'openimage_provider_duration_seconds_count{{{labels}}} 1', text)
+        self.assertIn(f'openimage_provider_ttfb_seconds_count{{{labels}}} 1', text)
+        self.assertIn(f'openimage_provider_retries_total{{{labels}}} 1', text)
+        self.assertIn(f'openimage_provider_received_bytes_total{{{labels}}} 50', text)
+
+    def test_hooks_outside_call_ignored(self):
+        """Test hooks sans appel en cours sans effet"""
+        note_first_byte()
+        note_retry()
+        self.assertNotIn('provider=', get_metrics_registry().render())
+
+    def test_outcome_classes(self):
+        """Test classes de résultat"""
+        self.assertEqual(outcome_class(None, []), 'empty')
+        self.assertEqual(outcome_class(RateLimitExceeded('x', 'rpm', 1.0)), 'rate_limited')
+        self.assertEqual(outcome_class(TimeoutError()), 'timeout')
+        self.assertEqual(outcome_class(Mock(spec=Exception, status_code=429, response=None)), 'client_error')
+        self.assertEqual(outcome_class(ValueError('boom')), 'error')
+
+    def test_failed_call_counted(self):
+        """Test appel en échec compté avec sa classe"""
+        with self.assertRaises(ValueError):
+            with track_provider_call('gemini'):
+                raise ValueError('boom')
+        self.assertIn(
+            'openimage_provider_requests_total{model="default",outcome="error",provider="gemini"} 1',
+            get_metrics_registry().render(),
+        )
+
+    def test_client_calls_tracked(self):
+        """Test generate_image des clients mesuré par le garde"""
+        StubClient().generate_image('a cat', {'model': 'any'})
+        text = get_metrics_registry().render()
+        self.assertIn('openimage_provider_requests_total{model="any",outcome="success",provider="stub"} 1', text)
+        self.assertIn('openimage_provider_received_bytes_total{model="any",provider="stub"} 24', text)
+
+    @patch('you_image_generator.retry_policy.time.sleep')
+    def test_retries_counted(self, mock_sleep):
+        """Test retries de la politique comptés dans l'appel"""
+        policy = RetryPolicy(max_attempts=3, base_delay=0.1)
+        send = Mock(side_effect=[Mock(status_code=503, headers={}), Mock(status_code=200)])
+        with track_provider_call('huggingface') as call:
+            policy.call(send, 'GET', 'test')
+        self.assertEqual(call.retries, 1)
+
+    def test_metrics_endpoint(self):
+        """Test endpoint /api/metrics"""
+        with track_provider_call('subnp', 'flux') as call:
+            call.results = []
+        response = self.client.get(reverse('you_image_generator:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'outcome="empty",provider="subnp"', response.content)
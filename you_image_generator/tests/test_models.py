@@ -1,4 +1,7 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from you_image_generator.models import GeneratedImage
 from django.utils import timezone
 import base64
@@ -85,4 +88,59 @@ class GeneratedImageModelTest(TestCase):
         
         images = GeneratedImage.objects.all()
         self.assertEqual(images[0].id, newer_image.id)
-        self.assertEqual(images[1].id, older_image.id)
\ No newline at end of file
+        self.assertEqual(images[1].id, older_image.id)
+
+class GeneratedImageQueryTest(TestCase):
+    """Tests pour les requêtes sans la colonne des images"""
+
+    def setUp(self):
+        # Lignes anciennes : octets encore dans la colonne image_data
+        for i in range(5):
+            image = GeneratedImage.objects.create(prompt=f'cat {i}', tags=['cat'])
+            GeneratedImage.objects.filter(pk=image.pk).update(legacy_image_data=b'x' * 100_000)
+
+    def image_column_queries(self, queries):
+        return [q['sql'] for q in queries if '"image_data"' in q['sql']]
+
+    def test_default_queryset_defers_bytes(self):
+        """Test métadonnées seules par défaut"""
+        with CaptureQueriesContext(connection) as queries:
+            images = list(GeneratedImage.objects.all())
+            [image.prompt for image in images]
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.image_column_queries(queries), [])
+
+    def test_with_image_single_query(self):
+        """Test with_image() charge les octets sans requête par ligne"""
+        with self.assertNumQueries(1):
+            images = list(GeneratedImage.objects.with_image())
+            self.assertEqual(sum(len(image.image_data) for image in images), 500_000)
+
+    def test_deferred_bytes_loaded_on_access(self):
+        """Test octets toujours lisibles sans with_image()"""
+        image = GeneratedImage.objects.first()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(image.image_data), 100_000)
+
+    def test_metadata_update_skips_bytes(self):
+        """Test favori / note : seules les colonnes chargées sont écrites"""
+        image = GeneratedImage.objects.get(prompt='cat 0')
+        with CaptureQueriesContext(connection) as queries:
+            image.style_preset = 'anime'
+            image.save()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.image_column_queries(queries), [])
+        self.assertEqual(GeneratedImage.objects.with_image().get(pk=image.pk).legacy_image_data, b'x' * 100_000)
+
+    def test_search_suggestions_skip_bytes(self):
+        """Test suggestions de recherche sans la colonne des images"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('you_image_generator:search_suggestions'), {'q': 'cat'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.image_column_queries(queries), [])
+
+    def test_generator_view_skips_bytes(self):
+        """Test page principale sans la colonne des images"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('you_image_generator:generator'))
+        self.assertEqual(self.image_column_queries(queries), [])
@@ -0,0 +1,161 @@
+from datetime import timedelta
+from django.db import IntegrityError
+from django.test import TestCase
+from unittest.mock import patch
+from you_image_generator.ai_clients import SegmindClient
+from you_image_generator.circuit_breaker import CircuitOpenError, get_circuit_breaker, reset_circuit_breakers
+from you_image_generator.models import ProviderQuota
+from you_image_generator.rate_limiter import (
+    DatabaseRateLimitBackend,
+    ProviderLimit,
+    RateLimiter,
+    RateLimitExceeded,
+    get_rate_limiter,
+    reset_rate_limiter,
+)
+
+
+class RateLimiterTest(TestCase):
+    """Tests pour le limiteur de quotas partagé entre workers"""
+
+    def setUp(self):
+        reset_rate_limiter()
+        reset_circuit_breakers()
+
+    def tearDown(self):
+        reset_rate_limiter()
+        reset_circuit_breakers()
+
+    def _limiter(self, **limit):
+        return RateLimiter({'test': ProviderLimit(**limit)}, DatabaseRateLimitBackend())
+
+    def test_daily_quota(self):
+        """Test quota journalier épuisé"""
+        limiter = self._limiter(daily_quota=2)
+        limiter.acquire('test')
+        limiter.acquire('test')
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            limiter.acquire('test')
+        self.assertEqual(ctx.exception.reason, 'daily_quota')
+        self.assertEqual(ProviderQuota.objects.get(provider='test').used_today, 2)
+
+    def test_daily_quota_resets_next_day(self):
+        """Test remise à zéro du quota le lendemain (UTC)"""
+        limiter = self._limiter(daily_quota=1)
+        limiter.acquire('test')
+        quota = ProviderQuota.objects.get(provider='test')
+        quota.day -= timedelta(days=1)
+        quota.save()
+
+        limiter.acquire('test')
+        self.assertEqual(limiter.remaining_budget('test')['daily_remaining'], 0)
+
+    def test_daily_quota_counts_images(self):
+        """Test quota journalier décompté par image (lots natifs)"""
+        limiter = self._limiter(daily_quota=5)
+        limiter.acquire('test', cost=4)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire('test', cost=2)
+        limiter.acquire('test')
+        self.assertEqual(ProviderQuota.objects.get(provider='test').used_today, 5)
+
+    def test_batch_call_charged_per_image(self):
+        """Test un appel Segmind de 4 images consomme 4 du quota"""
+        with self.settings(RATE_LIMITS={'segmind': {'daily_quota': 10}}):
+            limiter = get_rate_limiter()
+        client = SegmindClient(api_key='test_key')
+
+        with patch('requests.Session.request', side_effect=ConnectionError('down')):
+            with self.assertRaises(Exception):
+                client.generate_image('a cat', {'num_images': 4})
+        self.assertEqual(limiter.remaining_budget('segmind')['daily_remaining'], 6)
+
+    def test_token_bucket(self):
+        """Test seau à jetons: rafale puis attente"""
+        limiter = self._limiter(per_minute=6, burst=2)
+        limiter.acquire('test')
+        limiter.acquire('test')
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            limiter.acquire('test')
+        self.assertEqual(ctx.exception.reason, 'rate')
+        self.assertGreater(ctx.exception.retry_in, 0)
+        self.assertLessEqual(ctx.exception.retry_in, 10)
+
+    def test_quota_row_conflict_not_silent(self):
+        """Test pas de passage sans jeton si la ligne de quota reste en conflit"""
+        limiter = self._limiter(daily_quota=2)
+        with patch.object(ProviderQuota.objects, 'select_for_update', side_effect=IntegrityError('conflict')):
+            with self.assertRaises(IntegrityError):
+                limiter.acquire('test')
+
+    def test_remaining_budget(self):
+        """Test budget restant"""
+        limiter = self._limiter(per_minute=60, burst=5, daily_quota=10)
+        self.assertEqual(limiter.remaining_budget('test')['daily_remaining'], 10)
+
+        limiter.acquire('test')
+        budget = limiter.remaining_budget('test')
+        self.assertEqual(budget['daily_remaining'], 9)
+        self.assertEqual(budget['requests_available'], 4)
+        self.assertTrue(budget['has_headroom'])
+
+        self.assertIsNone(limiter.remaining_budget('unlimited'))
+        self.assertTrue(limiter.has_headroom('unlimited'))
+
+    def test_settings_override(self):
+        """Test limites définies dans les settings"""
+        with self.settings(RATE_LIMITS={'stability': {'daily_quota': 3}}):
+            limiter = get_rate_limiter()
+        self.assertTrue(limiter.is_limited('stability'))
+        self.assertTrue(limiter.is_limited('cloudflare'))
+        self.assertFalse(limiter.is_limited('pollinations'))
+
+    def test_client_throttled_before_dispatch(self):
+        """Test qu'un provider sans quota n'est pas appelé"""
+        with self.settings(RATE_LIMITS={'segmind': {'daily_quota': 0}}):
+            get_rate_limiter()
+        client = SegmindClient(api_key='test_key')
+
+        with patch('requests.Session.request') as mock_request:
+            with self.assertRaises(RateLimitExceeded):
+                client.generate_image('a cat', {})
+
+        mock_request.assert_not_called()
+        self.assertEqual(get_circuit_breaker('segmind').snapshot()['calls'], 0)
+
+    def test_open_circuit_spends_no_quota(self):
+        """Test qu'un circuit ouvert ne consomme pas de quota"""
+        with self.settings(RATE_LIMITS={'segmind': {'daily_quota': 5}}):
+            limiter = get_rate_limiter()
+        get_circuit_breaker('segmind')._open('test')
+        client = SegmindClient(api_key='test_key')
+
+        with self.assertRaises(CircuitOpenError):
+            client.generate_image('a cat', {})
+        self.assertEqual(limiter.remaining_budget('segmind')['daily_remaining'], 5)
+
+    def test_throttled_probe_releases_slot(self):
+        """Test un appel test refusé par le quota rend sa place"""
+        with self.settings(RATE_LIMITS={'segmind': {'daily_quota': 0}}):
+            get_rate_limiter()
+        breaker = get_circuit_breaker('segmind')
+        breaker._open('test')
+        breaker.opened_at -= breaker.open_seconds
+        client = SegmindClient(api_key='test_key')
+
+        for _ in range(2):
+            with self.assertRaises(RateLimitExceeded):
+                client.generate_image('a cat', {})
+
+    def test_health_reports_budget(self):
+        """Test budget et statut dans check_all_providers"""
+        from you_image_generator.ai_clients import check_all_providers
+
+        with self.settings(RATE_LIMITS={'segmind': {'daily_quota': 0}}):
+            get_rate_limiter()
+        results = check_all_providers({'segmind': 'test_key'})
+
+        self.assertEqual(results['segmind']['status'], 'quota_exhausted')
+        self.assertFalse(results['segmind']['healthy'])
+        self.assertEqual(results['segmind']['budget']['daily_remaining'], 0)
+        self.assertIsNone(results['pollinations']['budget'])
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from unittest.mock import patch, Mock
+from you_image_generator.models import CachedResult, GeneratedImage
+from you_image_generator.result_cache import ResultCache, cache_key, reset_result_cache
+import json
+
+
+def _key(**overrides):
+    params = {
+        'provider': 'segmind', 'model': 'sdxl', 'prompt': 'a cat', 'negative_prompt': '',
+        'width': 512, 'height': 512, 'seed': 42, 'cfg_scale': 7.0, 'style': '',
+    }
+    params.update(overrides)
+    return cache_key(**params)
+
+
+class ResultCacheTest(TestCase):
+    """Tests pour le cache des générations déterministes"""
+
+    def setUp(self):
+        reset_result_cache()
+        self.image = GeneratedImage.objects.create(prompt='a cat', image_data=b'png', provider='segmind')
+
+    def tearDown(self):
+        reset_result_cache()
+
+    def test_cache_key(self):
+        """Test clé canonique"""
+        self.assertEqual(_key(), _key(prompt=' a cat ', cfg_scale=7))
+        self.assertNotEqual(_key(), _key(seed=43))
+        self.assertNotEqual(_key(), _key(style='anime'))
+        self.assertNotEqual(_key(), _key(provider='prodia'))
+
+    def test_put_and_get(self):
+        """Test stockage puis lecture"""
+        cache = ResultCache()
+        self.assertIsNone(cache.get(_key()))
+
+        cache.put(_key(), self.image.id)
+        self.assertEqual(cache.get(_key()), self.image)
+        self.assertEqual(CachedResult.objects.get().hits, 1)
+
+    def test_ttl(self):
+        """Test expiration"""
+        cache = ResultCache(ttl=60)
+        cache.put(_key(), self.image.id)
+        CachedResult.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertIsNone(cache.get(_key()))
+        self.assertFalse(CachedResult.objects.exists())
+        self.assertTrue(GeneratedImage.objects.filter(pk=self.image.pk).exists())
+
+    def test_lru_eviction(self):
+        """Test éviction des entrées les moins récemment utilisées"""
+        cache = ResultCache(max_entries=2)
+        cache.put(_key(seed=1), self.image.id)
+        cache.put(_key(seed=2), self.image.id)
+        CachedResult.objects.filter(key=_key(seed=1)).update(last_used_at=timezone.now() + timedelta(seconds=1))
+
+        cache.put(_key(seed=3), self.image.id)
+        self.assertEqual(
+            set(CachedResult.objects.values_list('key', flat=True)),
+            {_key(seed=1), _key(seed=3)},
+        )
+
+    def test_deleting_image_drops_entry(self):
+        """Test suppression de l'image"""
+        ResultCache().put(_key(), self.image.id)
+        self.image.delete()
+        self.assertFalse(CachedResult.objects.exists())
+
+
+@patch('you_image_generator.views._get_provider_credentials', return_value=('test_key', None))
+@patch('you_image_generator.views.get_api_client')
+class ResultCacheViewTest(TestCase):
+    """Tests du cache dans generate_image_api"""
+
+    form = {
+        'prompt': 'a red fox',
+        'provider': 'segmind',
+        'seed': '1234',
+        'cfg_scale': '7',
+        'width': '512',
+        'height': '512',
+    }
+
+    def setUp(self):
+        reset_result_cache()
+        self.client = Client()
+
+    def tearDown(self):
+        reset_result_cache()
+
+    def _mock_client(self, mock_get_client):
+        result = Mock(prompt='a red fox', model_used='Segmind', image_data=b'fake_image', seed=None)
+        mock_get_client.return_value.generate_image.return_value = [result]
+        return mock_get_client.return_value
+
+    def test_seeded_request_served_from_cache(self, mock_get_client, mock_credentials):
+        """Test deuxième requête identique servie sans appel au provider"""
+        client = self._mock_client(mock_get_client)
+        first = json.loads(self.client.post(reverse('you_image_generator:generate_api'), self.form).content)
+        self.assertEqual(client.generate_image.call_args.kwargs['options']['seed'], 1234)
+
+        mock_get_client.reset_mock()
+        response = self.client.post(reverse('you_image_generator:generate_api'), self.form)
+        data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['cached'])
+        self.assertEqual(data['id'], first['id'])
+        mock_get_client.assert_not_called()
+
+    def test_bypass_flag(self, mock_get_client, mock_credentials):
+        """Test no_cache force une nouvelle génération"""
+        client = self._mock_client(mock_get_client)
+        self.client.post(reverse('you_image_generator:generate_api'), self.form)
+        response = self.client.post(reverse('you_image_generator:generate_api'), {**self.form, 'no_cache': '1'})
+
+        self.assertNotIn('cached', json.loads(response.content))
+        self.assertEqual(client.generate_image.call_count, 2)
+
+    def test_unseeded_request_not_cached(self, mock_get_client, mock_credentials):
+        """Test requête sans seed jamais mise en cache"""
+        self._mock_client(mock_get_client)
+        self.client.post(reverse('you_image_generator:generate_api'), {**self.form, 'seed': ''})
+        self.assertFalse(CachedResult.objects.exists())
@@ -0,0 +1,76 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from django.test import SimpleTestCase
+from unittest.mock import Mock, patch
+import requests
+from you_image_generator.downloads import ImageDownloadError
+from you_image_generator.retry_policy import RetryPolicy, parse_retry_after
+
+
+class RetryPolicyTest(SimpleTestCase):
+    """Tests pour la politique de retry"""
+    
+    def setUp(self):
+        sleep_patcher = patch('you_image_generator.retry_policy.time.sleep')
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+    
+    def test_parse_retry_after(self):
+        """Test lecture de Retry-After en secondes et en date HTTP"""
+        self.assertEqual(parse_retry_after('120'), 120.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        
+        when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(when), 30, delta=2)
+    
+    def test_retries_transient_status_with_retry_after(self):
+        """Test retry sur 429 en respectant Retry-After"""
+        throttled = Mock(status_code=429, headers={'retry-after': '7'})
+        ok = Mock(status_code=200, headers={})
+        send = Mock(side_effect=[throttled, ok])
+        
+        result = RetryPolicy().call(send, method='GET')
+        
+        self.assertIs(result, ok)
+        self.sleep.assert_called_once_with(7.0)
+        throttled.close.assert_called_once()
+    
+    def test_post_only_retries_unprocessed_statuses(self):
+        """Test qu'un POST n'est pas renvoyé sur 500 (déjà traité?)"""
+        error = Mock(status_code=500, headers={})
+        send = Mock(return_value=error)
+        
+        self.assertIs(RetryPolicy().call(send, method='POST'), error)
+        self.assertEqual(send.call_count, 1)
+    
+    def test_post_read_timeout_not_retried(self):
+        """Test qu'un timeout de lecture sur POST n'est pas renvoyé"""
+        send = Mock(side_effect=requests.ReadTimeout())
+        with self.assertRaises(requests.ReadTimeout):
+            RetryPolicy().call(send, method='POST')
+        self.assertEqual(send.call_count, 1)
+        
+        send = Mock(side_effect=[requests.ConnectionError(), 'ok'])
+        self.assertEqual(RetryPolicy().call(send, method='POST'), 'ok')
+    
+    def test_invalid_content_and_max_attempts(self):
+        """Test retry des corps non-image et nombre max de tentatives"""
+        error = ImageDownloadError("not an image", status_code=200, reason='content')
+        send = Mock(side_effect=error)
+        
+        with self.assertRaises(ImageDownloadError):
+            RetryPolicy(retry_invalid_content=True, max_attempts=3).call(send)
+        self.assertEqual(send.call_count, 3)
+        
+        send = Mock(side_effect=error)
+        with self.assertRaises(ImageDownloadError):
+            RetryPolicy().call(send)
+        self.assertEqual(send.call_count, 1)
+    
+    def test_deadline(self):
+        """Test qu'aucune tentative ne dépasse le délai global"""
+        send = Mock(return_value=Mock(status_code=503, headers={'retry-after': '60'}))
+        
+        RetryPolicy(deadline=30).call(send, method='GET')
+        self.assertEqual(send.call_count, 1)
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from django.http import QueryDict
+from django.test import TestCase
+from django.utils import timezone
+from unittest.mock import patch
+from you_image_generator.models import GeneratedImage, InFlightGeneration
+from you_image_generator.single_flight import SingleFlight, request_key
+from you_image_generator.views import _coalesced_response, _share_generation
+
+
+class SingleFlightTest(TestCase):
+    """Tests pour la déduplication des requêtes identiques en vol"""
+
+    def test_request_key(self):
+        """Test clé canonique indépendante de l'ordre et du jeton CSRF"""
+        a = QueryDict('prompt=cat&provider=segmind&seed=1&csrfmiddlewaretoken=x')
+        b = QueryDict('seed=1&provider=segmind&prompt=cat&csrfmiddlewaretoken=y')
+        c = QueryDict('prompt=cat&provider=segmind&seed=2')
+        self.assertEqual(request_key(a), request_key(b))
+        self.assertNotEqual(request_key(a), request_key(c))
+
+    def test_threads_share_one_call(self):
+        """Test plusieurs threads, un seul appel amont"""
+        flight = SingleFlight(distributed=False)
+        calls = []
+        results = []
+
+        def generate():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'id': 42}
+
+        def request():
+            results.append(flight.do('key', generate))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r[0] for r in results], [{'id': 42}] * 5)
+        self.assertEqual(sorted(r[1] for r in results), [False, True, True, True, True])
+        self.assertEqual(flight.in_flight, 0)
+
+    def test_error_shared_with_followers(self):
+        """Test erreur du leader transmise aux requêtes en attente"""
+        flight = SingleFlight(distributed=False)
+        started = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError('down')
+
+        def request():
+            try:
+                flight.do('key', failing)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=request)
+        leader.start()
+        started.wait()
+        request()
+        leader.join()
+        self.assertEqual(len(errors), 2)
+
+    def test_result_from_other_worker(self):
+        """Test attente du résultat publié par un autre worker"""
+        InFlightGeneration.objects.create(key='key', expires_at=timezone.now() + timedelta(seconds=60))
+        flight = SingleFlight(poll_interval=0)
+        published = [('running', None), ('done', [{'id': 7}, 200])]
+
+        with patch.object(flight, '_check', side_effect=published):
+            result, coalesced = flight.do('key', lambda: self.fail('should not generate'))
+        self.assertEqual(result, [{'id': 7}, 200])
+        self.assertTrue(coalesced)
+
+    def test_finished_row_not_reused(self):
+        """Test une requête arrivée après publication génère à nouveau"""
+        InFlightGeneration.objects.create(
+            key='key', result={'id': 7}, expires_at=timezone.now() + timedelta(seconds=2)
+        )
+        result, coalesced = SingleFlight().do('key', lambda: {'id': 8})
+        self.assertEqual(result, {'id': 8})
+        self.assertFalse(coalesced)
+
+    def test_takes_over_expired_lease(self):
+        """Test reprise d'un verrou expiré (worker mort)"""
+        InFlightGeneration.objects.create(key='key', expires_at=timezone.now() - timedelta(seconds=1))
+        flight = SingleFlight(linger=60)
+
+        result, coalesced = flight.do('key', lambda: {'id': 1})
+        self.assertEqual(result, {'id': 1})
+        self.assertFalse(coalesced)
+        self.assertEqual(InFlightGeneration.objects.get(key='key').result, {'id': 1})
+
+    def test_leader_renews_lease(self):
+        """Test renouvellement du bail pendant une génération longue"""
+        flight = SingleFlight(lease=0.03)
+
+        with patch.object(flight, '_renew') as renew:
+            flight.do('key', lambda: time.sleep(0.1) or {'id': 1})
+        self.assertGreaterEqual(renew.call_count, 2)
+
+        async def generate():
+            await asyncio.sleep(0.1)
+            return {'id': 2}
+
+        # Rows from the thread of sync_to_async are not visible inside the test transaction
+        with patch.object(flight, '_claim', return_value=True), patch.object(flight, '_publish'), \
+                patch.object(flight, '_renew') as renew:
+            asyncio.run(flight._alead('key', generate, None))
+        self.assertGreaterEqual(renew.call_count, 2)
+
+    def test_renew_extends_running_lease(self):
+        """Test le renouvellement repousse l'expiration du verrou"""
+        InFlightGeneration.objects.create(key='key', expires_at=timezone.now() + timedelta(seconds=1))
+        SingleFlight(lease=300)._renew('key')
+        self.assertGreater(InFlightGeneration.objects.get(key='key').expires_at,
+                           timezone.now() + timedelta(seconds=200))
+
+    def test_failed_leader_releases_lock(self):
+        """Test libération du verrou si la génération échoue"""
+        flight = SingleFlight()
+
+        def failing():
+            self.assertTrue(InFlightGeneration.objects.filter(key='key').exists())
+            raise RuntimeError('down')
+
+        with self.assertRaises(RuntimeError):
+            flight.do('key', failing)
+        self.assertFalse(InFlightGeneration.objects.filter(key='key').exists())
+
+    def test_coalesced_response_rows(self):
+        """Test une ligne partagée ou une ligne par requête"""
+        image = GeneratedImage.objects.create(prompt='cat', image_data=b'png')
+        shared = _share_generation(({'id': image.id, 'image_base64': 'cG5n'}, 200))
+        self.assertNotIn('image_base64', shared[0])
+
+        body, status = _coalesced_response(shared)
+        self.assertEqual(body['id'], image.id)
+        self.assertEqual(body['image_base64'], 'cG5n')
+        self.assertTrue(body['coalesced'])
+
+        with self.settings(SINGLE_FLIGHT_ROWS='per_request'):
+            body, status = _coalesced_response(shared)
+        self.assertNotEqual(body['id'], image.id)
+        self.assertEqual(GeneratedImage.objects.count(), 2)
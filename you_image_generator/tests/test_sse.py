@@ -0,0 +1,59 @@
+from django.test import SimpleTestCase
+from unittest.mock import patch, Mock
+from you_image_generator.ai_clients import SubnpClient
+from you_image_generator.sse import SSEEvent, SSEParser, iter_sse
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class SSEParserTest(SimpleTestCase):
+    """Tests pour le parseur SSE incrémental"""
+
+    stream = (
+        b'\xef\xbb\xbf: keep-alive\r\n'
+        b'id: 1\r\ndata: first\r\ndata: second\r\n\r\n'
+        b'event: status\rdata: {"status": "\xc3\xa9t\xc3\xa9"}\r\r'
+        b'retry: 3000\ndata\n\n'
+        b'data: unterminated'
+    )
+
+    def test_events(self):
+        """Test champs multi-lignes, id, event, retry et fins de ligne"""
+        events = list(iter_sse([self.stream]))
+        self.assertEqual(events, [
+            SSEEvent('message', 'first\nsecond', '1'),
+            SSEEvent('status', '{"status": "été"}', '1'),
+            SSEEvent('message', '', '1', 3000),
+        ])
+
+    def test_any_chunking(self):
+        """Test résultat identique quel que soit le découpage (CRLF, UTF-8 coupés)"""
+        expected = list(iter_sse([self.stream]))
+        for size in (1, 2, 3, 7):
+            self.assertEqual(list(iter_sse(chunked(self.stream, size))), expected, size)
+
+    def test_events_yielded_as_they_complete(self):
+        """Test événement rendu dès la ligne vide"""
+        parser = SSEParser()
+        self.assertEqual(parser.feed(b'data: a\n'), [])
+        self.assertEqual(parser.feed(b'\ndata: b'), [SSEEvent(data='a')])
+        self.assertEqual(parser.last_event_id, None)
+
+    @patch('requests.Session.request')
+    def test_subnp_stream(self, mock_request):
+        """Test client Subnp sur un flux découpé arbitrairement"""
+        stream = (
+            b'data: {"status": "processing", "message": "Generating"}\n\n'
+            b'data: {"status": "complete", "imageUrl": "https://img/x.png"}\n\n'
+        )
+        mock_request.return_value = Mock(status_code=200)
+        mock_request.return_value.iter_content.return_value = chunked(stream, 5)
+
+        client = SubnpClient()
+        with patch.object(client, '_download', return_value=b'png') as mock_download:
+            results = client.generate_image('a fox', {'model': 'magic'})
+
+        mock_download.assert_called_once_with('https://img/x.png', timeout=30)
+        self.assertEqual(results[0].image_data, b'png')
@@ -0,0 +1,128 @@
+import io
+from django.core.management import call_command
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from unittest.mock import patch
+from PIL import Image, features
+from you_image_generator import thumbnails
+from you_image_generator.blob_storage import get_blob_store
+from you_image_generator.downloads import sniff_image_type
+from you_image_generator.models import GeneratedImage
+from you_image_generator.thumbnails import derivative_key, generate_thumbnails, render_thumbnails
+
+
+def make_image(width=1024, height=768, color=(200, 40, 40)) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(output, format='PNG')
+    return output.getvalue()
+
+
+class RenderThumbnailsTest(SimpleTestCase):
+    """Tests pour le redimensionnement"""
+
+    def test_sizes_and_format(self):
+        """Test côté le plus long à la taille demandée, en WebP"""
+        result = render_thumbnails(make_image(), [128, 512], 'webp')
+        for size, data in result.items():
+            self.assertEqual(sniff_image_type(data), 'webp')
+            self.assertEqual(max(Image.open(io.BytesIO(data)).size), size)
+
+    def test_never_enlarged(self):
+        """Test petite image gardée à sa taille"""
+        data = render_thumbnails(make_image(100, 50), [256], 'webp')[256]
+        self.assertEqual(Image.open(io.BytesIO(data)).size, (100, 50))
+
+    def test_avif(self):
+        """Test format AVIF"""
+        if not features.check('avif'):
+            self.skipTest("Pillow built without AVIF")
+        data = render_thumbnails(make_image(), [128], 'avif')[128]
+        self.assertEqual(sniff_image_type(data), 'avif')
+
+
+@override_settings(THUMBNAIL_SIZES=[128, 256], THUMBNAIL_FORMAT='webp', THUMBNAIL_MODE='off')
+class GenerateThumbnailsTest(TestCase):
+    """Tests pour les miniatures stockées à côté de l'original"""
+
+    def test_generate(self):
+        """Test miniatures stockées et référencées sur la ligne"""
+        image = GeneratedImage.objects.create(prompt='a cat', image_data=make_image())
+        result = generate_thumbnails(image)
+        self.assertEqual(result, {'128': derivative_key(image.image_key, 128, 'webp'),
+                                  '256': derivative_key(image.image_key, 256, 'webp')})
+        self.assertEqual(GeneratedImage.objects.get(pk=image.pk).thumbnails, result)
+        self.assertLess(get_blob_store().size(result['128']), image.image_size / 10)
+
+    def test_shared_by_identical_images(self):
+        """Test miniatures d'un contenu identique réutilisées"""
+        data = make_image()
+        generate_thumbnails(GeneratedImage.objects.create(prompt='a', image_data=data))
+        with patch.object(thumbnails, 'render_thumbnails', wraps=render_thumbnails) as render:
+            generate_thumbnails(GeneratedImage.objects.create(prompt='b', image_data=data))
+        render.assert_not_called()
+
+    def test_legacy_row(self):
+        """Test ligne ancienne déplacée vers le stockage"""
+        image = GeneratedImage.objects.create(prompt='old')
+        GeneratedImage.objects.filter(pk=image.pk).update(legacy_image_data=make_image())
+        generate_thumbnails(GeneratedImage.objects.get(pk=image.pk))
+        image = GeneratedImage.objects.with_image().get(pk=image.pk)
+        self.assertIsNone(image.legacy_image_data)
+        self.assertEqual(set(image.thumbnails), {'128', '256'})
+
+    def test_deleted_with_image(self):
+        """Test miniatures supprimées avec la dernière ligne"""
+        image = GeneratedImage.objects.create(prompt='a cat', image_data=make_image())
+        keys = generate_thumbnails(image).values()
+        with self.captureOnCommitCallbacks(execute=True):
+            GeneratedImage.objects.get(pk=image.pk).delete()
+        self.assertFalse(any(get_blob_store().exists(key) for key in keys))
+
+    def test_sync_mode(self):
+        """Test miniatures faites à l'enregistrement"""
+        with self.settings(THUMBNAIL_MODE='sync'), self.captureOnCommitCallbacks(execute=True):
+            image = GeneratedImage.objects.create(prompt='a cat', image_data=make_image())
+        self.assertEqual(set(GeneratedImage.objects.get(pk=image.pk).thumbnails), {'128', '256'})
+
+    def test_background_mode(self):
+        """Test images créées confiées au pool de threads"""
+        with self.settings(THUMBNAIL_MODE='background'), \
+                patch.object(thumbnails.ThumbnailWorkers, 'submit') as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            created = GeneratedImage.objects.bulk_create([
+                GeneratedImage(prompt='a', image_data=make_image(color=(1, 2, 3))),
+                GeneratedImage(prompt='b', image_data=make_image(color=(4, 5, 6))),
+            ])
+        submit.assert_called_once_with([image.pk for image in created])
+
+    def test_metadata_save_not_scheduled(self):
+        """Test enregistrement sans nouvelle image : pas de miniatures"""
+        image = GeneratedImage.objects.create(prompt='a cat', image_data=make_image())
+        with self.settings(THUMBNAIL_MODE='sync'), self.captureOnCommitCallbacks() as callbacks:
+            image.prompt = 'a dog'
+            image.save()
+        self.assertEqual(callbacks, [])
+
+    def test_view(self):
+        """Test miniature servie, faite à la première demande"""
+        image = GeneratedImage.objects.create(prompt='a cat', image_data=make_image())
+        response = self.client.get(reverse('you_image_generator:image_thumbnail', args=[image.pk, 128]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['ETag'], f'"{derivative_key(image.image_key, 128, "webp")}"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(max(Image.open(io.BytesIO(b''.join(response.streaming_content))).size), 128)
+
+        response = self.client.get(reverse('you_image_generator:image_thumbnail', args=[image.pk, 300]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_backfill_command(self):
+        """Test commande de rattrapage, reprise possible"""
+        for i in range(3):
+            GeneratedImage.objects.create(prompt=f'img {i}', image_data=make_image(color=(i, i, i)))
+
+        call_command('generate_thumbnails', workers=1, batch_size=2, limit=2, stdout=io.StringIO())
+        self.assertEqual(GeneratedImage.objects.exclude(thumbnails={}).count(), 2)
+        call_command('generate_thumbnails', workers=1, stdout=io.StringIO())
+        for image in GeneratedImage.objects.all():
+            self.assertEqual(set(image.thumbnails), {'128', '256'})
@@ -1,7 +1,8 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from you_image_generator.ai_clients import ProviderError
 from you_image_generator.models import GeneratedImage
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 import json
 
 
@@ -56,6 +57,7 @@ class ViewsTest(TestCase):
         mock_result.prompt = "test"
         mock_result.model_used = "test_model"
         mock_result.image_data = b'fake_image'
+        mock_result.seed = None
         mock_client.generate_image.return_value = [mock_result]
         mock_get_client.return_value = mock_client
         
@@ -75,6 +77,126 @@ class ViewsTest(TestCase):
         data = json.loads(response.content)
         self.assertIn('image_base64', data)
     
+    @patch('you_image_generator.views.get_api_client')
+    def test_agenerate_image_api_success(self, mock_get_client):
+        """Test génération d'image via l'endpoint asynchrone"""
+        mock_result = Mock()
+        mock_result.prompt = "test"
+        mock_result.model_used = "test_model"
+        mock_result.image_data = b'fake_image'
+        mock_result.seed = None
+        mock_client = Mock()
+        mock_client.agenerate_image = AsyncMock(return_value=[mock_result])
+        mock_get_client.return_value = mock_client
+        
+        response = self.client.post(
+            reverse('you_image_generator:generate_async_api'),
+            {'prompt': 'a red apple', 'provider': 'pollinations'}
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertIn('image_base64', data)
+        mock_client.agenerate_image.assert_awaited_once()
+    
+    @patch('you_image_generator.views.get_api_client')
+    def test_generate_image_api_hedged(self, mock_get_client):
+        """Test génération en course entre plusieurs providers"""
+        mock_result = Mock(prompt="test", model_used="test_model", image_data=b'fake_image', seed=None)
+        failing = Mock()
+        failing.agenerate_image = AsyncMock(side_effect=Exception("down"))
+        working = Mock()
+        working.agenerate_image = AsyncMock(return_value=[mock_result])
+        mock_get_client.side_effect = lambda provider, *args, **kwargs: (
+            failing if provider == 'pollinations' else working
+        )
+        
+        response = self.client.post(
+            reverse('you_image_generator:generate_api'),
+            {'prompt': 'a red apple', 'hedge_providers': 'pollinations,prodia'}
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['provider'], 'prodia')
+        self.assertTrue(data['hedged'])
+    
+    @patch('you_image_generator.views.get_api_client')
+    def test_generate_image_api_failover(self, mock_get_client):
+        """Test bascule sur la chaîne de secours quand le provider échoue"""
+        mock_result = Mock(prompt="test", model_used="test_model", image_data=b'fake_image', seed=None)
+        failing = Mock()
+        failing.generate_image.side_effect = Exception("down")
+        working = Mock()
+        working.generate_image.return_value = [mock_result]
+        mock_get_client.side_effect = lambda provider, *args, **kwargs: (
+            failing if provider == 'prodia' else working
+        )
+        
+        with self.settings(PROVIDER_FALLBACK_CHAIN=['pollinations']):
+            response = self.client.post(
+                reverse('you_image_generator:generate_api'),
+                {'prompt': 'a red apple', 'provider': 'prodia'}
+            )
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['provider'], 'pollinations')
+        self.assertEqual(data['fallback_from'], 'prodia')
+    
+    @patch('you_image_generator.views.get_api_client')
+    def test_generate_image_api_batch(self, mock_get_client):
+        """Test plusieurs images en une requête (num_images)"""
+        mock_client = Mock()
+        mock_client.generate_images.return_value = [
+            Mock(prompt="test", model_used="test_model", image_data=f'image_{i}'.encode(), seed=100 + i)
+            for i in range(3)
+        ]
+        mock_get_client.return_value = mock_client
+        
+        response = self.client.post(
+            reverse('you_image_generator:generate_api'),
+            {'prompt': 'a red apple', 'provider': 'pollinations', 'num_images': '3'}
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(len(data['images']), 3)
+        self.assertEqual(data['id'], data['images'][0]['id'])
+        self.assertEqual(mock_client.generate_images.call_args.args[2], 3)
+        self.assertEqual(GeneratedImage.objects.filter(prompt='test').count(), 3)
+        self.assertEqual(
+            sorted(GeneratedImage.objects.filter(prompt='test').values_list('seed', flat=True)), [100, 101, 102]
+        )
+    
+    @patch('you_image_generator.views.get_api_client')
+    def test_generate_image_api_client_error_no_failover(self, mock_get_client):
+        """Test qu'une requête refusée par le provider ne bascule pas"""
+        refusing = Mock()
+        refusing.generate_image.side_effect = ProviderError("API Error: prompt rejected", status_code=400)
+        working = Mock()
+        mock_get_client.side_effect = lambda provider, *args, **kwargs: (
+            refusing if provider == 'prodia' else working
+        )
+        
+        with self.settings(PROVIDER_FALLBACK_CHAIN=['pollinations']):
+            response = self.client.post(
+                reverse('you_image_generator:generate_api'),
+                {'prompt': 'a red apple', 'provider': 'prodia'}
+            )
+        
+        self.assertEqual(response.status_code, 400)
+        working.generate_image.assert_not_called()
+    
+    def test_health_check_reports_circuit_state(self):
+        """Test que /api/health/ expose l'état des disjoncteurs"""
+        response = self.client.get(reverse('you_image_generator:api_health_check'))
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertIn('open_circuits', data['summary'])
+        self.assertEqual(data['providers']['pollinations']['circuit']['state'], 'closed')
+    
     def test_generate_image_api_missing_prompt(self):
         """Test génération sans prompt"""
         response = self.client.post(
@@ -97,6 +219,63 @@ class ViewsTest(TestCase):
         self.assertEqual(response.status_code, 400)
 
 
+@override_settings(GALLERY_PAGE_SIZE=10, THUMBNAIL_GALLERY_SIZE=256)
+class GalleryTest(TestCase):
+    """Tests pour la galerie paginée"""
+
+    def setUp(self):
+        GeneratedImage.objects.bulk_create([
+            GeneratedImage(prompt=f'image {i}', image_data=bytes([i]) * 100_000, width=512, height=768)
+            for i in range(25)
+        ])
+
+    def test_page_without_image_bytes(self):
+        """Test page principale : métadonnées de la première page seulement"""
+        response = self.client.get(reverse('you_image_generator:generator'))
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(response.content), 100_000)
+        self.assertNotIn('image_data', response.context)
+        self.assertEqual(len(response.context['gallery']['images']), 10)
+        self.assertIsNotNone(response.context['gallery']['next_cursor'])
+
+    def test_cursor_pagination(self):
+        """Test parcours complet, du plus récent au plus ancien, sans doublon"""
+        url = reverse('you_image_generator:gallery')
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, {'cursor': cursor} if cursor else {})
+            page = response.json()
+            seen += [image['id'] for image in page['images']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        expected = list(GeneratedImage.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_item_fields(self):
+        """Test champs d'une image : dimensions et URLs, pas d'octets"""
+        image = self.client.get(reverse('you_image_generator:gallery'), {'limit': 1}).json()['images'][0]
+        self.assertEqual((image['width'], image['height']), (512, 768))
+        self.assertEqual(image['image_url'], f"/image/{image['id']}/")
+        self.assertEqual(image['thumbnail_url'], f"/image/{image['id']}/thumb/256/")
+        self.assertNotIn('image_data', image)
+
+    def test_new_images_do_not_shift_pages(self):
+        """Test images créées entre deux pages ignorées par le curseur"""
+        url = reverse('you_image_generator:gallery')
+        first = self.client.get(url).json()
+        GeneratedImage.objects.create(prompt='newest', image_data=b'x')
+        second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertLess(second['images'][0]['id'], first['images'][-1]['id'])
+
+    def test_invalid_cursor(self):
+        """Test curseur ou limite invalides"""
+        url = reverse('you_image_generator:gallery')
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 'ten'}).status_code, 400)
+
+
 class AdvancedViewsTest(TestCase):
     """Tests pour views_advanced"""
     
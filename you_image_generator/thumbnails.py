@@ -0,0 +1,240 @@
+# you_image_generator/thumbnails.py
+"""
+Thumbnails of the generated images
+
+Each image gets a set of downscaled copies (settings.THUMBNAIL_SIZES, the
+longest side in pixels) in WebP or AVIF, stored in the blob store next to
+the original under derived keys (<image key>.<size>.<format>) and served by
+image/<id>/thumb/<size>/. GeneratedImage.thumbnails maps each size to its
+key.
+
+When they are made (settings.THUMBNAIL_MODE):
+- 'background' (default): on a thread pool of the web process, once the
+  row is committed
+- 'sync': in the request that saved the image, once the row is committed
+- 'off': only by `manage.py generate_thumbnails` or on the first request
+  of a missing size
+
+Identical images share their thumbnails, like their original.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional
+
+from PIL import Image, features
+
+from .blob_storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (128, 256, 512)
+DEFAULT_FORMAT = 'webp'
+DEFAULT_QUALITY = 80
+DEFAULT_WORKERS = 2
+
+CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+}
+
+
+def thumbnail_sizes() -> List[int]:
+    """Configured sizes, largest first"""
+    from django.conf import settings
+    sizes = getattr(settings, 'THUMBNAIL_SIZES', DEFAULT_SIZES)
+    return sorted({int(size) for size in sizes}, reverse=True)
+
+
+def thumbnail_format() -> str:
+    """Configured format, WebP if this Pillow cannot write AVIF"""
+    from django.conf import settings
+    name = getattr(settings, 'THUMBNAIL_FORMAT', DEFAULT_FORMAT).lower()
+    if name not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported THUMBNAIL_FORMAT: {name!r} (use 'webp' or 'avif')")
+    if name == 'avif' and not features.check('avif'):
+        logger.warning("Pillow was built without AVIF support, writing WebP thumbnails")
+        return 'webp'
+    return name
+
+
+def derivative_key(image_key: str, size: int, fmt: str) -> str:
+    """Blob key of a thumbnail, next to the original"""
+    return f"{image_key}.{size}.{fmt}"
+
+
+def render_thumbnails(data: bytes, sizes: Iterable[int], fmt: str,
+                      quality: int = DEFAULT_QUALITY) -> Dict[int, bytes]:
+    """
+    Downscale an image to several sizes
+
+    The image is decoded once; each size is resized from the previous
+    (larger) one. Images are never enlarged.
+
+    Args:
+        data: Original image bytes
+        sizes: Longest side of each thumbnail, in pixels
+        fmt: 'webp' or 'avif'
+        quality: Encoder quality (0-100)
+
+    Returns:
+        Encoded thumbnail by size
+    """
+    image = Image.open(BytesIO(data))
+    image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    thumbnails = {}
+    for size in sorted(sizes, reverse=True):
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        output = BytesIO()
+        image.save(output, format=fmt.upper(), quality=quality)
+        thumbnails[size] = output.getvalue()
+    return thumbnails
+
+
+def generate_thumbnails(image, sizes: Optional[Iterable[int]] = None, force: bool = False) -> Dict[str, str]:
+    """
+    Make the missing thumbnails of an image and record them on its row
+
+    Args:
+        image: GeneratedImage with its image stored
+        sizes: Sizes to make (all configured sizes if None)
+        force: Render again thumbnails already in the store
+
+    Returns:
+        The updated GeneratedImage.thumbnails ({size: blob key})
+    """
+    from django.conf import settings
+    from .models import GeneratedImage
+
+    if not image.image_key:
+        if image.image_data is None:
+            return image.thumbnails
+        # Row saved before the blob store: move its bytes there first
+        image.image_data = image.image_data
+        image.store_image()
+        GeneratedImage.objects.filter(pk=image.pk).update(
+            image_key=image.image_key, image_size=image.image_size, legacy_image_data=None,
+        )
+
+    store = get_blob_store()
+    fmt = thumbnail_format()
+    sizes = thumbnail_sizes() if sizes is None else [int(size) for size in sizes]
+    keys = {size: derivative_key(image.image_key, size, fmt) for size in sizes}
+    # Same content, same keys: another row may have made them already
+    missing = [size for size, key in keys.items() if force or not store.exists(key)]
+
+    if missing:
+        quality = getattr(settings, 'THUMBNAIL_QUALITY', DEFAULT_QUALITY)
+        for size, data in render_thumbnails(image.image_data, missing, fmt, quality).items():
+            store.put(data, key=keys[size])
+
+    thumbnails = {**(image.thumbnails or {}), **{str(size): key for size, key in keys.items()}}
+    if thumbnails != image.thumbnails:
+        image.thumbnails = thumbnails
+        # Only this column: the row may have changed since it was read
+        GeneratedImage.objects.filter(pk=image.pk).update(thumbnails=thumbnails)
+    logger.info(f"Thumbnails of image {image.pk}: {len(missing)} made, {len(sizes) - len(missing)} reused")
+    return thumbnails
+
+
+def generate_thumbnails_for(image_ids: Iterable[int]):
+    """Make the thumbnails of saved images, logging failures"""
+    from .models import GeneratedImage
+
+    for image in GeneratedImage.objects.filter(pk__in=list(image_ids)):
+        try:
+            generate_thumbnails(image)
+        except Exception as e:
+            logger.error(f"Thumbnails of image {image.pk} failed: {e}")
+
+
+class ThumbnailWorkers:
+    """
+    Thread pool of the web process making thumbnails after the response
+
+    Args:
+        workers: Images processed at the same time
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            # A forked worker does not inherit the parent's threads
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='thumbnails')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, image_ids: List[int]):
+        self._get_executor().submit(self._run, image_ids)
+
+    @staticmethod
+    def _run(image_ids: List[int]):
+        from django.db import close_old_connections
+
+        close_old_connections()
+        try:
+            generate_thumbnails_for(image_ids)
+        finally:
+            close_old_connections()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+# Global worker pool
+_thumbnail_workers = None
+
+
+def get_thumbnail_workers() -> ThumbnailWorkers:
+    """Get or create the global thumbnail thread pool (settings.THUMBNAIL_WORKERS)"""
+    global _thumbnail_workers
+
+    if _thumbnail_workers is None:
+        from django.conf import settings
+        _thumbnail_workers = ThumbnailWorkers(getattr(settings, 'THUMBNAIL_WORKERS', DEFAULT_WORKERS))
+
+    return _thumbnail_workers
+
+
+def reset_thumbnail_workers():
+    """Drop the global instance (after a settings change, in tests)"""
+    global _thumbnail_workers
+    if _thumbnail_workers is not None:
+        _thumbnail_workers.shutdown(wait=False)
+    _thumbnail_workers = None
+
+
+def schedule_thumbnails(image_ids: List[int]):
+    """
+    Make the thumbnails of newly saved images, per settings.THUMBNAIL_MODE
+
+    Runs once the current transaction commits, so workers see the rows.
+    """
+    from django.conf import settings
+    from django.db import transaction
+
+    mode = getattr(settings, 'THUMBNAIL_MODE', 'background')
+    if not image_ids or mode == 'off':
+        return
+    if mode == 'sync':
+        transaction.on_commit(lambda: generate_thumbnails_for(image_ids))
+    elif mode == 'background':
+        transaction.on_commit(lambda: get_thumbnail_workers().submit(image_ids))
+    else:
+        raise ValueError(f"Unknown THUMBNAIL_MODE: {mode!r}")
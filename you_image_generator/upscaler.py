@@ -248,7 +248,7 @@ def batch_upscale(
     
     for img_id in image_ids:
         try:
-            img = GeneratedImage.objects.get(id=img_id)
+            img = GeneratedImage.objects.with_image().get(id=img_id)
             
             logger.info(f"Upscaling image {img_id}...")
             upscaled_data = upscaler.upscale(
@@ -363,7 +363,7 @@ def upscale_all_low_res_images(min_width: int = 512, scale: int = 2):
     """
     from .models import GeneratedImage
     
-    low_res = GeneratedImage.objects.filter(width__lt=min_width)
+    low_res = GeneratedImage.objects.with_image().filter(width__lt=min_width)
     total = low_res.count()
     
     logger.info(f"Found {total} images to upscale")
@@ -451,7 +451,7 @@ def upscale_image_api(image_id: int, scale: int = 2) -> dict:
     
     try:
         # Get original image
-        original = GeneratedImage.objects.get(id=image_id)
+        original = GeneratedImage.objects.with_image().get(id=image_id)
         
         # Upscale
         upscaled_data = upscale_image(
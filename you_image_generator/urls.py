@@ -14,11 +14,20 @@ urlpatterns = [
     # Main Views
     # ============================================
     path('', views.image_generator_view, name='generator'),
+    path('image/<int:image_id>/', views.image_file_view, name='image_file'),
+    path('image/<int:image_id>/thumb/<int:size>/', views.image_thumbnail_view, name='image_thumbnail'),
+    path('api/gallery/', views.gallery_api, name='gallery'),
     
     # ============================================
     # Generation APIs
     # ============================================
     path('generate/', views.generate_image_api, name='generate_api'),
+    path('api/generate-async/', views.agenerate_image_api, name='generate_async_api'),
+    path('api/grid/', views.grid_generate_api, name='grid_generate'),
+    path('api/grid/estimate/', views.grid_estimate_api, name='grid_estimate'),
+    path('api/jobs/<uuid:job_id>/', views.job_status_api, name='job_status'),
+    path('api/jobs/<uuid:job_id>/result/', views.job_result_api, name='job_result'),
+    path('api/jobs/<uuid:job_id>/events/', views.job_events_api, name='job_events'),
     path('api/model-config/', views.get_model_configuration, name='model_config'),
     path('api/all-configs/', views.get_all_configurations, name='all_configs'),
     
@@ -59,4 +68,5 @@ urlpatterns = [
     path('api/health/', views.api_health_check, name='api_health_check'),
     path('api/providers/working/', views.get_working_providers, name='working_providers'),
     path('api/test-free/', views.test_free_apis, name='test_free_apis'),
+    path('api/metrics', views.metrics_api, name='metrics'),
 ]
\ No newline at end of file
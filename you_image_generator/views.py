@@ -1,261 +1,793 @@
-from django.shortcuts import render, redirect
-from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseServerError, JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseServerError, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
-from .models import GeneratedImage
+from django.urls import reverse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from .models import GeneratedImage, GenerationJob
 # Import the new multi-API client system
 from .ai_clients import get_api_client, AVAILABLE_PROVIDERS, ImageResult
+from .hedging import hedged_generate, generate_hedged, HedgeCandidate, HedgedGenerationError
+from .circuit_breaker import get_circuit_breaker, error_status, is_client_error
+from .rate_limiter import get_rate_limiter, RateLimitExceeded
+from .single_flight import get_single_flight, request_key
+from .result_cache import get_result_cache, cache_key, DETERMINISTIC_PROVIDERS
+from .grid import expand_grid, estimate_grid, iter_grid
+from .jobs import enqueue_generation, job_event, queue_position, recover_stale_job
+from .metrics import get_metrics_registry
+from .blob_storage import BlobNotFound, get_blob_store
+from .image_serving import serve_blob, serve_image
+from .thumbnails import generate_thumbnails, thumbnail_sizes
+from .styles import get_style_preset
+from .sse import iter_sse
 from django.conf import settings
-from typing import List
+from django.db.models import Q
+from datetime import datetime
+from typing import List, Optional
+import asyncio
 import base64
 import logging
 import json
+import time
 
 logger = logging.getLogger(__name__)
 
 # --- Main page view ---
 def image_generator_view(request):
-    generated_images = GeneratedImage.objects.all() 
-    
-    # Sérialiser les images pour JavaScript
-    images_data = []
-    for img in generated_images:
-        images_data.append({
-            'id': img.id,
-            'image_data': base64.b64encode(img.image_data).decode('utf-8') if img.image_data else '',
-            'prompt': img.prompt,
-            'negative_prompt': img.negative_prompt or '',
-            'model_used': img.model_used or 'Unknown',
-            'provider': img.provider or 'unknown',
-            'width': img.width,
-            'height': img.height,
-            'aspect_ratio': img.aspect_ratio,
-            'output_format': img.output_format,
-            'style_preset': img.style_preset or '',
-            'seed': img.seed,
-            'cfg_scale': img.cfg_scale,
-        })
-    
+    # Only the first gallery page, as metadata: the images themselves are
+    # loaded by the browser from their thumbnail URLs, the next pages from
+    # api/gallery/ as the user scrolls
     context = {
-        'generated_images': generated_images,
-        'images_json': json.dumps(images_data),  # Ajouter ceci
+        'gallery': _gallery_page(),
         'available_providers': AVAILABLE_PROVIDERS,
-        'default_provider': 'huggingface'
+        'default_provider': 'huggingface',
+        # Progress streams only hold no thread on an ASGI server; under WSGI
+        # the page polls api/jobs/<id>/ instead
+        'job_events_stream': isinstance(request, ASGIRequest),
     }
     return render(request, 'you_image_generator/generator.html', context)
 
+
+# --- Gallery ---
+
+# Columns listed by the gallery (never the image bytes)
+GALLERY_FIELDS = (
+    'id', 'prompt', 'model_used', 'provider', 'width', 'height',
+    'output_format', 'style_preset', 'created_at',
+)
+
+
+class InvalidCursor(ValueError):
+    """Gallery cursor that was not produced by _encode_cursor"""
+
+
+def _encode_cursor(image: GeneratedImage) -> str:
+    """Opaque position after an image, in gallery order (newest first)"""
+    raw = json.dumps([image.created_at.isoformat(), image.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, image_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(image_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _gallery_page(cursor: Optional[str] = None, limit: Optional[int] = None) -> dict:
+    """
+    One page of the gallery, newest first
+
+    Keyset pagination on (created_at, id): each page is one indexed query
+    whatever its depth, and images created meanwhile do not shift the pages.
+
+    Args:
+        cursor: next_cursor of the previous page (None for the first page)
+        limit: Images per page (settings.GALLERY_PAGE_SIZE by default)
+
+    Returns:
+        {'images': [...], 'next_cursor': str or None}
+
+    Raises:
+        InvalidCursor: Malformed cursor
+    """
+    default_limit = getattr(settings, 'GALLERY_PAGE_SIZE', 24)
+    limit = max(1, min(limit or default_limit, getattr(settings, 'GALLERY_MAX_PAGE_SIZE', 100)))
+    queryset = GeneratedImage.objects.only(*GALLERY_FIELDS).order_by('-created_at', '-id')
+    if cursor:
+        created_at, image_id = _decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=image_id))
+
+    images = list(queryset[:limit + 1])
+    thumbnail_size = getattr(settings, 'THUMBNAIL_GALLERY_SIZE', 256)
+    page = images[:limit]
+    return {
+        'images': [{
+            'id': image.id,
+            'prompt': image.prompt,
+            'model_used': image.model_used or 'Unknown',
+            'provider': image.provider or 'unknown',
+            'width': image.width,
+            'height': image.height,
+            'output_format': image.output_format,
+            'style_preset': image.style_preset or '',
+            'created_at': image.created_at.isoformat(),
+            'image_url': reverse('you_image_generator:image_file', args=[image.id]),
+            'thumbnail_url': image.thumbnail_url(thumbnail_size),
+        } for image in page],
+        'next_cursor': _encode_cursor(page[-1]) if len(images) > limit else None,
+    }
+
+
+@require_http_methods(["GET"])
+def gallery_api(request):
+    """
+    Gallery page for infinite scroll
+
+    GET /api/gallery/?cursor=<next_cursor>&limit=24
+
+    Returns:
+    {
+        "images": [{"id": 12, "prompt": "...", "width": 1024, "height": 1024,
+                    "image_url": "/image/12/", "thumbnail_url": "/image/12/thumb/256/", ...}],
+        "next_cursor": "WyIyMDI2LTEw..." (null on the last page)
+    }
+    """
+    try:
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        return JsonResponse(_gallery_page(request.GET.get('cursor') or None, limit))
+    except (InvalidCursor, ValueError):
+        return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+
+
 # --- API endpoint for generation ---
+
+class GenerationRequestError(Exception):
+    """Invalid or unservable generation request, returned as a JSON error."""
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _get_provider_credentials(provider: str):
+    """Return (api_key, account_id) for a provider, or raise GenerationRequestError."""
+    api_key = None
+    account_id = None
+    if provider == 'stability':
+        api_key = settings.STABILITY_AI_API_KEY
+        if not api_key:
+            raise GenerationRequestError('Stability AI API Key not configured', status=500)
+    elif provider == 'gemini':
+        api_key = settings.GEMINI_API_KEY
+        if not api_key:
+            raise GenerationRequestError('Gemini API Key not configured. Get one at https://aistudio.google.com/app/apikey', status=500)
+    elif provider == 'runware':
+        api_key = settings.RUNWARE_API_KEY
+        if not api_key:
+            raise GenerationRequestError('Runware API Key not configured', status=500)
+    elif provider == 'replicate':
+        api_key = settings.REPLICATE_API_KEY
+        if not api_key:
+            raise GenerationRequestError('Replicate API Key not configured', status=500)
+    elif provider == 'huggingface':
+        api_key = getattr(settings, 'HUGGINGFACE_API_KEY', None)
+    elif provider == 'cloudflare':
+        api_key = getattr(settings, 'CLOUDFLARE_API_KEY', None)
+        account_id = getattr(settings, 'CLOUDFLARE_ACCOUNT_ID', None)
+    elif provider == 'aihorde':
+        api_key = getattr(settings, 'AIHORDE_API_KEY', None) or "0000000000"  # Public key
+    elif provider == 'segmind':
+        api_key = getattr(settings, 'SEGMIND_API_KEY', None)
+    elif provider == 'pollinations':
+        api_key = getattr(settings, 'POLLINATION_API_KEY', None)
+    elif provider == 'deepai':
+        api_key = getattr(settings, 'DEEPAI_API_KEY', None)
+    # subnp, prodia and placeholder don't need API keys
+    return api_key, account_id
+
+
+def _validate_prompt(data) -> str:
+    prompt = data.get('prompt')
+    if not prompt or len(prompt.strip()) < 3:
+        raise GenerationRequestError('Prompt must be at least 3 characters long')
+    return prompt
+
+
+def _parse_seed_and_cfg(data) -> tuple:
+    """Seed (int) and CFG scale (float) of the form, None when empty or invalid."""
+    seed = data.get('seed', None)
+    cfg_scale = data.get('cfg_scale', None)
+
+    # Convertir seed et cfg_scale en nombres si fournis
+    if seed and seed.strip():
+        try:
+            seed = int(seed)
+        except ValueError:
+            seed = None
+    else:
+        seed = None
+
+    if cfg_scale and cfg_scale.strip():
+        try:
+            cfg_scale = float(cfg_scale)
+        except ValueError:
+            cfg_scale = None
+    else:
+        cfg_scale = None
+
+    return seed, cfg_scale
+
+
+def _requested_size(data) -> tuple:
+    """Width and height sent to the provider, limited to reasonable sizes."""
+    width = int(data.get('width', 512))
+    height = int(data.get('height', 512))
+    return min(max(width, 256), 1024), min(max(height, 256), 1024)
+
+
+def _requested_count(data) -> int:
+    """Number of images asked for (num_images), between 1 and MAX_IMAGES_PER_REQUEST."""
+    num_images = int(data.get('num_images') or 1)
+    return min(max(num_images, 1), getattr(settings, 'MAX_IMAGES_PER_REQUEST', 4))
+
+
+def _prepare_generation(data, provider: str = None) -> dict:
+    """
+    Validate the POSTed form and build everything needed to call a provider.
+
+    Returns a dict with prompt, provider, style_preset, client, options and num_images.
+    Raises GenerationRequestError for invalid requests; ValueError for bad numbers.
+    """
+    # Get form data
+    prompt = _validate_prompt(data)
+
+    # Get provider selection
+    provider = provider or data.get('provider', 'huggingface')
+    hf_model = data.get('hf_model', 'sdxl-lightning')
+    subnp_model = data.get('subnp_model', 'magic')
+    pollinations_model = data.get('pollinations_model', 'default')
+    segmind_model = data.get('segmind_model', 'sdxl')
+    prodia_model = data.get('prodia_model', 'sdxl')
+    cloudflare_model = data.get('cloudflare_model', 'sdxl')
+    aihorde_model = data.get('aihorde_model', 'sdxl')
+    if provider not in AVAILABLE_PROVIDERS:
+        raise GenerationRequestError(f'Unknown provider: {provider}')
+
+    # Get other parameters
+    negative_prompt = data.get('negative_prompt', '')
+    width, height = _requested_size(data)
+
+    style_preset = data.get('style_preset', '')
+
+    logger.info(f"Generating image with provider: {provider}, prompt: {prompt[:50]}...")
+
+    # Get API key based on provider
+    api_key, account_id = _get_provider_credentials(provider)
+
+    # Initialize the AI client
+    try:
+        if provider == 'cloudflare':
+            ai_client = get_api_client(provider, api_key, account_id=account_id)
+        else:
+            ai_client = get_api_client(provider, api_key)
+    except ValueError as e:
+        raise GenerationRequestError(str(e))
+
+    # Prepare options for generation
+    generation_options = {
+        'prompt': prompt,
+        'negative_prompt': negative_prompt if negative_prompt else None,
+        'width': width,
+        'height': height,
+    }
+    
+    # Provider-specific options
+    if provider == 'stability':
+        generation_options.update({
+            'engine': 'ultra',  # Use better quality
+            'cfg_scale': 7,
+            'steps': 20,  # Lower steps to save credits
+        })
+
+    # Assign model for each provider
+    if provider == 'huggingface':
+        generation_options['model'] = hf_model
+        # Encoded once, straight into the stored format
+        generation_options['output_format'] = data.get('output_format', 'PNG')
+    if provider == 'subnp':
+        generation_options['model'] = subnp_model
+    if provider == 'pollinations':
+        generation_options['model'] = pollinations_model
+    if provider == 'segmind':
+        generation_options['model'] = segmind_model
+    if provider == 'prodia':
+        generation_options['model'] = prodia_model
+    if provider == 'cloudflare':
+        generation_options['model'] = cloudflare_model
+    if provider == 'aihorde':
+        generation_options['model'] = aihorde_model
+
+    # Seeded providers reproduce an image from its seed (see result_cache.py)
+    if ai_client.supports_seed:
+        seed, cfg_scale = _parse_seed_and_cfg(data)
+        generation_options['seed'] = seed
+        generation_options['cfg_scale'] = cfg_scale
+    
+    # Filter out None values
+    generation_options = {k: v for k, v in generation_options.items() if v is not None}
+
+    return {
+        'prompt': prompt,
+        'provider': provider,
+        'style_preset': style_preset,
+        'client': ai_client,
+        'options': generation_options,
+        'num_images': _requested_count(data),
+    }
+
+
+def _prepare_hedge(data) -> Optional[dict]:
+    """
+    Build the candidates of a hedged generation.
+
+    Hedging is requested with `hedge_providers`, a comma-separated list of
+    providers in order of preference. Providers without credentials are
+    skipped. Returns None when the form does not ask for hedging.
+    """
+    names = [name.strip() for name in data.get('hedge_providers', '').split(',') if name.strip()]
+    if not names:
+        return None
+
+    prompt = _validate_prompt(data)
+    unknown = [name for name in names if name not in AVAILABLE_PROVIDERS]
+    if unknown:
+        raise GenerationRequestError(f'Unknown provider: {", ".join(unknown)}')
+
+    candidates = []
+    style_preset = ''
+    for name in dict.fromkeys(names):
+        if not get_rate_limiter().has_headroom(name):
+            logger.warning(f"Hedge: skipping {name}, no quota left")
+            continue
+        try:
+            generation = _prepare_generation(data, provider=name)
+        except GenerationRequestError as e:
+            logger.warning(f"Hedge: skipping {name}: {e.message}")
+            continue
+        style_preset = generation['style_preset']
+        candidates.append(HedgeCandidate(name, generation['client'], generation['options']))
+
+    if not candidates:
+        raise GenerationRequestError('None of the hedge providers is configured', status=500)
+
+    return {'prompt': prompt, 'style_preset': style_preset, 'candidates': candidates}
+
+
+def _fallback_generations(data, tried: List[str]):
+    """
+    Yield prepared generations for the failover chain (PROVIDER_FALLBACK_CHAIN).
+
+    Providers already tried, without credentials, whose circuit is open or
+    without quota left are skipped.
+    """
+    limiter = get_rate_limiter()
+    for name in getattr(settings, 'PROVIDER_FALLBACK_CHAIN', []):
+        if name in tried or name not in AVAILABLE_PROVIDERS:
+            continue
+        if get_circuit_breaker(name).is_open:
+            logger.info(f"Failover: skipping {name}, circuit open")
+            continue
+        if not limiter.has_headroom(name):
+            logger.info(f"Failover: skipping {name}, no quota left")
+            continue
+        try:
+            yield _prepare_generation(data, provider=name)
+        except GenerationRequestError as e:
+            logger.info(f"Failover: skipping {name}: {e.message}")
+
+
+def _call_provider(generation: dict) -> List[ImageResult]:
+    """Run a prepared generation (several images use the provider's batch support)."""
+    if generation['num_images'] > 1:
+        return generation['client'].generate_images(
+            generation['prompt'], generation['options'], generation['num_images']
+        )
+    return generation['client'].generate_image(
+        prompt=generation['prompt'],
+        options=generation['options']
+    )
+
+
+async def _acall_provider(generation: dict) -> List[ImageResult]:
+    """Async counterpart of _call_provider."""
+    if generation['num_images'] > 1:
+        return await generation['client'].agenerate_images(
+            generation['prompt'], generation['options'], generation['num_images']
+        )
+    return await generation['client'].agenerate_image(
+        prompt=generation['prompt'],
+        options=generation['options']
+    )
+
+
+def _client_error_status(error: Exception) -> int:
+    """Status returned for a request the provider refused (see is_client_error)."""
+    # Rejected credentials are a server configuration problem, like a missing key
+    return 500 if error_status(error) in (401, 403) else 400
+
+
+def _generate_with_failover(data, generation: dict):
+    """
+    Call the requested provider, then the failover chain until one succeeds.
+
+    Returns (provider, image_results). Raises GenerationRequestError with
+    the error of the requested provider when every attempt failed, or at
+    once when the provider refused the request itself (4xx other than 429).
+    """
+    provider = generation['provider']
+    try:
+        return provider, _call_provider(generation)
+    except Exception as e:
+        first_error = _generation_error_message(provider, e)
+        if is_client_error(e):
+            # Refused request: another provider would not fix it
+            raise GenerationRequestError(first_error, status=_client_error_status(e))
+        # Throttled before dispatch: tell the client to come back later
+        first_status = 429 if isinstance(e, RateLimitExceeded) else 500
+
+    for fallback in _fallback_generations(data, [provider]):
+        logger.warning(f"Failover: {provider} failed, trying {fallback['provider']}")
+        try:
+            image_results = _call_provider(fallback)
+        except Exception as e:
+            _generation_error_message(fallback['provider'], e)
+            continue
+        if image_results:
+            return fallback['provider'], image_results
+
+    raise GenerationRequestError(first_error, status=first_status)
+
+
+async def _agenerate_with_failover(data, generation: dict):
+    """Async counterpart of _generate_with_failover."""
+    provider = generation['provider']
+    try:
+        return provider, await _acall_provider(generation)
+    except Exception as e:
+        first_error = _generation_error_message(provider, e)
+        if is_client_error(e):
+            # Refused request: another provider would not fix it
+            raise GenerationRequestError(first_error, status=_client_error_status(e))
+        # Throttled before dispatch: tell the client to come back later
+        first_status = 429 if isinstance(e, RateLimitExceeded) else 500
+
+    for fallback in await sync_to_async(list)(_fallback_generations(data, [provider])):
+        logger.warning(f"Failover: {provider} failed, trying {fallback['provider']}")
+        try:
+            image_results = await _acall_provider(fallback)
+        except Exception as e:
+            _generation_error_message(fallback['provider'], e)
+            continue
+        if image_results:
+            return fallback['provider'], image_results
+
+    raise GenerationRequestError(first_error, status=first_status)
+
+
+def _hedge_error_message(error: HedgedGenerationError) -> str:
+    messages = [
+        f"{provider}: {_generation_error_message(provider, exc)}"
+        for provider, exc in error.errors.items()
+    ]
+    return 'Failed to generate image with every provider. ' + ' | '.join(messages)
+
+
+def _generation_error_message(provider: str, error: Exception) -> str:
+    """Turn a provider exception into a user-facing message."""
+    logger.error(f"Error calling {provider} client: {error}")
+    error_msg = str(error)
+    # Provide helpful error messages
+    if provider == 'stability' and '400' in error_msg:
+        error_msg = "Stability AI request failed. You might be out of credits or the prompt might be filtered."
+    elif provider == 'huggingface' and 'loading' in error_msg.lower():
+        error_msg = "Hugging Face model is loading. Please try again in a few seconds."
+    return f'Failed to generate image: {error_msg}'
+
+
+def _image_response(image: GeneratedImage) -> dict:
+    """JSON description of a saved image."""
+    return {
+        'id': image.id,
+        'prompt': image.prompt,
+        'model_used': image.model_used,
+        'provider': image.provider,
+        'width': image.width,
+        'height': image.height,
+        'aspect_ratio': image.aspect_ratio,
+        'output_format': image.output_format,
+        'image_base64': base64.b64encode(image.image_data).decode('utf-8'),
+        'content_type': f'image/{image.output_format.lower()}',
+        'image_url': reverse('you_image_generator:image_file', args=[image.id]),
+        'thumbnail_url': image.thumbnail_url(getattr(settings, 'THUMBNAIL_GALLERY_SIZE', 256)),
+        'created_at': image.created_at.isoformat(),
+    }
+
+
+def _save_image_results(data, provider: str, style_preset: str, image_results: List[ImageResult]) -> dict:
+    """
+    Save generated images with the form metadata and build the JSON response.
+
+    The response describes the first image; when several were generated
+    (num_images), all of them are listed under 'images'.
+    """
+    try:
+        # Extraire toutes les métadonnées du formulaire
+        width = int(data.get('width', 1024))
+        height = int(data.get('height', 1024))
+        aspect_ratio = data.get('aspect_ratio', '1:1')
+        output_format = data.get('output_format', 'PNG')
+        negative_prompt = data.get('negative_prompt', '')
+        seed, cfg_scale = _parse_seed_and_cfg(data)
+
+        # Créer les objets avec toutes les métadonnées
+        new_db_images = [
+            GeneratedImage(
+                prompt=img_result.prompt,
+                negative_prompt=negative_prompt if negative_prompt else None,
+                model_used=img_result.model_used,
+                provider=provider,
+                image_data=img_result.image_data,
+                width=width,
+                height=height,
+                aspect_ratio=aspect_ratio,
+                output_format=output_format,
+                # Seed each image was generated with (the form's when unknown
+                # for a single image, none for the other images of a batch)
+                seed=img_result.seed if img_result.seed is not None else (
+                    seed if len(image_results) == 1 else None),
+                cfg_scale=cfg_scale,
+                style_preset=style_preset if style_preset else None,
+            )
+            for img_result in image_results
+        ]
+        if len(new_db_images) == 1:
+            new_db_images[0].save()
+        else:
+            # One INSERT for the whole batch
+            GeneratedImage.objects.bulk_create(new_db_images)
+
+        logger.info(f"Successfully saved {len(new_db_images)} image(s) to database "
+                    f"(ID: {', '.join(str(img.id) for img in new_db_images)})")
+        images = [_image_response(img) for img in new_db_images]
+
+    except Exception as e:
+        logger.error(f"Error saving image to database: {e}")
+        # Toujours retourner l'image même si la sauvegarde échoue
+        images = [{
+            'prompt': img_result.prompt,
+            'model_used': img_result.model_used,
+            'provider': provider,
+            'image_base64': base64.b64encode(img_result.image_data).decode('utf-8'),
+            'content_type': 'image/png',
+            'warning': 'Image generated but not saved to database'
+        } for img_result in image_results]
+
+    response_data = dict(images[0])
+    if len(images) > 1:
+        response_data['images'] = images
+    return response_data
+
+
+def _result_cache_key(data, provider: str) -> Optional[str]:
+    """Cache key of a seeded request to a deterministic provider, else None."""
+    if not getattr(settings, 'RESULT_CACHE_ENABLED', True):
+        return None
+    if provider not in DETERMINISTIC_PROVIDERS:
+        return None
+    seed, cfg_scale = _parse_seed_and_cfg(data)
+    if seed is None or seed < 0:
+        return None
+    width, height = _requested_size(data)
+    return cache_key(
+        provider=provider,
+        model=data.get(f'{provider}_model', 'sdxl'),
+        prompt=data.get('prompt', ''),
+        negative_prompt=data.get('negative_prompt', ''),
+        width=width,
+        height=height,
+        seed=seed,
+        cfg_scale=cfg_scale,
+        style=data.get('style_preset', ''),
+    )
+
+
+def _cached_generation_response(data) -> Optional[dict]:
+    """
+    Response for a request already generated with the same seed, or None.
+
+    Skipped when the form sets `no_cache` (the fresh result replaces the
+    cached one) and for hedged requests.
+    """
+    if data.get('hedge_providers') or data.get('no_cache', '').lower() in ('1', 'true', 'on', 'yes'):
+        return None
+    if _requested_count(data) > 1:
+        return None
+    try:
+        key = _result_cache_key(data, data.get('provider', 'huggingface'))
+    except ValueError:
+        return None
+    if key is None:
+        return None
+
+    image = get_result_cache().get(key)
+    if image is None:
+        return None
+    return {**_image_response(image), 'cached': True}
+
+
+def _remember_result(data, provider: str, response_data: dict):
+    """Add a saved seeded generation to the result cache."""
+    key = _result_cache_key(data, provider)
+    if key is not None and 'id' in response_data and 'images' not in response_data:
+        get_result_cache().put(key, response_data['id'])
+
+
+def _generation_response(data) -> tuple:
+    """Run a generation request: (JSON body, HTTP status)."""
+    # Seeded request already generated: no provider call at all
+    cached = _cached_generation_response(data)
+    if cached is not None:
+        return cached, 200
+
+    try:
+        hedge = _prepare_hedge(data)
+        generation = None if hedge else _prepare_generation(data)
+    except GenerationRequestError as e:
+        return {'error': e.message}, e.status
+
+    if hedge:
+        # Several providers race, the first image wins
+        try:
+            provider, image_results = generate_hedged(hedge['prompt'], hedge['candidates'])
+        except HedgedGenerationError as e:
+            return {'error': _hedge_error_message(e)}, 500
+        style_preset = hedge['style_preset']
+    else:
+        style_preset = generation['style_preset']
+
+        # Call the AI model (failing over to PROVIDER_FALLBACK_CHAIN)
+        try:
+            provider, image_results = _generate_with_failover(data, generation)
+        except GenerationRequestError as e:
+            return {'error': e.message}, e.status
+
+    if not image_results:
+        return {'error': 'No images were generated.'}, 500
+
+    # Save the first generated image to database
+    response_data = _save_image_results(data, provider, style_preset, image_results)
+    if hedge:
+        response_data['hedged'] = True
+    elif provider != generation['provider']:
+        response_data['fallback_from'] = generation['provider']
+    else:
+        _remember_result(data, provider, response_data)
+    return response_data, 200
+
+
+async def _agenerate_response(data) -> tuple:
+    """Async counterpart of _generation_response."""
+    cached = await sync_to_async(_cached_generation_response)(data)
+    if cached is not None:
+        return cached, 200
+
+    try:
+        # Quota lookups hit the database
+        hedge = await sync_to_async(_prepare_hedge)(data)
+        generation = None if hedge else _prepare_generation(data)
+    except GenerationRequestError as e:
+        return {'error': e.message}, e.status
+
+    if hedge:
+        try:
+            provider, image_results = await hedged_generate(hedge['prompt'], hedge['candidates'])
+        except HedgedGenerationError as e:
+            return {'error': _hedge_error_message(e)}, 500
+        style_preset = hedge['style_preset']
+    else:
+        style_preset = generation['style_preset']
+
+        try:
+            provider, image_results = await _agenerate_with_failover(data, generation)
+        except GenerationRequestError as e:
+            return {'error': e.message}, e.status
+
+    if not image_results:
+        return {'error': 'No images were generated.'}, 500
+
+    response_data = await sync_to_async(_save_image_results)(
+        data, provider, style_preset, image_results
+    )
+    if hedge:
+        response_data['hedged'] = True
+    elif provider != generation['provider']:
+        response_data['fallback_from'] = generation['provider']
+    else:
+        await sync_to_async(_remember_result)(data, provider, response_data)
+    return response_data, 200
+
+
+def _share_generation(result) -> list:
+    """Result published to other workers: the image is reloaded from its row."""
+    body, status = result
+    if 'id' in body:
+        body = {k: v for k, v in body.items() if k != 'image_base64'}
+    return [body, status]
+
+
+def _coalesced_response(result) -> tuple:
+    """
+    Response of a request that waited for an identical in-flight one.
+
+    With SINGLE_FLIGHT_ROWS = 'per_request' each requester gets its own copy
+    of the saved image; with 'shared' (default) they all get the same row.
+    """
+    body, status = result
+    body = dict(body)
+    if status == 200 and 'id' in body:
+        image = GeneratedImage.objects.with_image().filter(pk=body['id']).first()
+        if image is not None:
+            if getattr(settings, 'SINGLE_FLIGHT_ROWS', 'shared') == 'per_request':
+                image.pk = None
+                image.save()
+                body['id'] = image.id
+                body['created_at'] = image.created_at.isoformat()
+            if 'image_base64' not in body:
+                body['image_base64'] = base64.b64encode(image.image_data).decode('utf-8')
+    body['coalesced'] = True
+    return body, status
+
+
+def _single_flight_response(data) -> tuple:
+    """
+    _generation_response shared with identical requests in flight, in this
+    worker or another one (see single_flight.py). Background jobs run
+    through it too.
+    """
+    if not getattr(settings, 'SINGLE_FLIGHT_ENABLED', True):
+        return _generation_response(data)
+
+    result, coalesced = get_single_flight().do(
+        request_key(data),
+        lambda: _generation_response(data),
+        share=_share_generation,
+    )
+    return _coalesced_response(result) if coalesced else result
+
+
 @require_http_methods(["POST"])
 def generate_image_api(request):
     """
     API endpoint to receive a prompt, generate image(s), and save them.
     Returns a JSON response with details of the generated image(s).
+
+    Identical requests in flight at the same time (double-clicks, client
+    retries) share a single upstream generation (see single_flight.py).
+
+    With `background=1` the request is queued as a job and the response
+    (202) only carries its id; poll api/jobs/<id>/ for the result.
     """
     if request.method == 'POST':
         try:
-            # Get form data
-            prompt = request.POST.get('prompt')
-            if not prompt or len(prompt.strip()) < 3:
-                return JsonResponse({'error': 'Prompt must be at least 3 characters long'}, status=400)
-
-            # Get provider selection
-            provider = request.POST.get('provider', 'huggingface')
-            hf_model = request.POST.get('hf_model', 'sdxl-lightning')
-            subnp_model = request.POST.get('subnp_model', 'magic')
-            pollinations_model = request.POST.get('pollinations_model', 'default')
-            segmind_model = request.POST.get('segmind_model', 'sdxl')
-            prodia_model = request.POST.get('prodia_model', 'sdxl')
-            cloudflare_model = request.POST.get('cloudflare_model', 'sdxl')
-            aihorde_model = request.POST.get('aihorde_model', 'sdxl')
-            if provider not in AVAILABLE_PROVIDERS:
-                return JsonResponse({'error': f'Unknown provider: {provider}'}, status=400)
-
-            # Get other parameters
-            negative_prompt = request.POST.get('negative_prompt', '')
-            width = int(request.POST.get('width', 512))
-            height = int(request.POST.get('height', 512))
-            
-            # Validate dimensions (limit to reasonable sizes)
-            width = min(max(width, 256), 1024)
-            height = min(max(height, 256), 1024)
-
-            style_preset = request.POST.get('style_preset', '')
-
-            logger.info(f"Generating image with provider: {provider}, prompt: {prompt[:50]}...")
-
-            # Get API key based on provider
-            api_key = None
-            if provider == 'stability':
-                api_key = settings.STABILITY_AI_API_KEY
-                if not api_key:
-                    return JsonResponse({'error': 'Stability AI API Key not configured'}, status=500)
-            elif provider == 'gemini':
-                api_key = settings.GEMINI_API_KEY
-                if not api_key:
-                    return JsonResponse({'error': 'Gemini API Key not configured. Get one at https://aistudio.google.com/app/apikey'}, status=500)
-            elif provider == 'runware':
-                api_key = settings.RUNWARE_API_KEY
-                if not api_key:
-                    return JsonResponse({'error': 'Runware API Key not configured'}, status=500)
-            elif provider == 'replicate':
-                api_key = settings.REPLICATE_API_KEY
-                if not api_key:
-                    return JsonResponse({'error': 'Replicate API Key not configured'}, status=500)
-            elif provider == 'huggingface':
-                api_key = getattr(settings, 'HUGGINGFACE_API_KEY', None)
-            elif provider == 'cloudflare':
-                api_key = getattr(settings, 'CLOUDFLARE_API_KEY', None)
-                account_id = getattr(settings, 'CLOUDFLARE_ACCOUNT_ID', None)
-            elif provider == 'aihorde':
-                api_key = getattr(settings, 'AIHORDE_API_KEY', None) or "0000000000"  # Public key
-            elif provider == 'segmind':
-                api_key = getattr(settings, 'SEGMIND_API_KEY', None)
-            elif provider == 'pollinations':
-                api_key = getattr(settings, 'POLLINATION_API_KEY', None)
-            elif provider == 'deepai':
-                api_key = getattr(settings, 'DEEPAI_API_KEY', None)
-            # subnp, prodia and placeholder don't need API keys
-
-            # Initialize the AI client
-            try:
-                if provider == 'cloudflare':
-                    ai_client = get_api_client(provider, api_key, account_id=account_id)
-                else:
-                    ai_client = get_api_client(provider, api_key)
-            except ValueError as e:
-                return JsonResponse({'error': str(e)}, status=400)
-
-            # Prepare options for generation
-            generation_options = {
-                'prompt': prompt,
-                'negative_prompt': negative_prompt if negative_prompt else None,
-                'width': width,
-                'height': height,
-            }
-            
-            # Provider-specific options
-            if provider == 'stability':
-                generation_options.update({
-                    'engine': 'ultra',  # Use better quality
-                    'cfg_scale': 7,
-                    'steps': 20,  # Lower steps to save credits
-                })
+            if request.POST.get('background') in ('1', 'true', 'on'):
+                body, status = _enqueue_response(request.POST)
+                return JsonResponse(body, status=status)
 
-            # Assign model for each provider
-            if provider == 'huggingface':
-                generation_options['model'] = hf_model
-            if provider == 'subnp':
-                generation_options['model'] = subnp_model
-            if provider == 'pollinations':
-                generation_options['model'] = pollinations_model
-            if provider == 'segmind':
-                generation_options['model'] = segmind_model
-            if provider == 'prodia':
-                generation_options['model'] = prodia_model
-            if provider == 'cloudflare':
-                generation_options['model'] = cloudflare_model
-            if provider == 'aihorde':
-                generation_options['model'] = aihorde_model
-            
-            # Filter out None values
-            generation_options = {k: v for k, v in generation_options.items() if v is not None}
-
-            # Call the AI model
-            try:
-                image_results: List[ImageResult] = ai_client.generate_image(
-                    prompt=prompt, 
-                    options=generation_options
-                )
-            except Exception as e:
-                logger.error(f"Error calling {provider} client: {e}")
-                error_msg = str(e)
-                # Provide helpful error messages
-                if provider == 'stability' and '400' in error_msg:
-                    error_msg = "Stability AI request failed. You might be out of credits or the prompt might be filtered."
-                elif provider == 'huggingface' and 'loading' in error_msg.lower():
-                    error_msg = "Hugging Face model is loading. Please try again in a few seconds."
-                
-                return JsonResponse({'error': f'Failed to generate image: {error_msg}'}, status=500)
-
-            if not image_results:
-                return JsonResponse({'error': 'No images were generated.'}, status=500)
-
-            # Save the first generated image to database
-            img_result = image_results[0]
-            try:
-                # Extraire toutes les métadonnées du formulaire
-                width = int(request.POST.get('width', 1024))
-                height = int(request.POST.get('height', 1024))
-                aspect_ratio = request.POST.get('aspect_ratio', '1:1')
-                output_format = request.POST.get('output_format', 'PNG')
-                negative_prompt = request.POST.get('negative_prompt', '')
-                seed = request.POST.get('seed', None)
-                cfg_scale = request.POST.get('cfg_scale', None)
-                
-                # Convertir seed et cfg_scale en nombres si fournis
-                if seed and seed.strip():
-                    try:
-                        seed = int(seed)
-                    except ValueError:
-                        seed = None
-                else:
-                    seed = None
-                    
-                if cfg_scale and cfg_scale.strip():
-                    try:
-                        cfg_scale = float(cfg_scale)
-                    except ValueError:
-                        cfg_scale = None
-                else:
-                    cfg_scale = None
-
-                # Créer l'objet avec toutes les métadonnées
-                new_db_image = GeneratedImage(
-                    prompt=img_result.prompt,
-                    negative_prompt=negative_prompt if negative_prompt else None,
-                    model_used=img_result.model_used,
-                    provider=provider,
-                    image_data=img_result.image_data,
-                    width=width,
-                    height=height,
-                    aspect_ratio=aspect_ratio,
-                    output_format=output_format,
-                    seed=seed,
-                    cfg_scale=cfg_scale,
-                    style_preset=style_preset if style_preset else None,
-                )
-                new_db_image.save()
-                
-                logger.info(f"Successfully saved image to database (ID: {new_db_image.id})")
-
-                # Préparer la réponse avec toutes les métadonnées
-                response_data = {
-                    'id': new_db_image.id,
-                    'prompt': new_db_image.prompt,
-                    'model_used': new_db_image.model_used,
-                    'provider': provider,
-                    'width': width,
-                    'height': height,
-                    'aspect_ratio': aspect_ratio,
-                    'output_format': output_format,
-                    'image_base64': base64.b64encode(new_db_image.image_data).decode('utf-8'),
-                    'content_type': f'image/{output_format.lower()}',
-                    'created_at': new_db_image.created_at.isoformat(),
-                }
-                
-                return JsonResponse(response_data, status=200)
-
-            except Exception as e:
-                logger.error(f"Error saving image to database: {e}")
-                # Toujours retourner l'image même si la sauvegarde échoue
-                response_data = {
-                    'prompt': img_result.prompt,
-                    'model_used': img_result.model_used,
-                    'provider': provider,
-                    'image_base64': base64.b64encode(img_result.image_data).decode('utf-8'),
-                    'content_type': 'image/png',
-                    'warning': 'Image generated but not saved to database'
-                }
-                return JsonResponse(response_data, status=200)
+            body, status = _single_flight_response(request.POST)
+            return JsonResponse(body, status=status)
 
         except ValueError as e:
             logger.error(f"ValueError in generate_image_api: {e}")
@@ -267,6 +799,350 @@ def generate_image_api(request):
 
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+
+@require_http_methods(["POST"])
+async def agenerate_image_api(request):
+    """
+    Async version of generate_image_api.
+
+    Served under openimage/asgi.py, the provider call is awaited on the event
+    loop (agenerate_image) instead of pinning a worker thread while remote
+    jobs are polled, so one process can keep many generations in flight.
+    Only database work (quota lookups, the final write) runs in a thread.
+    """
+    try:
+        if request.POST.get('background') in ('1', 'true', 'on'):
+            body, status = await sync_to_async(_enqueue_response)(request.POST)
+            return JsonResponse(body, status=status)
+
+        if not getattr(settings, 'SINGLE_FLIGHT_ENABLED', True):
+            body, status = await _agenerate_response(request.POST)
+            return JsonResponse(body, status=status)
+
+        result, coalesced = await get_single_flight().ado(
+            request_key(request.POST),
+            lambda: _agenerate_response(request.POST),
+            share=_share_generation,
+        )
+        body, status = await sync_to_async(_coalesced_response)(result) if coalesced else result
+        return JsonResponse(body, status=status)
+
+    except ValueError as e:
+        logger.error(f"ValueError in agenerate_image_api: {e}")
+        return JsonResponse({'error': f'Invalid input: {str(e)}'}, status=400)
+    except Exception as e:
+        logger.error(f"Unexpected error in agenerate_image_api: {e}")
+        return JsonResponse({'error': 'An internal server error occurred. Please try again.'}, status=500)
+
+
+# --- Background jobs ---
+
+def _job_status(job: GenerationJob) -> dict:
+    """JSON description of a generation job, without image data."""
+    status = {
+        'job_id': str(job.id),
+        'status': job.status,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('you_image_generator:job_status', args=[job.id]),
+        'result_url': reverse('you_image_generator:job_result', args=[job.id]),
+        'events_url': reverse('you_image_generator:job_events', args=[job.id]),
+    }
+    stage, details = job_event(job)
+    status['progress'] = {'stage': stage, **details}
+    if job.status == GenerationJob.STATUS_QUEUED:
+        status['position'] = details['position']
+    if job.is_finished:
+        status['result'] = job.result
+        if job.error:
+            status['error'] = job.error
+    return status
+
+
+def _enqueue_response(data) -> tuple:
+    """Queue a generation request as a background job: (JSON body, HTTP status)."""
+    try:
+        _validate_prompt(data)
+    except GenerationRequestError as e:
+        return {'error': e.message}, e.status
+    return _job_status(enqueue_generation(data)), 202
+
+
+def _with_image_data(body: dict) -> dict:
+    """Stored response body with the base64 image(s) reloaded from their rows."""
+    body = dict(body)
+    ids = [body['id']] + [image['id'] for image in body.get('images', []) if 'id' in image]
+    images = GeneratedImage.objects.with_image().in_bulk(ids)
+
+    def encoded(image_id):
+        image = images.get(image_id)
+        return base64.b64encode(image.image_data).decode('utf-8') if image else None
+
+    if 'image_base64' not in body:
+        body['image_base64'] = encoded(body['id'])
+    if 'images' in body:
+        body['images'] = [
+            {**image, 'image_base64': encoded(image['id'])} if 'id' in image else image
+            for image in body['images']
+        ]
+    return body
+
+
+@require_http_methods(["GET"])
+def job_status_api(request, job_id):
+    """Status of a background generation job (queue position, result metadata)."""
+    job = GenerationJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse(_job_status(recover_stale_job(job)))
+
+
+@require_http_methods(["GET"])
+def job_result_api(request, job_id):
+    """
+    Result of a background generation job, in the same format as generate/.
+    Answers 202 with the job status while it is not finished.
+    """
+    job = GenerationJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    job = recover_stale_job(job)
+    if not job.is_finished:
+        return JsonResponse(_job_status(job), status=202)
+
+    body = job.result or {}
+    if job.status == GenerationJob.STATUS_SUCCEEDED and 'id' in body:
+        body = _with_image_data(body)
+    body['job_id'] = str(job.id)
+    return JsonResponse(body, status=job.http_status or 200)
+
+
+def _sse_message(event: str, data: dict, event_id: int) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _job_progress_event(job_id) -> Optional[tuple]:
+    """(SSE payload, finished) of a job's current state, None if it is gone."""
+    job = GenerationJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return None
+    job = recover_stale_job(job)
+    stage, details = job_event(job)
+    data = {'job_id': str(job.id), 'stage': stage, **details}
+    if job.is_finished:
+        data['result'] = job.result
+        data['result_url'] = reverse('you_image_generator:job_result', args=[job.id])
+    return data, job.is_finished
+
+
+@require_http_methods(["GET"])
+async def job_events_api(request, job_id):
+    """
+    Server-Sent Events stream of a background job's progress.
+
+    Emits normalized events (queued, position, processing, downloading,
+    then complete or failed) each time the job row changes, and ends once
+    the job is finished. The row is polled with asyncio.sleep between
+    checks: served under openimage/asgi.py, an open stream holds no worker
+    thread. (A WSGI server would only send it once the job is done, so the
+    page polls api/jobs/<id>/ there.)
+    """
+    if not await GenerationJob.objects.filter(pk=job_id).aexists():
+        return JsonResponse({'error': 'Job not found'}, status=404)
+
+    poll_interval = getattr(settings, 'JOB_EVENTS_POLL_INTERVAL', 0.5)
+    timeout = getattr(settings, 'JOB_EVENTS_TIMEOUT', 600)
+    keepalive = 15
+
+    async def stream():
+        started = last_sent = time.monotonic()
+        last_data = None
+        event_id = 0
+        # Reconnect delay of EventSource after the stream ends
+        yield 'retry: 2000\n\n'
+
+        while True:
+            state = await sync_to_async(_job_progress_event)(job_id)
+            if state is None:
+                return
+
+            data, finished = state
+            if data != last_data:
+                last_data = data
+                event_id += 1
+                yield _sse_message(data['stage'], data, event_id)
+                last_sent = time.monotonic()
+
+            if finished:
+                return
+            now = time.monotonic()
+            if now - started > timeout:
+                return
+            if now - last_sent > keepalive:
+                yield ': keep-alive\n\n'
+                last_sent = now
+            await asyncio.sleep(poll_interval)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Do not let nginx buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# --- Grid generation ---
+
+# Form field holding the model of each provider
+_MODEL_FIELDS = {'huggingface': 'hf_model'}
+
+
+def _prepare_grid(body: dict) -> tuple:
+    """
+    Expand a grid request into prepared cells.
+
+    Body: prompts (list), providers (list of 'provider' or 'provider:model'),
+    styles (list of style keys, optional), width, height, seed, cfg_scale.
+    Cells that cannot run (unknown or unconfigured provider...) carry an
+    error instead of a generation. Returns (cells, concurrency).
+    """
+    prompts = [p.strip() for p in body.get('prompts', []) if isinstance(p, str) and p.strip()]
+    targets = [t.strip() for t in body.get('providers', []) if isinstance(t, str) and t.strip()]
+    styles = [s.strip() for s in body.get('styles', []) if isinstance(s, str)] or ['']
+    if not prompts or not targets:
+        raise GenerationRequestError('prompts and providers are required')
+    unknown_styles = [style for style in styles if style and not get_style_preset(style)]
+    if unknown_styles:
+        raise GenerationRequestError(f'Unknown style: {", ".join(unknown_styles)}')
+
+    max_cells = getattr(settings, 'GRID_MAX_CELLS', 48)
+    if len(prompts) * len(targets) * len(styles) > max_cells:
+        raise GenerationRequestError(f'A grid is limited to {max_cells} cells')
+
+    cells = expand_grid(prompts, targets, styles)
+    for cell in cells:
+        data = {
+            'prompt': cell.styled_prompt,
+            'negative_prompt': cell.negative_prompt,
+            'width': str(body.get('width', 512)),
+            'height': str(body.get('height', 512)),
+            'seed': str(body.get('seed') or ''),
+            'cfg_scale': str(body.get('cfg_scale') or ''),
+            'style_preset': cell.style,
+        }
+        if cell.model:
+            data[_MODEL_FIELDS.get(cell.provider, f'{cell.provider}_model')] = cell.model
+        try:
+            cell.generation = _prepare_generation(data, provider=cell.provider)
+            cell.generation['data'] = data
+        except GenerationRequestError as e:
+            cell.error = e.message
+
+    return cells, getattr(settings, 'GRID_CONCURRENCY_PER_PROVIDER', 2)
+
+
+def _grid_estimate(cells, concurrency: int) -> dict:
+    """estimate_grid plus the remaining quota of metered providers."""
+    estimate = estimate_grid(cells, concurrency)
+    limiter = get_rate_limiter()
+    for provider, details in estimate['providers'].items():
+        budget = limiter.remaining_budget(provider)
+        if budget is not None:
+            details['budget'] = budget
+            if budget['daily_remaining'] is not None and budget['daily_remaining'] < details['cells']:
+                details['warning'] = f"Only {budget['daily_remaining']} call(s) left today"
+    return estimate
+
+
+def _read_grid_request(request) -> tuple:
+    try:
+        body = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        raise GenerationRequestError('Invalid JSON')
+    return _prepare_grid(body) + (body.get('save', True),)
+
+
+@require_http_methods(["POST"])
+def grid_estimate_api(request):
+    """
+    Cost and time estimate of a grid, without generating anything.
+
+    POST /api/grid/estimate/ with the same JSON body as /api/grid/.
+    """
+    try:
+        cells, concurrency, _ = _read_grid_request(request)
+    except GenerationRequestError as e:
+        return JsonResponse({'error': e.message}, status=e.status)
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid input: {str(e)}'}, status=400)
+
+    estimate = _grid_estimate(cells, concurrency)
+    estimate['skipped'] = [dict(cell.describe(), error=cell.error) for cell in cells if cell.error]
+    return JsonResponse({'success': True, 'estimate': estimate})
+
+
+@require_http_methods(["POST"])
+def grid_generate_api(request):
+    """
+    Generate a prompt x provider x style grid, streaming cells as they finish.
+
+    POST /api/grid/
+    {
+        "prompts": ["a red fox", "a lighthouse"],
+        "providers": ["pollinations", "segmind:kandinsky"],
+        "styles": ["", "anime", "watercolor"],
+        "width": 512, "height": 512,
+        "save": true
+    }
+
+    The response is NDJSON (one JSON object per line): an "estimate" line,
+    one "cell" line per finished cell (with the saved image or an error),
+    then a "done" line.
+    """
+    try:
+        cells, concurrency, save = _read_grid_request(request)
+    except GenerationRequestError as e:
+        return JsonResponse({'error': e.message}, status=e.status)
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid input: {str(e)}'}, status=400)
+
+    def stream():
+        started = time.monotonic()
+        succeeded = 0
+        yield json.dumps({'type': 'estimate', **_grid_estimate(cells, concurrency)}) + '\n'
+
+        for result in iter_grid(cells, concurrency):
+            line = {'type': 'cell', **result.cell.describe(), 'duration': round(result.duration, 2)}
+            if result.error is not None:
+                line['error'] = result.error
+            else:
+                succeeded += 1
+                generation = result.cell.generation
+                if save:
+                    line['image'] = _save_image_results(
+                        generation['data'], result.cell.provider, result.cell.style, result.images[:1]
+                    )
+                else:
+                    line['image'] = {
+                        'image_base64': base64.b64encode(result.images[0].image_data).decode('utf-8'),
+                        'model_used': result.images[0].model_used,
+                    }
+            yield json.dumps(line) + '\n'
+
+        yield json.dumps({
+            'type': 'done',
+            'cells': len(cells),
+            'succeeded': succeeded,
+            'failed': len(cells) - succeeded,
+            'seconds': round(time.monotonic() - started, 2),
+        }) + '\n'
+
+    response = StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Let nginx flush each cell
+    return response
+
+
 @require_http_methods(["GET"])
 def get_model_configuration(request):
     """API endpoint pour récupérer la configuration d'un modèle"""
@@ -293,6 +1169,73 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+@require_http_methods(["GET", "HEAD"])
+def image_file_view(request, image_id):
+    """
+    Stored image file, cacheable by browsers and CDNs
+
+    GET /image/<id>/
+
+    Strong ETag, 304 on If-None-Match, Range requests and immutable
+    Cache-Control (see image_serving.py).
+    """
+    image = get_object_or_404(GeneratedImage, pk=image_id)
+    try:
+        return serve_image(request, image)
+    except BlobNotFound:
+        logger.error(f"Blob {image.image_key} of image {image.id} is missing from the store")
+        return HttpResponse(status=404)
+
+
+@require_http_methods(["GET", "HEAD"])
+def image_thumbnail_view(request, image_id, size):
+    """
+    Thumbnail of a stored image, with the same caching as image/<id>/
+
+    GET /image/<id>/thumb/<size>/
+
+    Only the sizes of settings.THUMBNAIL_SIZES exist; one not made yet is
+    made on this request.
+    """
+    image = get_object_or_404(GeneratedImage, pk=image_id)
+    key = image.thumbnails.get(str(size))
+    if key is None:
+        if size not in thumbnail_sizes():
+            return HttpResponse(status=404)
+        try:
+            key = generate_thumbnails(image, [size]).get(str(size))
+        except Exception as e:
+            logger.error(f"Thumbnail {size} of image {image.id} failed: {e}")
+            return HttpResponse(status=404)
+        if key is None:
+            return HttpResponse(status=404)
+
+    extension = key.rsplit('.', 1)[-1]
+    try:
+        return serve_blob(
+            request, key, get_blob_store().size(key), image.created_at,
+            filename=f'image-{image.id}-{size}.{extension}', default_type=f'image/{extension}',
+        )
+    except BlobNotFound:
+        logger.error(f"Thumbnail {key} of image {image.id} is missing from the store")
+        return HttpResponse(status=404)
+
+
+@require_http_methods(["GET"])
+def metrics_api(request):
+    """
+    Provider latency and throughput metrics, in Prometheus text format
+
+    GET /api/metrics
+
+    Aggregated over all worker processes (see metrics.py).
+    """
+    return HttpResponse(
+        get_metrics_registry().render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 @require_http_methods(["GET"])
 def api_health_check(request):
     """
@@ -306,8 +1249,10 @@ def api_health_check(request):
         "providers": {
             "pollinations": {
                 "is_healthy": true,
-                "message": "API working",
-                "response_time": 1.23,
+                "status": "available",
+                "message": "Client initialized",
+                "circuit": {"state": "closed", "failure_rate": 0.0, ...},
+                "budget": null,  // or {"daily_remaining": 12, "has_headroom": true, ...}
                 "info": {...}
             },
             ...
@@ -315,7 +1260,8 @@ def api_health_check(request):
         "summary": {
             "total": 4,
             "working": 3,
-            "broken": 1
+            "broken": 1,
+            "open_circuits": 1
         }
     }
     """
@@ -350,10 +1296,11 @@ def api_health_check(request):
             provider_info = AVAILABLE_PROVIDERS.get(provider_key, {})
             
             providers[provider_key] = {
-                'is_healthy': health.is_healthy,
-                'message': health.message,
-                'response_time': health.response_time,
-                'last_checked': health.last_checked.isoformat(),
+                'is_healthy': health['healthy'],
+                'status': health['status'],
+                'message': health['message'],
+                'circuit': health.get('circuit'),
+                'budget': health.get('budget'),
                 'info': {
                     'name': provider_info.get('name', provider_key),
                     'description': provider_info.get('description', ''),
@@ -365,7 +1312,7 @@ def api_health_check(request):
                 }
             }
             
-            if health.is_healthy:
+            if health['healthy']:
                 working_count += 1
             else:
                 broken_count += 1
@@ -376,7 +1323,10 @@ def api_health_check(request):
             'summary': {
                 'total': working_count + broken_count,
                 'working': working_count,
-                'broken': broken_count
+                'broken': broken_count,
+                'open_circuits': sum(
+                    1 for p in providers.values() if (p['circuit'] or {}).get('state') == 'open'
+                ),
             },
             'recommendations': get_health_recommendations(providers)
         }, status=200)
@@ -481,7 +1431,7 @@ def get_working_providers(request):
         # Get working providers
         working = [
             provider for provider, health in health_results.items()
-            if health.is_healthy
+            if health['healthy']
         ]
         
         # Recommend the best one
@@ -601,18 +1551,16 @@ def test_free_apis(request):
         
         working_subnp = []
         if r.status_code == 200:
-            import json as json_lib
-            for line in r.iter_lines(decode_unicode=True):
-                if line.startswith('data: '):
-                    try:
-                        data = json_lib.loads(line[6:])
-                        if data.get('status') == 'complete' and data.get('imageUrl'):
-                            working_subnp.append('magic')
-                            break
-                        elif data.get('status') == 'error':
-                            break
-                    except:
-                        continue
+            for event in iter_sse(r.iter_content(chunk_size=None)):
+                try:
+                    data = json.loads(event.data)
+                except ValueError:
+                    continue
+                if data.get('status') == 'complete' and data.get('imageUrl'):
+                    working_subnp.append('magic')
+                    break
+                elif data.get('status') == 'error':
+                    break
         
         results['subnp'] = {
             'status': 'ok' if working_subnp else 'error',
@@ -9,6 +9,7 @@ from django.views.decorators.http import require_http_methods
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.conf import settings
 from .models import GeneratedImage
 from .upscaler import upscale_image, upscale_image_api, REALESRGAN_AVAILABLE
 from .styles import (
@@ -225,6 +226,7 @@ def advanced_search_view(request):
                 'rating': img.rating,
                 'created_at': img.created_at.isoformat(),
                 'image_url': f'/image/{img.id}/',
+                'thumbnail_url': img.thumbnail_url(getattr(settings, 'THUMBNAIL_GALLERY_SIZE', 256)),
             })
         
         return JsonResponse({
@@ -545,7 +547,7 @@ def export_images_view(request):
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
             for img_id in image_ids:
                 try:
-                    img = GeneratedImage.objects.get(id=img_id)
+                    img = GeneratedImage.objects.with_image().get(id=img_id)
                     
                     # Create filename
                     filename = f"{img.id}_{img.prompt[:30].replace(' ', '_')}.{img.output_format.lower()}"
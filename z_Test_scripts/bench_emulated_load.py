@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test de charge de generate/ contre les providers émulés (hors réseau)
+
+1. python manage.py provider_emulator --latency uniform:1,3 --payload-bytes 500000
+2. PROVIDER_EMULATOR_URL=http://127.0.0.1:8765 GEMINI_API_KEY=dummy python manage.py runserver
+   (ou gunicorn, pour mesurer plusieurs workers)
+3. python z_Test_scripts/bench_emulated_load.py --provider gemini -n 200 -c 20
+
+Envoie N requêtes avec C clients simultanés (prompts distincts, pour ne pas
+passer par le single-flight ni le cache) et affiche débit, percentiles de
+latence et répartition des statuts HTTP. /api/metrics donne ensuite le
+détail par provider.
+
+Usage: python z_Test_scripts/bench_emulated_load.py [--url URL] [--provider P] [-n N] [-c C]
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+_local = threading.local()
+
+
+def session(base_url: str) -> requests.Session:
+    # One keep-alive session per client thread, with its CSRF cookie
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+        _local.session.get(f'{base_url}/', timeout=30)
+    return _local.session
+
+
+def generate(base_url: str, provider: str) -> tuple:
+    client = session(base_url)
+    started = time.perf_counter()
+    try:
+        response = client.post(
+            f'{base_url}/generate/',
+            data={'prompt': f'load test {uuid.uuid4().hex}', 'provider': provider},
+            headers={'X-CSRFToken': client.cookies.get('csrftoken', ''), 'Referer': f'{base_url}/'},
+            timeout=300,
+        )
+        status = response.status_code
+    except requests.RequestException as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - started
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--provider', default='pollinations')
+    parser.add_argument('-n', '--requests', type=int, default=100)
+    parser.add_argument('-c', '--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: generate(args.url, args.provider), range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency in results]
+    print(f"{args.requests} requêtes, {args.concurrency} clients, provider={args.provider}")
+    print(f"durée {elapsed:.1f}s, débit {args.requests / elapsed:.1f} req/s")
+    print(f"latence moyenne {statistics.mean(latencies):.2f}s, p50 {percentile(latencies, 0.5):.2f}s, "
+          f"p95 {percentile(latencies, 0.95):.2f}s, p99 {percentile(latencies, 0.99):.2f}s")
+    for status, count in Counter(status for status, _ in results).most_common():
+        print(f"  HTTP {status}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Temps par étape du chemin SDK HuggingFace (HuggingFaceClient._encode_image)
+
+Simule la réponse d'un modèle 1024x1024 (JPEG renvoyé par l'API) et mesure :
+- ancien chemin : décodage PIL (fait par text_to_image) + PNG niveau 6 par défaut
+- nouveau chemin sans post() : décodage + encodage unique (PNG niveau 1, JPEG, WEBP)
+- nouveau chemin avec post() : octets bruts transmis, aucune étape
+
+Usage: python z_Test_scripts/bench_hf_encode.py
+"""
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from django.conf import settings  # noqa: E402
+
+settings.configure()
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from you_image_generator.ai_clients import HuggingFaceClient  # noqa: E402
+
+ROUNDS = 5
+
+
+def provider_jpeg(size: int = 1024) -> bytes:
+    # Noise smoothed a little: closer to a photo than pure noise or a flat color
+    image = Image.frombytes('RGB', (size, size), os.urandom(size * size * 3)).filter(ImageFilter.GaussianBlur(2))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def timed(fn) -> tuple:
+    """Mean milliseconds per call and size of the result"""
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn()
+    size = len(result) if isinstance(result, bytes) else 0
+    return (time.perf_counter() - started) / ROUNDS * 1000, size
+
+
+def decode(raw: bytes):
+    image = Image.open(io.BytesIO(raw))
+    image.load()
+    return image
+
+
+def main():
+    raw = provider_jpeg()
+    image = decode(raw)
+    decode_ms, _ = timed(lambda: decode(raw))
+
+    def legacy():
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    rows = [('old: decode + PNG level 6', decode_ms, *timed(legacy))]
+    for output_format, level in (('PNG', 1), ('JPEG', None), ('WEBP', None)):
+        settings.IMAGE_ENCODE_PNG_COMPRESS_LEVEL = level or 1
+        label = f"new: decode + {output_format}" + (f" level {level}" if level else ' q90')
+        rows.append((label, decode_ms, *timed(lambda: HuggingFaceClient._encode_image(image, output_format))))
+    rows.append(('new: raw bytes passthrough', 0.0, 0.0, len(raw)))
+
+    print(f"{'path':<30} {'decode ms':>10} {'encode ms':>10} {'total ms':>9} {'bytes':>10}")
+    for label, decode_time, encode_time, size in rows:
+        print(f"{label:<30} {decode_time:10.1f} {encode_time:10.1f} {decode_time + encode_time:9.1f} {size:10d}")
+
+
+if __name__ == '__main__':
+    main()
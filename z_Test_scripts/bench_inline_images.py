@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire de l'extraction base64 en flux (you_image_generator/inline_images.py)
+
+Compare, pour une réponse JSON Gemini contenant une image de N Mo :
+- l'ancienne méthode : texte complet, response.json(), puis b64decode
+- Base64FieldExtractor, alimenté par morceaux de 64 Ko
+
+Chaque mesure tourne dans un processus neuf ; on affiche le pic d'allocations
+Python (tracemalloc) et la hausse du pic RSS au-delà du corps reçu.
+
+Usage: python z_Test_scripts/bench_inline_images.py [taille_image_Mo]
+"""
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_body(image_mb: float) -> bytes:
+    image = b'\x89PNG\r\n\x1a\n' + os.urandom(int(image_mb * 1024 * 1024))
+    return json.dumps({'candidates': [{'content': {'parts': [
+        {'inlineData': {'mimeType': 'image/png', 'data': base64.b64encode(image).decode()}}
+    ]}}]}).encode()
+
+
+def chunks(body: bytes):
+    view = memoryview(body)
+    for i in range(0, len(body), CHUNK_SIZE):
+        yield bytes(view[i:i + CHUNK_SIZE])
+
+
+def legacy(body: bytes) -> int:
+    # requests: content joined from the chunks, decoded to text, then parsed
+    text = b''.join(chunks(body)).decode('utf-8')
+    data = json.loads(text)
+    image_b64 = data['candidates'][0]['content']['parts'][0]['inlineData']['data']
+    return len(base64.b64decode(image_b64))
+
+
+def streaming(body: bytes) -> int:
+    from you_image_generator.inline_images import Base64FieldExtractor
+
+    extractor = Base64FieldExtractor(('candidates', 'content', 'parts', 'inlineData', 'data'),
+                                     max_bytes=1 << 40)
+    for chunk in chunks(body):
+        if extractor.feed(chunk):
+            break
+    return len(extractor.getvalue())
+
+
+def measure(method: str, image_mb: float):
+    from django.conf import settings
+    settings.configure(IMAGE_DOWNLOAD_SPOOL_BYTES=1 << 40)
+
+    body = make_body(image_mb)
+    fn = {'legacy': legacy, 'streaming': streaming}[method]
+    fn(make_body(0.01))  # imports, warm-up
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn(body)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss
+    print(json.dumps({'size': size, 'peak': peak, 'rss_kb': rss_growth, 'seconds': elapsed}))
+
+
+def main():
+    image_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    print(f"Image {image_mb} MB, JSON body {len(make_body(image_mb)) / 1e6:.1f} MB")
+    print(f"{'method':>10} {'peak alloc MB':>14} {'peak RSS +MB':>13} {'seconds':>8}")
+    for method in ('legacy', 'streaming'):
+        out = subprocess.run([sys.executable, __file__, '--measure', method, str(image_mb)],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out)
+        print(f"{method:>10} {result['peak'] / 1e6:14.1f} {result['rss_kb'] / 1024:13.1f} {result['seconds']:8.3f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], float(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du parseur SSE (you_image_generator/sse.py)
+
+Compare le parseur incrémental à l'ancienne boucle de SubnpClient
+(buffer += chunk; buffer.split('\\n')) sur des flux de plus en plus longs,
+découpés en petits morceaux. Le temps par Mo du parseur reste constant
+(linéaire), celui de l'ancienne boucle grandit avec la longueur des lignes.
+
+Usage: python z_Test_scripts/bench_sse_parser.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from you_image_generator.sse import iter_sse  # noqa: E402
+
+CHUNK_SIZE = 64
+
+
+def make_stream(events: int, payload: int) -> bytes:
+    data = b'x' * payload
+    return b''.join(b'id: %d\ndata: {"status": "processing", "blob": "%s"}\n\n' % (i, data) for i in range(events))
+
+
+def chunks(stream: bytes):
+    return (stream[i:i + CHUNK_SIZE] for i in range(0, len(stream), CHUNK_SIZE))
+
+
+def legacy(stream: bytes) -> int:
+    """Ancienne boucle de SubnpClient.generate_image"""
+    buffer = ''
+    count = 0
+    for chunk in chunks(stream):
+        buffer += chunk.decode('utf-8')
+        lines = buffer.split('\n')
+        buffer = lines[-1]
+        count += sum(1 for line in lines[:-1] if line.startswith('data: '))
+    return count
+
+
+def incremental(stream: bytes) -> int:
+    return sum(1 for _ in iter_sse(chunks(stream)))
+
+
+def timed(fn, stream: bytes) -> float:
+    started = time.perf_counter()
+    fn(stream)
+    return time.perf_counter() - started
+
+
+def main():
+    print(f"{'stream':>22} {'MB':>6} {'legacy s/MB':>12} {'parser s/MB':>12}")
+    for events, payload in ((200, 1000), (100, 10_000), (20, 100_000), (5, 400_000)):
+        stream = make_stream(events, payload)
+        assert incremental(stream) == legacy(stream) == events
+        mb = len(stream) / 1e6
+        print(f"{events:>6} x {payload:>9} B {mb:6.1f} "
+              f"{timed(legacy, stream) / mb:12.4f} {timed(incremental, stream) / mb:12.4f}")
+
+
+if __name__ == '__main__':
+    main()